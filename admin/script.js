@@ -208,6 +208,29 @@ async function reloadDetector() {
     }
 }
 
+// ===== 影像預覽 =====
+// 只在開啟時連線 MJPEG 串流 (伺服器沒有觀看者時不繪製也不編碼)
+let previewActive = false;
+
+function togglePreview() {
+    const image = document.getElementById('preview-image');
+    const placeholder = document.getElementById('preview-placeholder');
+    const button = document.getElementById('btn-toggle-preview');
+    
+    previewActive = !previewActive;
+    if (previewActive) {
+        image.src = `/api/preview.mjpg?t=${Date.now()}`;
+        image.style.display = 'block';
+        placeholder.style.display = 'none';
+        button.textContent = '⏹ 關閉預覽';
+    } else {
+        image.removeAttribute('src');
+        image.style.display = 'none';
+        placeholder.style.display = 'flex';
+        button.textContent = '▶ 開啟預覽';
+    }
+}
+
 // ===== 查看 API 文件 =====
 function viewDocs() {
     window.open('/docs', '_blank');
@@ -250,6 +273,7 @@ function bindEvents() {
     document.getElementById('btn-refresh-connection').addEventListener('click', refreshConnection);
     document.getElementById('btn-reload-detector').addEventListener('click', reloadDetector);
     document.getElementById('btn-view-docs').addEventListener('click', viewDocs);
+    document.getElementById('btn-toggle-preview').addEventListener('click', togglePreview);
 }
 
 // ===== CSS 動畫 =====
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+近距離警報 API 端點 (WebSocket 事件頻道與 REST 查詢)
+"""
+
+from typing import Optional
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+
+from ..models.schemas import ApiResponse
+from ..services.alerts import AlertEngine, AlertChannel
+from ..services.connection_manager import ConnectionManager
+from ..services.remote_detector import RemoteDetectorService
+
+
+# 建立路由器
+router = APIRouter(tags=["alerts"])
+
+# 全域服務實例 (在 main.py 中初始化)
+alert_engine: Optional[AlertEngine] = None
+alert_channel: AlertChannel = None
+connection_manager: ConnectionManager = None
+remote_detector: Optional[RemoteDetectorService] = None
+
+
+def init_alert_services(engine: Optional[AlertEngine], channel: AlertChannel, manager: ConnectionManager,
+                        remote: Optional[RemoteDetectorService] = None):
+    """
+    初始化警報 API 服務 (由 main.py 呼叫)
+
+    Args:
+        engine: 警報引擎 (daemon 訂閱端模式為 None)
+        channel: 警報 WebSocket 頻道
+        manager: 連線管理器 (警報連線也會保持偵測器運行)
+        remote: daemon 訂閱端模式的遠端偵測服務 (警報由常駐程式評估,狀態向其查詢、事件由其轉送)
+    """
+    global alert_engine, alert_channel, connection_manager, remote_detector
+    alert_engine = engine
+    alert_channel = channel
+    connection_manager = manager
+    remote_detector = remote
+
+
+@router.websocket("/ws/alerts")
+async def websocket_alerts(websocket: WebSocket):
+    """
+    警報事件串流 (只需要警報的前端可不訂閱完整偵測串流)
+
+    連線後先回傳目前狀態:
+    {"type": "alert_state", "active": [{"rule": str, "since": float}]}
+
+    之後只在規則狀態改變時推送:
+    {
+        "type": "alert",
+        "event": "enter" | "exit",
+        "rule": str,
+        "distance": float,
+        "closest_distance": float,
+        "count": int,
+        "timestamp": float,
+        "duration": float      // 僅 exit
+    }
+    """
+    await alert_channel.connect(websocket)
+    try:
+        await connection_manager.acquire()
+    except RuntimeError as e:
+        alert_channel.disconnect(websocket)
+        await websocket.close(code=1011, reason="偵測器無法啟動")
+        print(f"❌ 警報 WebSocket 無法啟動偵測器: {e}")
+        return
+
+    try:
+        active = alert_engine.get_active() if alert_engine else (await remote_detector.query("alerts"))["active"]
+        await websocket.send_json({"type": "alert_state", "active": active})
+
+        while True:
+            try:
+                data = await websocket.receive_text()
+                if data == "ping":
+                    await websocket.send_text("pong")
+            except WebSocketDisconnect:
+                break
+
+    except Exception as e:
+        print(f"❌ 警報 WebSocket 錯誤: {e}")
+    finally:
+        alert_channel.disconnect(websocket)
+        await connection_manager.release()
+
+
+@router.get("/api/alerts", response_model=ApiResponse)
+async def get_alerts():
+    """
+    取得警報規則、觸發中的規則與最近事件
+
+    Returns:
+        {"rules": [...], "active": [...], "recent": [...]}
+    """
+    return ApiResponse(
+        status="success",
+        message="成功取得警報狀態",
+        data=alert_engine.get_state() if alert_engine else await remote_detector.query_or_503("alerts")
+    )
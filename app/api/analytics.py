@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+即時人流分析 API 端點
+"""
+
+from typing import Optional
+from fastapi import APIRouter, Query
+
+from ..models.schemas import ApiResponse
+from ..services.analytics import OccupancyAnalytics
+from ..services.remote_detector import RemoteDetectorService
+
+
+# 建立路由器
+router = APIRouter(prefix="/api/analytics", tags=["analytics"])
+
+# 全域服務實例 (在 main.py 中初始化)
+analytics: Optional[OccupancyAnalytics] = None
+remote_detector: Optional[RemoteDetectorService] = None
+
+
+def init_analytics_services(occupancy_analytics: Optional[OccupancyAnalytics],
+                            remote: Optional[RemoteDetectorService] = None):
+    """
+    初始化人流分析 API 服務 (由 main.py 呼叫)
+
+    Args:
+        occupancy_analytics: 人流分析器 (daemon 訂閱端模式為 None)
+        remote: daemon 訂閱端模式的遠端偵測服務 (分析由常駐程式維護,向其查詢)
+    """
+    global analytics, remote_detector
+    analytics = occupancy_analytics
+    remote_detector = remote
+
+
+@router.get("", response_model=ApiResponse)
+async def get_analytics():
+    """
+    取得人流分析摘要
+
+    Returns:
+        在場人數 (含各距離區間)、各時間窗不重複訪客數、平均停留時間、
+        各距離區間累計時間、接近/遠離次數
+    """
+    return ApiResponse(
+        status="success",
+        message="成功取得人流分析",
+        data=analytics.get_summary() if analytics else await remote_detector.query_or_503("analytics")
+    )
+
+
+@router.get("/tracks", response_model=ApiResponse)
+async def get_analytics_tracks(
+    recent: int = Query(50, ge=0, le=1000, description="最近結束的追蹤筆數")
+):
+    """
+    取得進行中與最近結束的追蹤 (停留時間、距離區間時間、接近/遠離次數)
+
+    Returns:
+        {"active": [...], "finished": [...]}
+    """
+    return ApiResponse(
+        status="success",
+        message="成功取得追蹤分析",
+        data=analytics.get_tracks(recent) if analytics else await remote_detector.query_or_503(
+            "analytics_tracks", recent=recent
+        )
+    )
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批次校準 API 端點 (錄製已知距離樣本、擬合並寫回 sensor_config.json)
+"""
+
+import io
+import asyncio
+import numpy as np
+from functools import partial
+from typing import Dict, Any
+from fastapi import APIRouter, Body, HTTPException, Query
+from fastapi.responses import Response
+from pydantic import ValidationError
+
+from ..models.schemas import ApiResponse, CalibrationRecordRequest
+from ..models.sensor_config import DistanceSettings, ReloadPlan
+from ..services.calibration import CalibrationRecorder, solve_calibration
+from ..services.connection_manager import ConnectionManager
+from ..utils.config_loader import load_sensor_config, update_sensor_config
+
+
+# 建立路由器
+router = APIRouter(prefix="/api/calibration", tags=["calibration"])
+
+# 全域服務實例 (在 main.py 中初始化)
+recorder: CalibrationRecorder = None
+detector_service = None
+connection_manager: ConnectionManager = None
+
+# 錄製結束後偵測器保持運行的秒數
+RECORD_LINGER = 5.0
+
+
+def init_calibration_services(calibration_recorder: CalibrationRecorder, detector, manager: ConnectionManager):
+    """
+    初始化校準 API 服務 (由 main.py 呼叫)
+
+    Args:
+        calibration_recorder: 校準樣本錄製器
+        detector: 偵測服務實例 (寫回配置後重新載入)
+        manager: 連線管理器 (錄製期間保持偵測器運行)
+    """
+    global recorder, detector_service, connection_manager
+    recorder = calibration_recorder
+    detector_service = detector
+    connection_manager = manager
+
+
+async def _hold_detector(duration: float):
+    """錄製期間持有偵測器租約 (即使沒有串流客戶端也會持續偵測)"""
+    try:
+        await connection_manager.acquire()
+    except RuntimeError as e:
+        print(f"❌ 校準錄製無法啟動偵測器: {e}")
+        return
+    try:
+        await asyncio.sleep(duration)
+    finally:
+        await connection_manager.release(linger=RECORD_LINGER)
+
+
+async def _write_distance(values: Dict[str, Any]):
+    """
+    驗證後寫入 distance 參數並熱套用
+
+    Args:
+        values: 要更新的距離參數 (只更新傳入的欄位)
+
+    Returns:
+        (寫入後的配置, 套用計畫)
+
+    Raises:
+        HTTPException: 參數驗證或套用失敗 (400)
+    """
+    current = load_sensor_config().get("distance", {})
+    try:
+        DistanceSettings.model_validate({**current, **values})
+    except ValidationError as e:
+        raise HTTPException(status_code=400, detail=f"距離參數驗證失敗: {e.errors()[0]['msg']}")
+
+    config = update_sensor_config("distance", values)
+    try:
+        plan = await detector_service.reload_config()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if isinstance(plan, ReloadPlan):
+        plan = plan.to_dict()
+    return config, plan
+
+
+@router.get("", response_model=ApiResponse)
+async def get_calibration_status():
+    """
+    取得錄製狀態與各距離樣本數
+
+    Returns:
+        錄製狀態
+    """
+    return ApiResponse(
+        status="success",
+        message="成功取得校準狀態",
+        data=recorder.get_status()
+    )
+
+
+@router.post("/record", response_model=ApiResponse)
+async def start_recording(request: CalibrationRecordRequest):
+    """
+    開始錄製一段已知距離的樣本 (畫面中需只有一人站在指定距離)
+
+    Returns:
+        錄製狀態
+    """
+    recorder.start(request.distance, request.duration)
+    asyncio.create_task(_hold_detector(request.duration))
+
+    return ApiResponse(
+        status="success",
+        message=f"開始錄製 {request.distance:g} cm 樣本",
+        data=recorder.get_status()
+    )
+
+
+@router.post("/stop", response_model=ApiResponse)
+async def stop_recording():
+    """停止錄製"""
+    recorder.stop()
+    return ApiResponse(status="success", message="已停止錄製", data=recorder.get_status())
+
+
+@router.delete("/samples", response_model=ApiResponse)
+async def clear_samples():
+    """清除所有樣本"""
+    recorder.clear()
+    return ApiResponse(status="success", message="已清除校準樣本", data=recorder.get_status())
+
+
+@router.get("/samples")
+async def export_samples():
+    """
+    匯出樣本 CSV (box_height, box_width, distance),可用 python -m tools.calibrate 離線擬合
+
+    Returns:
+        CSV 檔案
+    """
+    buffer = io.StringIO()
+    buffer.write("box_height,box_width,distance\n")
+    np.savetxt(buffer, np.column_stack(recorder.arrays()), fmt="%.2f", delimiter=",")
+    return Response(
+        content=buffer.getvalue(),
+        media_type="text/csv",
+        headers={"Content-Disposition": "attachment; filename=calibration_samples.csv"}
+    )
+
+
+@router.post("/solve", response_model=ApiResponse)
+async def solve(
+    write: bool = Query(False, description="是否寫回 sensor_config.json 並重新載入偵測器"),
+    fit_ratio: bool = Query(True, description="是否擬合 standing_ratio"),
+    outlier_k: float = Query(3.0, gt=0, description="離群值門檻 (MAD 倍數)"),
+    min_samples: int = Query(20, ge=3, description="擬合單一姿態係數所需的最少樣本數")
+):
+    """
+    以目前樣本擬合焦距與姿態係數
+
+    Returns:
+        擬合結果與殘差統計
+    """
+    heights, widths, distances = recorder.arrays()
+    distance_config = load_sensor_config()["distance"]
+
+    loop = asyncio.get_event_loop()
+    try:
+        result = await loop.run_in_executor(None, partial(
+            solve_calibration, heights, widths, distances, distance_config,
+            fit_ratio=fit_ratio, outlier_k=outlier_k, min_samples=min_samples
+        ))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if write:
+        await _write_distance(result["config"])
+        print(f"📐 校準結果已寫入: {result['config']}")
+
+    return ApiResponse(
+        status="success",
+        message="校準完成並已寫入配置" if write else "校準完成 (尚未寫入配置)",
+        data={**result, "written": write}
+    )
+
+
+@router.get("/distance", response_model=ApiResponse)
+async def get_distance_config():
+    """
+    取得目前的距離參數 (遠端校準 GUI 連線時同步)
+
+    Returns:
+        sensor_config.json 的 distance 區塊
+    """
+    return ApiResponse(
+        status="success",
+        message="成功取得距離參數",
+        data=load_sensor_config().get("distance", {})
+    )
+
+
+@router.put("/distance", response_model=ApiResponse)
+async def update_distance_config(values: Dict[str, Any] = Body(..., description="要更新的距離參數")):
+    """
+    寫回距離參數並熱套用 (遠端校準 GUI 的校準結果)
+    只更新傳入的欄位,寫入前先驗證,偵測不中斷也不需另開模型
+
+    Returns:
+        更新後的距離參數與套用計畫
+    """
+    config, plan = await _write_distance(values)
+    print(f"📐 距離參數已由遠端更新: {values}")
+
+    return ApiResponse(
+        status="success",
+        message="距離參數已寫入配置",
+        data={"distance": config["distance"], "plan": plan}
+    )
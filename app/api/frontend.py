@@ -4,11 +4,18 @@
 RESTful API 端點 (前端展覽作品用)
 """
 
-from fastapi import APIRouter, HTTPException
-from ..models.schemas import DetectionResult, DetectionStats, NetworkConfig, ApiResponse
+import json
+import os
+import time
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from ..models.schemas import ApiResponse
+from ..models.sensor_config import ReloadPlan
+from ..services.connection_manager import ConnectionManager
 from ..services.detector import YOLODetectorService
+from ..services.subscription import Subscription, FULL_SUBSCRIPTION
 from ..utils.config_loader import load_network_config, save_network_config
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Callable, Hashable
 
 
 # 建立路由器
@@ -16,57 +23,304 @@ router = APIRouter(prefix="/api", tags=["frontend"])
 
 # 全域服務實例 (在 main.py 中初始化)
 detector_service: YOLODetectorService = None
+connection_manager: ConnectionManager = None
 
+# 附加統計來源 (名稱 → 取得統計字典的函式),併入 /api/detection/stats
+stats_providers: Dict[str, Callable[[], Dict[str, Any]]] = {}
 
-def init_frontend_services(detector: YOLODetectorService):
+# 長輪詢參數
+LONG_POLL_MAX_TIMEOUT = 30.0      # 單次請求最長等待秒數
+LONG_POLL_LINGER = 10.0           # 最後一個長輪詢結束後,偵測器保持運行的秒數
+SSE_KEEPALIVE_INTERVAL = 15.0     # SSE 無新幀時的心跳間隔 (秒)
+
+# 附加統計 (CPU、連線數...) 與幀無關,偵測器閒置時也會變化;統計快取最長保留的秒數
+STATS_CACHE_INTERVAL = 1.0
+
+
+def init_frontend_services(detector: YOLODetectorService, manager: ConnectionManager):
     """
     初始化 Frontend API 服務 (由 main.py 呼叫)
     
     Args:
         detector: 偵測服務實例
+        manager: 連線管理器實例 (提供共用幀來源)
     """
-    global detector_service
+    global detector_service, connection_manager
     detector_service = detector
+    connection_manager = manager
+
+
+class _SerializedCache:
+    """
+    已序列化回應快取
+    同一版本鍵 (例如幀序號) 只序列化一次,並以版本鍵產生 ETag
+    """
+    
+    # 每次啟動不同,避免服務重啟後序號重複造成誤判 304
+    _boot_id = f"{os.getpid():x}{int(time.time()):x}"
+    
+    def __init__(self, name: str):
+        self.name = name
+        self.key: Optional[Hashable] = None
+        self.body: bytes = b""
+        self.etag = ""
+    
+    def get(self, key: Hashable, build: Callable[[], str]):
+        """
+        取得快取內容,版本鍵改變時才重新序列化
+        
+        Args:
+            key: 版本鍵
+            build: 產生回應 JSON 字串的函式
+            
+        Returns:
+            (回應內容, ETag)
+        """
+        if key != self.key or not self.body:
+            self.body = build().encode("utf-8")
+            self.etag = f'"{self.name}-{self._boot_id}-{abs(hash(key)):x}"'
+            self.key = key
+        return self.body, self.etag
+
+
+_snapshot_cache = _SerializedCache("current")
+_stats_cache = _SerializedCache("stats")
+
+
+def _cached_response(request: Request, cache: _SerializedCache, key: Hashable,
+                     build: Callable[[], str]) -> Response:
+    """
+    回傳快取內容,客戶端 If-None-Match 相符時回傳 304
+    
+    Args:
+        request: 請求物件
+        cache: 回應快取
+        key: 版本鍵
+        build: 產生回應 JSON 字串的函式
+    """
+    body, etag = cache.get(key, build)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        if "*" in tags or etag in tags or f"W/{etag}" in tags:
+            return Response(status_code=304, headers=headers)
+    
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def register_stats_provider(name: str, provider: Callable[[], Dict[str, Any]]):
+    """
+    註冊附加統計來源 (由 main.py 呼叫)
+    
+    Args:
+        name: 統計資訊中的欄位名稱
+        provider: 取得統計字典的函式
+    """
+    stats_providers[name] = provider
+
+
+def _collect_stats() -> Dict[str, Any]:
+    """彙整偵測器統計與所有附加統計來源"""
+    stats = detector_service.get_stats()
+    for name, provider in stats_providers.items():
+        try:
+            stats[name] = provider()
+        except Exception as e:
+            stats[name] = {"error": str(e)}
+    return stats
+
+
+def _subscription_from_query(
+    fields: Optional[str],
+    min_distance: Optional[float],
+    max_distance: Optional[float],
+    min_confidence: Optional[float],
+    track_ids: Optional[str]
+) -> Subscription:
+    """
+    從查詢參數建立訂閱 (格式與 WebSocket 訂閱訊息相同)
+    
+    Raises:
+        HTTPException: 參數格式錯誤 (400)
+    """
+    message: Dict[str, Any] = {"min_confidence": min_confidence}
+    if fields:
+        message["fields"] = [f.strip() for f in fields.split(",") if f.strip()]
+    if min_distance is not None or max_distance is not None:
+        message["distance_range"] = [min_distance, max_distance]
+    if track_ids:
+        message["track_ids"] = [t.strip() for t in track_ids.split(",") if t.strip()]
+    
+    try:
+        return Subscription.from_message(message)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _envelope(data_json: str, message: str) -> str:
+    """
+    以已序列化的資料組裝 ApiResponse 格式字串 (避免重新驗證與序列化)
+    
+    Args:
+        data_json: 已序列化的 data 欄位
+        message: 回應訊息
+        
+    Returns:
+        完整回應 JSON 字串
+    """
+    return (
+        f'{{"status":"success","message":{json.dumps(message, ensure_ascii=False)},'
+        f'"data":{data_json},"timestamp":{time.time()}}}'
+    )
 
 
 @router.get("/distance/current", response_model=ApiResponse)
-async def get_current_distance():
+async def get_current_distance(request: Request):
     """
     取得最新距離資料快照 (REST 輪詢方式)
     
+    回應內容依幀序號快取,附帶 ETag;
+    客戶端帶 If-None-Match 且無新幀時回傳 304
+    
     Returns:
         最新的偵測結果
     """
-    snapshot = detector_service.get_current_snapshot()
+    frame = detector_service.current_frame
     
-    if snapshot is None:
+    if frame is None:
         return ApiResponse(
             status="error",
             message="偵測器尚未啟動或無可用資料",
             data=None
         )
     
-    return ApiResponse(
-        status="success",
-        message="成功取得當前距離資料",
-        data=snapshot
+    return _cached_response(
+        request, _snapshot_cache, frame.seq,
+        lambda: _envelope(frame.render(FULL_SUBSCRIPTION), "成功取得當前距離資料")
+    )
+
+
+@router.get("/distance/wait")
+async def wait_for_distance(
+    after_seq: int = Query(0, ge=0, description="客戶端已取得的最後幀序號"),
+    timeout: float = Query(10.0, gt=0, description="最長等待秒數"),
+    fields: Optional[str] = Query(None, description="以逗號分隔的欄位"),
+    min_distance: Optional[float] = Query(None),
+    max_distance: Optional[float] = Query(None),
+    min_confidence: Optional[float] = Query(None),
+    track_ids: Optional[str] = Query(None, description="以逗號分隔的追蹤 ID")
+):
+    """
+    長輪詢 - 有比 after_seq 更新的幀時立即回傳,否則等待至逾時
+    
+    Returns:
+        ApiResponse 格式,data 含 seq 欄位 (下次請求帶入 after_seq);
+        逾時無新幀時回傳 204
+    """
+    subscription = _subscription_from_query(
+        fields, min_distance, max_distance, min_confidence, track_ids
+    )
+    # 確保回應帶有序號,供客戶端續接
+    if "seq" not in subscription.fields:
+        subscription = Subscription(
+            fields=subscription.fields | {"seq"},
+            min_distance=subscription.min_distance,
+            max_distance=subscription.max_distance,
+            min_confidence=subscription.min_confidence,
+            track_ids=subscription.track_ids
+        )
+    
+    await connection_manager.acquire_or_503()
+    try:
+        frame = await connection_manager.hub.wait_for(
+            after_seq, min(timeout, LONG_POLL_MAX_TIMEOUT)
+        )
+    finally:
+        await connection_manager.release(linger=LONG_POLL_LINGER)
+    
+    if frame is None:
+        return Response(status_code=204)
+    
+    return Response(
+        content=_envelope(frame.render(subscription), "成功取得距離資料"),
+        media_type="application/json"
+    )
+
+
+@router.get("/distance/stream")
+async def stream_distance(
+    request: Request,
+    fields: Optional[str] = Query(None, description="以逗號分隔的欄位"),
+    min_distance: Optional[float] = Query(None),
+    max_distance: Optional[float] = Query(None),
+    min_confidence: Optional[float] = Query(None),
+    track_ids: Optional[str] = Query(None, description="以逗號分隔的追蹤 ID")
+):
+    """
+    Server-Sent Events 串流 (不支援 WebSocket 的客戶端用)
+    
+    每個事件的 id 為幀序號,data 為訂閱投影後的 JSON;
+    斷線重連時瀏覽器會帶上 Last-Event-ID,從下一幀繼續
+    """
+    subscription = _subscription_from_query(
+        fields, min_distance, max_distance, min_confidence, track_ids
+    )
+    
+    try:
+        last_seq = int(request.headers.get("last-event-id", 0))
+    except ValueError:
+        last_seq = 0
+    
+    # 回應標頭送出前先確認偵測器可啟動 (失敗回傳 503);
+    # 串流本身另外持有租約,延遲停止讓兩次取得之間偵測器不關閉
+    await connection_manager.acquire_or_503()
+    await connection_manager.release(linger=LONG_POLL_LINGER)
+    
+    async def event_stream():
+        nonlocal last_seq
+        try:
+            await connection_manager.acquire()
+        except RuntimeError as e:
+            yield f"event: error\ndata: {json.dumps({'message': str(e)}, ensure_ascii=False)}\n\n"
+            return
+        try:
+            while not await request.is_disconnected():
+                frame = await connection_manager.hub.wait_for(last_seq, SSE_KEEPALIVE_INTERVAL)
+                if frame is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                
+                last_seq = frame.seq
+                yield f"id: {frame.seq}\ndata: {frame.render(subscription)}\n\n"
+        finally:
+            await connection_manager.release()
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
 
 
 @router.get("/detection/stats", response_model=ApiResponse)
-async def get_detection_stats():
+async def get_detection_stats(request: Request):
     """
     取得當前統計資訊
     
+    回應內容依 (幀序號, 運行狀態, 運行秒數, 時間區間) 快取,附帶 ETag;
+    時間區間讓附加統計來源在偵測器閒置時最多 STATS_CACHE_INTERVAL 秒更新一次
+    
     Returns:
         統計資料 (人數、距離、FPS、運行狀態)
     """
-    stats = detector_service.get_stats()
-    
-    return ApiResponse(
-        status="success",
-        message="成功取得統計資訊",
-        data=stats
+    return _cached_response(
+        request, _stats_cache, (*detector_service.get_stats_key(), int(time.time() // STATS_CACHE_INTERVAL)),
+        lambda: _envelope(
+            json.dumps(_collect_stats(), ensure_ascii=False, separators=(",", ":")),
+            "成功取得統計資訊"
+        )
     )
 
 
@@ -101,7 +355,8 @@ async def update_network_config(config: Dict[str, Any]):
         更新結果
     """
     try:
-        success = save_network_config(config)
+        # 與現有配置合併,避免只送出部分區塊 (例如後台只送 websocket) 時覆蓋其他設定
+        success = save_network_config({**load_network_config(), **config})
         
         if success:
             return ApiResponse(
@@ -119,19 +374,25 @@ async def update_network_config(config: Dict[str, Any]):
 @router.post("/detector/refresh", response_model=ApiResponse)
 async def refresh_detector():
     """
-    重新載入配置並重啟偵測器
-    用於在 GUI 工具修改 sensor_config.json 後手動刷新
+    重新載入配置並熱套用
+    用於在 GUI 工具修改 sensor_config.json 後手動刷新 (服務也會自動監看檔案變更);
+    只有模型或攝影機設定變更時才重新載入對應資源,其餘參數不中斷偵測
     
     Returns:
-        重啟結果
+        套用計畫 (各變更欄位的套用方式)
     """
     try:
-        await detector_service.reload_config()
+        plan = await detector_service.reload_config()
+        if isinstance(plan, ReloadPlan):
+            plan = plan.to_dict()
         
         return ApiResponse(
             status="success",
-            message="偵測器配置已重新載入"
+            message="偵測器配置已重新載入",
+            data=plan
         )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"重新載入配置失敗: {str(e)}")
 
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+歷史資料 API 端點
+"""
+
+import time
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query
+
+from ..models.schemas import ApiResponse
+from ..services.history import DetectionHistory
+from ..services.remote_detector import RemoteDetectorService
+
+
+# 建立路由器
+router = APIRouter(prefix="/api", tags=["history"])
+
+# 全域服務實例 (在 main.py 中初始化)
+history: Optional[DetectionHistory] = None
+remote_detector: Optional[RemoteDetectorService] = None
+
+# 未指定 from 時的預設查詢長度 (秒)
+DEFAULT_WINDOW = 600
+
+
+def init_history_services(detection_history: Optional[DetectionHistory],
+                          remote: Optional[RemoteDetectorService] = None):
+    """
+    初始化歷史資料 API 服務 (由 main.py 呼叫)
+
+    Args:
+        detection_history: 偵測歷史環形緩衝 (daemon 訂閱端模式為 None)
+        remote: daemon 訂閱端模式的遠端偵測服務 (歷史由常駐程式維護,向其查詢)
+    """
+    global history, remote_detector
+    history = detection_history
+    remote_detector = remote
+
+
+@router.get("/distance/history", response_model=ApiResponse)
+async def get_distance_history(
+    start: Optional[float] = Query(None, alias="from", description="起始時間戳記 (預設為結束前 10 分鐘)"),
+    end: Optional[float] = Query(None, alias="to", description="結束時間戳記 (預設為現在)"),
+    max_points: int = Query(500, ge=3, le=5000, description="最多輸出點數"),
+    method: str = Query("minmax", pattern="^(minmax|lttb)$", description="降採樣方式"),
+    tracks: bool = Query(False, description="是否附帶各追蹤 ID 摘要")
+):
+    """
+    取得近期偵測歷史 (伺服器端降採樣)
+
+    - minmax: 依時間等分區間,輸出最近距離最小/最大值與人數最大/平均值
+    - lttb: Largest-Triangle-Three-Buckets,依最近距離選出保留曲線形狀的點
+
+    Returns:
+        降採樣後的時間序列
+    """
+    end = end if end is not None else time.time()
+    start = start if start is not None else end - DEFAULT_WINDOW
+    if start > end:
+        raise HTTPException(status_code=400, detail="from 必須小於 to")
+
+    params = {"start": start, "end": end, "max_points": max_points, "method": method, "tracks": tracks}
+    if history is None:
+        data = await remote_detector.query_or_503("history", **params)
+    else:
+        data = history.series(**params)
+
+    return ApiResponse(
+        status="success",
+        message="成功取得歷史資料",
+        data=data
+    )
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+標註預覽 API 端點 (MJPEG 串流與單張快照)
+"""
+
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+
+from ..services.connection_manager import ConnectionManager
+from ..services.preview import PreviewRenderer
+
+
+# 建立路由器
+router = APIRouter(prefix="/api", tags=["preview"])
+
+# 全域服務實例 (在 main.py 中初始化)
+renderer: PreviewRenderer = None
+connection_manager: ConnectionManager = None
+
+# MJPEG 分隔字串
+BOUNDARY = "frame"
+
+# 沒有新影像時的等待上限 (秒),期間檢查客戶端是否已離線
+WAIT_INTERVAL = 5.0
+
+# 原始影像尺寸標頭 ("寬x高"),客戶端以此將偵測框座標換算到預覽影像
+SOURCE_SIZE_HEADER = "X-Source-Size"
+
+# 快照在最後一位觀看者離開後保持偵測器運行的秒數 (連續取快照時不反覆開關攝影機)
+SNAPSHOT_LINGER = 5.0
+
+
+def init_preview_services(preview_renderer: PreviewRenderer, manager: ConnectionManager):
+    """
+    初始化預覽 API 服務 (由 main.py 呼叫)
+
+    Args:
+        preview_renderer: 預覽繪製器
+        manager: 連線管理器 (觀看期間保持偵測器運行)
+    """
+    global renderer, connection_manager
+    renderer = preview_renderer
+    connection_manager = manager
+
+
+def _source_size() -> str:
+    """目前預覽的原始影像尺寸標頭值"""
+    width, height = renderer.source_size or (0, 0)
+    return f"{width}x{height}"
+
+
+def _ensure_supported():
+    """daemon 訂閱端模式沒有原始影像,無法提供預覽"""
+    if not renderer.supported:
+        raise HTTPException(status_code=503, detail="訂閱端模式不提供預覽影像")
+
+
+@router.get("/preview.mjpg")
+async def preview_stream(request: Request):
+    """
+    標註預覽 MJPEG 串流 (瀏覽器可直接以 <img src="/api/preview.mjpg"> 顯示)
+
+    每幀只繪製與編碼一次,所有觀看者共用;觀看者跟不上時只會收到最新一張
+    每張影像的標頭附上 X-Source-Size (原始影像尺寸)
+    """
+    _ensure_supported()
+
+    # 回應標頭送出前先確認偵測器可啟動 (失敗回傳 503);串流本身另外持有租約
+    await connection_manager.acquire_or_503()
+    await connection_manager.release(linger=SNAPSHOT_LINGER)
+
+    async def stream():
+        await connection_manager.acquire()
+        renderer.add_viewer()
+        last_seq = 0
+        try:
+            while not await request.is_disconnected():
+                result = await renderer.wait_for(last_seq, WAIT_INTERVAL)
+                if result is None:
+                    continue
+
+                last_seq, jpeg = result
+                yield (
+                    f"--{BOUNDARY}\r\nContent-Type: image/jpeg\r\n"
+                    f"Content-Length: {len(jpeg)}\r\n"
+                    f"{SOURCE_SIZE_HEADER}: {_source_size()}\r\n\r\n"
+                ).encode("ascii") + jpeg + b"\r\n"
+        finally:
+            renderer.remove_viewer()
+            await connection_manager.release()
+
+    return StreamingResponse(
+        stream(),
+        media_type=f"multipart/x-mixed-replace; boundary={BOUNDARY}",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/preview.jpg")
+async def preview_snapshot():
+    """
+    標註預覽單張快照
+    有觀看者時直接回傳最新一張;否則暫時啟動繪製,等待下一張完成
+    """
+    _ensure_supported()
+
+    await connection_manager.acquire_or_503()
+    renderer.add_viewer()
+    try:
+        result = await renderer.wait_for(0 if renderer.viewers > 1 else renderer.seq, WAIT_INTERVAL)
+    finally:
+        renderer.remove_viewer()
+        await connection_manager.release(linger=SNAPSHOT_LINGER)
+
+    if result is None:
+        raise HTTPException(status_code=503, detail="尚無預覽影像 (偵測器未產生新幀)")
+    return Response(
+        content=result[1],
+        media_type="image/jpeg",
+        headers={"Cache-Control": "no-cache", SOURCE_SIZE_HEADER: _source_size()}
+    )
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+事件錄影 API 端點
+"""
+
+from pathlib import Path
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import FileResponse
+
+from ..models.schemas import ApiResponse
+from ..services.recording import EventRecorder, CLIP_SUFFIX, list_clips
+
+
+# 建立路由器
+router = APIRouter(prefix="/api/recordings", tags=["recordings"])
+
+# 全域服務實例 (在 main.py 中初始化)
+recorder: Optional[EventRecorder] = None
+recordings_dir: Optional[Path] = None
+
+
+def init_recording_services(event_recorder: Optional[EventRecorder], directory: Path):
+    """
+    初始化錄影 API 服務 (由 main.py 呼叫)
+
+    Args:
+        event_recorder: 事件錄影器 (未啟用或 daemon 模式由常駐程式錄影時為 None)
+        directory: 錄影目錄
+    """
+    global recorder, recordings_dir
+    recorder = event_recorder
+    recordings_dir = directory
+
+
+@router.get("", response_model=ApiResponse)
+async def get_recordings():
+    """
+    列出錄影片段 (新到舊)
+
+    Returns:
+        片段清單 (名稱、大小、觸發原因、最近距離、幀數...) 與錄影器統計
+    """
+    return ApiResponse(
+        status="success",
+        data={
+            "clips": list_clips(recordings_dir),
+            "stats": recorder.get_stats() if recorder else None
+        }
+    )
+
+
+@router.get("/{name}")
+async def download_recording(name: str):
+    """
+    下載錄影片段
+
+    Args:
+        name: 片段檔名 (GET /api/recordings 的 name)
+    """
+    if Path(name).name != name or not name.endswith(CLIP_SUFFIX):
+        raise HTTPException(status_code=400, detail="無效的片段名稱")
+    path = recordings_dir / name
+    if not path.is_file():
+        raise HTTPException(status_code=404, detail=f"找不到片段: {name}")
+    return FileResponse(path, media_type="video/mp4", filename=name)
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+長期統計 API 端點 (讀取 SQLite 時序儲存)
+"""
+
+import asyncio
+import time
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query
+
+from ..models.schemas import ApiResponse
+from ..services.storage import DetectionStore, choose_resolution
+
+
+# 建立路由器
+router = APIRouter(prefix="/api/stats", tags=["statistics"])
+
+# 全域服務實例 (在 main.py 中初始化,未啟用儲存時為 None)
+store: Optional[DetectionStore] = None
+
+# 未指定 from 時的預設查詢長度 (秒)
+DEFAULT_WINDOW = 86400
+
+
+def init_statistics_services(detection_store: Optional[DetectionStore]):
+    """
+    初始化長期統計 API 服務 (由 main.py 呼叫)
+
+    Args:
+        detection_store: 偵測資料儲存,未啟用時為 None
+    """
+    global store
+    store = detection_store
+
+
+def _resolve_range(start: Optional[float], end: Optional[float]):
+    """補齊查詢區間並檢查儲存是否啟用"""
+    if store is None:
+        raise HTTPException(status_code=503, detail="未啟用偵測資料儲存 (sensor_config.json 的 storage.enabled)")
+
+    end = end if end is not None else time.time()
+    start = start if start is not None else end - DEFAULT_WINDOW
+    if start > end:
+        raise HTTPException(status_code=400, detail="from 必須小於 to")
+    return start, end
+
+
+async def _run(func, *args):
+    """在執行緒池執行資料庫查詢,避免阻塞事件迴圈"""
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(None, func, *args)
+
+
+@router.get("/timeseries", response_model=ApiResponse)
+async def get_timeseries(
+    start: Optional[float] = Query(None, alias="from", description="起始時間戳記 (預設為 24 小時前)"),
+    end: Optional[float] = Query(None, alias="to", description="結束時間戳記 (預設為現在)"),
+    resolution: str = Query("auto", pattern="^(auto|raw|1m|1h)$", description="資料解析度")
+):
+    """
+    取得時序資料
+
+    resolution=auto 時依區間長度選擇: 15 分鐘內為原始幀,2 天內為分鐘彙總,更長為小時彙總
+
+    Returns:
+        時序資料
+    """
+    start, end = _resolve_range(start, end)
+    if resolution == "auto":
+        resolution = choose_resolution(start, end)
+
+    if resolution == "raw":
+        series = await _run(store.query_frames, start, end)
+    else:
+        series = await _run(store.query_rollups, resolution, start, end)
+
+    return ApiResponse(
+        status="success",
+        message="成功取得時序資料",
+        data={"from": start, "to": end, "resolution": resolution, "series": series}
+    )
+
+
+@router.get("/summary", response_model=ApiResponse)
+async def get_summary(
+    start: Optional[float] = Query(None, alias="from", description="起始時間戳記 (預設為 24 小時前)"),
+    end: Optional[float] = Query(None, alias="to", description="結束時間戳記 (預設為現在)")
+):
+    """
+    取得區間統計 (訪客數、平均/最多人數、最近距離、有人比例)
+    只讀取彙總表,查詢成本與區間長度無關
+
+    Returns:
+        區間統計
+    """
+    start, end = _resolve_range(start, end)
+    resolution = "1h" if choose_resolution(start, end) == "1h" else "1m"
+    summary = await _run(store.summarize, resolution, start, end)
+
+    return ApiResponse(
+        status="success",
+        message="成功取得區間統計",
+        data={"from": start, "to": end, "resolution": resolution, **summary}
+    )
+
+
+@router.get("/tracks", response_model=ApiResponse)
+async def get_tracks(
+    start: Optional[float] = Query(None, alias="from", description="起始時間戳記 (預設為 24 小時前)"),
+    end: Optional[float] = Query(None, alias="to", description="結束時間戳記 (預設為現在)"),
+    limit: int = Query(1000, ge=1, le=10000, description="最多筆數")
+):
+    """
+    取得區間內的追蹤摘要 (每位訪客一筆: 停留時間、最近/平均距離)
+
+    Returns:
+        追蹤摘要列表
+    """
+    start, end = _resolve_range(start, end)
+    tracks = await _run(store.query_tracks, start, end, limit)
+
+    return ApiResponse(
+        status="success",
+        message="成功取得追蹤摘要",
+        data={"from": start, "to": end, "tracks": tracks}
+    )
@@ -4,9 +4,11 @@
 WebSocket API 端點
 """
 
+import json
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 from ..services.connection_manager import ConnectionManager
 from ..services.detector import YOLODetectorService
+from ..services.subscription import Subscription, FULL_SUBSCRIPTION
 
 
 # 建立路由器
@@ -30,40 +32,37 @@ def init_websocket_services(detector: YOLODetectorService, manager: ConnectionMa
     connection_manager = manager
 
 
-@router.websocket("/ws/detection")
-async def websocket_detection(websocket: WebSocket):
+async def _serve_connection(websocket: WebSocket, subscription: Subscription):
     """
-    完整偵測資料串流 (後台監控用)
+    處理單一 WebSocket 連線: 註冊至連線管理器並處理客戶端訊息
     
-    回傳格式:
-    {
-        "detections": [
-            {
-                "track_id": int,
-                "distance": float,
-                "bbox": [x1, y1, x2, y2],
-                "confidence": float
-            }
-        ],
-        "fps": int,
-        "actual_fps": int,
-        "closest_distance": float,
-        "total_count": int,
-        "timestamp": float
-    }
+    支援的客戶端訊息:
+    - "ping": 心跳檢測,回覆 "pong"
+    - {"type": "subscribe", ...}: 更新訂閱內容 (格式見 Subscription.from_message)
+    
+    Args:
+        websocket: WebSocket 連線物件
+        subscription: 初始訂閱內容
     """
-    await connection_manager.connect(websocket)
+    try:
+        await connection_manager.connect(websocket, subscription)
+    except RuntimeError as e:
+        await websocket.close(code=1011, reason="偵測器無法啟動")
+        print(f"❌ WebSocket 無法啟動偵測器: {e}")
+        return
     
     try:
         # 保持連線直到客戶端斷開
         while True:
-            # 等待客戶端訊息 (用於心跳檢測)
+            # 等待客戶端訊息 (心跳檢測與訂閱)
             try:
                 data = await websocket.receive_text()
                 
                 # 處理特殊指令
                 if data == "ping":
                     await websocket.send_text("pong")
+                elif data.startswith("{"):
+                    await _handle_message(websocket, data)
                     
             except WebSocketDisconnect:
                 break
@@ -74,6 +73,58 @@ async def websocket_detection(websocket: WebSocket):
         await connection_manager.disconnect(websocket)
 
 
+async def _handle_message(websocket: WebSocket, data: str):
+    """
+    處理客戶端 JSON 訊息
+    
+    Args:
+        websocket: WebSocket 連線物件
+        data: 原始訊息字串
+    """
+    try:
+        message = json.loads(data)
+        if not isinstance(message, dict) or message.get("type") != "subscribe":
+            raise ValueError("不支援的訊息類型")
+        
+        subscription = Subscription.from_message(message)
+    except ValueError as e:
+        await websocket.send_json({"type": "error", "message": str(e)})
+        return
+    
+    connection_manager.subscribe(websocket, subscription)
+    await websocket.send_json({"type": "subscribed", "subscription": subscription.to_dict()})
+
+
+@router.websocket("/ws/detection")
+async def websocket_detection(websocket: WebSocket):
+    """
+    完整偵測資料串流 (後台監控用)
+    
+    回傳格式:
+    {
+        "detections": [
+            {
+                "track_id": int,
+                "distance": float,
+                "bbox": [x1, y1, x2, y2],
+                "confidence": float
+            }
+        ],
+        "fps": int,
+        "actual_fps": int,
+        "closest_distance": float,
+        "total_count": int,
+        "timestamp": float,
+        "seq": int
+    }
+    
+    客戶端可傳送訂閱訊息只接收需要的欄位與偵測框:
+    {"type": "subscribe", "fields": [...], "distance_range": [min, max],
+     "min_confidence": float, "track_ids": [int, ...]}
+    """
+    await _serve_connection(websocket, FULL_SUBSCRIPTION)
+
+
 @router.websocket("/ws/live")
 async def websocket_live(websocket: WebSocket):
     """
@@ -85,28 +136,7 @@ async def websocket_live(websocket: WebSocket):
         "total_count": int,
         "timestamp": float
     }
-    """
-    await websocket.accept()
     
-    try:
-        # 訂閱偵測串流
-        async for detection_data in detector_service.detection_stream():
-            # 簡化資料
-            simplified_data = {
-                "closest_distance": detection_data.get("closest_distance", 0),
-                "total_count": detection_data.get("total_count", 0),
-                "timestamp": detection_data.get("timestamp", 0)
-            }
-            
-            try:
-                await websocket.send_json(simplified_data)
-            except WebSocketDisconnect:
-                break
-                
-    except Exception as e:
-        print(f"❌ WebSocket Live 錯誤: {e}")
-    finally:
-        try:
-            await websocket.close()
-        except:
-            pass
+    與 /ws/detection 共用同一偵測串流,亦可傳送訂閱訊息調整內容
+    """
+    await _serve_connection(websocket, Subscription.live())
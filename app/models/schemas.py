@@ -42,6 +42,12 @@ class NetworkConfig(BaseModel):
     broadcast_interval: int = Field(33, description="廣播間隔 (毫秒)")
 
 
+class CalibrationRecordRequest(BaseModel):
+    """校準樣本錄製請求"""
+    distance: float = Field(..., gt=0, description="實際距離 (cm)")
+    duration: float = Field(10.0, gt=0, le=600, description="錄製秒數")
+
+
 class ApiResponse(BaseModel):
     """標準 API 回應格式"""
     status: str = Field("success", description="狀態: success/error")
@@ -0,0 +1,407 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+感測器配置模型 - 驗證 sensor_config.json 並比對新舊配置,決定最省成本的套用方式
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Literal, Optional, Set, Tuple, Union
+from pydantic import BaseModel, ConfigDict, Field, NonNegativeInt, PositiveInt, ValidationError, field_validator
+
+
+class StubSettings(BaseModel):
+    """模擬推論後端設定 (model.backend 為 "stub" 時使用)"""
+    model_config = ConfigDict(extra="allow")
+
+    mode: Literal["random", "scripted"] = "random"
+    people: List[int] = Field(default_factory=lambda: [0, 4], min_length=2, max_length=2)
+    distance_range: List[float] = Field(default_factory=lambda: [80, 600], min_length=2, max_length=2)
+    latency_ms: float = Field(20, ge=0)
+    latency_jitter_ms: float = Field(5, ge=0)
+    script: List[Dict[str, Any]] = Field(default_factory=list)
+    seed: Optional[int] = None
+
+    @field_validator("people")
+    @classmethod
+    def _ordered_people(cls, people: List[int]) -> List[int]:
+        if not 0 <= people[0] <= people[1]:
+            raise ValueError("people 需為 [最少, 最多] 且不為負數")
+        return people
+
+    @field_validator("distance_range")
+    @classmethod
+    def _ordered_range(cls, distance_range: List[float]) -> List[float]:
+        if not 0 < distance_range[0] < distance_range[1]:
+            raise ValueError("distance_range 需為 [最近, 最遠] 且大於 0")
+        return distance_range
+
+
+class BuiltinTrackerSettings(BaseModel):
+    """內建 IoU 追蹤器設定 (model.tracker 為 "builtin" 時使用)"""
+    model_config = ConfigDict(extra="allow")
+
+    match_iou: float = Field(0.3, gt=0, le=1)
+    low_conf: float = Field(0.1, ge=0, le=1)
+    max_age: int = Field(30, ge=0)
+    assignment: Literal["hungarian", "greedy"] = "hungarian"
+
+
+class ModelSettings(BaseModel):
+    """YOLO 模型設定"""
+    model_config = ConfigDict(extra="allow", protected_namespaces=())
+
+    model_path: str = "yolo11n.pt"
+    imgsz: int = Field(416, gt=0)
+    conf: float = Field(0.5, ge=0, le=1)
+    iou: float = Field(0.5, ge=0, le=1)
+    device: Union[int, str] = "cpu"
+    vid_stride: int = Field(1, ge=1)
+    interpolate_skipped: bool = False
+    tracker: str = "botsort.yaml"
+    builtin_tracker: BuiltinTrackerSettings = Field(default_factory=BuiltinTrackerSettings)
+    backend: Literal["ultralytics", "stub"] = "ultralytics"
+    stub: StubSettings = Field(default_factory=StubSettings)
+
+
+class DistanceSettings(BaseModel):
+    """距離計算設定"""
+    model_config = ConfigDict(extra="allow")
+
+    focal_length: float = Field(600, gt=0)
+    real_person_height: float = Field(170, gt=0)
+    use_adaptive_height: bool = True
+    use_smoothing: bool = True
+    use_display_smoothing: bool = True
+    smoothing_window: int = Field(5, ge=1)
+    display_smooth_factor: float = Field(0.3, gt=0, le=1)
+    standing_ratio: float = Field(2.5, gt=0)
+    sitting_height_factor: float = Field(0.6, gt=0)
+    crouching_height_factor: float = Field(0.75, gt=0)
+    smoothing_mode: Literal["average", "kalman"] = "average"
+    kalman_process_noise: float = Field(150, gt=0)
+    kalman_measurement_noise: float = Field(0.05, gt=0)
+    kalman_track_timeout: float = Field(2.0, gt=0)
+
+
+class CameraSettings(BaseModel):
+    """攝影機設定"""
+    model_config = ConfigDict(extra="allow")
+
+    source: Union[int, str] = 0
+    width: int = Field(640, gt=0)
+    height: int = Field(480, gt=0)
+    type: Literal["device", "file", "synthetic"] = "device"
+    pacing: Literal["realtime", "unpaced"] = "realtime"
+    loop: bool = True
+    fps: float = Field(30, ge=0)
+
+
+class PerformanceSettings(BaseModel):
+    """效能設定"""
+    model_config = ConfigDict(extra="allow")
+
+    use_fps_limit: bool = False
+    target_fps: float = Field(20, gt=0)
+
+
+class RuntimeSettings(BaseModel):
+    """長時間運行設定"""
+    model_config = ConfigDict(extra="allow")
+
+    max_runtime_hours: float = Field(8, ge=0)
+    health_check_interval: float = Field(300, gt=0)
+    auto_reconnect: bool = True
+    max_consecutive_errors: int = Field(50, ge=1)
+    stall_timeout: float = Field(5.0, gt=0)
+    reconnect_max_delay: float = Field(30.0, gt=0)
+
+
+class CpuSettings(BaseModel):
+    """CPU 資源設定 (執行緒數與核心綁定,變更需重新啟動服務)"""
+    model_config = ConfigDict(extra="allow")
+
+    torch_threads: Optional[int] = Field(None, ge=1)
+    torch_interop_threads: Optional[int] = Field(None, ge=1)
+    omp_threads: Optional[int] = Field(None, ge=1)
+    opencv_threads: Optional[int] = Field(None, ge=0)
+    capture_cores: List[NonNegativeInt] = Field(default_factory=list)
+    inference_cores: List[NonNegativeInt] = Field(default_factory=list)
+    api_cores: List[NonNegativeInt] = Field(default_factory=list)
+    api_executor_workers: Optional[int] = Field(None, ge=1)
+
+
+class ZoneArea(BaseModel):
+    """單一地面區域"""
+    model_config = ConfigDict(extra="allow")
+
+    name: str = Field(min_length=1)
+    polygon: List[Tuple[float, float]] = Field(min_length=3)
+
+
+class ZoneSettings(BaseModel):
+    """地面區域設定 (多邊形以 reference_size 像素座標定義,未設定時為攝影機解析度)"""
+    model_config = ConfigDict(extra="allow")
+
+    reference_size: Optional[Tuple[int, int]] = None
+    areas: List[ZoneArea] = Field(default_factory=list, max_length=32)   # 與 zones.MAX_ZONES 一致
+
+    @field_validator("reference_size")
+    @classmethod
+    def _positive_size(cls, size: Optional[Tuple[int, int]]) -> Optional[Tuple[int, int]]:
+        if size is not None and min(size) <= 0:
+            raise ValueError("reference_size 必須為正數")
+        return size
+
+    @field_validator("areas")
+    @classmethod
+    def _unique_names(cls, areas: List[ZoneArea]) -> List[ZoneArea]:
+        names = [area.name for area in areas]
+        if len(set(names)) != len(names):
+            raise ValueError("區域 name 不可重複")
+        return areas
+
+
+class HistorySettings(BaseModel):
+    """近期歷史環形緩衝設定"""
+    model_config = ConfigDict(extra="allow")
+
+    capacity: int = Field(36000, ge=1)
+    track_capacity: int = Field(360000, ge=1)
+
+
+class StorageSettings(BaseModel):
+    """長期時序儲存設定"""
+    model_config = ConfigDict(extra="allow")
+
+    enabled: bool = False
+    path: str = "data/detections.db"
+    batch_size: int = Field(200, ge=1)
+    flush_interval: float = Field(2.0, gt=0)
+    max_disk_mb: float = Field(500, gt=0)
+    track_timeout: float = Field(5.0, gt=0)
+    max_queue: int = Field(10000, ge=1)
+
+
+class AnalyticsSettings(BaseModel):
+    """即時人流分析設定"""
+    model_config = ConfigDict(extra="allow")
+
+    bands: List[float] = Field(default_factory=lambda: [150, 300], min_length=2, max_length=2)
+    track_timeout: float = Field(3.0, gt=0)
+    approach_threshold: float = Field(30, ge=0)
+    visitor_windows: List[PositiveInt] = Field(default_factory=lambda: [60, 600, 3600])
+    finished_capacity: int = Field(1000, ge=1)
+
+    @field_validator("bands")
+    @classmethod
+    def _ascending_bands(cls, bands: List[float]) -> List[float]:
+        if bands[0] >= bands[1]:
+            raise ValueError("bands 必須由小到大")
+        return bands
+
+
+class AlertRuleSettings(BaseModel):
+    """單一近距離警報規則"""
+    model_config = ConfigDict(extra="allow")
+
+    name: str = Field(min_length=1)
+    distance: float = Field(gt=0)
+    hysteresis: float = Field(20, ge=0)
+    min_count: int = Field(1, ge=1)
+    min_duration: float = Field(0.5, ge=0)
+    release_duration: float = Field(0.5, ge=0)
+    cooldown: float = Field(5.0, ge=0)
+
+
+class AlertSettings(BaseModel):
+    """近距離警報設定"""
+    model_config = ConfigDict(extra="allow")
+
+    enabled: bool = True
+    webhook_url: str = ""
+    history_size: int = Field(100, ge=1)
+    rules: List[AlertRuleSettings] = Field(default_factory=list)
+
+
+class PreviewSettings(BaseModel):
+    """標註預覽設定"""
+    model_config = ConfigDict(extra="allow")
+
+    width: int = Field(640, gt=0)
+    quality: int = Field(70, ge=1, le=100)
+    max_fps: float = Field(15, gt=0)
+
+
+class RecordingTrigger(BaseModel):
+    """事件錄影觸發條件 (null 為不使用該條件)"""
+    model_config = ConfigDict(extra="allow")
+
+    distance_below: Optional[float] = Field(100, gt=0)
+    count_above: Optional[int] = Field(None, ge=0)
+
+
+class RecordingSettings(BaseModel):
+    """事件錄影設定"""
+    model_config = ConfigDict(extra="allow")
+
+    enabled: bool = False
+    always_on: bool = False
+    path: str = "recordings"
+    trigger: RecordingTrigger = Field(default_factory=RecordingTrigger)
+    pre_roll: float = Field(5.0, ge=0)
+    post_roll: float = Field(5.0, ge=0)
+    max_clip_seconds: float = Field(60, gt=0)
+    fps: float = Field(10, gt=0)
+    width: int = Field(640, gt=0)
+    quality: int = Field(75, ge=1, le=100)
+    annotate: bool = True
+    max_disk_mb: float = Field(2048, gt=0)
+
+
+class SensorConfig(BaseModel):
+    """
+    sensor_config.json 的驗證模型
+    服務使用的區塊都有型別與範圍檢查,驗證失敗時整份配置不套用;其餘區塊 (output...) 原樣保留
+    """
+    model_config = ConfigDict(extra="allow")
+
+    model: ModelSettings = Field(default_factory=ModelSettings)
+    distance: DistanceSettings = Field(default_factory=DistanceSettings)
+    camera: CameraSettings = Field(default_factory=CameraSettings)
+    performance: PerformanceSettings = Field(default_factory=PerformanceSettings)
+    runtime: RuntimeSettings = Field(default_factory=RuntimeSettings)
+    cpu: CpuSettings = Field(default_factory=CpuSettings)
+    zones: ZoneSettings = Field(default_factory=ZoneSettings)
+    history: HistorySettings = Field(default_factory=HistorySettings)
+    storage: StorageSettings = Field(default_factory=StorageSettings)
+    analytics: AnalyticsSettings = Field(default_factory=AnalyticsSettings)
+    alerts: AlertSettings = Field(default_factory=AlertSettings)
+    preview: PreviewSettings = Field(default_factory=PreviewSettings)
+    recording: RecordingSettings = Field(default_factory=RecordingSettings)
+
+    @classmethod
+    def from_dict(cls, raw: Dict[str, Any]) -> "SensorConfig":
+        """
+        驗證原始配置
+
+        Args:
+            raw: load_sensor_config() 讀入的字典
+
+        Raises:
+            ValueError: 欄位型別或數值範圍錯誤
+        """
+        try:
+            return cls.model_validate(raw)
+        except ValidationError as e:
+            problems = "; ".join(
+                f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()
+            )
+            raise ValueError(f"sensor_config.json 驗證失敗: {problems}")
+
+    def to_dict(self) -> Dict[str, Any]:
+        """轉為偵測器使用的字典 (已補上預設值)"""
+        return self.model_dump()
+
+
+# === 變更分類 (依套用成本由低到高) ===
+
+# 直接替換,不中斷偵測 (距離參數保留平滑狀態)
+IN_PLACE_SECTIONS = {"distance", "zones"}
+
+# 下一幀生效 (偵測迴圈每幀讀取)
+NEXT_FRAME_KEYS = {
+    "model.conf", "model.iou", "model.imgsz", "model.vid_stride",
+    "model.interpolate_skipped", "model.builtin_tracker"
+}
+NEXT_FRAME_SECTIONS = {"performance", "runtime"}
+
+# 需要重新載入模型
+MODEL_RELOAD_KEYS = {"model.model_path", "model.device", "model.tracker", "model.backend", "model.stub"}
+
+# 需要重新開啟攝影機
+CAMERA_SECTIONS = {"camera"}
+
+# 只有 GUI 工具使用,服務不需處理
+IGNORED_SECTIONS = {"output"}
+
+
+@dataclass
+class ReloadPlan:
+    """配置變更的套用計畫"""
+    in_place: List[str] = field(default_factory=list)
+    next_frame: List[str] = field(default_factory=list)
+    reload_model: List[str] = field(default_factory=list)
+    reopen_camera: List[str] = field(default_factory=list)
+    restart_required: List[str] = field(default_factory=list)
+    ignored: List[str] = field(default_factory=list)
+
+    @property
+    def changed(self) -> bool:
+        """是否有任何變更"""
+        return any(self.to_dict().values())
+
+    def touches(self, section: str) -> bool:
+        """是否有變更屬於指定區塊"""
+        prefix = f"{section}."
+        return any(key == section or key.startswith(prefix) for key in self.in_place)
+
+    def to_dict(self) -> Dict[str, List[str]]:
+        """轉為可序列化的字典"""
+        return {
+            "in_place": self.in_place,
+            "next_frame": self.next_frame,
+            "reload_model": self.reload_model,
+            "reopen_camera": self.reopen_camera,
+            "restart_required": self.restart_required,
+            "ignored": self.ignored
+        }
+
+
+def diff_config(old: Dict[str, Any], new: Dict[str, Any]) -> Set[str]:
+    """
+    比對兩份配置,列出變更的欄位
+
+    Returns:
+        變更欄位集合 ("區塊.欄位",非字典區塊整體變更時為 "區塊")
+    """
+    changes = set()
+    for section in set(old) | set(new):
+        before, after = old.get(section), new.get(section)
+        if before == after:
+            continue
+        if isinstance(before, dict) and isinstance(after, dict):
+            for key in set(before) | set(after):
+                if before.get(key) != after.get(key):
+                    changes.add(f"{section}.{key}")
+        else:
+            changes.add(section)
+    return changes
+
+
+def plan_reload(old: Dict[str, Any], new: Dict[str, Any]) -> ReloadPlan:
+    """
+    依變更欄位決定套用方式
+
+    Args:
+        old: 目前配置
+        new: 新配置
+
+    Returns:
+        ReloadPlan
+    """
+    plan = ReloadPlan()
+    for key in sorted(diff_config(old, new)):
+        section = key.split(".", 1)[0]
+        if section in IN_PLACE_SECTIONS:
+            plan.in_place.append(key)
+        elif key in NEXT_FRAME_KEYS or section in NEXT_FRAME_SECTIONS:
+            plan.next_frame.append(key)
+        elif key in MODEL_RELOAD_KEYS:
+            plan.reload_model.append(key)
+        elif section in CAMERA_SECTIONS:
+            plan.reopen_camera.append(key)
+        elif section in IGNORED_SECTIONS:
+            plan.ignored.append(key)
+        else:
+            plan.restart_required.append(key)
+    return plan
@@ -2,3 +2,6 @@
 from .calculator import DistanceCalculator
 from .detector import YOLODetectorService
 from .connection_manager import ConnectionManager
+from .remote_detector import RemoteDetectorService
+from .frame import DetectionFrame
+from .subscription import Subscription
@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+近距離警報引擎 - 每幀以向量化方式評估所有規則,輸出離散的進入/離開事件
+"""
+
+import json
+import queue
+import asyncio
+import threading
+import urllib.request
+import numpy as np
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, Any, List, Callable, Optional
+from fastapi import WebSocket
+
+from .frame import DetectionFrame
+
+
+# 單一 WebSocket 傳送警報的最長等待秒數 (逾時視為斷線)
+ALERT_SEND_TIMEOUT = 5.0
+
+
+@dataclass(frozen=True)
+class AlertRule:
+    """
+    警報規則
+
+    至少 min_count 人距離小於 distance 且持續 min_duration 秒 → 進入 (enter);
+    距離小於 distance + hysteresis 的人數低於 min_count 且持續 release_duration 秒 → 離開 (exit);
+    離開後 cooldown 秒內不再觸發進入
+    """
+    name: str
+    distance: float
+    hysteresis: float = 20.0
+    min_count: int = 1
+    min_duration: float = 0.5
+    release_duration: float = 0.5
+    cooldown: float = 5.0
+
+    @classmethod
+    def from_dict(cls, config: Dict[str, Any]) -> "AlertRule":
+        """
+        由配置建立規則
+
+        Args:
+            config: 單一規則設定
+
+        Raises:
+            ValueError: 設定格式錯誤
+        """
+        if not isinstance(config, dict) or not config.get("name"):
+            raise ValueError("警報規則必須包含 name")
+        try:
+            rule = cls(
+                name=str(config["name"]),
+                distance=float(config["distance"]),
+                hysteresis=float(config.get("hysteresis", 20.0)),
+                min_count=int(config.get("min_count", 1)),
+                min_duration=float(config.get("min_duration", 0.5)),
+                release_duration=float(config.get("release_duration", 0.5)),
+                cooldown=float(config.get("cooldown", 5.0))
+            )
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"警報規則 {config['name']} 格式錯誤 (需要數值 distance)")
+
+        if rule.distance <= 0 or rule.hysteresis < 0 or rule.min_count < 1:
+            raise ValueError(f"警報規則 {rule.name} 參數超出範圍")
+        return rule
+
+    def to_dict(self) -> Dict[str, Any]:
+        """轉為可序列化的字典"""
+        return {
+            "name": self.name,
+            "distance": self.distance,
+            "hysteresis": self.hysteresis,
+            "min_count": self.min_count,
+            "min_duration": self.min_duration,
+            "release_duration": self.release_duration,
+            "cooldown": self.cooldown
+        }
+
+
+class AlertEngine:
+    """
+    警報引擎 (FrameHub 監聽器)
+    所有規則的門檻、狀態與計時器都存成陣列,每幀以一次 (人數 × 規則) 比較完成評估;
+    只有狀態改變的規則才會產生事件並呼叫回呼函式
+    """
+
+    def __init__(self, rules: List[AlertRule], history_size: int = 100):
+        """
+        初始化警報引擎
+
+        Args:
+            rules: 警報規則
+            history_size: 保留的最近事件數
+        """
+        self.rules = list(rules)
+        count = len(self.rules)
+
+        # 規則參數
+        self._enter = np.array([r.distance for r in self.rules], dtype=np.float64)
+        self._exit = np.array([r.distance + r.hysteresis for r in self.rules], dtype=np.float64)
+        self._min_count = np.array([r.min_count for r in self.rules], dtype=np.int64)
+        self._min_duration = np.array([r.min_duration for r in self.rules], dtype=np.float64)
+        self._release_duration = np.array([r.release_duration for r in self.rules], dtype=np.float64)
+        self._cooldown = np.array([r.cooldown for r in self.rules], dtype=np.float64)
+
+        # 規則狀態 (NaN 表示未在計時)
+        self._active = np.zeros(count, dtype=bool)
+        self._active_since = np.full(count, np.nan)
+        self._pending_since = np.full(count, np.nan)
+        self._clear_since = np.full(count, np.nan)
+        self._cooldown_until = np.zeros(count)
+
+        self.recent: deque = deque(maxlen=history_size)
+        self.event_count = 0
+        self._callbacks: List[Callable[[Dict[str, Any]], None]] = []
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "AlertEngine":
+        """
+        依配置建立警報引擎 (enabled 為 false 時不載入任何規則)
+
+        Args:
+            config: sensor_config.json 的 alerts 區塊
+
+        Raises:
+            ValueError: 規則格式錯誤或名稱重複
+        """
+        rules = []
+        if config.get("enabled", True):
+            rules = [AlertRule.from_dict(r) for r in config.get("rules", [])]
+
+        names = [r.name for r in rules]
+        if len(names) != len(set(names)):
+            raise ValueError("警報規則名稱不可重複")
+
+        return cls(rules, history_size=int(config.get("history_size", 100)))
+
+    def add_callback(self, callback: Callable[[Dict[str, Any]], None]):
+        """
+        註冊事件回呼 (於事件迴圈中同步呼叫,必須是輕量操作)
+
+        Args:
+            callback: 接收事件字典的函式
+        """
+        self._callbacks.append(callback)
+
+    def update(self, frame: DetectionFrame):
+        """
+        以一幀資料評估所有規則
+
+        Args:
+            frame: 偵測幀
+        """
+        if not self.rules:
+            return
+
+        now = frame.timestamp
+        distances = frame.distances
+        if distances.size:
+            enter_counts = (distances[:, None] < self._enter).sum(axis=0)
+            hold_counts = (distances[:, None] < self._exit).sum(axis=0)
+        else:
+            enter_counts = hold_counts = np.zeros(len(self.rules), dtype=np.int64)
+
+        idle = ~self._active
+        entering = idle & (enter_counts >= self._min_count)
+        releasing = self._active & (hold_counts < self._min_count)
+
+        # 進入條件計時 (條件中斷即重新計時)
+        self._pending_since[entering & np.isnan(self._pending_since)] = now
+        self._pending_since[idle & ~entering] = np.nan
+        fire = (
+            entering
+            & (now - self._pending_since >= self._min_duration)
+            & (now >= self._cooldown_until)
+        )
+
+        # 離開條件計時 (回到遲滯帶內即取消)
+        self._clear_since[releasing & np.isnan(self._clear_since)] = now
+        self._clear_since[self._active & ~releasing] = np.nan
+        clear = releasing & (now - self._clear_since >= self._release_duration)
+
+        if not (fire.any() or clear.any()):
+            return
+
+        closest = frame.closest_distance
+        for i in np.flatnonzero(fire):
+            self._active[i] = True
+            self._active_since[i] = now
+            self._pending_since[i] = np.nan
+            self._emit("enter", i, now, closest, int(enter_counts[i]))
+
+        for i in np.flatnonzero(clear):
+            duration = now - self._active_since[i]
+            self._active[i] = False
+            self._active_since[i] = np.nan
+            self._clear_since[i] = np.nan
+            self._cooldown_until[i] = now + self._cooldown[i]
+            self._emit("exit", i, now, closest, int(hold_counts[i]), duration)
+
+    def _emit(self, kind: str, index: int, timestamp: float, closest: float,
+              count: int, duration: Optional[float] = None):
+        """建立事件並通知所有回呼"""
+        rule = self.rules[index]
+        event = {
+            "type": "alert",
+            "event": kind,
+            "rule": rule.name,
+            "distance": rule.distance,
+            "closest_distance": closest,
+            "count": count,
+            "timestamp": timestamp
+        }
+        if duration is not None:
+            event["duration"] = round(float(duration), 2)
+
+        self.event_count += 1
+        self.recent.append(event)
+
+        for callback in self._callbacks:
+            try:
+                callback(event)
+            except Exception as e:
+                print(f"⚠ 警報回呼錯誤 ({getattr(callback, '__qualname__', callback)}): {e}")
+
+    def get_active(self) -> List[Dict[str, Any]]:
+        """
+        取得目前觸發中的規則
+
+        Returns:
+            [{"rule": str, "since": float}, ...]
+        """
+        return [
+            {"rule": self.rules[i].name, "since": float(self._active_since[i])}
+            for i in np.flatnonzero(self._active)
+        ]
+
+    def get_state(self) -> Dict[str, Any]:
+        """
+        取得規則、觸發中的規則與最近事件 (/api/alerts 的內容,daemon 模式由常駐程式回覆)
+
+        Returns:
+            {"rules": [...], "active": [...], "recent": [...]}
+        """
+        return {
+            "rules": [rule.to_dict() for rule in self.rules],
+            "active": self.get_active(),
+            "recent": list(self.recent)
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """取得警報統計 (併入 /api/detection/stats)"""
+        return {
+            "rules": len(self.rules),
+            "active": [a["rule"] for a in self.get_active()],
+            "events": self.event_count
+        }
+
+
+class AlertChannel:
+    """
+    警報 WebSocket 頻道
+    事件依序放入佇列,由單一傳送任務推送給所有連線,保證每個客戶端收到的 enter/exit 順序一致
+    """
+
+    def __init__(self):
+        """初始化警報頻道"""
+        self.connections: set = set()
+        self._queue: Optional[asyncio.Queue] = None
+        self._sender_task: Optional[asyncio.Task] = None
+
+    async def connect(self, websocket: WebSocket):
+        """
+        接受新的警報連線
+
+        Args:
+            websocket: WebSocket 連線物件
+        """
+        await websocket.accept()
+        self.connections.add(websocket)
+
+        if self._sender_task is None or self._sender_task.done():
+            self._queue = asyncio.Queue()
+            self._sender_task = asyncio.create_task(self._sender_loop())
+
+    def disconnect(self, websocket: WebSocket):
+        """
+        移除警報連線
+
+        Args:
+            websocket: WebSocket 連線物件
+        """
+        self.connections.discard(websocket)
+
+    def publish(self, event: Dict[str, Any]):
+        """
+        放入待推送事件 (AlertEngine 回呼)
+
+        Args:
+            event: 警報事件
+        """
+        if self.connections and self._queue is not None:
+            self._queue.put_nowait(json.dumps(event, ensure_ascii=False, separators=(",", ":")))
+
+    async def _sender_loop(self):
+        """依序推送佇列中的事件"""
+        while True:
+            text = await self._queue.get()
+            for websocket in list(self.connections):
+                try:
+                    await asyncio.wait_for(websocket.send_text(text), ALERT_SEND_TIMEOUT)
+                except Exception as e:
+                    print(f"⚠ 警報推送失敗,移除連線: {e}")
+                    self.connections.discard(websocket)
+
+    async def close(self):
+        """停止傳送任務"""
+        if self._sender_task:
+            self._sender_task.cancel()
+            try:
+                await self._sender_task
+            except asyncio.CancelledError:
+                pass
+            self._sender_task = None
+        self.connections.clear()
+
+
+class WebhookSender:
+    """
+    Webhook 回呼 - 以背景執行緒將警報事件 POST 至本機服務 (JSON),不阻塞事件迴圈
+    """
+
+    def __init__(self, url: str, timeout: float = 2.0, max_queue: int = 1000):
+        """
+        初始化 Webhook
+
+        Args:
+            url: 接收事件的 URL
+            timeout: 單次請求逾時秒數
+            max_queue: 待送事件上限 (超過即丟棄)
+        """
+        self.url = url
+        self.timeout = timeout
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._worker, name="alert-webhook", daemon=True)
+        self._thread.start()
+
+    def send(self, event: Dict[str, Any]):
+        """
+        放入待送事件 (AlertEngine 回呼)
+
+        Args:
+            event: 警報事件
+        """
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+
+    def _worker(self):
+        """背景執行緒: 逐一 POST 事件"""
+        while True:
+            event = self._queue.get()
+            if event is None:
+                break
+
+            body = json.dumps(event, ensure_ascii=False).encode("utf-8")
+            request = urllib.request.Request(
+                self.url, data=body, method="POST",
+                headers={"Content-Type": "application/json"}
+            )
+            try:
+                with urllib.request.urlopen(request, timeout=self.timeout):
+                    pass
+                self.sent += 1
+            except Exception as e:
+                self.failed += 1
+                print(f"⚠ 警報 Webhook 失敗: {e}")
+
+    def close(self):
+        """送出剩餘事件後停止背景執行緒"""
+        try:
+            self._queue.put(None, timeout=self.timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout=self.timeout * 2)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """取得 Webhook 統計"""
+        return {"url": self.url, "sent": self.sent, "failed": self.failed, "dropped": self.dropped}
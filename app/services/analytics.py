@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+即時人流分析 - 依追蹤 ID 增量維護在場人數、停留時間、距離區間時間與接近/遠離次數
+"""
+
+import bisect
+import time
+import numpy as np
+from collections import deque
+from typing import Dict, Any, List, NamedTuple
+
+from .frame import DetectionFrame
+
+
+# 距離區間名稱 (與後台顏色標示一致: <150 紅 / 150-300 黃 / >300 綠)
+BAND_NAMES = ("near", "middle", "far")
+
+
+class TrackState:
+    """進行中的追蹤狀態"""
+
+    __slots__ = (
+        "first_seen", "last_seen", "last_distance", "min_distance", "band",
+        "band_time", "anchor_distance", "approaches", "retreats", "samples"
+    )
+
+    def __init__(self, timestamp: float, distance: float, band: int):
+        self.first_seen = timestamp
+        self.last_seen = timestamp
+        self.last_distance = distance
+        self.min_distance = distance
+        self.band = band
+        self.band_time = [0.0, 0.0, 0.0]
+        self.anchor_distance = distance   # 接近/遠離判定的基準距離
+        self.approaches = 0
+        self.retreats = 0
+        self.samples = 1
+
+
+class TrackSummary(NamedTuple):
+    """結束追蹤的固定大小摘要"""
+    track_id: int
+    first_seen: float
+    last_seen: float
+    min_distance: float
+    near_time: float
+    middle_time: float
+    far_time: float
+    approaches: int
+    retreats: int
+
+    @property
+    def dwell(self) -> float:
+        return self.last_seen - self.first_seen
+
+
+class OccupancyAnalytics:
+    """
+    即時人流分析
+    每幀只處理本幀出現的追蹤 ID 與進行中的追蹤 (O(進行中追蹤數)),不回頭掃描歷史;
+    追蹤結束後壓縮為固定大小的 TrackSummary,保留最近 N 筆並累加到總計
+    """
+
+    def __init__(
+        self,
+        bands: tuple = (150.0, 300.0),
+        track_timeout: float = 3.0,
+        approach_threshold: float = 30.0,
+        visitor_windows: tuple = (60, 600, 3600),
+        finished_capacity: int = 1000
+    ):
+        """
+        初始化分析器
+
+        Args:
+            bands: 距離區間邊界 (cm),預設 <150 / 150-300 / >300
+            track_timeout: 追蹤 ID 消失多久視為離開 (秒)
+            approach_threshold: 距離變化超過此值 (cm) 計為一次接近或遠離
+            visitor_windows: 不重複訪客統計的時間窗 (秒)
+            finished_capacity: 保留的結束追蹤摘要數
+        """
+        self.bands = np.asarray(bands, dtype=np.float64)
+        self.track_timeout = track_timeout
+        self.approach_threshold = approach_threshold
+        self.visitor_windows = tuple(sorted(visitor_windows))
+
+        self.active: Dict[int, TrackState] = {}
+        self.finished: deque = deque(maxlen=finished_capacity)
+        self._arrivals: deque = deque()   # 新追蹤出現的時間 (遞增)
+
+        # 當前幀
+        self.occupancy = 0
+        self.occupancy_by_band = [0, 0, 0]
+        self.last_update = 0.0
+
+        # 累計 (含已結束的追蹤)
+        self.total_visitors = 0
+        self.total_dwell = 0.0
+        self.total_finished = 0
+        self.total_band_time = [0.0, 0.0, 0.0]
+        self.total_approaches = 0
+        self.total_retreats = 0
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "OccupancyAnalytics":
+        """
+        依配置建立分析器
+
+        Args:
+            config: sensor_config.json 的 analytics 區塊
+        """
+        return cls(
+            bands=tuple(config.get("bands", (150.0, 300.0))),
+            track_timeout=float(config.get("track_timeout", 3.0)),
+            approach_threshold=float(config.get("approach_threshold", 30.0)),
+            visitor_windows=tuple(config.get("visitor_windows", (60, 600, 3600))),
+            finished_capacity=int(config.get("finished_capacity", 1000))
+        )
+
+    def update(self, frame: DetectionFrame):
+        """
+        以一幀資料更新分析狀態 (FrameHub 監聽器)
+
+        Args:
+            frame: 偵測幀
+        """
+        now = frame.timestamp
+        bands = np.searchsorted(self.bands, frame.distances, side="left")
+
+        self.occupancy = frame.total_count
+        self.occupancy_by_band = np.bincount(bands, minlength=3)[:3].tolist()
+        self.last_update = now
+
+        tracked = np.flatnonzero(frame.track_ids >= 0)
+        for i in tracked:
+            track_id = int(frame.track_ids[i])
+            distance = float(frame.distances[i])
+            band = int(bands[i])
+            state = self.active.get(track_id)
+
+            if state is None:
+                self.active[track_id] = TrackState(now, distance, band)
+                self._arrivals.append(now)
+                self.total_visitors += 1
+                continue
+
+            # 兩次出現之間的時間計入上一次所在的區間 (間隔過長視為遮擋,不計入)
+            dt = now - state.last_seen
+            if 0 < dt <= self.track_timeout:
+                state.band_time[state.band] += dt
+
+            # 接近 / 遠離 (距離相對基準變化超過門檻才計數,避免抖動)
+            delta = distance - state.anchor_distance
+            if delta <= -self.approach_threshold:
+                state.approaches += 1
+                state.anchor_distance = distance
+            elif delta >= self.approach_threshold:
+                state.retreats += 1
+                state.anchor_distance = distance
+
+            state.last_seen = now
+            state.last_distance = distance
+            state.min_distance = min(state.min_distance, distance)
+            state.band = band
+            state.samples += 1
+
+        self._expire(now)
+
+    def _expire(self, now: float):
+        """結束逾時的追蹤並壓縮為摘要,同時清除過舊的到達紀錄"""
+        expired = [
+            track_id for track_id, state in self.active.items()
+            if now - state.last_seen > self.track_timeout
+        ]
+        for track_id in expired:
+            state = self.active.pop(track_id)
+            summary = TrackSummary(
+                track_id, state.first_seen, state.last_seen, state.min_distance,
+                *state.band_time, state.approaches, state.retreats
+            )
+            self.finished.append(summary)
+
+            self.total_finished += 1
+            self.total_dwell += summary.dwell
+            for b in range(3):
+                self.total_band_time[b] += state.band_time[b]
+            self.total_approaches += state.approaches
+            self.total_retreats += state.retreats
+
+        oldest = now - self.visitor_windows[-1]
+        while self._arrivals and self._arrivals[0] < oldest:
+            self._arrivals.popleft()
+
+    def _sync_clock(self) -> float:
+        """
+        取得摘要的計算時間點
+        偵測器依需求啟動,無人連線時停止,update 不再執行;超過 track_timeout 沒有新幀時
+        以實際時間結束所有逾時追蹤並清空在場人數,避免閒置時一直回報最後一幀的狀態
+
+        Returns:
+            計算時間 (有新幀時為最後一幀時間,否則為現在)
+        """
+        now = time.time()
+        if now - self.last_update <= self.track_timeout:
+            return self.last_update
+        self.occupancy = 0
+        self.occupancy_by_band = [0, 0, 0]
+        self._expire(now)
+        return now
+
+    def unique_visitors(self, now: float) -> Dict[str, int]:
+        """
+        各時間窗內的不重複訪客數 (新追蹤 ID 數)
+
+        Returns:
+            {"60s": int, "600s": int, ...}
+        """
+        # deque 不支援二分搜尋,轉為 list 的成本與最長時間窗內的訪客數成正比 (僅查詢時發生)
+        arrivals = list(self._arrivals)
+        result = {}
+        for window in self.visitor_windows:
+            index = bisect.bisect_left(arrivals, now - window)
+            result[f"{int(window)}s"] = len(arrivals) - index
+        return result
+
+    def get_summary(self) -> Dict[str, Any]:
+        """
+        取得分析摘要 (供統計資訊與 REST API 使用)
+
+        Returns:
+            摘要字典
+        """
+        now = self._sync_clock()
+        active_dwell = [now - s.first_seen for s in self.active.values()]
+        band_time = [
+            self.total_band_time[b] + sum(s.band_time[b] for s in self.active.values())
+            for b in range(3)
+        ]
+
+        return {
+            "occupancy": self.occupancy,
+            "occupancy_by_band": dict(zip(BAND_NAMES, self.occupancy_by_band)),
+            "active_tracks": len(self.active),
+            "unique_visitors": self.unique_visitors(now),
+            "total_visitors": self.total_visitors,
+            "avg_dwell": round(self.total_dwell / self.total_finished, 2) if self.total_finished else 0.0,
+            "max_active_dwell": round(max(active_dwell), 2) if active_dwell else 0.0,
+            "band_time": {name: round(t, 1) for name, t in zip(BAND_NAMES, band_time)},
+            "approaches": self.total_approaches + sum(s.approaches for s in self.active.values()),
+            "retreats": self.total_retreats + sum(s.retreats for s in self.active.values())
+        }
+
+    def get_tracks(self, recent: int = 50) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        取得進行中與最近結束的追蹤
+
+        Args:
+            recent: 最近結束的追蹤筆數
+
+        Returns:
+            {"active": [...], "finished": [...]}
+        """
+        now = self._sync_clock()
+        active = [
+            {
+                "track_id": track_id,
+                "dwell": round(now - s.first_seen, 2),
+                "distance": round(s.last_distance, 1),
+                "min_distance": round(s.min_distance, 1),
+                "band": BAND_NAMES[s.band],
+                "band_time": {name: round(t, 1) for name, t in zip(BAND_NAMES, s.band_time)},
+                "approaches": s.approaches,
+                "retreats": s.retreats
+            }
+            for track_id, s in self.active.items()
+        ]
+        finished = [
+            {
+                "track_id": s.track_id,
+                "first_seen": s.first_seen,
+                "dwell": round(s.dwell, 2),
+                "min_distance": round(s.min_distance, 1),
+                "band_time": {
+                    "near": round(s.near_time, 1),
+                    "middle": round(s.middle_time, 1),
+                    "far": round(s.far_time, 1)
+                },
+                "approaches": s.approaches,
+                "retreats": s.retreats
+            }
+            for s in list(self.finished)[-recent:]
+        ]
+        return {"active": active, "finished": finished}
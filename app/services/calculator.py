@@ -6,13 +6,19 @@
 
 import numpy as np
 from collections import deque
-from typing import Dict, Optional
+from typing import Dict, Optional, Tuple
+
+from .kalman import TrackKalmanFilter
 
 
 class DistanceCalculator:
     """
     距離計算器 - 使用相似三角形原理計算人體距離
     支援自適應高度判斷和多種平滑化演算法
+
+    smoothing_mode:
+    - "average" (預設): 移動平均 + EMA,以樣本數計算
+    - "kalman": 依實際時間間隔的等速度卡爾曼濾波,另輸出接近速度 (cm/s)
     """
     
     def __init__(self, config: Dict):
@@ -26,6 +32,34 @@ class DistanceCalculator:
         self.distance_history: Dict[int, deque] = {}  # 各追蹤 ID 的距離歷史 (移動平均用)
         self.display_distances: Dict[int, float] = {}  # 各追蹤 ID 的顯示距離 (EMA 平滑用)
         
+        # 卡爾曼濾波模式 (所有追蹤共用一組陣列狀態)
+        self.smoothing_mode = config.get("smoothing_mode", "average")
+        self.kalman = TrackKalmanFilter.from_config(config) if self.smoothing_mode == "kalman" else None
+        
+    def update_config(self, config: Dict):
+        """
+        就地套用新的距離參數 (熱重載用),保留各追蹤 ID 的平滑狀態
+        
+        Args:
+            config: 新的距離配置字典
+        """
+        previous = self.config
+        self.config = config
+        
+        # 視窗大小改變時以新長度重建,保留最近的樣本
+        window = config.get("smoothing_window", 5)
+        if window != previous.get("smoothing_window", 5):
+            self.distance_history = {
+                track_id: deque(history, maxlen=window)
+                for track_id, history in self.distance_history.items()
+            }
+        
+        # 平滑模式或卡爾曼參數改變時重建濾波器
+        kalman_keys = ("smoothing_mode", "kalman_process_noise", "kalman_measurement_noise", "kalman_track_timeout")
+        if any(config.get(key) != previous.get(key) for key in kalman_keys):
+            self.smoothing_mode = config.get("smoothing_mode", "average")
+            self.kalman = TrackKalmanFilter.from_config(config) if self.smoothing_mode == "kalman" else None
+        
     def calculate_distance(
         self, 
         box_height: float, 
@@ -80,6 +114,78 @@ class DistanceCalculator:
         
         return distance
     
+    def calculate_distances(
+        self,
+        box_heights: np.ndarray,
+        box_widths: np.ndarray,
+        track_ids: np.ndarray,
+        timestamp: float
+    ) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """
+        計算整幀所有偵測框的距離 (依 smoothing_mode 平滑)
+
+        Args:
+            box_heights: 邊界框高度陣列 (像素)
+            box_widths: 邊界框寬度陣列 (像素)
+            track_ids: 追蹤 ID 陣列,無 ID 時為 -1
+            timestamp: 影像擷取時間 (秒,卡爾曼模式依此計算時間間隔)
+
+        Returns:
+            (距離陣列, 接近速度陣列 cm/s);非卡爾曼模式時速度為 None,無追蹤 ID 的速度為 NaN
+        """
+        if self.kalman is None:
+            distances = np.empty(len(box_heights), dtype=np.float64)
+            for i in range(len(box_heights)):
+                track_id = int(track_ids[i])
+                distances[i] = self.calculate_distance(
+                    float(box_heights[i]),
+                    float(box_widths[i]),
+                    track_id if track_id >= 0 else None
+                )
+            return distances, None
+
+        distances = self.calculate_raw_distances(box_heights, box_widths)
+        speeds = np.full(len(distances), np.nan)
+        tracked = (np.asarray(track_ids) >= 0) & (distances > 0)
+        if tracked.any():
+            smoothed, velocities = self.kalman.update(track_ids[tracked], distances[tracked], timestamp)
+            distances[tracked] = smoothed
+            speeds[tracked] = -velocities   # 速度為正表示遠離,接近速度取反
+        return distances, speeds
+
+    def calculate_raw_distances(self, box_heights: np.ndarray, box_widths: np.ndarray) -> np.ndarray:
+        """
+        向量化計算未平滑的距離 (與 calculate_distance 相同的姿態判斷與公式)
+
+        Args:
+            box_heights: 邊界框高度陣列 (像素)
+            box_widths: 邊界框寬度陣列 (像素)
+
+        Returns:
+            距離陣列 (cm),高度不大於 0 時為 0
+        """
+        heights = np.asarray(box_heights, dtype=np.float64)
+        widths = np.asarray(box_widths, dtype=np.float64)
+        person_height = np.full(heights.shape, float(self.config["real_person_height"]))
+
+        if self.config.get("use_adaptive_height", True):
+            aspect = np.divide(heights, widths, out=np.full(heights.shape, 2.5), where=widths > 0)
+            factor = np.where(
+                aspect >= self.config.get("standing_ratio", 2.5), 1.0,
+                np.where(
+                    aspect < 1.5,
+                    self.config.get("sitting_height_factor", 0.6),
+                    self.config.get("crouching_height_factor", 0.75)
+                )
+            )
+            person_height *= factor
+
+        valid = heights > 0
+        return np.divide(
+            person_height * self.config["focal_length"], heights,
+            out=np.zeros(heights.shape), where=valid
+        )
+
     def _smooth_distance(self, track_id: int, distance: float) -> float:
         """
         數據平滑化 - 移動平均法 (Moving Average)
@@ -168,6 +274,10 @@ class DistanceCalculator:
         if track_id is None:
             self.distance_history.clear()
             self.display_distances.clear()
+            if self.kalman is not None:
+                self.kalman.clear()
         else:
             self.distance_history.pop(track_id, None)
             self.display_distances.pop(track_id, None)
+            if self.kalman is not None:
+                self.kalman.remove(track_id)
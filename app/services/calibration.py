@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批次校準 - 從錄製的偵測樣本 (框高、框寬、實際距離) 擬合焦距與姿態係數
+"""
+
+import csv
+import time
+import numpy as np
+from pathlib import Path
+from typing import Dict, Any, Optional, List, Tuple
+
+from .calculator import DistanceCalculator
+from .frame import DetectionFrame
+
+
+# 姿態類別 (與 DistanceCalculator 的判斷一致)
+STANDING, CROUCHING, SITTING = 0, 1, 2
+POSTURE_NAMES = ("standing", "crouching", "sitting")
+
+# 長寬比低於此值視為坐姿 (DistanceCalculator 中固定)
+SITTING_RATIO = 1.5
+
+# 寫回 sensor_config.json distance 區塊的欄位
+CALIBRATED_KEYS = ("focal_length", "sitting_height_factor", "crouching_height_factor", "standing_ratio")
+
+
+class CalibrationRecorder:
+    """
+    校準樣本錄製器 (FrameHub 監聽器)
+    錄製期間只收集畫面中恰好一人的幀,以該人的框高/框寬搭配操作者輸入的實際距離作為樣本
+    """
+
+    def __init__(self, max_samples: int = 200000):
+        """
+        初始化錄製器
+
+        Args:
+            max_samples: 樣本上限 (超過即停止錄製)
+        """
+        self.max_samples = max_samples
+        self.heights: List[float] = []
+        self.widths: List[float] = []
+        self.distances: List[float] = []
+        self.skipped = 0
+
+        self.recording_distance: Optional[float] = None
+        self.recording_until = 0.0
+
+    @property
+    def is_recording(self) -> bool:
+        """是否錄製中"""
+        return self.recording_distance is not None
+
+    def start(self, distance: float, duration: float):
+        """
+        開始錄製一段已知距離的樣本
+
+        Args:
+            distance: 實際距離 (cm)
+            duration: 錄製秒數
+        """
+        self.recording_distance = float(distance)
+        self.recording_until = time.time() + duration
+        print(f"🎯 開始錄製校準樣本: {distance:.0f} cm,{duration:.0f} 秒")
+
+    def stop(self):
+        """停止錄製"""
+        if self.recording_distance is not None:
+            print(f"⏹ 校準樣本錄製結束 (累計 {len(self.distances)} 筆)")
+        self.recording_distance = None
+
+    def clear(self):
+        """清除所有樣本"""
+        self.stop()
+        self.heights.clear()
+        self.widths.clear()
+        self.distances.clear()
+        self.skipped = 0
+
+    def update(self, frame: DetectionFrame):
+        """
+        收集單幀樣本
+
+        Args:
+            frame: 偵測幀
+        """
+        if self.recording_distance is None:
+            return
+        if frame.timestamp > self.recording_until or len(self.distances) >= self.max_samples:
+            self.stop()
+            return
+        if frame.total_count != 1:
+            self.skipped += 1
+            return
+
+        x1, y1, x2, y2 = frame.boxes[0]
+        self.heights.append(float(y2 - y1))
+        self.widths.append(float(x2 - x1))
+        self.distances.append(self.recording_distance)
+
+    def arrays(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        取得樣本陣列
+
+        Returns:
+            (框高, 框寬, 實際距離)
+        """
+        return (
+            np.asarray(self.heights, dtype=np.float64),
+            np.asarray(self.widths, dtype=np.float64),
+            np.asarray(self.distances, dtype=np.float64)
+        )
+
+    def get_status(self) -> Dict[str, Any]:
+        """取得錄製狀態與各距離樣本數"""
+        values, counts = np.unique(np.asarray(self.distances), return_counts=True)
+        return {
+            "recording": self.is_recording,
+            "recording_distance": self.recording_distance,
+            "remaining": max(0.0, round(self.recording_until - time.time(), 1)) if self.is_recording else 0.0,
+            "samples": len(self.distances),
+            "skipped_frames": self.skipped,
+            "by_distance": {f"{v:g}": int(c) for v, c in zip(values, counts)}
+        }
+
+    def save_csv(self, path: Path):
+        """
+        匯出樣本為 CSV (box_height, box_width, distance)
+
+        Args:
+            path: 輸出路徑
+        """
+        save_samples(path, *self.arrays())
+
+
+def load_samples(path: Path) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    讀取樣本 CSV (欄位: box_height, box_width, distance)
+
+    Args:
+        path: CSV 路徑
+
+    Returns:
+        (框高, 框寬, 實際距離)
+
+    Raises:
+        ValueError: 缺少必要欄位
+    """
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.DictReader(f)
+        missing = {"box_height", "box_width", "distance"} - set(reader.fieldnames or [])
+        if missing:
+            raise ValueError(f"樣本檔缺少欄位: {', '.join(sorted(missing))}")
+        rows = [(r["box_height"], r["box_width"], r["distance"]) for r in reader]
+
+    data = np.asarray(rows, dtype=np.float64).reshape(-1, 3)
+    return data[:, 0], data[:, 1], data[:, 2]
+
+
+def save_samples(path: Path, heights: np.ndarray, widths: np.ndarray, distances: np.ndarray):
+    """
+    寫入樣本 CSV
+
+    Args:
+        path: 輸出路徑
+        heights: 框高
+        widths: 框寬
+        distances: 實際距離
+    """
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(["box_height", "box_width", "distance"])
+        writer.writerows(np.column_stack([heights, widths, distances]).tolist())
+
+
+def classify_postures(heights: np.ndarray, widths: np.ndarray, standing_ratio: float) -> np.ndarray:
+    """
+    依長寬比判斷姿態 (向量化)
+
+    Returns:
+        姿態類別陣列 (STANDING / CROUCHING / SITTING)
+    """
+    aspect = np.divide(heights, widths, out=np.full(heights.shape, 2.5), where=widths > 0)
+    postures = np.full(heights.shape, CROUCHING, dtype=np.int8)
+    postures[aspect < SITTING_RATIO] = SITTING
+    postures[aspect >= standing_ratio] = STANDING
+    return postures
+
+
+def _fit_factors(
+    y: np.ndarray,
+    postures: np.ndarray,
+    defaults: np.ndarray,
+    outlier_k: float,
+    min_samples: int,
+    iterations: int
+) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    對數空間最小平方擬合 + MAD 離群值剔除
+
+    模型: log(d × h / H) = log f + log k[姿態],站立時 k = 1;
+    各姿態各自只有一個自由參數,聯合最小平方解即為各類別的平均值
+
+    Returns:
+        (log 參數 [log f, log k_crouch, log k_sit], 殘差, 內群遮罩),站立樣本不足時為 None
+    """
+    inliers = np.ones(y.shape, dtype=bool)
+    params = np.log(defaults)
+
+    for _ in range(iterations):
+        counts = np.bincount(postures[inliers], minlength=3)
+        if counts[STANDING] < min_samples:
+            return None
+        sums = np.bincount(postures[inliers], weights=y[inliers], minlength=3)
+        means = sums / np.maximum(counts, 1)
+
+        params = np.log(defaults).copy()
+        params[STANDING] = means[STANDING]
+        for posture in (CROUCHING, SITTING):
+            if counts[posture] >= min_samples:
+                params[posture] = means[posture] - means[STANDING]
+
+        offsets = np.where(postures == STANDING, 0.0, params[postures])
+        residuals = y - (params[STANDING] + offsets)
+
+        center = np.median(residuals[inliers])
+        mad = 1.4826 * np.median(np.abs(residuals[inliers] - center))
+        updated = np.abs(residuals - center) <= max(outlier_k * mad, 0.01)
+        if np.array_equal(updated, inliers):
+            break
+        inliers = updated
+
+    return params, residuals, inliers
+
+
+def _error_stats(predicted: np.ndarray, actual: np.ndarray) -> Dict[str, float]:
+    """距離誤差統計 (cm 與相對誤差)"""
+    errors = predicted - actual
+    absolute = np.abs(errors)
+    return {
+        "mae": round(float(absolute.mean()), 2),
+        "rmse": round(float(np.sqrt(np.mean(errors ** 2))), 2),
+        "median": round(float(np.median(absolute)), 2),
+        "p95": round(float(np.percentile(absolute, 95)), 2),
+        "bias": round(float(errors.mean()), 2),
+        "mean_relative": round(float(np.mean(absolute / actual)), 4)
+    }
+
+
+def solve_calibration(
+    heights: np.ndarray,
+    widths: np.ndarray,
+    distances: np.ndarray,
+    distance_config: Dict[str, Any],
+    fit_ratio: bool = True,
+    ratio_grid: Optional[np.ndarray] = None,
+    outlier_k: float = 3.0,
+    min_samples: int = 20,
+    iterations: int = 10,
+    robust_scale: float = 0.2
+) -> Dict[str, Any]:
+    """
+    擬合焦距與姿態係數
+
+    standing_ratio 以格點搜尋,每個候選值做一次對數空間最小平方 + 離群值剔除,
+    以截斷平方損失 (殘差超過 robust_scale 以常數計) 選出最佳值;全程為陣列運算
+
+    Args:
+        heights: 框高陣列 (像素)
+        widths: 框寬陣列 (像素)
+        distances: 實際距離陣列 (cm)
+        distance_config: 目前的 distance 配置 (real_person_height 與未擬合參數的預設值)
+        fit_ratio: 是否擬合 standing_ratio
+        ratio_grid: standing_ratio 候選值 (預設 1.6 ~ 4.0,間隔 0.05)
+        outlier_k: 離群值門檻 (MAD 倍數)
+        min_samples: 擬合單一姿態係數所需的最少樣本數
+        iterations: 離群值剔除的最多迭代次數
+        robust_scale: 選擇 standing_ratio 時的截斷門檻 (對數殘差,0.2 ≈ 20%)
+
+    Returns:
+        擬合結果 (新參數、樣本/內群數、各姿態樣本數、擬合前後的誤差統計、各距離誤差)
+
+    Raises:
+        ValueError: 樣本無效或站立樣本不足
+    """
+    started = time.perf_counter()
+
+    heights = np.asarray(heights, dtype=np.float64)
+    widths = np.asarray(widths, dtype=np.float64)
+    distances = np.asarray(distances, dtype=np.float64)
+    valid = (heights > 0) & (widths > 0) & (distances > 0)
+    heights, widths, distances = heights[valid], widths[valid], distances[valid]
+    if len(distances) < min_samples:
+        raise ValueError(f"有效樣本不足 (需要至少 {min_samples} 筆,目前 {len(distances)} 筆)")
+
+    person_height = float(distance_config["real_person_height"])
+    adaptive = distance_config.get("use_adaptive_height", True)
+    defaults = np.array([
+        distance_config["focal_length"],
+        distance_config.get("crouching_height_factor", 0.75),
+        distance_config.get("sitting_height_factor", 0.6)
+    ], dtype=np.float64)
+    current_ratio = float(distance_config.get("standing_ratio", 2.5))
+
+    y = np.log(distances * heights / person_height)
+
+    if not adaptive:
+        candidates = [None]
+    elif fit_ratio:
+        candidates = ratio_grid if ratio_grid is not None else np.round(np.arange(1.6, 4.0001, 0.05), 2)
+    else:
+        candidates = [current_ratio]
+
+    best = None
+    for ratio in candidates:
+        if ratio is None:
+            postures = np.zeros(len(y), dtype=np.int8)
+        else:
+            postures = classify_postures(heights, widths, ratio)
+
+        fit = _fit_factors(y, postures, defaults, outlier_k, min_samples, iterations)
+        if fit is None:
+            continue
+        params, residuals, inliers = fit
+        loss = float(np.mean(np.minimum(residuals ** 2, robust_scale ** 2)))
+        if best is None or loss < best[0]:
+            best = (loss, ratio, params, inliers, postures)
+
+    if best is None:
+        raise ValueError(f"站立姿態樣本不足 (需要至少 {min_samples} 筆)")
+
+    loss, ratio, params, inliers, postures = best
+    values = np.exp(params)
+    result_config = {
+        "focal_length": round(float(values[STANDING]), 2),
+        "crouching_height_factor": round(float(values[CROUCHING]), 4),
+        "sitting_height_factor": round(float(values[SITTING]), 4),
+        "standing_ratio": round(float(ratio), 2) if ratio is not None else current_ratio
+    }
+
+    # 擬合前後誤差 (以內群樣本比較,避免離群值主導)
+    before = DistanceCalculator(distance_config).calculate_raw_distances(heights, widths)
+    after = DistanceCalculator({**distance_config, **result_config}).calculate_raw_distances(heights, widths)
+
+    # 各距離誤差 (每個錄製距離一列)
+    by_distance = []
+    values_d, inverse = np.unique(distances, return_inverse=True)
+    for index, value in enumerate(values_d):
+        group = (inverse == index) & inliers
+        if not group.any():
+            continue
+        by_distance.append({
+            "distance": float(value),
+            "samples": int(group.sum()),
+            "predicted_median": round(float(np.median(after[group])), 1),
+            "error_median": round(float(np.median(np.abs(after[group] - value))), 1)
+        })
+
+    counts = np.bincount(postures[inliers], minlength=3)
+    return {
+        "config": result_config,
+        "previous": {key: distance_config.get(key) for key in CALIBRATED_KEYS},
+        "samples": int(len(distances)),
+        "inliers": int(inliers.sum()),
+        "postures": {name: int(counts[i]) for i, name in enumerate(POSTURE_NAMES)},
+        "fitted": {
+            "crouching_height_factor": bool(adaptive and counts[CROUCHING] >= min_samples),
+            "sitting_height_factor": bool(adaptive and counts[SITTING] >= min_samples),
+            "standing_ratio": bool(adaptive and fit_ratio)
+        },
+        "residuals": _error_stats(after[inliers], distances[inliers]),
+        "residuals_before": _error_stats(before[inliers], distances[inliers]),
+        "by_distance": by_distance,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)
+    }
@@ -1,18 +1,40 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 """
-WebSocket 連線管理器
+WebSocket 連線管理器 (同時管理 SSE / 長輪詢等串流消費者)
 """
 
 import asyncio
-from typing import List, Dict, Any
-from fastapi import WebSocket, WebSocketDisconnect
+from typing import List, Dict, Optional
+from fastapi import HTTPException, WebSocket, WebSocketDisconnect
+
+from .frame import DetectionFrame
+from .frame_hub import FrameHub
+from .subscription import Subscription, FULL_SUBSCRIPTION
+from .supervisor import ExponentialBackoff
+
+
+# 每個 WebSocket 連線的待送訊息上限 (超過時捨棄最舊的幀,慢速客戶端只收到較新的幀)
+SEND_QUEUE_SIZE = 4
+
+# 單則訊息送出的最長等待時間 (秒),逾時視為停滯客戶端並中斷連線
+SEND_TIMEOUT = 5.0
+
+# 常駐消費者 (always_on 錄影) 啟動偵測器失敗時的重試延遲 (秒)
+HOLD_RETRY_INITIAL = 1.0
+HOLD_RETRY_MAX = 60.0
 
 
 class ConnectionManager:
     """
     WebSocket 連線管理器
     負責管理所有 WebSocket 連線的生命週期
+    
+    偵測器在第一個消費者 (WebSocket / SSE / 長輪詢) 出現時啟動,
+    所有消費者離開後停止;每幀發佈至 FrameHub 供非 WebSocket 消費者取用
+    
+    每個 WebSocket 連線有各自的待送佇列與傳送任務,廣播只放入佇列不等待送出,
+    慢速或停滯的客戶端不會拖住偵測串流與其他消費者
     """
     
     def __init__(self, detector_service):
@@ -23,28 +45,43 @@ class ConnectionManager:
             detector_service: YOLODetectorService 實例
         """
         self.active_connections: List[WebSocket] = []
+        self.subscriptions: Dict[WebSocket, Subscription] = {}
+        self._outboxes: Dict[WebSocket, asyncio.Queue] = {}
+        self._senders: Dict[WebSocket, asyncio.Task] = {}
+        self.dropped_messages = 0     # 慢速客戶端佇列已滿而捨棄的訊息數
+        self.stalled_disconnects = 0  # 送出逾時而中斷的連線數
         self.detector_service = detector_service
         self.detector_lock = asyncio.Lock()
         self.broadcast_task: asyncio.Task = None
         
-    async def connect(self, websocket: WebSocket):
+        # 非 WebSocket 消費者 (SSE / 長輪詢) 與共用幀來源
+        self.stream_consumers = 0
+        self.hub = FrameHub()
+        self._idle_stop_task: Optional[asyncio.Task] = None
+        
+    async def connect(self, websocket: WebSocket, subscription: Optional[Subscription] = None):
         """
         接受新的 WebSocket 連線
         
         Args:
             websocket: WebSocket 連線物件
+            subscription: 初始訂閱內容,預設為完整資料
         """
         await websocket.accept()
+        self.subscriptions[websocket] = subscription or FULL_SUBSCRIPTION
         self.active_connections.append(websocket)
+        self._outboxes[websocket] = asyncio.Queue(maxsize=SEND_QUEUE_SIZE)
+        self._senders[websocket] = asyncio.create_task(self._send_loop(websocket))
         print(f"✅ WebSocket 連線已建立 (總連線數: {len(self.active_connections)})")
         
-        # 若為第一個連線,啟動偵測器
-        async with self.detector_lock:
-            if len(self.active_connections) == 1 and not self.detector_service.is_running:
-                await self.detector_service.start_detection()
-                # 啟動廣播任務
-                if self.broadcast_task is None or self.broadcast_task.done():
-                    self.broadcast_task = asyncio.create_task(self._broadcast_loop())
+        # 若為第一個連線,啟動偵測器 (啟動失敗時移除連線,避免偵測器之後無法閒置停止)
+        try:
+            await self._ensure_running()
+        except Exception:
+            self.subscriptions.pop(websocket, None)
+            self.active_connections.remove(websocket)
+            self._stop_sender(websocket)
+            raise
     
     async def disconnect(self, websocket: WebSocket):
         """
@@ -53,51 +90,196 @@ class ConnectionManager:
         Args:
             websocket: WebSocket 連線物件
         """
+        self.subscriptions.pop(websocket, None)
+        self._stop_sender(websocket)
         if websocket in self.active_connections:
             self.active_connections.remove(websocket)
             print(f"❌ WebSocket 連線已斷開 (剩餘連線數: {len(self.active_connections)})")
         
         # 若無任何連線,停止偵測器
+        await self._stop_if_idle()
+    
+    async def acquire(self):
+        """
+        註冊非 WebSocket 消費者 (SSE / 長輪詢),必要時啟動偵測器
+        
+        Raises:
+            RuntimeError: 偵測器無法啟動 (模型或攝影機),此時不計入消費者
+        """
+        self.stream_consumers += 1
+        try:
+            await self._ensure_running()
+        except Exception:
+            self.stream_consumers = max(0, self.stream_consumers - 1)
+            raise
+    
+    async def acquire_or_503(self):
+        """
+        HTTP 端點 (長輪詢 / SSE / 預覽) 使用的 acquire
+        
+        Raises:
+            HTTPException: 偵測器無法啟動 (503)
+        """
+        try:
+            await self.acquire()
+        except RuntimeError as e:
+            raise HTTPException(status_code=503, detail=f"偵測器無法啟動: {e}")
+    
+    def hold(self) -> asyncio.Task:
+        """
+        背景註冊一個常駐消費者 (always_on 錄影),讓偵測器不因無人連線而停止
+        偵測器無法啟動時以指數退避重試,直到成功或任務被取消
+        
+        Returns:
+            背景任務 (關閉時取消)
+        """
+        return asyncio.create_task(self._hold_loop())
+    
+    async def _hold_loop(self):
+        """持續嘗試取得常駐消費者租約"""
+        backoff = ExponentialBackoff(HOLD_RETRY_INITIAL, HOLD_RETRY_MAX)
+        while True:
+            try:
+                await self.acquire()
+                print("▶ 常駐消費者已啟動偵測器")
+                return
+            except RuntimeError as e:
+                delay = backoff.next()
+                print(f"⚠ 常駐消費者無法啟動偵測器: {e},{delay:.0f} 秒後重試")
+                await asyncio.sleep(delay)
+    
+    async def release(self, linger: float = 0.0):
+        """
+        移除非 WebSocket 消費者
+        
+        Args:
+            linger: 無消費者後延遲停止偵測器的秒數
+                    (長輪詢客戶端會立即再次請求,避免反覆開關攝影機)
+        """
+        self.stream_consumers = max(0, self.stream_consumers - 1)
+        
+        if linger > 0:
+            if self._idle_stop_task is None or self._idle_stop_task.done():
+                self._idle_stop_task = asyncio.create_task(self._delayed_stop(linger))
+        else:
+            await self._stop_if_idle()
+    
+    def consumer_count(self) -> int:
+        """取得所有消費者數量 (WebSocket + SSE / 長輪詢)"""
+        return len(self.active_connections) + self.stream_consumers
+    
+    async def _ensure_running(self):
+        """確保偵測器與廣播任務已啟動"""
         async with self.detector_lock:
-            if len(self.active_connections) == 0 and self.detector_service.is_running:
+            if self._idle_stop_task and not self._idle_stop_task.done():
+                self._idle_stop_task.cancel()
+            self._idle_stop_task = None
+            
+            if not self.detector_service.is_running:
+                await self.detector_service.start_detection()
+            # 啟動廣播任務
+            if self.broadcast_task is None or self.broadcast_task.done():
+                self.broadcast_task = asyncio.create_task(self._broadcast_loop())
+    
+    async def _stop_if_idle(self):
+        """若無任何消費者,停止偵測器與廣播任務"""
+        async with self.detector_lock:
+            if self.consumer_count() == 0 and self.detector_service.is_running:
                 await self.detector_service.stop_detection()
                 # 取消廣播任務
                 if self.broadcast_task and not self.broadcast_task.done():
                     self.broadcast_task.cancel()
     
-    async def broadcast(self, data: Dict[str, Any]):
+    async def _delayed_stop(self, delay: float):
+        """延遲後若仍無消費者則停止偵測器"""
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            return
+        self._idle_stop_task = None
+        await self._stop_if_idle()
+    
+    def subscribe(self, websocket: WebSocket, subscription: Subscription):
+        """
+        更新連線的訂閱內容
+        
+        Args:
+            websocket: WebSocket 連線物件
+            subscription: 新的訂閱內容
+        """
+        if websocket in self.active_connections:
+            self.subscriptions[websocket] = subscription
+    
+    async def broadcast(self, frame: DetectionFrame):
         """
         廣播資料給所有連線的客戶端
+        依訂閱內容分組,每種訂閱每幀只組裝與序列化一次;
+        訊息放入各連線的待送佇列後立即返回,佇列已滿時捨棄最舊的訊息
         
         Args:
-            data: 要廣播的資料字典
+            frame: 偵測幀
         """
-        disconnected_clients = []
+        # 依訂閱內容分組 (複製列表避免迭代時修改)
+        groups: Dict[Subscription, List[WebSocket]] = {}
+        for connection in self.active_connections[:]:
+            subscription = self.subscriptions.get(connection, FULL_SUBSCRIPTION)
+            groups.setdefault(subscription, []).append(connection)
         
-        for connection in self.active_connections[:]:  # 複製列表避免迭代時修改
+        for subscription, connections in groups.items():
+            message = frame.render(subscription)
+            
+            for connection in connections:
+                outbox = self._outboxes.get(connection)
+                if outbox is None:
+                    continue
+                if outbox.full():
+                    outbox.get_nowait()
+                    self.dropped_messages += 1
+                outbox.put_nowait(message)
+    
+    async def _send_loop(self, websocket: WebSocket):
+        """
+        單一連線的傳送任務: 依序送出待送佇列中的訊息
+        送出逾時 (客戶端停止讀取) 或失敗時關閉並移除連線
+        """
+        outbox = self._outboxes[websocket]
+        try:
+            while True:
+                message = await outbox.get()
+                await asyncio.wait_for(websocket.send_text(message), SEND_TIMEOUT)
+        except asyncio.CancelledError:
+            return
+        except asyncio.TimeoutError:
+            self.stalled_disconnects += 1
+            print(f"⚠ WebSocket 客戶端 {SEND_TIMEOUT:g} 秒未接收資料,中斷連線")
             try:
-                await connection.send_json(data)
-            except WebSocketDisconnect:
-                disconnected_clients.append(connection)
-            except Exception as e:
-                print(f"⚠ 廣播錯誤: {e}")
-                disconnected_clients.append(connection)
+                await websocket.close(code=1013)
+            except Exception:
+                pass
+        except WebSocketDisconnect:
+            pass
+        except Exception as e:
+            print(f"⚠ 廣播錯誤: {e}")
         
-        # 清理斷開的連線
-        for client in disconnected_clients:
-            await self.disconnect(client)
+        await self.disconnect(websocket)
+    
+    def _stop_sender(self, websocket: WebSocket):
+        """停止連線的傳送任務並移除待送佇列 (由傳送任務自己呼叫時不取消自身)"""
+        self._outboxes.pop(websocket, None)
+        task = self._senders.pop(websocket, None)
+        if task is not None and task is not asyncio.current_task():
+            task.cancel()
     
     async def _broadcast_loop(self):
         """
         廣播迴圈 - 持續從偵測器獲取資料並廣播
+        偵測器停止時串流結束,迴圈隨之結束
         """
         try:
-            async for detection_data in self.detector_service.detection_stream():
+            async for frame in self.detector_service.detection_stream():
+                await self.hub.publish(frame)
                 if len(self.active_connections) > 0:
-                    await self.broadcast(detection_data)
-                else:
-                    # 無連線時停止廣播
-                    break
+                    await self.broadcast(frame)
         except asyncio.CancelledError:
             print("🛑 廣播任務已取消")
         except Exception as e:
@@ -115,7 +297,13 @@ class ConnectionManager:
             except Exception as e:
                 print(f"⚠ 關閉連線錯誤: {e}")
         
+        for connection in list(self._senders):
+            self._stop_sender(connection)
         self.active_connections.clear()
+        self.subscriptions.clear()
+        self.stream_consumers = 0
+        if self._idle_stop_task and not self._idle_stop_task.done():
+            self._idle_stop_task.cancel()
         
         # 停止偵測器
         if self.detector_service.is_running:
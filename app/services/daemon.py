@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+偵測常駐程式 - 獨立擁有攝影機與模型,透過本機 socket 發佈偵測幀
+
+傳輸協定 (每行一個 JSON 物件):
+- 訂閱端 → 常駐程式: {"cmd": "subscribe"} 開始接收幀;
+  {"cmd": "reload"} 重新載入配置 (回覆套用計畫);{"cmd": "stats"} 查詢統計;{"cmd": "ready"} 查詢就緒狀態;
+  {"cmd": "query", "name": str, "params": {...}} 查詢常駐程式端的服務 (歷史、人流分析、警報,回覆 result)
+- 常駐程式 → 訂閱端: {"type": "frame", "data": <完整 payload>}、{"type": "alert", "data": <警報事件>}、
+  {"type": "stats", "data": <統計資料>}、{"type": "result", "data": <查詢結果>}、
+  {"type": "ok"} / {"type": "error", "message": str}
+  (subscribe 先回覆 ok 表示偵測器已啟動,或回覆 error 後關閉連線)
+"""
+
+import asyncio
+import json
+import os
+import socket
+import time
+from typing import Dict, Any, Callable, Set, Tuple
+
+from .connection_manager import ConnectionManager
+from .subscription import FULL_SUBSCRIPTION
+
+
+# 單行訊息上限 (數百人的完整 payload 仍在範圍內)
+STREAM_LIMIT = 4 * 1024 * 1024
+
+# 統計資料推送間隔 (秒)
+STATS_INTERVAL = 1.0
+
+# 幀訊息前綴 (訂閱端可直接取出 data 原文,免重新序列化)
+FRAME_PREFIX = '{"type":"frame","data":'
+
+
+def use_unix_socket(config: Dict[str, Any]) -> bool:
+    """是否使用 Unix domain socket (Windows 等不支援時改用本機 TCP)"""
+    return hasattr(socket, "AF_UNIX") and bool(config.get("socket_path"))
+
+
+async def open_daemon_connection(config: Dict[str, Any]) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+    """
+    連線至偵測常駐程式
+
+    Args:
+        config: daemon 設定 (get_daemon_config)
+
+    Returns:
+        (reader, writer)
+    """
+    if use_unix_socket(config):
+        return await asyncio.open_unix_connection(config["socket_path"], limit=STREAM_LIMIT)
+    return await asyncio.open_connection(config["host"], config["port"], limit=STREAM_LIMIT)
+
+
+def encode_message(message: Dict[str, Any]) -> bytes:
+    """將訊息編碼為單行 JSON"""
+    return (json.dumps(message, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+class DetectorDaemon:
+    """
+    偵測常駐程式
+    有訂閱端時啟動偵測器,所有訂閱端離開後停止;
+    每幀只序列化一次,寫給所有訂閱端 (慢速訂閱端只會收到最新幀)
+    """
+
+    def __init__(self, detector_service, config: Dict[str, Any]):
+        """
+        初始化常駐程式
+
+        Args:
+            detector_service: YOLODetectorService 實例
+            config: daemon 設定 (get_daemon_config)
+        """
+        self.detector_service = detector_service
+        self.config = config
+        self.manager = ConnectionManager(detector_service)
+        self.server: asyncio.AbstractServer = None
+        self.subscriber_count = 0
+
+        # 常駐程式端服務的查詢指令與附加統計來源 (由 detector_daemon.py 註冊)
+        self.queries: Dict[str, Callable[..., Any]] = {}
+        self.stats_providers: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+        # 各訂閱端待轉送的警報事件 (警報引擎只在常駐程式執行,事件逐一轉送,不像幀只送最新)
+        self._alert_queues: Set[asyncio.Queue] = set()
+
+    def add_query(self, name: str, handler: Callable[..., Any]):
+        """
+        註冊查詢指令 ({"cmd": "query", "name": name, "params": {...}})
+
+        Args:
+            name: 查詢名稱
+            handler: 以 params 為關鍵字參數呼叫,回傳可 JSON 序列化的結果
+        """
+        self.queries[name] = handler
+
+    def add_stats_provider(self, name: str, provider: Callable[[], Dict[str, Any]]):
+        """
+        註冊附加統計來源 (併入推送給訂閱端的統計,訂閱端的 /api/detection/stats 直接沿用)
+
+        Args:
+            name: 統計資訊中的欄位名稱
+            provider: 取得統計字典的函式
+        """
+        self.stats_providers[name] = provider
+
+    def publish_alert(self, event: Dict[str, Any]):
+        """
+        轉送警報事件給所有訂閱端 (AlertEngine 回呼)
+
+        Args:
+            event: 警報事件
+        """
+        for alerts in self._alert_queues:
+            alerts.put_nowait(event)
+
+    def _collect_stats(self) -> Dict[str, Any]:
+        """彙整偵測器統計與所有附加統計來源"""
+        stats = self.detector_service.get_stats()
+        for name, provider in self.stats_providers.items():
+            stats[name] = provider()
+        return stats
+
+    async def start(self):
+        """啟動 socket 伺服器"""
+        if use_unix_socket(self.config):
+            path = self.config["socket_path"]
+            if os.path.exists(path):
+                os.unlink(path)
+            self.server = await asyncio.start_unix_server(
+                self._handle_client, path=path, limit=STREAM_LIMIT
+            )
+            print(f"✅ 偵測常駐程式已啟動: unix://{path}")
+        else:
+            self.server = await asyncio.start_server(
+                self._handle_client, self.config["host"], self.config["port"], limit=STREAM_LIMIT
+            )
+            print(f"✅ 偵測常駐程式已啟動: tcp://{self.config['host']}:{self.config['port']}")
+
+    async def serve_forever(self):
+        """啟動並持續服務直到被取消"""
+        await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def close(self):
+        """關閉伺服器並停止偵測器"""
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        await self.manager.disconnect_all()
+        if use_unix_socket(self.config) and os.path.exists(self.config["socket_path"]):
+            os.unlink(self.config["socket_path"])
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """處理單一訂閱端連線"""
+        try:
+            line = await reader.readline()
+            if not line:
+                return
+            message = json.loads(line)
+
+            if message.get("cmd") == "subscribe":
+                await self._serve_subscriber(reader, writer)
+            else:
+                await self._handle_command(message, writer)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            print(f"❌ 常駐程式連線錯誤: {e}")
+        finally:
+            writer.close()
+
+    async def _handle_command(self, message: Dict[str, Any], writer: asyncio.StreamWriter):
+        """處理單次指令"""
+        command = message.get("cmd")
+        if command == "reload":
+            try:
+                plan = await self.detector_service.reload_config()
+                writer.write(encode_message({"type": "ok", "data": plan.to_dict()}))
+            except ValueError as e:
+                writer.write(encode_message({"type": "error", "message": str(e)}))
+        elif command == "ready":
+            writer.write(encode_message({"type": "ready", "data": await self.detector_service.get_readiness()}))
+        elif command == "stats":
+            writer.write(encode_message({"type": "stats", "data": self._collect_stats()}))
+        elif command == "query":
+            handler = self.queries.get(message.get("name"))
+            if handler is None:
+                writer.write(encode_message({"type": "error", "message": f"未知查詢: {message.get('name')}"}))
+            else:
+                try:
+                    writer.write(encode_message({"type": "result", "data": handler(**(message.get("params") or {}))}))
+                except (TypeError, ValueError) as e:
+                    writer.write(encode_message({"type": "error", "message": f"查詢失敗: {e}"}))
+        else:
+            writer.write(encode_message({"type": "error", "message": f"未知指令: {command}"}))
+        await writer.drain()
+
+    async def _serve_subscriber(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """持續推送偵測幀給訂閱端,直到連線中斷"""
+        self.subscriber_count += 1
+        print(f"✅ 訂閱端已連線 (訂閱端數: {self.subscriber_count})")
+        try:
+            await self.manager.acquire()
+        except RuntimeError as e:
+            self.subscriber_count -= 1
+            writer.write(encode_message({"type": "error", "message": str(e)}))
+            await writer.drain()
+            return
+
+        # 訂閱期間仍可接收指令 (例如 reload),讀到 EOF 代表訂閱端離線
+        async def read_commands():
+            while True:
+                line = await reader.readline()
+                if not line:
+                    return
+                await self._handle_command(json.loads(line), writer)
+
+        reader_task = asyncio.create_task(read_commands())
+        alerts: asyncio.Queue = asyncio.Queue()
+        self._alert_queues.add(alerts)
+        hub = self.manager.hub
+        last_seq = hub.seq
+        last_stats = 0.0
+
+        try:
+            writer.write(encode_message({"type": "ok"}))
+            await writer.drain()
+            while not reader_task.done():
+                frame = await hub.wait_for(last_seq, STATS_INTERVAL)
+                if frame is not None:
+                    last_seq = frame.seq
+                    writer.write(f"{FRAME_PREFIX}{frame.render(FULL_SUBSCRIPTION)}}}\n".encode("utf-8"))
+                while not alerts.empty():
+                    writer.write(encode_message({"type": "alert", "data": alerts.get_nowait()}))
+
+                now = time.time()
+                if now - last_stats >= STATS_INTERVAL:
+                    last_stats = now
+                    writer.write(encode_message({"type": "stats", "data": self._collect_stats()}))
+
+                await writer.drain()
+        finally:
+            reader_task.cancel()
+            self._alert_queues.discard(alerts)
+            self.subscriber_count -= 1
+            print(f"❌ 訂閱端已離線 (訂閱端數: {self.subscriber_count})")
+            await self.manager.release(linger=self.config.get("idle_linger", 0))
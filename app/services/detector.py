@@ -2,18 +2,39 @@
 # -*- coding: utf-8 -*-
 """
 YOLO 偵測服務 - 核心偵測引擎
+
+ultralytics (含 torch) 與 cv2 延遲到載入模型、開啟攝影機時才匯入,
+讓 API 伺服器不必等待這些套件即可開始監聽
+
+model.backend 為 "stub" 時以模擬後端取代 YOLO 模型,camera.type 可改用影片檔或合成影像,
+沒有攝影機與模型權重也能執行整個服務 (負載測試用)
+
+model.tracker 為 "builtin" 時以 YOLO.predict() 偵測,再由內建 IoU 追蹤器指派 ID,
+不使用 ultralytics 的 BoT-SORT / ByteTrack
 """
 
 import asyncio
-import cv2
 import time
 import numpy as np
 from collections import deque
-from typing import Optional, Dict, Any, AsyncGenerator
-from ultralytics import YOLO
+from typing import Optional, Dict, Any, AsyncGenerator, TYPE_CHECKING
 
 from .calculator import DistanceCalculator
+from .frame import DetectionFrame
+from .zones import ZoneMap
+from .subscription import FULL_SUBSCRIPTION
+from .supervisor import PipelineSupervisor, RECONNECT, RESTART, STOP
+from .sources import open_source
+from .stub_backend import StubBackend
+from .tracker import IoUTracker, BUILTIN_TRACKER
+from .interpolation import SkipFrameInterpolator
+from ..models.sensor_config import SensorConfig, ReloadPlan, plan_reload
 from ..utils.config_loader import load_sensor_config, get_model_path
+from ..utils.cpu_resources import CpuResources, CAPTURE, INFERENCE
+
+if TYPE_CHECKING:
+    import cv2
+    from ultralytics import YOLO
 
 
 class YOLODetectorService:
@@ -22,16 +43,30 @@ class YOLODetectorService:
     負責攝影機管理、YOLO 推論、距離計算
     """
     
-    def __init__(self):
-        """初始化偵測服務"""
-        self.config = load_sensor_config()
-        self.model: Optional[YOLO] = None
-        self.cap: Optional[cv2.VideoCapture] = None
+    def __init__(self, resources: Optional[CpuResources] = None):
+        """
+        初始化偵測服務
+        
+        Args:
+            resources: CPU 資源配置 (由 main.py 建立並綁定事件迴圈;未提供時依 cpu 區塊建立)
+        """
+        self.settings = SensorConfig.from_dict(load_sensor_config())
+        self.config = self.settings.to_dict()
+        
+        # 擷取與推論的專用執行緒 (執行緒數與核心綁定見 cpu 區塊)
+        self.resources = resources or CpuResources.from_config(self.config["cpu"])
+        
+        self.model: Optional["YOLO"] = None   # YOLO 模型或 StubBackend
+        self.tracker: Optional[IoUTracker] = None   # 內建追蹤器 (model.tracker 為 "builtin" 時)
+        self.cap: Optional["cv2.VideoCapture"] = None   # 或 sources 模組的影片檔/合成來源
         self.is_running = False
         
         # 距離計算器
         self.distance_calculator = DistanceCalculator(self.config["distance"])
         
+        # 地面區域點陣 (第一幀時依影像尺寸編譯)
+        self.zone_map = ZoneMap.from_config(self.config["zones"], self.config["camera"])
+        
         # 統計資料
         self.fps = 0
         self.actual_fps = 0
@@ -39,41 +74,146 @@ class YOLODetectorService:
         self.closest_distance = 0.0
         self.frame_times = deque(maxlen=30)
         self.start_time: Optional[float] = None
+        self.frame_seq = 0
+        
+        # 當前偵測幀 (供 REST API 使用)
+        self.current_frame: Optional[DetectionFrame] = None
+        
+        # 跳幀內插 (model.interpolate_skipped 啟用時補上 vid_stride 跳過的幀)
+        self.interpolator = SkipFrameInterpolator()
+        self.interpolated_frames = 0
+        
+        # 熱重載: 需要重新開啟的資源 (於偵測迴圈的下一幀開始前處理,避免與推論同時進行)
+        self._pending_model_reload = False
+        self._pending_camera_reopen = False
+        
+        # 讀取停滯後舊的 read() 可能仍卡在已捨棄的擷取執行緒中,此攝影機之後一律在背景釋放
+        self._capture_stalled = False
+        
+        # 影像消費者數 (預覽、錄影);大於 0 時偵測幀附上原始影像
+        self.image_consumers = 0
         
-        # 當前偵測結果快照 (供 REST API 使用)
-        self.current_snapshot: Optional[Dict[str, Any]] = None
+        # 管線監督 (runtime 區塊: 停滯偵測、重連、錯誤預算、定時回收)
+        self.supervisor = PipelineSupervisor.from_config(self.config["runtime"])
+        self._pending_restart: Optional[str] = None
+        self._health_task: Optional[asyncio.Task] = None
+        
+        # 背景預熱 (服務啟動時載入模型並執行一次推論)
+        self.created_at = time.perf_counter()
+        self.ready = False
+        self.load_error: Optional[str] = None
+        self.boot_timings: Dict[str, float] = {}
+        self._warmup_task: Optional[asyncio.Task] = None
         
     def load_model(self):
-        """載入 YOLO 模型"""
+        """載入 YOLO 模型 (第一次呼叫時才匯入 ultralytics/torch;stub 後端不匯入)"""
         if self.model is not None:
             return
+        
+        # 內建追蹤器隨模型重新建立 (與 ultralytics 追蹤器一樣,重新載入時重置追蹤狀態)
+        model_config = self.config["model"]
+        self.tracker = IoUTracker.from_config(model_config["builtin_tracker"]) if model_config["tracker"] == BUILTIN_TRACKER else None
+        
+        if self.config["model"]["backend"] == "stub":
+            try:
+                self.model = StubBackend.from_config(self.config["model"]["stub"], self.config["distance"])
+            except ValueError as e:
+                raise RuntimeError(f"無法載入模擬推論後端: {e}")
+            print(f"✅ 模擬推論後端已載入 ({self.model.mode}, 延遲 {self.model.latency * 1000:.0f} ms)")
+            self.resources.apply_library_threads()
+            return
             
         try:
-            model_path = get_model_path()
+            start = time.perf_counter()
+            from ultralytics import YOLO
+            import_ms = (time.perf_counter() - start) * 1000
+            
+            start = time.perf_counter()
+            model_path = get_model_path(self.config["model"]["model_path"])
             self.model = YOLO(str(model_path))
-            print(f"✅ YOLO 模型已載入: {model_path}")
+            load_ms = (time.perf_counter() - start) * 1000
+            self.resources.apply_library_threads()
+            
+            # 套件只會匯入一次,重新載入模型時保留第一次的匯入耗時
+            self.boot_timings.setdefault("import_ms", round(import_ms, 1))
+            self.boot_timings["model_load_ms"] = round(load_ms, 1)
+            print(f"✅ YOLO 模型已載入: {model_path} (匯入 {import_ms:.0f} ms, 載入 {load_ms:.0f} ms)")
         except Exception as e:
             raise RuntimeError(f"無法載入 YOLO 模型: {e}")
     
+    def warm_up_model(self):
+        """
+        以 imgsz 大小的空白影像執行一次推論 (同步方法,供 run_in_executor 使用)
+        第一次推論需要初始化運算核心與追蹤器,預先執行可避免第一個客戶端等待
+        """
+        imgsz = self.config["model"]["imgsz"]
+        start = time.perf_counter()
+        self._run_yolo_inference(np.zeros((imgsz, imgsz, 3), dtype=np.uint8))
+        warmup_ms = (time.perf_counter() - start) * 1000
+        
+        self.boot_timings["warmup_ms"] = round(warmup_ms, 1)
+        print(f"🔥 模型預熱完成 ({imgsz}x{imgsz}, {warmup_ms:.0f} ms)")
+    
+    def start_warmup(self) -> asyncio.Task:
+        """
+        在背景載入並預熱模型 (服務啟動時呼叫,不阻塞伺服器監聽)
+        
+        Returns:
+            預熱工作 (重複呼叫時回傳同一個)
+        """
+        if self._warmup_task is None:
+            self._warmup_task = asyncio.create_task(self._warm_up())
+        return self._warmup_task
+    
+    async def _warm_up(self):
+        """背景預熱流程,失敗時記錄錯誤 (第一個客戶端連線時會再嘗試載入)"""
+        try:
+            await self.resources.run(INFERENCE, self.load_model)
+            await self.resources.run(INFERENCE, self.warm_up_model)
+            self.ready = True
+            self.boot_timings["ready_ms"] = round((time.perf_counter() - self.created_at) * 1000, 1)
+            print(f"✅ 偵測器已就緒 (啟動後 {self.boot_timings['ready_ms'] / 1000:.1f} 秒)")
+        except Exception as e:
+            self.load_error = str(e)
+            print(f"❌ 模型預熱失敗: {e}")
+    
+    async def get_readiness(self) -> Dict[str, Any]:
+        """
+        取得就緒狀態 (供 /ready 使用)
+        
+        Returns:
+            {"ready", "state": loading/ready/error, "error", "timings"}
+        """
+        if self.ready:
+            state = "ready"
+        elif self.load_error:
+            state = "error"
+        else:
+            state = "loading"
+        return {
+            "ready": self.ready,
+            "state": state,
+            "error": self.load_error,
+            "timings": dict(self.boot_timings)
+        }
+    
     def start_camera(self):
-        """啟動攝影機"""
+        """啟動攝影機 (或依 camera.type 開啟影片檔、合成影像來源)"""
         if self.cap is not None and self.cap.isOpened():
             return
             
         try:
-            source = self.config["camera"]["source"]
-            self.cap = cv2.VideoCapture(source)
+            camera = self.config["camera"]
+            source = camera["source"] if camera["type"] != "synthetic" else "synthetic"
+            self.cap = open_source(camera)
+            self.resources.apply_library_threads()
+            self.interpolator.reset()   # 新來源的幀與先前的推論幀不連續
             
             if not self.cap.isOpened():
                 raise RuntimeError(f"無法開啟攝影機: {source}")
             
-            # 設定解析度
-            width = self.config["camera"]["width"]
-            height = self.config["camera"]["height"]
-            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
-            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
-            
-            print(f"✅ 攝影機已啟動: {source} ({width}x{height})")
+            pacing = f", {camera['pacing']}" if camera["type"] != "device" else ""
+            print(f"✅ 攝影機已啟動: {source} ({camera['width']}x{camera['height']}{pacing})")
         except Exception as e:
             raise RuntimeError(f"無法啟動攝影機: {e}")
     
@@ -88,27 +228,38 @@ class YOLODetectorService:
         """啟動偵測"""
         if self.is_running:
             return
-            
-        self.load_model()
-        self.start_camera()
+        
+        # 背景預熱進行中時等待完成,不重複載入
+        if self._warmup_task is not None and not self._warmup_task.done():
+            await asyncio.shield(self._warmup_task)
+        
+        await self.resources.run(INFERENCE, self.load_model)
+        await self.resources.run(CAPTURE, self.start_camera)
+        self.ready = True
+        self.load_error = None
         self.is_running = True
         self.start_time = time.time()
+        self.supervisor.pipeline_started = self.start_time
+        self._health_task = asyncio.create_task(self._health_check_loop())
         print("▶ 偵測器已啟動")
     
     async def stop_detection(self):
         """停止偵測"""
         self.is_running = False
-        self.stop_camera()
+        if self._health_task is not None:
+            self._health_task.cancel()
+            self._health_task = None
+        self._release_camera(asyncio.get_running_loop())
         self.start_time = None
         print("⏹ 偵測器已停止")
     
-    async def detection_stream(self) -> AsyncGenerator[Dict[str, Any], None]:
+    async def detection_stream(self) -> AsyncGenerator[DetectionFrame, None]:
         """
         偵測串流 - 異步生成器
         持續產生偵測結果直到 is_running 為 False
         
         Yields:
-            偵測結果字典,包含 detections, fps, closest_distance, total_count, timestamp
+            DetectionFrame 偵測幀 (payload 由訂閱端依需求組裝)
         """
         if not self.is_running:
             await self.start_detection()
@@ -118,41 +269,65 @@ class YOLODetectorService:
         fps_counter = 0
         last_frame_time = time.time()
         
-        # FPS 限制參數
-        use_fps_limit = self.config["performance"]["use_fps_limit"]
-        target_fps = self.config["performance"]["target_fps"]
-        frame_interval = 1.0 / target_fps if use_fps_limit else 0
-        vid_stride = self.config["model"]["vid_stride"]
-        
         loop = asyncio.get_event_loop()
         
         while self.is_running:
             try:
                 loop_start = time.time()
                 
-                # === 讀取影像 (在執行緒池執行,避免阻塞) ===
-                ret, frame = await loop.run_in_executor(None, self.cap.read)
+                # === 熱重載 (只在需要時重新開啟模型或攝影機) ===
+                if self._pending_model_reload or self._pending_camera_reopen:
+                    await self._reopen_resources(loop)
+                
+                # === 定時回收與健康檢查要求的重啟 ===
+                if self.supervisor.recycle_due(loop_start):
+                    self._pending_restart = "recycle"
+                if self._pending_restart:
+                    reason, self._pending_restart = self._pending_restart, None
+                    await self._restart_pipeline(loop, reason)
+                
+                # FPS 限制與跳幀參數 (每幀讀取,熱重載後下一幀生效)
+                performance = self.config["performance"]
+                vid_stride = self.config["model"]["vid_stride"]
+                
+                # === 讀取影像 (在擷取執行緒執行,超過期限視為擷取停滯) ===
+                if self.cap is None:
+                    await self._handle_failure(loop, "read", "攝影機未開啟")
+                    continue
+                try:
+                    ret, frame = await asyncio.wait_for(
+                        self.resources.run(CAPTURE, self.cap.read),
+                        self.supervisor.stall_timeout
+                    )
+                except asyncio.TimeoutError:
+                    # 卡住的 read() 仍占用擷取執行緒,之後的讀取與重連改用新的執行緒
+                    self.resources.abandon(CAPTURE)
+                    self._capture_stalled = True
+                    await self._handle_failure(loop, "stall", f"超過 {self.supervisor.stall_timeout:g} 秒沒有新影像")
+                    continue
+                capture_time = time.time()
                 
                 if not ret:
-                    print("⚠ 無法讀取影像,嘗試重新連接...")
-                    await asyncio.sleep(1)
+                    await self._handle_failure(loop, "read", "無法讀取影像")
                     continue
                 
                 frame_count += 1
                 
-                # === 跳幀處理 ===
+                # === 跳幀處理 (啟用內插時以等速度外推補上跳過的幀) ===
                 if frame_count % vid_stride != 0:
+                    if self.config["model"]["interpolate_skipped"]:
+                        predicted = self.interpolator.predict(frame_count, vid_stride)
+                        if predicted is not None:
+                            self._stamp_frame(predicted)
+                            self.interpolated_frames += 1
+                            yield predicted
                     continue
                 
-                # === YOLO 推論 (在執行緒池執行) ===
-                results = await loop.run_in_executor(
-                    None,
-                    self._run_yolo_inference,
-                    frame
-                )
+                # === YOLO 推論 (在推論執行緒執行) ===
+                results = await self.resources.run(INFERENCE, self._run_yolo_inference, frame)
                 
                 # === 處理偵測結果 ===
-                detection_data = self._process_results(results)
+                frame_data = self._process_results(results, capture_time)
                 
                 # === FPS 計算 ===
                 fps_counter += 1
@@ -168,27 +343,116 @@ class YOLODetectorService:
                 self.actual_fps = int(1.0 / avg_frame_time) if avg_frame_time > 0 else 0
                 last_frame_time = time.time()
                 
-                # === 更新統計資料 ===
-                detection_data["fps"] = self.fps
-                detection_data["actual_fps"] = self.actual_fps
-                detection_data["timestamp"] = time.time()
-                
-                # 更新快照
-                self.current_snapshot = detection_data
+                # === 更新統計資料與快照 ===
+                self._stamp_frame(frame_data)
+                if self.image_consumers > 0:
+                    frame_data.image = frame
+                if self.config["model"]["interpolate_skipped"]:
+                    self.interpolator.update(frame_data, frame_count)
+                self.supervisor.frame_ok(frame_data.timestamp)
                 
                 # === 產生結果 ===
-                yield detection_data
+                yield frame_data
                 
                 # === FPS 限制 ===
-                if use_fps_limit:
+                if performance["use_fps_limit"]:
                     elapsed_time = time.time() - loop_start
-                    sleep_time = frame_interval - elapsed_time
+                    sleep_time = 1.0 / performance["target_fps"] - elapsed_time
                     if sleep_time > 0:
                         await asyncio.sleep(sleep_time)
                         
             except Exception as e:
                 print(f"❌ 偵測迴圈錯誤: {e}")
-                await asyncio.sleep(0.1)
+                await self._handle_failure(loop, "error", str(e))
+    
+    def _stamp_frame(self, frame_data: DetectionFrame):
+        """填入序號、FPS 與時間戳記並更新快照 (推論幀與內插幀共用序號)"""
+        self.frame_seq += 1
+        frame_data.seq = self.frame_seq
+        frame_data.fps = self.fps
+        frame_data.actual_fps = self.actual_fps
+        frame_data.timestamp = time.time()
+        self.current_frame = frame_data
+    
+    async def _handle_failure(self, loop: asyncio.AbstractEventLoop, kind: str, message: str):
+        """
+        回報錯誤給監督器並執行其決定的動作 (重試、退避重連、重啟管線或停止)
+        
+        Args:
+            loop: 事件迴圈
+            kind: 錯誤類型 ("read"、"stall"、"error")
+            message: 錯誤訊息
+        """
+        action = self.supervisor.record_error(kind, message)
+        delay = self.supervisor.next_delay(action)
+        
+        try:
+            if action == STOP:
+                print(f"⛔ 連續錯誤達 {self.supervisor.max_consecutive_errors} 次且未啟用自動重連,停止偵測")
+                await self.stop_detection()
+            elif action == RESTART:
+                print(f"⚠ 連續錯誤達 {self.supervisor.max_consecutive_errors} 次,重啟偵測管線")
+                await self._restart_pipeline(loop, "errors")
+            elif action == RECONNECT:
+                print(f"⚠ {message},{delay:.1f} 秒後重新開啟影像來源")
+                await asyncio.sleep(delay)
+                self._release_camera(loop)
+                self.supervisor.record_reconnect()
+                await self.resources.run(CAPTURE, self.start_camera)
+            else:
+                await asyncio.sleep(delay)
+        except Exception as e:
+            # 重連或重啟本身失敗時計入錯誤,下一輪再由監督器決定
+            self.supervisor.record_error("error", str(e))
+            print(f"❌ 復原失敗: {e}")
+    
+    def _release_camera(self, loop: asyncio.AbstractEventLoop):
+        """
+        釋放攝影機 (重連、重啟、停止與重新開啟共用)
+        讀取停滯過的攝影機舊的 read() 可能仍卡在執行緒中,同步 release() 會阻塞事件迴圈,改在背景釋放不等待
+        
+        Args:
+            loop: 事件迴圈
+        """
+        stalled, self._capture_stalled = self._capture_stalled, False
+        if self.cap is None:
+            return
+        if stalled:
+            cap, self.cap = self.cap, None
+            loop.run_in_executor(None, cap.release)
+            print("⏹ 攝影機已停止 (背景釋放)")
+        else:
+            self.stop_camera()
+    
+    async def _restart_pipeline(self, loop: asyncio.AbstractEventLoop, reason: str):
+        """
+        重啟整條偵測管線: 重新載入並預熱模型 (追蹤器一併重置)、清除平滑狀態、重新開啟攝影機
+        
+        Args:
+            loop: 事件迴圈
+            reason: 重啟原因 ("errors"、"health"、"recycle")
+        """
+        labels = {"errors": "錯誤預算用盡", "health": "健康檢查失敗", "recycle": "定時回收"}
+        print(f"🔁 重啟偵測管線 ({labels.get(reason, reason)})")
+        self.supervisor.record_restart(reason)
+        
+        self._release_camera(loop)
+        self.model = None
+        self.distance_calculator.clear_history()
+        await self.resources.run(INFERENCE, self.load_model)
+        await self.resources.run(INFERENCE, self.warm_up_model)
+        await self.resources.run(CAPTURE, self.start_camera)
+    
+    async def _health_check_loop(self):
+        """
+        定期健康檢查 (health_check_interval)
+        管線超過檢查間隔沒有產生任何幀時 (例如推論持續失敗),要求偵測迴圈重啟管線
+        """
+        while self.is_running:
+            await asyncio.sleep(self.supervisor.health_check_interval)
+            if self.is_running and self.supervisor.is_stalled(time.time()):
+                print(f"⚠ 健康檢查: {self.supervisor.health_check_interval:.0f} 秒內沒有新的偵測幀")
+                self._pending_restart = "health"
     
     def _run_yolo_inference(self, frame):
         """
@@ -200,6 +464,21 @@ class YOLODetectorService:
         Returns:
             YOLO Results 物件
         """
+        if self.tracker is not None:
+            # 內建追蹤器: 以較低門檻偵測,低信心度的框只用於延續既有追蹤
+            model_config = self.config["model"]
+            results = self.model.predict(
+                source=frame,
+                classes=[0],
+                conf=min(model_config["conf"], self.tracker.low_conf),
+                iou=model_config["iou"],
+                imgsz=model_config["imgsz"],
+                device=model_config["device"],
+                show=False,
+                verbose=False
+            )
+            return self.tracker.track(results, model_config["conf"])
+        
         results = self.model.track(
             source=frame,
             classes=[0],  # 只偵測人類
@@ -214,58 +493,59 @@ class YOLODetectorService:
         )
         return results
     
-    def _process_results(self, results) -> Dict[str, Any]:
+    def _process_results(self, results, timestamp: Optional[float] = None) -> DetectionFrame:
         """
         處理 YOLO 偵測結果
         
         Args:
             results: YOLO Results 物件
+            timestamp: 影像擷取時間 (卡爾曼平滑依此計算時間間隔,預設為現在)
             
         Returns:
-            處理後的偵測資料字典
-        """
-        detections = []
-        distances = []
-        
-        if results[0].boxes is not None and len(results[0].boxes) > 0:
-            for box in results[0].boxes:
-                # 取得邊界框資料
-                xyxy = box.xyxy[0].cpu().numpy()
-                x1, y1, x2, y2 = xyxy
-                box_height = y2 - y1
-                box_width = x2 - x1
-                
-                # 取得追蹤 ID
-                track_id = int(box.id[0]) if box.id is not None else None
-                
-                # 計算距離
-                distance = self.distance_calculator.calculate_distance(
-                    box_height, box_width, track_id
-                )
-                distances.append(distance)
-                
-                # 取得信心度
-                confidence = float(box.conf[0])
-                
-                # 組裝偵測資料
-                detections.append({
-                    "track_id": track_id,
-                    "distance": round(distance, 1),
-                    "bbox": [float(x1), float(y1), float(x2), float(y2)],
-                    "confidence": round(confidence, 3)
-                })
+            DetectionFrame 偵測幀 (尚未填入序號與時間戳記)
+        """
+        boxes = results[0].boxes
+        
+        if boxes is None or len(boxes) == 0:
+            frame_data = DetectionFrame.empty()
+        else:
+            # 一次取出所有邊界框資料 (避免逐框 GPU/CPU 轉換)
+            xyxy = boxes.xyxy.cpu().numpy().astype(np.float32)
+            confidences = boxes.conf.cpu().numpy().astype(np.float32)
+            
+            # 取得追蹤 ID (無 ID 時為 -1)
+            if boxes.id is not None:
+                track_ids = boxes.id.cpu().numpy().astype(np.int64)
+            else:
+                track_ids = np.full(len(xyxy), -1, dtype=np.int64)
+            
+            box_heights = xyxy[:, 3] - xyxy[:, 1]
+            box_widths = xyxy[:, 2] - xyxy[:, 0]
+            
+            # 計算距離 (平滑化狀態依追蹤 ID 保存)
+            distances, approach_speeds = self.distance_calculator.calculate_distances(
+                box_heights, box_widths, track_ids,
+                timestamp if timestamp is not None else time.time()
+            )
+            
+            frame_data = DetectionFrame(
+                boxes=xyxy,
+                confidences=confidences,
+                track_ids=track_ids,
+                distances=distances,
+                approach_speeds=approach_speeds
+            )
+        
+        # 區域查詢 (所有人的腳底座標一次索引)
+        if len(self.zone_map):
+            frame_data.zone_names = self.zone_map.names
+            frame_data.zone_masks = self.zone_map.lookup(frame_data.boxes, results[0].orig_shape)
         
         # 更新統計
-        self.total_detections = len(detections)
-        self.closest_distance = round(min(distances), 1) if distances else 0.0
+        self.total_detections = frame_data.total_count
+        self.closest_distance = frame_data.closest_distance
         
-        return {
-            "detections": detections,
-            "total_count": self.total_detections,
-            "closest_distance": self.closest_distance,
-            "fps": self.fps,
-            "actual_fps": self.actual_fps
-        }
+        return frame_data
     
     def get_current_snapshot(self) -> Optional[Dict[str, Any]]:
         """
@@ -274,7 +554,9 @@ class YOLODetectorService:
         Returns:
             最新的偵測結果,若尚未開始偵測則返回 None
         """
-        return self.current_snapshot
+        if self.current_frame is None:
+            return None
+        return FULL_SUBSCRIPTION.build_payload(self.current_frame)
     
     def get_stats(self) -> Dict[str, Any]:
         """
@@ -289,24 +571,108 @@ class YOLODetectorService:
             "fps": self.fps,
             "actual_fps": self.actual_fps,
             "is_running": self.is_running,
-            "uptime": int(time.time() - self.start_time) if self.start_time else 0
+            "uptime": self._uptime(),
+            "frame_seq": self.frame_seq,
+            "interpolated_frames": self.interpolated_frames,
+            "supervisor": self.supervisor.get_stats(),
+            "cpu": self.resources.get_stats()
         }
     
-    async def reload_config(self):
+    def get_stats_key(self) -> tuple:
+        """
+        取得統計資訊版本鍵 (供 REST 回應快取判斷內容是否改變)
+        
+        Returns:
+            (幀序號, 是否運行中, 運行秒數)
         """
-        重新載入配置並重啟偵測器
-        用於後台修改 sensor_config.json 後手動刷新
+        return (self.frame_seq, self.is_running, self._uptime())
+    
+    def _uptime(self) -> int:
+        """運行秒數"""
+        return int(time.time() - self.start_time) if self.start_time else 0
+    
+    async def reload_config(self) -> ReloadPlan:
         """
-        was_running = self.is_running
+        重新讀取 sensor_config.json 並熱套用變更
+        用於後台手動刷新或檔案監看偵測到變更時
         
-        if was_running:
-            await self.stop_detection()
+        Returns:
+            套用計畫
+            
+        Raises:
+            ValueError: 配置驗證失敗 (保留目前配置)
+        """
+        return self.apply_config(SensorConfig.from_dict(load_sensor_config()))
+    
+    def apply_config(self, settings: SensorConfig) -> ReloadPlan:
+        """
+        比對新舊配置,以最省成本的方式套用每項變更
         
-        # 重新載入配置
-        self.config = load_sensor_config()
-        self.distance_calculator = DistanceCalculator(self.config["distance"])
+        - 距離參數、地面區域: 立即就地替換 (保留平滑狀態)
+        - 模型門檻、跳幀、內建追蹤器參數、FPS 限制、runtime: 偵測迴圈下一幀讀取
+        - 模型檔、裝置、追蹤器: 下一幀前重新載入模型
+        - 攝影機: 下一幀前重新開啟攝影機
         
-        if was_running:
-            await self.start_detection()
+        Args:
+            settings: 已驗證的新配置
+            
+        Returns:
+            套用計畫
+            
+        Raises:
+            ValueError: 無法建立新配置的衍生物件 (例如區域);此時不套用任何變更,下次重新載入仍會比對到全部變更
+        """
+        config = settings.to_dict()
+        plan = plan_reload(self.config, config)
+        if not plan.changed:
+            return plan
+        
+        # === 先建立可能失敗的衍生物件,全部成功後才替換狀態 ===
+        zone_map = self.zone_map
+        if plan.touches("zones") or plan.reopen_camera:
+            # 區域參考解析度預設跟隨攝影機解析度
+            zone_map = ZoneMap.from_config(config["zones"], config["camera"])
+        
+        # === 一次替換 (以下只套用已驗證的數值,不會失敗) ===
+        self.settings = settings
+        self.config = config
+        self.zone_map = zone_map
+        
+        if any(key.startswith("runtime.") for key in plan.next_frame):
+            self.supervisor.update_config(config["runtime"])
+        if "model.builtin_tracker" in plan.next_frame and self.tracker is not None:
+            self.tracker.update_config(config["model"]["builtin_tracker"])
+        if plan.touches("distance"):
+            self.distance_calculator.update_config(config["distance"])
+        
+        if plan.reload_model:
+            if self.is_running:
+                self._pending_model_reload = True
+            else:
+                self.model = None
+        if plan.reopen_camera and self.is_running:
+            self._pending_camera_reopen = True
+        
+        applied = [f"{name}: {', '.join(keys)}" for name, keys in plan.to_dict().items() if keys]
+        print(f"🔄 配置已套用 ({'; '.join(applied)})")
+        if plan.restart_required:
+            print(f"⚠ 以下設定需重新啟動服務才會生效: {', '.join(plan.restart_required)}")
+        return plan
+    
+    async def _reopen_resources(self, loop: asyncio.AbstractEventLoop):
+        """
+        重新載入模型及/或重新開啟攝影機 (在執行緒池執行,避免阻塞事件迴圈)
+        
+        Args:
+            loop: 事件迴圈
+        """
+        if self._pending_model_reload:
+            self.model = None
+            await self.resources.run(INFERENCE, self.load_model)
+            await self.resources.run(INFERENCE, self.warm_up_model)
+            self._pending_model_reload = False
         
-        print("🔄 配置已重新載入")
+        if self._pending_camera_reopen:
+            self._release_camera(loop)
+            await self.resources.run(CAPTURE, self.start_camera)
+            self._pending_camera_reopen = False
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+偵測幀資料結構 - 以陣列保存單幀偵測結果,依訂閱需求組裝 payload
+"""
+
+import json
+import numpy as np
+from typing import Dict, Any, Optional, Tuple
+
+from .zones import summarize_zones, zone_names_of
+
+
+class DetectionFrame:
+    """
+    單幀偵測結果
+    各偵測框資料以 numpy 陣列保存,payload 只在有人訂閱時才組裝,
+    同一訂閱內容每幀只序列化一次 (快取於幀物件上,供所有連線共用)
+    """
+
+    __slots__ = (
+        "seq", "timestamp", "boxes", "confidences", "track_ids", "distances",
+        "fps", "actual_fps", "zone_names", "zone_masks",
+        "approach_speeds", "interpolated", "image", "_rendered"
+    )
+
+    def __init__(
+        self,
+        boxes: np.ndarray,
+        confidences: np.ndarray,
+        track_ids: np.ndarray,
+        distances: np.ndarray,
+        seq: int = 0,
+        timestamp: float = 0.0,
+        fps: int = 0,
+        actual_fps: int = 0,
+        zone_names: Tuple[str, ...] = (),
+        zone_masks: Optional[np.ndarray] = None,
+        approach_speeds: Optional[np.ndarray] = None,
+        interpolated: bool = False
+    ):
+        """
+        初始化偵測幀
+
+        Args:
+            boxes: 邊界框陣列 (N, 4) [x1, y1, x2, y2]
+            confidences: 信心度陣列 (N,)
+            track_ids: 追蹤 ID 陣列 (N,),無 ID 時為 -1
+            distances: 距離陣列 (N,) (cm)
+            seq: 幀序號 (單調遞增)
+            timestamp: 時間戳記
+            fps: 當前 FPS
+            actual_fps: 實際 FPS
+            zone_names: 區域名稱 (依位元順序,未設定區域時為空)
+            zone_masks: 各偵測框所在區域的位元遮罩 (N,) uint32
+            approach_speeds: 接近速度 (N,) cm/s (卡爾曼平滑模式才有,無追蹤 ID 時為 NaN)
+            interpolated: 是否為跳幀內插的預測幀 (非推論結果)
+        """
+        self.boxes = boxes
+        self.confidences = confidences
+        self.track_ids = track_ids
+        self.distances = distances
+        self.seq = seq
+        self.timestamp = timestamp
+        self.fps = fps
+        self.actual_fps = actual_fps
+        self.zone_names = zone_names
+        self.zone_masks = zone_masks if zone_masks is not None else np.zeros(len(distances), dtype=np.uint32)
+        self.approach_speeds = approach_speeds
+        self.interpolated = interpolated
+        self.image: Optional[np.ndarray] = None  # 原始影像 (BGR),只在有影像消費者時附上,不進入 payload
+        self._rendered: Dict[Any, str] = {}
+
+    @classmethod
+    def empty(cls) -> "DetectionFrame":
+        """建立無偵測結果的幀"""
+        return cls(
+            boxes=np.zeros((0, 4), dtype=np.float32),
+            confidences=np.zeros(0, dtype=np.float32),
+            track_ids=np.zeros(0, dtype=np.int64),
+            distances=np.zeros(0, dtype=np.float64)
+        )
+
+    @classmethod
+    def from_payload(cls, payload: Dict[str, Any]) -> "DetectionFrame":
+        """
+        由完整 payload 還原偵測幀 (訂閱端接收常駐程式資料用)
+
+        Args:
+            payload: 完整訂閱的 payload 字典
+
+        Returns:
+            DetectionFrame 實例
+        """
+        detections = payload.get("detections", [])
+        n = len(detections)
+        zone_names = tuple(payload.get("zones", {}))
+        bit_of = {name: 1 << i for i, name in enumerate(zone_names)}
+        has_speed = n > 0 and "approach_speed" in detections[0]
+        frame = cls(
+            boxes=np.array([d["bbox"] for d in detections], dtype=np.float32).reshape(n, 4),
+            confidences=np.array([d["confidence"] for d in detections], dtype=np.float32),
+            track_ids=np.array(
+                [d["track_id"] if d["track_id"] is not None else -1 for d in detections],
+                dtype=np.int64
+            ),
+            distances=np.array([d["distance"] for d in detections], dtype=np.float64),
+            seq=payload.get("seq", 0),
+            timestamp=payload.get("timestamp", 0.0),
+            fps=payload.get("fps", 0),
+            actual_fps=payload.get("actual_fps", 0),
+            zone_names=zone_names,
+            zone_masks=np.array(
+                [sum(bit_of.get(z, 0) for z in d.get("zones", ())) for d in detections],
+                dtype=np.uint32
+            ),
+            approach_speeds=np.array(
+                [d["approach_speed"] if d["approach_speed"] is not None else np.nan for d in detections],
+                dtype=np.float64
+            ) if has_speed else None,
+            interpolated=payload.get("interpolated", False)
+        )
+        return frame
+
+    @property
+    def total_count(self) -> int:
+        """偵測人數"""
+        return len(self.distances)
+
+    @property
+    def closest_distance(self) -> float:
+        """最近距離 (cm),無偵測時為 0"""
+        if len(self.distances) == 0:
+            return 0.0
+        return round(float(self.distances.min()), 1)
+
+    def build_detections(self, indices: Optional[np.ndarray] = None) -> list:
+        """
+        組裝偵測框列表
+
+        Args:
+            indices: 要輸出的偵測框索引,None 表示全部
+
+        Returns:
+            偵測資料字典列表
+        """
+        if indices is None:
+            indices = range(len(self.distances))
+
+        detections = []
+        for i in indices:
+            track_id = int(self.track_ids[i])
+            x1, y1, x2, y2 = self.boxes[i]
+            detection = {
+                "track_id": track_id if track_id >= 0 else None,
+                "distance": round(float(self.distances[i]), 1),
+                "bbox": [float(x1), float(y1), float(x2), float(y2)],
+                "confidence": round(float(self.confidences[i]), 3)
+            }
+            if self.approach_speeds is not None:
+                speed = float(self.approach_speeds[i])
+                detection["approach_speed"] = round(speed, 1) if speed == speed else None
+            if self.zone_names:
+                detection["zones"] = zone_names_of(self.zone_names, int(self.zone_masks[i]))
+            detections.append(detection)
+        return detections
+
+    def build_zones(self, indices: Optional[np.ndarray] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        組裝各區域人數與最近距離
+
+        Args:
+            indices: 要納入的偵測框索引,None 表示全部
+
+        Returns:
+            {區域名稱: {"count": int, "closest_distance": float}}
+        """
+        if indices is None:
+            return summarize_zones(self.zone_names, self.zone_masks, self.distances)
+        return summarize_zones(self.zone_names, self.zone_masks[indices], self.distances[indices])
+
+    def render(self, subscription) -> str:
+        """
+        依訂閱內容產生 JSON 字串 (每幀每種訂閱只計算一次)
+
+        Args:
+            subscription: Subscription 實例
+
+        Returns:
+            序列化後的 JSON 字串
+        """
+        text = self._rendered.get(subscription)
+        if text is None:
+            payload = subscription.build_payload(self)
+            text = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+            self._rendered[subscription] = text
+        return text
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+幀分發中心 - 保存最新偵測幀,供 SSE / 長輪詢等待新幀
+"""
+
+import asyncio
+from typing import Optional, Callable, List
+
+from .frame import DetectionFrame
+
+
+class FrameHub:
+    """
+    幀分發中心
+    廣播迴圈每產生一幀就發佈至此,等待端依幀序號取得比自己新的幀;
+    慢速消費者只會拿到最新幀,不會累積舊資料
+
+    監聽器 (歷史紀錄、統計等) 於發佈時同步呼叫,必須是輕量操作;
+    跳幀內插的預測幀只提供給串流消費者,不呼叫監聽器 (不寫入歷史、統計與警報)
+    """
+
+    def __init__(self):
+        """初始化幀分發中心"""
+        self.latest: Optional[DetectionFrame] = None
+        self._condition = asyncio.Condition()
+        self._listeners: List[Callable[[DetectionFrame], None]] = []
+
+    def add_listener(self, listener: Callable[[DetectionFrame], None]):
+        """
+        註冊每幀監聽器
+
+        Args:
+            listener: 接收 DetectionFrame 的函式
+        """
+        self._listeners.append(listener)
+
+    @property
+    def seq(self) -> int:
+        """最新幀序號 (尚無資料時為 0)"""
+        return self.latest.seq if self.latest is not None else 0
+
+    async def publish(self, frame: DetectionFrame):
+        """
+        發佈新幀並喚醒所有等待端
+
+        Args:
+            frame: 偵測幀
+        """
+        self.latest = frame
+
+        if not frame.interpolated:
+            for listener in self._listeners:
+                try:
+                    listener(frame)
+                except Exception as e:
+                    print(f"⚠ 幀監聽器錯誤 ({getattr(listener, '__qualname__', listener)}): {e}")
+
+        async with self._condition:
+            self._condition.notify_all()
+
+    async def wait_for(self, after_seq: int, timeout: float) -> Optional[DetectionFrame]:
+        """
+        等待序號大於 after_seq 的幀
+
+        若 after_seq 大於目前序號 (例如服務重啟後客戶端仍持有舊序號),
+        直接返回最新幀讓客戶端重新同步
+
+        Args:
+            after_seq: 客戶端已取得的最後序號
+            timeout: 最長等待秒數
+
+        Returns:
+            最新幀,逾時則返回 None
+        """
+        latest = self.latest
+        if latest is not None and latest.seq != after_seq:
+            return latest
+
+        def is_newer() -> bool:
+            return self.latest is not None and self.latest.seq != after_seq
+
+        try:
+            async with self._condition:
+                await asyncio.wait_for(self._condition.wait_for(is_newer), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+        return self.latest
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+偵測歷史環形緩衝 - 以固定大小陣列保存近期幀,支援時間區間查詢與降採樣
+"""
+
+import numpy as np
+from typing import Dict, Any
+
+from .frame import DetectionFrame
+
+
+class DetectionHistory:
+    """
+    偵測歷史環形緩衝
+    幀資料 (時間、人數、最近距離) 與各追蹤 ID 的精簡紀錄 (ID、距離)
+    分別存於兩個固定大小的環形陣列,記憶體上限由配置決定
+    """
+
+    def __init__(self, capacity: int = 36000, track_capacity: int = 360000):
+        """
+        初始化歷史緩衝
+
+        Args:
+            capacity: 最多保存的幀數
+            track_capacity: 最多保存的追蹤紀錄數 (所有幀的偵測框總數)
+        """
+        self.capacity = capacity
+        self.track_capacity = track_capacity
+
+        # === 幀環形陣列 ===
+        self.timestamps = np.zeros(capacity, dtype=np.float64)
+        self.counts = np.zeros(capacity, dtype=np.int32)
+        self.closest = np.full(capacity, np.nan, dtype=np.float32)  # 無人時為 NaN
+        self.track_start = np.zeros(capacity, dtype=np.int64)        # 追蹤紀錄的絕對起始位置
+        self.track_len = np.zeros(capacity, dtype=np.int32)
+        self.head = 0       # 下一個寫入位置
+        self.size = 0
+
+        # === 追蹤紀錄環形陣列 (以絕對位置遞增,取餘數定位) ===
+        self.track_ids = np.zeros(track_capacity, dtype=np.int32)
+        self.track_distances = np.zeros(track_capacity, dtype=np.float32)
+        self.track_cursor = 0
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "DetectionHistory":
+        """
+        依配置建立歷史緩衝
+
+        Args:
+            config: sensor_config.json 的 history 區塊
+        """
+        return cls(
+            capacity=int(config.get("capacity", 36000)),
+            track_capacity=int(config.get("track_capacity", 360000))
+        )
+
+    @property
+    def memory_bytes(self) -> int:
+        """緩衝區佔用的記憶體 (bytes)"""
+        return sum(a.nbytes for a in (
+            self.timestamps, self.counts, self.closest, self.track_start,
+            self.track_len, self.track_ids, self.track_distances
+        ))
+
+    def append(self, frame: DetectionFrame):
+        """
+        寫入一幀 (FrameHub 監聽器)
+
+        Args:
+            frame: 偵測幀
+        """
+        i = self.head
+        n = min(frame.total_count, self.track_capacity)
+
+        self.timestamps[i] = frame.timestamp
+        self.counts[i] = frame.total_count
+        self.closest[i] = frame.distances.min() if frame.total_count else np.nan
+        self.track_start[i] = self.track_cursor
+        self.track_len[i] = n
+
+        if n:
+            positions = (self.track_cursor + np.arange(n)) % self.track_capacity
+            self.track_ids[positions] = frame.track_ids[:n]
+            self.track_distances[positions] = frame.distances[:n]
+            self.track_cursor += n
+
+        self.head = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def _ordered(self, array: np.ndarray) -> np.ndarray:
+        """依時間順序取出環形陣列內容"""
+        if self.size < self.capacity:
+            return array[:self.size]
+        return np.concatenate((array[self.head:], array[:self.head]))
+
+    def query(self, start: float, end: float) -> Dict[str, np.ndarray]:
+        """
+        取出時間區間內的幀資料
+
+        Args:
+            start: 起始時間戳記
+            end: 結束時間戳記
+
+        Returns:
+            {"timestamp", "count", "closest", "track_start", "track_len"} 陣列
+        """
+        timestamps = self._ordered(self.timestamps)
+        lo = np.searchsorted(timestamps, start, side="left")
+        hi = np.searchsorted(timestamps, end, side="right")
+
+        return {
+            "timestamp": timestamps[lo:hi],
+            "count": self._ordered(self.counts)[lo:hi],
+            "closest": self._ordered(self.closest)[lo:hi],
+            "track_start": self._ordered(self.track_start)[lo:hi],
+            "track_len": self._ordered(self.track_len)[lo:hi]
+        }
+
+    def track_summary(self, track_start: np.ndarray, track_len: np.ndarray) -> list:
+        """
+        彙整區間內各追蹤 ID 的紀錄 (已被覆寫的紀錄自動略過)
+
+        Args:
+            track_start: 各幀追蹤紀錄起始位置
+            track_len: 各幀追蹤紀錄數
+
+        Returns:
+            [{"track_id", "samples", "min_distance", "max_distance"}, ...]
+        """
+        if len(track_start) == 0:
+            return []
+
+        oldest_valid = self.track_cursor - self.track_capacity
+        first = max(int(track_start[0]), oldest_valid)
+        last = int(track_start[-1] + track_len[-1])
+        if last <= first:
+            return []
+
+        positions = np.arange(first, last) % self.track_capacity
+        ids = self.track_ids[positions]
+        distances = self.track_distances[positions]
+        valid = ids >= 0
+        ids, distances = ids[valid], distances[valid]
+        if len(ids) == 0:
+            return []
+
+        order = np.argsort(ids, kind="stable")
+        ids, distances = ids[order], distances[order]
+        unique_ids, starts, samples = np.unique(ids, return_index=True, return_counts=True)
+
+        return [
+            {
+                "track_id": int(track_id),
+                "samples": int(n),
+                "min_distance": round(float(d_min), 1),
+                "max_distance": round(float(d_max), 1)
+            }
+            for track_id, n, d_min, d_max in zip(
+                unique_ids, samples,
+                np.minimum.reduceat(distances, starts),
+                np.maximum.reduceat(distances, starts)
+            )
+        ]
+
+    def series(self, start: float, end: float, max_points: int = 500, method: str = "minmax",
+               tracks: bool = False) -> Dict[str, Any]:
+        """
+        時間區間內的降採樣時間序列 (/api/distance/history 的內容,daemon 模式由常駐程式計算)
+
+        Args:
+            start: 起始時間戳記
+            end: 結束時間戳記
+            max_points: 最多輸出點數
+            method: 降採樣方式 (minmax / lttb)
+            tracks: 是否附帶各追蹤 ID 摘要
+
+        Returns:
+            {"from", "to", "method", "samples", "series"[, "tracks"]}
+        """
+        window = self.query(start, end)
+
+        if method == "lttb":
+            series = downsample_lttb(window["timestamp"], window["count"], window["closest"], max_points)
+        else:
+            series = downsample_minmax(window["timestamp"], window["count"], window["closest"], max_points)
+
+        data = {
+            "from": start,
+            "to": end,
+            "method": method,
+            "samples": int(len(window["timestamp"])),
+            "series": series
+        }
+        if tracks:
+            data["tracks"] = self.track_summary(window["track_start"], window["track_len"])
+        return data
+
+
+def downsample_minmax(timestamps: np.ndarray, counts: np.ndarray, closest: np.ndarray,
+                      max_points: int) -> Dict[str, list]:
+    """
+    最小/最大值保留降採樣 (依時間等分區間)
+    每個區間輸出最近距離的最小值與最大值、人數最大值與平均值,峰值不會被平均掉
+
+    Args:
+        timestamps: 時間戳記 (遞增)
+        counts: 人數
+        closest: 最近距離 (無人為 NaN)
+        max_points: 最多輸出的區間數
+
+    Returns:
+        {"timestamp", "closest_min", "closest_max", "count_max", "count_avg"}
+    """
+    n = len(timestamps)
+    if n == 0:
+        return {"timestamp": [], "closest_min": [], "closest_max": [], "count_max": [], "count_avg": []}
+
+    buckets = min(max_points, n)
+    edges = np.linspace(timestamps[0], timestamps[-1], buckets + 1)
+    starts = np.searchsorted(timestamps, edges[:-1], side="left")
+    starts[0] = 0
+    # 移除空區間
+    starts = np.unique(starts[starts < n])
+    sizes = np.diff(np.append(starts, n))
+
+    with np.errstate(invalid="ignore"):
+        closest_min = np.fmin.reduceat(closest, starts)
+        closest_max = np.fmax.reduceat(closest, starts)
+
+    return {
+        "timestamp": timestamps[starts].tolist(),
+        "closest_min": _nan_to_none(closest_min),
+        "closest_max": _nan_to_none(closest_max),
+        "count_max": np.maximum.reduceat(counts, starts).tolist(),
+        "count_avg": np.round(np.add.reduceat(counts, starts) / sizes, 2).tolist()
+    }
+
+
+def downsample_lttb(timestamps: np.ndarray, counts: np.ndarray, closest: np.ndarray,
+                    max_points: int) -> Dict[str, list]:
+    """
+    Largest-Triangle-Three-Buckets 降採樣 (依最近距離選點,保留曲線形狀)
+
+    Args:
+        timestamps: 時間戳記 (遞增)
+        counts: 人數
+        closest: 最近距離 (無人為 NaN,選點時視為 0)
+        max_points: 最多輸出的點數
+
+    Returns:
+        {"timestamp", "closest_distance", "total_count"}
+    """
+    n = len(timestamps)
+    if n <= max_points or max_points < 3:
+        indices = np.arange(n)
+    else:
+        y = np.nan_to_num(closest.astype(np.float64))
+        x = timestamps - timestamps[0]
+        bounds = np.linspace(1, n - 1, max_points - 1).astype(np.int64)
+
+        indices = np.empty(max_points, dtype=np.int64)
+        indices[0] = 0
+        indices[-1] = n - 1
+        a = 0
+        for b in range(max_points - 2):
+            lo, hi = bounds[b], bounds[b + 1]
+            # 下一區間平均點
+            next_hi = bounds[b + 2] if b + 2 < len(bounds) else n
+            avg_x = x[hi:next_hi].mean() if next_hi > hi else x[-1]
+            avg_y = y[hi:next_hi].mean() if next_hi > hi else y[-1]
+            # 三角形面積最大的點
+            area = np.abs(
+                (x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a])
+            )
+            a = lo + int(np.argmax(area))
+            indices[b + 1] = a
+
+    return {
+        "timestamp": timestamps[indices].tolist(),
+        "closest_distance": _nan_to_none(closest[indices]),
+        "total_count": counts[indices].tolist()
+    }
+
+
+def _nan_to_none(values: np.ndarray) -> list:
+    """NaN 轉為 None (JSON null),其餘四捨五入至 0.1 cm"""
+    return [None if np.isnan(v) else round(float(v), 1) for v in values]
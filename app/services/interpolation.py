@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+跳幀內插 - vid_stride 跳過的攝影機幀以等速度外推產生預測偵測幀,
+前端以攝影機幀率收到平滑的資料,推論仍只執行在部分幀
+"""
+
+import numpy as np
+from typing import Optional
+
+from .frame import DetectionFrame
+
+
+# 速度的指數平滑係數 (新量測的權重)
+VELOCITY_SMOOTHING = 0.5
+
+
+class SkipFrameInterpolator:
+    """
+    等速度外推
+
+    每次推論幀以同一追蹤 ID 在前後兩次推論幀的邊界框與距離差,除以相隔的攝影機幀數得到每幀變化量;
+    跳過的幀以最近一次推論幀加上變化量 × 經過幀數產生預測幀 (無追蹤 ID 或新出現的追蹤維持原位)
+    預測只是陣列加法,不重新計算距離與區域 (區域沿用最近一次推論幀)
+    """
+
+    def __init__(self):
+        self.base: Optional[DetectionFrame] = None
+        self.base_index = 0
+        self.box_velocity = np.zeros((0, 4), dtype=np.float64)    # 每攝影機幀的邊界框變化量
+        self.distance_velocity = np.zeros(0, dtype=np.float64)    # 每攝影機幀的距離變化量 (cm)
+
+    def reset(self):
+        """清除狀態 (管線重啟或攝影機重新開啟後,前後幀不再連續)"""
+        self.base = None
+        self.box_velocity = self.box_velocity[:0]
+        self.distance_velocity = self.distance_velocity[:0]
+
+    def update(self, frame: DetectionFrame, frame_index: int):
+        """
+        記錄一次推論幀並更新各追蹤的變化量
+
+        Args:
+            frame: 推論產生的偵測幀
+            frame_index: 攝影機幀編號
+        """
+        box_velocity = np.zeros((len(frame.track_ids), 4), dtype=np.float64)
+        distance_velocity = np.zeros(len(frame.track_ids), dtype=np.float64)
+
+        previous = self.base
+        steps = frame_index - self.base_index
+        if previous is not None and steps > 0 and len(frame.track_ids) and len(previous.track_ids):
+            common, now, before = np.intersect1d(frame.track_ids, previous.track_ids, return_indices=True)
+            valid = common >= 0
+            now, before = now[valid], before[valid]
+            box_velocity[now] = (frame.boxes[now] - previous.boxes[before]) / steps
+            distance_velocity[now] = (frame.distances[now] - previous.distances[before]) / steps
+
+            # 與上一次的變化量平滑 (降低框抖動造成的預測跳動)
+            box_velocity[now] = VELOCITY_SMOOTHING * box_velocity[now] + (1 - VELOCITY_SMOOTHING) * self.box_velocity[before]
+            distance_velocity[now] = (
+                VELOCITY_SMOOTHING * distance_velocity[now] + (1 - VELOCITY_SMOOTHING) * self.distance_velocity[before]
+            )
+
+        self.base = frame
+        self.base_index = frame_index
+        self.box_velocity = box_velocity
+        self.distance_velocity = distance_velocity
+
+    def predict(self, frame_index: int, max_steps: int) -> Optional[DetectionFrame]:
+        """
+        產生跳過幀的預測偵測幀
+
+        Args:
+            frame_index: 攝影機幀編號
+            max_steps: 距離最近一次推論幀的最大幀數 (超過時推論已落後,不再外推)
+
+        Returns:
+            標記為 interpolated 的偵測幀 (尚未填入序號與時間戳記),無法預測時為 None
+        """
+        base = self.base
+        steps = frame_index - self.base_index
+        if base is None or steps <= 0 or steps > max_steps:
+            return None
+
+        return DetectionFrame(
+            boxes=(base.boxes + self.box_velocity * steps).astype(np.float32),
+            confidences=base.confidences,
+            track_ids=base.track_ids,
+            distances=np.maximum(base.distances + self.distance_velocity * steps, 0.0),
+            zone_names=base.zone_names,
+            zone_masks=base.zone_masks,
+            approach_speeds=base.approach_speeds,
+            interpolated=True
+        )
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+追蹤卡爾曼濾波 - 以陣列同時處理所有追蹤 ID 的等速度模型 (距離 + 接近速度)
+"""
+
+import numpy as np
+from typing import Tuple
+
+
+class TrackKalmanFilter:
+    """
+    等速度卡爾曼濾波器 (狀態: 距離 cm、速度 cm/s)
+    以實際時間間隔計算預測,跳幀 (vid_stride) 或掉幀時不會改變平滑程度;
+    所有追蹤的狀態存成依 ID 排序的陣列,每幀的預測與更新都是一次陣列運算
+    """
+
+    def __init__(
+        self,
+        process_noise: float = 150.0,
+        measurement_noise: float = 0.05,
+        initial_velocity_std: float = 100.0,
+        track_timeout: float = 2.0
+    ):
+        """
+        初始化濾波器
+
+        Args:
+            process_noise: 加速度標準差 (cm/s²),越大越快跟上速度變化
+            measurement_noise: 量測標準差 (相對距離的比例,框高量化誤差使遠處誤差較大)
+            initial_velocity_std: 新追蹤的初始速度標準差 (cm/s)
+            track_timeout: 追蹤 ID 消失多久後捨棄狀態 (秒)
+        """
+        self.accel_var = float(process_noise) ** 2
+        self.measurement_noise = float(measurement_noise)
+        self.initial_velocity_var = float(initial_velocity_std) ** 2
+        self.track_timeout = float(track_timeout)
+
+        self.ids = np.zeros(0, dtype=np.int64)           # 已排序的追蹤 ID
+        self.state = np.zeros((0, 2), dtype=np.float64)   # [距離, 速度]
+        self.cov = np.zeros((0, 2, 2), dtype=np.float64)  # 共變異矩陣
+        self.last_seen = np.zeros(0, dtype=np.float64)
+
+    @classmethod
+    def from_config(cls, config: dict) -> "TrackKalmanFilter":
+        """
+        依 distance 配置建立濾波器
+
+        Args:
+            config: sensor_config.json 的 distance 區塊
+        """
+        return cls(
+            process_noise=config.get("kalman_process_noise", 150.0),
+            measurement_noise=config.get("kalman_measurement_noise", 0.05),
+            track_timeout=config.get("kalman_track_timeout", 2.0)
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def update(self, track_ids: np.ndarray, measurements: np.ndarray, timestamp: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        以一幀量測更新所有出現的追蹤
+
+        Args:
+            track_ids: 追蹤 ID 陣列 (M,),不可重複
+            measurements: 原始距離陣列 (M,) (cm)
+            timestamp: 量測時間 (秒)
+
+        Returns:
+            (平滑距離 (M,), 速度 (M,) cm/s,正值表示遠離)
+        """
+        track_ids = np.asarray(track_ids, dtype=np.int64)
+        z = np.asarray(measurements, dtype=np.float64)
+
+        self._prune(timestamp)
+        slots = self._slots_for(track_ids, z, timestamp)
+
+        x = self.state[slots]
+        P = self.cov[slots]
+        dt = np.maximum(timestamp - self.last_seen[slots], 0.0)
+
+        # === 預測: x = F x, P = F P Fᵀ + Q ===
+        x_pred = np.column_stack([x[:, 0] + dt * x[:, 1], x[:, 1]])
+        p00, p01, p11 = P[:, 0, 0], P[:, 0, 1], P[:, 1, 1]
+        dt2 = dt * dt
+        q = self.accel_var
+        pp00 = p00 + 2 * dt * p01 + dt2 * p11 + q * dt2 * dt2 / 4
+        pp01 = p01 + dt * p11 + q * dt2 * dt / 2
+        pp11 = p11 + q * dt2
+
+        # === 更新: H = [1, 0] ===
+        r = (self.measurement_noise * np.maximum(z, 1.0)) ** 2
+        s = pp00 + r
+        k0 = pp00 / s
+        k1 = pp01 / s
+        innovation = z - x_pred[:, 0]
+
+        x_new = np.column_stack([x_pred[:, 0] + k0 * innovation, x_pred[:, 1] + k1 * innovation])
+        P_new = np.empty_like(P)
+        P_new[:, 0, 0] = (1 - k0) * pp00
+        P_new[:, 0, 1] = P_new[:, 1, 0] = (1 - k0) * pp01
+        P_new[:, 1, 1] = pp11 - k1 * pp01
+
+        self.state[slots] = x_new
+        self.cov[slots] = P_new
+        self.last_seen[slots] = timestamp
+
+        return x_new[:, 0], x_new[:, 1]
+
+    def _slots_for(self, track_ids: np.ndarray, z: np.ndarray, timestamp: float) -> np.ndarray:
+        """取得追蹤 ID 對應的狀態索引,新 ID 以當前量測初始化後插入 (保持排序)"""
+        positions = np.searchsorted(self.ids, track_ids)
+        found = positions < len(self.ids)
+        found[found] = self.ids[positions[found]] == track_ids[found]
+
+        if not found.all():
+            new = ~found
+            # 初始距離變異數設為極大值,第一次更新時直接採用量測值 (不重複計入同一筆量測)
+            cov = np.zeros((new.sum(), 2, 2))
+            cov[:, 0, 0] = 1e8
+            cov[:, 1, 1] = self.initial_velocity_var
+
+            ids = np.concatenate([self.ids, track_ids[new]])
+            order = np.argsort(ids, kind="stable")
+            self.ids = ids[order]
+            self.state = np.concatenate([self.state, np.column_stack([z[new], np.zeros(new.sum())])])[order]
+            self.cov = np.concatenate([self.cov, cov])[order]
+            self.last_seen = np.concatenate([self.last_seen, np.full(new.sum(), timestamp)])[order]
+            positions = np.searchsorted(self.ids, track_ids)
+
+        return positions
+
+    def _prune(self, now: float):
+        """捨棄逾時未出現的追蹤"""
+        if len(self.ids) == 0:
+            return
+        keep = now - self.last_seen <= self.track_timeout
+        if not keep.all():
+            self.ids = self.ids[keep]
+            self.state = self.state[keep]
+            self.cov = self.cov[keep]
+            self.last_seen = self.last_seen[keep]
+
+    def remove(self, track_id: int):
+        """捨棄單一追蹤 ID 的狀態 (ID 重新出現時從新量測開始)"""
+        keep = self.ids != track_id
+        if not keep.all():
+            self.ids = self.ids[keep]
+            self.state = self.state[keep]
+            self.cov = self.cov[keep]
+            self.last_seen = self.last_seen[keep]
+
+    def clear(self):
+        """清除所有追蹤狀態"""
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.state = np.zeros((0, 2), dtype=np.float64)
+        self.cov = np.zeros((0, 2, 2), dtype=np.float64)
+        self.last_seen = np.zeros(0, dtype=np.float64)
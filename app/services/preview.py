@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+標註預覽 - 在背景執行緒將偵測幀畫上邊界框與距離並編碼為 JPEG,
+每幀只繪製與編碼一次,供所有 MJPEG 觀看者共用;沒有觀看者時完全不運作
+"""
+
+import asyncio
+import threading
+import time
+import numpy as np
+from typing import Dict, Any, Optional, Tuple
+
+from .frame import DetectionFrame
+
+
+# 距離顏色 (BGR,與 camera_test_gui_v2.py 相同: >300cm 綠 / 150-300cm 黃 / <150cm 紅)
+FAR_COLOR = (0, 255, 0)
+MIDDLE_COLOR = (0, 255, 255)
+NEAR_COLOR = (0, 0, 255)
+HUD_COLOR = (0, 255, 0)
+
+
+def distance_color(distance: float) -> Tuple[int, int, int]:
+    """依距離取得標註顏色"""
+    if distance > 300:
+        return FAR_COLOR
+    if distance > 150:
+        return MIDDLE_COLOR
+    return NEAR_COLOR
+
+
+def annotate_frame(frame: DetectionFrame, image: np.ndarray) -> np.ndarray:
+    """
+    在影像上畫出邊界框、追蹤 ID、距離與 FPS/人數資訊 (直接修改傳入的影像)
+
+    Args:
+        frame: 偵測幀
+        image: BGR 影像 (呼叫端負責複製)
+
+    Returns:
+        標註後的影像
+    """
+    import cv2
+
+    for i in range(frame.total_count):
+        x1, y1, x2, y2 = (int(v) for v in frame.boxes[i])
+        distance = float(frame.distances[i])
+        color = distance_color(distance)
+        cv2.rectangle(image, (x1, y1), (x2, y2), color, 2)
+
+        track_id = int(frame.track_ids[i])
+        label = f"#{track_id} {distance:.1f}cm" if track_id >= 0 else f"{distance:.1f}cm"
+        cv2.putText(image, label, (x1, max(y1 - 10, 15)), cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+
+    # 左上角資訊 (cv2 字型不支援中文,使用英文標籤)
+    cv2.putText(image, f"FPS: {frame.fps}/{frame.actual_fps}", (10, 30),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.7, HUD_COLOR, 2)
+    cv2.putText(image, f"People: {frame.total_count}", (10, 60),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.7, HUD_COLOR, 2)
+    if frame.total_count:
+        cv2.putText(image, f"Closest: {frame.closest_distance:.1f}cm", (10, 90),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, MIDDLE_COLOR, 2)
+    return image
+
+
+class PreviewRenderer:
+    """
+    MJPEG 預覽繪製器
+    FrameHub 監聽器只記下最新幀 (O(1));背景執行緒取出最新幀繪製、縮放並編碼,
+    繪製太慢時中間的幀直接略過,觀看者永遠拿到最新一張 JPEG
+    """
+
+    def __init__(self, detector_service, width: int = 640, quality: int = 70, max_fps: float = 15):
+        """
+        初始化繪製器
+
+        Args:
+            detector_service: 偵測服務 (觀看期間要求偵測幀附上原始影像)
+            width: 輸出寬度 (像素,依比例縮放;0 為原始大小)
+            quality: JPEG 品質 (1-100)
+            max_fps: 最高編碼頻率
+        """
+        self.detector_service = detector_service
+        self.width = int(width)
+        self.quality = int(quality)
+        self.min_interval = 1.0 / max_fps if max_fps > 0 else 0.0
+
+        self.viewers = 0
+        self.seq = 0                 # 已編碼的 JPEG 序號
+        self.jpeg: Optional[bytes] = None
+        self.source_size: Optional[Tuple[int, int]] = None   # 原始影像 (寬, 高),偵測框座標以此為準
+        self.frames_encoded = 0
+        self.frames_skipped = 0
+        self.last_render_ms = 0.0
+        self.last_encode_ms = 0.0
+
+        self._pending: Optional[DetectionFrame] = None
+        self._last_encoded_at = 0.0
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._new_jpeg: Optional[asyncio.Event] = None
+
+    @classmethod
+    def from_config(cls, detector_service, config: Dict[str, Any]) -> "PreviewRenderer":
+        """
+        依配置建立繪製器
+
+        Args:
+            detector_service: 偵測服務
+            config: sensor_config.json 的 preview 區塊
+        """
+        return cls(
+            detector_service,
+            width=config.get("width", 640),
+            quality=config.get("quality", 70),
+            max_fps=config.get("max_fps", 15)
+        )
+
+    @property
+    def supported(self) -> bool:
+        """偵測服務是否提供原始影像 (daemon 訂閱端模式沒有影像)"""
+        return hasattr(self.detector_service, "image_consumers")
+
+    # === 觀看者管理 ===
+
+    def add_viewer(self):
+        """新增觀看者 (第一位觀看者啟動背景繪製並要求偵測幀附上影像)"""
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+            self._new_jpeg = asyncio.Event()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._worker, name="preview-render", daemon=True)
+            self._thread.start()
+
+        self.viewers += 1
+        if self.viewers == 1:
+            self.detector_service.image_consumers += 1
+
+    def remove_viewer(self):
+        """移除觀看者 (最後一位離開後不再附上影像,也不再繪製)"""
+        if self.viewers == 0:
+            return
+        self.viewers -= 1
+        if self.viewers == 0:
+            self.detector_service.image_consumers = max(0, self.detector_service.image_consumers - 1)
+            with self._condition:
+                self._pending = None
+
+    # === FrameHub 監聽器 ===
+
+    def update(self, frame: DetectionFrame):
+        """
+        記下最新幀並喚醒繪製執行緒 (未處理的舊幀直接被取代)
+
+        Args:
+            frame: 偵測幀
+        """
+        if self.viewers == 0 or frame.image is None:
+            return
+        with self._condition:
+            if self._pending is not None:
+                self.frames_skipped += 1
+            self._pending = frame
+            self._condition.notify()
+
+    # === 取得 JPEG ===
+
+    async def wait_for(self, after_seq: int, timeout: float) -> Optional[Tuple[int, bytes]]:
+        """
+        等待比 after_seq 新的 JPEG
+
+        Args:
+            after_seq: 觀看者已取得的最後序號
+            timeout: 最長等待秒數
+
+        Returns:
+            (序號, JPEG),逾時則返回 None
+        """
+        if self.jpeg is not None and self.seq != after_seq:
+            return self.seq, self.jpeg
+        try:
+            await asyncio.wait_for(self._new_jpeg.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        return self.seq, self.jpeg
+
+    def _publish(self):
+        """(事件迴圈中執行) 喚醒等待新 JPEG 的觀看者"""
+        event, self._new_jpeg = self._new_jpeg, asyncio.Event()
+        event.set()
+
+    # === 背景繪製 ===
+
+    def _worker(self):
+        """背景執行緒: 取最新幀繪製、縮放、編碼"""
+        import cv2
+
+        while True:
+            with self._condition:
+                while self._pending is None:
+                    self._condition.wait()
+                frame, self._pending = self._pending, None
+
+            # 限制編碼頻率 (等待期間若有更新的幀,改用最新幀)
+            wait = self._last_encoded_at + self.min_interval - time.time()
+            if wait > 0:
+                time.sleep(wait)
+                with self._condition:
+                    if self._pending is not None:
+                        frame, self._pending = self._pending, None
+                        self.frames_skipped += 1
+
+            try:
+                start = time.perf_counter()
+                image = frame.image
+                if self.width and image.shape[1] != self.width:
+                    scale = self.width / image.shape[1]
+                    image = cv2.resize(image, (self.width, int(round(image.shape[0] * scale))),
+                                       interpolation=cv2.INTER_AREA)
+                    scaled = _scaled_frame(frame, scale)
+                else:
+                    image = image.copy()
+                    scaled = frame
+                annotate_frame(scaled, image)
+                render_ms = (time.perf_counter() - start) * 1000
+
+                start = time.perf_counter()
+                ok, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+                encode_ms = (time.perf_counter() - start) * 1000
+                if not ok:
+                    continue
+            except Exception as e:
+                print(f"⚠ 預覽繪製錯誤: {e}")
+                continue
+
+            self.source_size = (frame.image.shape[1], frame.image.shape[0])
+            self.jpeg = encoded.tobytes()
+            self.seq += 1
+            self.frames_encoded += 1
+            self.last_render_ms = render_ms
+            self.last_encode_ms = encode_ms
+            self._last_encoded_at = time.time()
+            self._loop.call_soon_threadsafe(self._publish)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """取得預覽統計"""
+        return {
+            "viewers": self.viewers,
+            "frames_encoded": self.frames_encoded,
+            "frames_skipped": self.frames_skipped,
+            "last_render_ms": round(self.last_render_ms, 2),
+            "last_encode_ms": round(self.last_encode_ms, 2),
+            "jpeg_bytes": len(self.jpeg) if self.jpeg else 0,
+            "width": self.width,
+            "source_size": list(self.source_size) if self.source_size else None,
+            "quality": self.quality
+        }
+
+
+def _scaled_frame(frame: DetectionFrame, scale: float) -> DetectionFrame:
+    """建立邊界框依比例縮放的幀 (只供繪製使用,其餘欄位共用)"""
+    return DetectionFrame(
+        boxes=frame.boxes * scale,
+        confidences=frame.confidences,
+        track_ids=frame.track_ids,
+        distances=frame.distances,
+        fps=frame.fps,
+        actual_fps=frame.actual_fps
+    )
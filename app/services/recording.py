@@ -0,0 +1,457 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+事件錄影 - 記憶體中保留最近數秒的壓縮影像 (預錄),觸發條件成立時連同事後畫面
+交給背景編碼程序寫成影片,錄影目錄超過磁碟預算時從最舊的片段開始刪除
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+import multiprocessing
+import numpy as np
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+from .frame import DetectionFrame
+from .preview import annotate_frame, _scaled_frame
+
+
+# 影片副檔名與編碼 (mp4v 不需額外套件)
+CLIP_SUFFIX = ".mp4"
+FOURCC = "mp4v"
+
+
+def write_clip(path: str, jpegs: List[bytes], fps: float, metadata: Dict[str, Any], max_disk_bytes: int) -> Dict[str, Any]:
+    """
+    將 JPEG 影像序列寫成影片並執行磁碟預算清理 (在背景編碼程序中執行)
+
+    Args:
+        path: 影片路徑
+        jpegs: JPEG 影像序列
+        fps: 影片幀率
+        metadata: 寫入同名 .json 的片段資訊
+        max_disk_bytes: 錄影目錄磁碟預算
+
+    Returns:
+        {"path", "bytes", "write_ms", "evicted": [被刪除的片段]}
+    """
+    import cv2
+
+    start = time.perf_counter()
+    target = Path(path)
+    tmp_path = target.with_name(target.stem + ".tmp" + CLIP_SUFFIX)
+
+    writer = None
+    try:
+        for data in jpegs:
+            image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if image is None:
+                continue
+            if writer is None:
+                height, width = image.shape[:2]
+                writer = cv2.VideoWriter(str(tmp_path), cv2.VideoWriter_fourcc(*FOURCC), fps, (width, height))
+            writer.write(image)
+    finally:
+        if writer is not None:
+            writer.release()
+
+    if not tmp_path.exists():
+        raise RuntimeError(f"無法寫入影片: {target.name}")
+    os.replace(tmp_path, target)
+    target.with_suffix(".json").write_text(json.dumps(metadata, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    evicted = evict_oldest(target.parent, max_disk_bytes)
+    return {
+        "path": str(target),
+        "bytes": target.stat().st_size,
+        "write_ms": round((time.perf_counter() - start) * 1000, 1),
+        "evicted": evicted
+    }
+
+
+def evict_oldest(directory: Path, max_disk_bytes: int) -> List[str]:
+    """
+    錄影目錄超過磁碟預算時,從最舊的片段開始刪除 (連同 .json)
+
+    Args:
+        directory: 錄影目錄
+        max_disk_bytes: 磁碟預算
+
+    Returns:
+        被刪除的片段名稱
+    """
+    clips = sorted(directory.glob(f"*{CLIP_SUFFIX}"), key=lambda p: p.stat().st_mtime)
+    clips = [clip for clip in clips if not clip.stem.endswith(".tmp")]
+    sizes = [clip.stat().st_size + _sidecar_size(clip) for clip in clips]
+    total = sum(sizes)
+
+    evicted = []
+    # 至少保留最新的片段
+    for clip, size in zip(clips[:-1], sizes[:-1]):
+        if total <= max_disk_bytes:
+            break
+        clip.unlink(missing_ok=True)
+        clip.with_suffix(".json").unlink(missing_ok=True)
+        total -= size
+        evicted.append(clip.name)
+    return evicted
+
+
+def _sidecar_size(clip: Path) -> int:
+    """片段資訊檔大小"""
+    sidecar = clip.with_suffix(".json")
+    return sidecar.stat().st_size if sidecar.exists() else 0
+
+
+class EventRecorder:
+    """
+    事件錄影器
+    FrameHub 監聽器只把 (時間、影像參考、是否觸發) 放入有上限的佇列;
+    背景執行緒負責縮放、標註與 JPEG 壓縮,維護預錄環形緩衝與錄影狀態,
+    片段結束後交給獨立的編碼程序寫檔,擷取與推論不會被編碼或磁碟寫入阻塞
+
+    觸發條件 (任一成立即觸發):
+    - distance_below: 有人距離小於此值 (cm)
+    - count_above: 人數大於此值
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        distance_below: Optional[float] = 100,
+        count_above: Optional[int] = None,
+        pre_roll: float = 5.0,
+        post_roll: float = 5.0,
+        max_clip_seconds: float = 60.0,
+        fps: float = 10.0,
+        width: int = 640,
+        quality: int = 75,
+        annotate: bool = True,
+        max_disk_mb: float = 2048,
+        max_queue: int = 30
+    ):
+        """
+        初始化錄影器
+
+        Args:
+            directory: 錄影目錄
+            distance_below: 距離觸發門檻 (cm),None 為不使用
+            count_above: 人數觸發門檻,None 為不使用
+            pre_roll: 觸發前保留的秒數
+            post_roll: 條件解除後繼續錄製的秒數
+            max_clip_seconds: 單一片段最長秒數 (超過即結束並開始新片段)
+            fps: 緩衝與影片幀率上限
+            width: 影像寬度 (依比例縮放,0 為原始大小)
+            quality: 緩衝 JPEG 品質 (1-100)
+            annotate: 是否畫上邊界框與距離
+            max_disk_mb: 錄影目錄磁碟預算 (MB)
+            max_queue: 待壓縮影像上限 (壓縮跟不上時丟棄新幀)
+        """
+        self.directory = Path(directory)
+        self.distance_below = distance_below
+        self.count_above = count_above
+        self.pre_roll = pre_roll
+        self.post_roll = post_roll
+        self.max_clip_seconds = max_clip_seconds
+        self.fps = fps
+        self.min_interval = 1.0 / fps if fps > 0 else 0.0
+        self.width = int(width)
+        self.quality = int(quality)
+        self.annotate = annotate
+        self.max_disk_bytes = int(max_disk_mb * 1024 * 1024)
+
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._last_accepted = 0.0
+
+        # 背景執行緒狀態
+        self._ring: deque = deque()            # 預錄緩衝 [(時間, JPEG)]
+        self._ring_bytes = 0
+        self._clip: Optional[List[Tuple[float, bytes]]] = None
+        self._clip_info: Dict[str, Any] = {}
+        self._last_triggered = 0.0
+
+        # 統計
+        self.frames_buffered = 0
+        self.dropped_frames = 0
+        self.clips_written = 0
+        self.clips_failed = 0
+        self.clips_evicted = 0
+        self.last_clip: Optional[Dict[str, Any]] = None
+        self.last_compress_ms = 0.0
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], base_dir: Path) -> "EventRecorder":
+        """
+        依配置建立錄影器
+
+        Args:
+            config: sensor_config.json 的 recording 區塊
+            base_dir: 相對路徑的基準目錄
+        """
+        directory = cls.resolve_directory(config, base_dir)
+        trigger = config.get("trigger", {"distance_below": 100})
+        return cls(
+            directory=str(directory),
+            distance_below=trigger.get("distance_below"),
+            count_above=trigger.get("count_above"),
+            pre_roll=float(config.get("pre_roll", 5.0)),
+            post_roll=float(config.get("post_roll", 5.0)),
+            max_clip_seconds=float(config.get("max_clip_seconds", 60.0)),
+            fps=float(config.get("fps", 10.0)),
+            width=int(config.get("width", 640)),
+            quality=int(config.get("quality", 75)),
+            annotate=bool(config.get("annotate", True)),
+            max_disk_mb=float(config.get("max_disk_mb", 2048))
+        )
+
+    @staticmethod
+    def resolve_directory(config: Dict[str, Any], base_dir: Path) -> Path:
+        """
+        取得錄影目錄 (相對路徑以 base_dir 為基準)
+
+        Args:
+            config: sensor_config.json 的 recording 區塊
+            base_dir: 相對路徑的基準目錄
+        """
+        directory = Path(config.get("path", "recordings"))
+        return directory if directory.is_absolute() else base_dir / directory
+
+    # ===== 生命週期 =====
+
+    def start(self):
+        """啟動壓縮執行緒與編碼程序"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        # 以 spawn 建立編碼程序,不複製推論執行緒與模型的狀態
+        self._executor = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+        self._thread = threading.Thread(target=self._worker, name="event-recorder", daemon=True)
+        self._thread.start()
+        print(f"✅ 事件錄影已啟動: {self.directory}")
+
+    def close(self):
+        """結束進行中的片段,等待編碼完成後停止"""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout=10)
+        self._thread = None
+        self._executor.shutdown(wait=True)
+        self._executor = None
+        print("⏹ 事件錄影已停止")
+
+    # ===== FrameHub 監聽器 =====
+
+    def is_triggered(self, frame: DetectionFrame) -> bool:
+        """觸發條件是否成立"""
+        if frame.total_count == 0:
+            return False
+        if self.count_above is not None and frame.total_count > self.count_above:
+            return True
+        if self.distance_below is not None:
+            distances = frame.distances
+            return bool(((distances > 0) & (distances < self.distance_below)).any())
+        return False
+
+    def update(self, frame: DetectionFrame):
+        """
+        放入一幀 (依 fps 降頻,佇列已滿時丟棄)
+
+        Args:
+            frame: 偵測幀 (需附帶原始影像)
+        """
+        if frame.image is None or self._thread is None:
+            return
+        if frame.timestamp - self._last_accepted < self.min_interval:
+            return
+        self._last_accepted = frame.timestamp
+
+        try:
+            self._queue.put_nowait((frame, self.is_triggered(frame)))
+        except queue.Full:
+            self.dropped_frames += 1
+
+    # ===== 背景執行緒 =====
+
+    def _worker(self):
+        """背景執行緒: 壓縮影像、維護預錄緩衝與錄影狀態"""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            frame, triggered = item
+
+            try:
+                data = self._compress(frame)
+            except Exception as e:
+                print(f"⚠ 錄影影像壓縮失敗: {e}")
+                continue
+            self._advance(frame, data, triggered)
+
+        if self._clip:
+            self._finish_clip()
+
+    def _compress(self, frame: DetectionFrame) -> bytes:
+        """縮放、標註並壓縮為 JPEG"""
+        import cv2
+
+        start = time.perf_counter()
+        image = frame.image
+        if self.width and image.shape[1] != self.width:
+            scale = self.width / image.shape[1]
+            image = cv2.resize(image, (self.width, int(round(image.shape[0] * scale))), interpolation=cv2.INTER_AREA)
+            if self.annotate:
+                annotate_frame(_scaled_frame(frame, scale), image)
+        elif self.annotate:
+            image = annotate_frame(frame, image.copy())
+
+        ok, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        if not ok:
+            raise RuntimeError("JPEG 編碼失敗")
+        self.last_compress_ms = (time.perf_counter() - start) * 1000
+        self.frames_buffered += 1
+        return encoded.tobytes()
+
+    def _advance(self, frame: DetectionFrame, data: bytes, triggered: bool):
+        """
+        更新預錄緩衝與錄影狀態
+
+        Args:
+            frame: 偵測幀
+            data: 壓縮後的影像
+            triggered: 此幀觸發條件是否成立
+        """
+        now = frame.timestamp
+        closest = frame.closest_distance if frame.total_count else None
+
+        if self._clip is None:
+            # 預錄緩衝只保留最近 pre_roll 秒
+            self._ring.append((now, data))
+            self._ring_bytes += len(data)
+            while self._ring and now - self._ring[0][0] > self.pre_roll:
+                self._ring_bytes -= len(self._ring.popleft()[1])
+
+            if triggered:
+                self._start_clip(now, frame)
+            return
+
+        self._clip.append((now, data))
+        info = self._clip_info
+        info["max_count"] = max(info["max_count"], frame.total_count)
+        if closest is not None and (info["closest_distance"] is None or closest < info["closest_distance"]):
+            info["closest_distance"] = round(closest, 1)
+        if triggered:
+            self._last_triggered = now
+
+        # 條件解除滿 post_roll 或片段過長時結束
+        if now - self._last_triggered >= self.post_roll or now - info["start"] >= self.max_clip_seconds:
+            self._finish_clip()
+
+    def _start_clip(self, now: float, frame: DetectionFrame):
+        """開始新片段 (預錄緩衝成為片段開頭)"""
+        self._clip = list(self._ring)
+        self._ring.clear()
+        self._ring_bytes = 0
+        self._last_triggered = now
+
+        reasons = []
+        if self.distance_below is not None and frame.total_count and frame.closest_distance < self.distance_below:
+            reasons.append(f"distance<{self.distance_below:g}")
+        if self.count_above is not None and frame.total_count > self.count_above:
+            reasons.append(f"count>{self.count_above}")
+        self._clip_info = {
+            "start": self._clip[0][0],
+            "triggered_at": now,
+            "trigger": reasons,
+            "max_count": frame.total_count,
+            "closest_distance": round(frame.closest_distance, 1) if frame.total_count else None
+        }
+        print(f"⏺ 事件錄影開始 ({', '.join(reasons)})")
+
+    def _finish_clip(self):
+        """結束片段並交給編碼程序"""
+        clip, self._clip = self._clip, None
+        info = self._clip_info
+        info["end"] = clip[-1][0]
+        info["frames"] = len(clip)
+
+        duration = info["end"] - info["start"]
+        fps = (len(clip) - 1) / duration if duration > 0 else self.fps
+        fps = min(max(fps, 1.0), self.fps) if self.fps > 0 else max(fps, 1.0)
+        info["fps"] = round(fps, 2)
+
+        triggered_at = datetime.fromtimestamp(info["triggered_at"])
+        name = triggered_at.strftime("event_%Y%m%d_%H%M%S_") + f"{triggered_at.microsecond // 1000:03d}{CLIP_SUFFIX}"
+        path = self.directory / name
+        future = self._executor.submit(
+            write_clip, str(path), [data for _, data in clip], fps, info, self.max_disk_bytes
+        )
+        future.add_done_callback(self._on_clip_written)
+        print(f"⏹ 事件錄影結束: {name} ({len(clip)} 幀, {duration:.1f} 秒)")
+
+    def _on_clip_written(self, future: Future):
+        """編碼程序完成回呼"""
+        try:
+            result = future.result()
+        except Exception as e:
+            self.clips_failed += 1
+            print(f"❌ 事件錄影寫入失敗: {e}")
+            return
+        self.clips_written += 1
+        self.clips_evicted += len(result["evicted"])
+        self.last_clip = {key: value for key, value in result.items() if key != "evicted"}
+        for name in result["evicted"]:
+            print(f"🗑 錄影超過磁碟預算,已刪除: {name}")
+
+    # ===== 查詢 =====
+
+    def get_stats(self) -> Dict[str, Any]:
+        """取得錄影統計"""
+        return {
+            "recording": self._clip is not None,
+            "buffered_frames": len(self._ring),
+            "buffer_bytes": self._ring_bytes,
+            "frames_buffered": self.frames_buffered,
+            "dropped_frames": self.dropped_frames,
+            "queued": self._queue.qsize(),
+            "clips_written": self.clips_written,
+            "clips_failed": self.clips_failed,
+            "clips_evicted": self.clips_evicted,
+            "last_compress_ms": round(self.last_compress_ms, 2),
+            "last_clip": self.last_clip
+        }
+
+
+def list_clips(directory: Path) -> List[Dict[str, Any]]:
+    """
+    列出錄影目錄中的片段 (新到舊,附上同名 .json 的片段資訊)
+
+    Args:
+        directory: 錄影目錄
+    """
+    if not directory.exists():
+        return []
+    clips = []
+    for clip in directory.glob(f"*{CLIP_SUFFIX}"):
+        if clip.stem.endswith(".tmp"):
+            continue
+        stat = clip.stat()
+        entry = {"name": clip.name, "bytes": stat.st_size, "created": stat.st_mtime}
+        sidecar = clip.with_suffix(".json")
+        if sidecar.exists():
+            try:
+                entry.update(json.loads(sidecar.read_text(encoding="utf-8")))
+            except (OSError, ValueError):
+                pass
+        clips.append(entry)
+    clips.sort(key=lambda entry: entry["created"], reverse=True)
+    return clips
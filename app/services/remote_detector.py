@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+遠端偵測服務 - 訂閱偵測常駐程式的幀,供多個 uvicorn worker 共用同一攝影機
+"""
+
+import asyncio
+import json
+import time
+from typing import Optional, Dict, Any, AsyncGenerator, Callable, List
+from fastapi import HTTPException
+
+from .daemon import open_daemon_connection, encode_message, FRAME_PREFIX
+from .frame import DetectionFrame
+from .subscription import FULL_SUBSCRIPTION
+
+
+class RemoteDetectorService:
+    """
+    遠端偵測服務
+    介面與 YOLODetectorService 相同,但不開啟攝影機也不載入模型,
+    只在有消費者時向常駐程式訂閱偵測幀
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        """
+        初始化遠端偵測服務
+
+        Args:
+            config: daemon 設定 (get_daemon_config)
+        """
+        self.config = config
+        self.is_running = False
+        self.start_time: Optional[float] = None
+
+        # 常駐程式連線
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+
+        # 最新資料
+        self.current_frame: Optional[DetectionFrame] = None
+        self.frame_seq = 0
+        self.remote_stats: Dict[str, Any] = {}
+
+        # 常駐程式轉送的警報事件回呼 (警報引擎與 Webhook 只在常駐程式執行)
+        self._alert_callbacks: List[Callable[[Dict[str, Any]], None]] = []
+
+    def add_alert_callback(self, callback: Callable[[Dict[str, Any]], None]):
+        """
+        註冊警報事件回呼 (訂閱期間收到常駐程式轉送的事件時呼叫)
+
+        Args:
+            callback: 接收事件字典的函式
+        """
+        self._alert_callbacks.append(callback)
+
+    async def start_detection(self):
+        """
+        開始訂閱常駐程式
+
+        Raises:
+            RuntimeError: 無法連線至常駐程式,或常駐程式的偵測器無法啟動
+        """
+        if self.is_running:
+            return
+
+        try:
+            await self._connect()
+        except OSError as e:
+            self._close()
+            raise RuntimeError(f"無法連線至偵測常駐程式: {e}") from e
+        self.is_running = True
+        self.start_time = time.time()
+        print("▶ 已訂閱偵測常駐程式")
+
+    async def stop_detection(self):
+        """停止訂閱 (常駐程式在所有訂閱端離開後自行停止攝影機)"""
+        self.is_running = False
+        self.start_time = None
+        self._close()
+        print("⏹ 已取消訂閱偵測常駐程式")
+
+    async def _connect(self):
+        """
+        連線並送出訂閱指令,等待常駐程式確認偵測器已啟動
+
+        Raises:
+            OSError: 連線失敗或中斷
+            RuntimeError: 常駐程式回報偵測器無法啟動
+        """
+        self._reader, self._writer = await open_daemon_connection(self.config)
+        self._writer.write(encode_message({"cmd": "subscribe"}))
+        await self._writer.drain()
+
+        line = await self._reader.readline()
+        if not line:
+            raise ConnectionError("常駐程式已關閉連線")
+        reply = json.loads(line)
+        if reply.get("type") == "error":
+            self._close()
+            raise RuntimeError(reply.get("message", "常駐程式無法啟動偵測器"))
+
+    def _close(self):
+        """關閉連線"""
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+
+    async def detection_stream(self) -> AsyncGenerator[DetectionFrame, None]:
+        """
+        偵測串流 - 異步生成器
+        連線中斷時以指數退避重連,直到 is_running 為 False;
+        常駐程式回報錯誤 (偵測器無法啟動) 時停止訂閱並結束串流,下一個消費者會重新嘗試啟動
+
+        Yields:
+            DetectionFrame 偵測幀
+        """
+        if not self.is_running:
+            await self.start_detection()
+
+        backoff = 0.5
+
+        while self.is_running:
+            try:
+                if self._reader is None:
+                    await self._connect()
+
+                line = await self._reader.readline()
+                if not line:
+                    raise ConnectionError("常駐程式已關閉連線")
+                backoff = 0.5
+
+                text = line.decode("utf-8").rstrip("\n")
+                if text.startswith(FRAME_PREFIX):
+                    data_text = text[len(FRAME_PREFIX):-1]
+                    frame = DetectionFrame.from_payload(json.loads(data_text))
+                    # 直接沿用常駐程式序列化好的完整 payload
+                    frame._rendered[FULL_SUBSCRIPTION] = data_text
+
+                    self.frame_seq = frame.seq
+                    self.current_frame = frame
+                    yield frame
+                else:
+                    message = json.loads(text)
+                    if message.get("type") == "stats":
+                        self.remote_stats = message["data"]
+                    elif message.get("type") == "alert":
+                        for callback in self._alert_callbacks:
+                            callback(message["data"])
+                    elif message.get("type") == "error":
+                        raise RuntimeError(message.get("message", "常駐程式回報錯誤"))
+
+            except RuntimeError as e:
+                print(f"❌ 常駐程式無法提供偵測幀: {e}")
+                self.is_running = False
+                self.start_time = None
+                self._close()
+                break
+            except (ConnectionError, OSError) as e:
+                if not self.is_running:
+                    break
+                print(f"⚠ 常駐程式連線中斷: {e},{backoff:.1f} 秒後重連")
+                self._close()
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 10.0)
+
+    def get_current_snapshot(self) -> Optional[Dict[str, Any]]:
+        """
+        取得當前偵測結果快照 (供 REST API 使用)
+
+        Returns:
+            最新的偵測結果,若尚未收到資料則返回 None
+        """
+        if self.current_frame is None:
+            return None
+        return FULL_SUBSCRIPTION.build_payload(self.current_frame)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        取得統計資訊 (常駐程式最近一次推送的統計,加上本端訂閱狀態)
+
+        Returns:
+            統計資料字典
+        """
+        stats = dict(self.remote_stats)
+        stats["is_running"] = self.is_running
+        stats["frame_seq"] = self.frame_seq
+        stats["source"] = "daemon"
+        return stats
+
+    def get_stats_key(self) -> tuple:
+        """取得統計資訊版本鍵"""
+        return (self.frame_seq, self.is_running, self.remote_stats.get("uptime", 0))
+
+    async def get_readiness(self) -> Dict[str, Any]:
+        """
+        查詢常駐程式的就緒狀態 (模型已載入並預熱)
+        
+        Returns:
+            {"ready", "state", "error", "timings"};無法連線時 state 為 unreachable
+        """
+        try:
+            reader, writer = await open_daemon_connection(self.config)
+        except OSError as e:
+            return {"ready": False, "state": "unreachable", "error": str(e), "timings": {}}
+        try:
+            writer.write(encode_message({"cmd": "ready"}))
+            await writer.drain()
+            reply = json.loads(await reader.readline())
+        finally:
+            writer.close()
+        return reply.get("data", {"ready": False, "state": "error", "error": reply.get("message"), "timings": {}})
+    
+    async def query(self, name: str, **params) -> Any:
+        """
+        查詢常駐程式端的服務 (歷史、人流分析、警報只在常駐程式維護一份)
+
+        Args:
+            name: 查詢名稱 (DetectorDaemon.add_query 註冊)
+            **params: 查詢參數
+
+        Returns:
+            查詢結果
+
+        Raises:
+            RuntimeError: 無法連線至常駐程式或查詢失敗
+        """
+        try:
+            reader, writer = await open_daemon_connection(self.config)
+        except OSError as e:
+            raise RuntimeError(f"無法連線至偵測常駐程式: {e}") from e
+        try:
+            writer.write(encode_message({"cmd": "query", "name": name, "params": params}))
+            await writer.drain()
+            line = await reader.readline()
+        except OSError as e:
+            raise RuntimeError(f"常駐程式連線中斷: {e}") from e
+        finally:
+            writer.close()
+
+        if not line:
+            raise RuntimeError("常駐程式已關閉連線")
+        reply = json.loads(line)
+        if reply.get("type") != "result":
+            raise RuntimeError(reply.get("message", "常駐程式查詢失敗"))
+        return reply["data"]
+
+    async def query_or_503(self, name: str, **params) -> Any:
+        """
+        API 端點使用的 query
+
+        Raises:
+            HTTPException: 無法連線至常駐程式或查詢失敗 (503)
+        """
+        try:
+            return await self.query(name, **params)
+        except RuntimeError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+
+    async def reload_config(self) -> Dict[str, Any]:
+        """
+        請常駐程式重新載入配置 (由常駐程式熱套用)
+        
+        Returns:
+            常駐程式回覆的套用計畫
+            
+        Raises:
+            ValueError: 常駐程式回報配置驗證失敗
+        """
+        reader, writer = await open_daemon_connection(self.config)
+        try:
+            writer.write(encode_message({"cmd": "reload"}))
+            await writer.drain()
+            reply = json.loads(await reader.readline())
+            if reply.get("type") != "ok":
+                raise ValueError(reply.get("message", "常駐程式重新載入失敗"))
+        finally:
+            writer.close()
+        
+        print("🔄 已請求常駐程式重新載入配置")
+        return reply.get("data", {})
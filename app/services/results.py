@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+以 numpy 陣列提供 ultralytics Results 的介面 (boxes.xyxy/conf/id、orig_shape),
+供模擬後端與內建追蹤器輸出,偵測器的結果處理不需區分來源
+"""
+
+import numpy as np
+
+
+class ArrayTensor:
+    """模擬 torch.Tensor 的 cpu().numpy() 介面"""
+
+    def __init__(self, array: np.ndarray):
+        self._array = array
+
+    def cpu(self) -> "ArrayTensor":
+        return self
+
+    def numpy(self) -> np.ndarray:
+        return self._array
+
+
+class ArrayBoxes:
+    """模擬 ultralytics Boxes (ids 為空或 None 時 id 為 None,與未追蹤的結果相同)"""
+
+    def __init__(self, xyxy: np.ndarray, conf: np.ndarray, ids=None):
+        self.xyxy = ArrayTensor(xyxy)
+        self.conf = ArrayTensor(conf)
+        self.id = ArrayTensor(ids) if ids is not None and len(ids) else None
+        self._count = len(xyxy)
+
+    def __len__(self) -> int:
+        return self._count
+
+
+class ArrayResults:
+    """模擬 ultralytics Results"""
+
+    def __init__(self, boxes: ArrayBoxes, orig_shape: tuple):
+        self.boxes = boxes
+        self.orig_shape = orig_shape
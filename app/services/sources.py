@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+影像來源 - 依 camera.type 開啟攝影機、循環播放的影片檔或程序產生的合成影像
+影片與合成來源提供與 cv2.VideoCapture 相同的 read/isOpened/release 介面,
+讓沒有攝影機的建置機也能以真實負載執行整個 API/WebSocket 服務
+"""
+
+import time
+import numpy as np
+from typing import Dict, Any, Tuple, Optional
+
+
+# 來源類型
+DEVICE = "device"         # 攝影機或串流 (cv2.VideoCapture)
+FILE = "file"             # 影片檔循環播放
+SYNTHETIC = "synthetic"   # 程序產生的合成影像
+
+# 播放節奏
+REALTIME = "realtime"     # 依影片 (或設定) 的 FPS 送出
+UNPACED = "unpaced"       # 不等待,盡可能快 (量測管線上限)
+
+
+class FramePacer:
+    """依固定 FPS 等待下一幀的送出時間 (落後時不補送,直接從現在重新計時)"""
+
+    def __init__(self, fps: float):
+        """
+        Args:
+            fps: 目標 FPS,0 表示不等待
+        """
+        self.interval = 1.0 / fps if fps > 0 else 0.0
+        self._next_due: Optional[float] = None
+
+    def wait(self):
+        """等待到下一幀的送出時間"""
+        if self.interval <= 0:
+            return
+        now = time.perf_counter()
+        if self._next_due is not None and self._next_due > now:
+            time.sleep(self._next_due - now)
+            now = self._next_due
+        self._next_due = now + self.interval
+
+
+class VideoFileSource:
+    """
+    影片檔來源
+    播放到結尾時回到開頭 (loop),realtime 節奏依影片 FPS 送出,unpaced 則盡可能快
+    """
+
+    def __init__(self, path: str, pacing: str = REALTIME, loop: bool = True, fallback_fps: float = 30):
+        """
+        Args:
+            path: 影片檔路徑
+            pacing: 播放節奏 (realtime / unpaced)
+            loop: 結尾時是否從頭播放
+            fallback_fps: 影片沒有 FPS 資訊時使用的 FPS
+        """
+        import cv2
+
+        self.path = path
+        self.loop = loop
+        self.loops = 0
+        self._cap = cv2.VideoCapture(path)
+        self._rewind_prop = cv2.CAP_PROP_POS_FRAMES
+
+        fps = self._cap.get(cv2.CAP_PROP_FPS) or fallback_fps
+        self.fps = fps
+        self._pacer = FramePacer(fps if pacing == REALTIME else 0)
+
+    def isOpened(self) -> bool:
+        return self._cap.isOpened()
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        """讀取下一幀 (結尾時回到開頭)"""
+        self._pacer.wait()
+        ret, frame = self._cap.read()
+        if not ret and self.loop:
+            self._cap.set(self._rewind_prop, 0)
+            self.loops += 1
+            ret, frame = self._cap.read()
+        return ret, frame
+
+    def set(self, prop: int, value: float) -> bool:
+        """影片解析度固定,忽略設定"""
+        return False
+
+    def get(self, prop: int) -> float:
+        return self._cap.get(prop)
+
+    def release(self):
+        self._cap.release()
+
+
+class SyntheticSource:
+    """
+    合成影像來源
+    每幀複製一張預先產生的漸層底圖並畫上移動的亮條,
+    記憶體配置與畫面變化接近真實攝影機,不需任何影像檔或裝置
+    """
+
+    def __init__(self, width: int, height: int, fps: float = 30, pacing: str = REALTIME):
+        """
+        Args:
+            width: 影像寬度
+            height: 影像高度
+            fps: realtime 節奏的 FPS
+            pacing: 播放節奏 (realtime / unpaced)
+        """
+        self.width = width
+        self.height = height
+        self.frames = 0
+        self._opened = True
+        self._pacer = FramePacer(fps if pacing == REALTIME else 0)
+
+        # 漸層底圖 (B 隨水平、G 隨垂直變化)
+        x = np.linspace(0, 255, width, dtype=np.float32)
+        y = np.linspace(0, 255, height, dtype=np.float32)
+        self._base = np.empty((height, width, 3), dtype=np.uint8)
+        self._base[:, :, 0] = x[np.newaxis, :]
+        self._base[:, :, 1] = y[:, np.newaxis]
+        self._base[:, :, 2] = 64
+        self._bar_width = max(1, width // 20)
+
+    def isOpened(self) -> bool:
+        return self._opened
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        """產生下一幀"""
+        if not self._opened:
+            return False, None
+        self._pacer.wait()
+
+        frame = self._base.copy()
+        x = (self.frames * 8) % self.width
+        frame[:, x:x + self._bar_width] = 255
+        self.frames += 1
+        return True, frame
+
+    def set(self, prop: int, value: float) -> bool:
+        """解析度由配置決定,忽略設定"""
+        return False
+
+    def get(self, prop: int) -> float:
+        return 0.0
+
+    def release(self):
+        self._opened = False
+
+
+def open_source(camera: Dict[str, Any]):
+    """
+    依 camera 區塊開啟影像來源
+
+    Args:
+        camera: sensor_config.json 的 camera 區塊
+            type: device (預設) / file / synthetic
+            source: 攝影機編號、串流網址或影片檔路徑
+            width, height: 解析度 (攝影機為要求值,合成來源為實際大小)
+            pacing: realtime / unpaced (影片檔與合成來源)
+            loop: 影片檔結尾時是否從頭播放
+            fps: 合成來源的 FPS (影片檔沒有 FPS 資訊時亦使用)
+
+    Returns:
+        具 read/isOpened/release 介面的來源物件
+    """
+    source_type = camera.get("type", DEVICE)
+    pacing = camera.get("pacing", REALTIME)
+    fps = camera.get("fps", 30)
+
+    if source_type == SYNTHETIC:
+        return SyntheticSource(camera["width"], camera["height"], fps, pacing)
+
+    if source_type == FILE:
+        return VideoFileSource(str(camera["source"]), pacing, camera.get("loop", True), fps)
+
+    import cv2
+
+    cap = cv2.VideoCapture(camera["source"])
+    if cap.isOpened():
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, camera["width"])
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, camera["height"])
+    return cap
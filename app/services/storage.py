@@ -0,0 +1,537 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+偵測資料持久化 - SQLite (WAL) 時序儲存,背景批次寫入並維護 1 分鐘 / 1 小時彙總
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+from .frame import DetectionFrame
+
+
+# 彙總表 (資料表名稱, 區間秒數)
+ROLLUPS = (("rollup_1m", 60), ("rollup_1h", 3600))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS frames (
+    ts REAL NOT NULL,
+    total_count INTEGER NOT NULL,
+    closest_distance REAL
+);
+CREATE INDEX IF NOT EXISTS idx_frames_ts ON frames(ts);
+
+CREATE TABLE IF NOT EXISTS tracks (
+    track_id INTEGER NOT NULL,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    samples INTEGER NOT NULL,
+    min_distance REAL NOT NULL,
+    avg_distance REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tracks_first_seen ON tracks(first_seen);
+"""
+
+ROLLUP_SCHEMA = """
+CREATE TABLE IF NOT EXISTS {table} (
+    bucket INTEGER PRIMARY KEY,
+    frames INTEGER NOT NULL,
+    count_sum INTEGER NOT NULL,
+    count_max INTEGER NOT NULL,
+    occupied_frames INTEGER NOT NULL,
+    closest_min REAL,
+    closest_sum REAL NOT NULL,
+    new_tracks INTEGER NOT NULL
+);
+"""
+
+ROLLUP_UPSERT = """
+INSERT INTO {table} (bucket, frames, count_sum, count_max, occupied_frames,
+                     closest_min, closest_sum, new_tracks)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(bucket) DO UPDATE SET
+    frames = frames + excluded.frames,
+    count_sum = count_sum + excluded.count_sum,
+    count_max = MAX(count_max, excluded.count_max),
+    occupied_frames = occupied_frames + excluded.occupied_frames,
+    closest_min = MIN(COALESCE(closest_min, excluded.closest_min),
+                      COALESCE(excluded.closest_min, closest_min)),
+    closest_sum = closest_sum + excluded.closest_sum,
+    new_tracks = new_tracks + excluded.new_tracks
+"""
+
+
+class DetectionStore:
+    """
+    偵測資料儲存
+    事件迴圈只負責把每幀的精簡資料放入佇列,
+    由背景執行緒批次寫入原始幀、增量更新彙總表並整理追蹤摘要;
+    資料庫超過磁碟預算時依序刪除最舊的原始幀、追蹤摘要與分鐘彙總
+    """
+
+    def __init__(
+        self,
+        path: str,
+        batch_size: int = 200,
+        flush_interval: float = 2.0,
+        max_disk_mb: float = 500,
+        track_timeout: float = 5.0,
+        max_queue: int = 10000
+    ):
+        """
+        初始化儲存
+
+        Args:
+            path: 資料庫檔案路徑
+            batch_size: 累積多少幀寫入一次
+            flush_interval: 最長寫入間隔 (秒)
+            max_disk_mb: 資料庫磁碟預算 (MB)
+            track_timeout: 追蹤 ID 消失多久視為離開 (秒)
+            max_queue: 待寫入佇列上限 (幀),寫入跟不上時超過的幀直接捨棄
+        """
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_disk_bytes = int(max_disk_mb * 1024 * 1024)
+        self.track_timeout = track_timeout
+
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._writer: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+        # 寫入執行緒內部狀態: 進行中的追蹤 {track_id: [first, last, samples, min, sum]}
+        self._active_tracks: Dict[int, list] = {}
+        self._finished: List[tuple] = []
+
+        # 統計
+        self.frames_written = 0
+        self.dropped_frames = 0
+        self.last_flush_ms = 0.0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._init_schema()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], base_dir: Path) -> "DetectionStore":
+        """
+        依配置建立儲存
+
+        Args:
+            config: sensor_config.json 的 storage 區塊
+            base_dir: 相對路徑的基準目錄
+        """
+        path = Path(config.get("path", "data/detections.db"))
+        if not path.is_absolute():
+            path = base_dir / path
+        return cls(
+            path=str(path),
+            batch_size=int(config.get("batch_size", 200)),
+            flush_interval=float(config.get("flush_interval", 2.0)),
+            max_disk_mb=float(config.get("max_disk_mb", 500)),
+            track_timeout=float(config.get("track_timeout", 5.0)),
+            max_queue=int(config.get("max_queue", 10000))
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        """開啟資料庫連線"""
+        connection = sqlite3.connect(str(self.path), timeout=10)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def _init_schema(self):
+        """建立資料表 (auto_vacuum 需在建表前設定,刪除資料後才能歸還磁碟空間)"""
+        connection = sqlite3.connect(str(self.path), timeout=10)
+        try:
+            connection.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(SCHEMA)
+            for table, _ in ROLLUPS:
+                connection.executescript(ROLLUP_SCHEMA.format(table=table))
+            connection.commit()
+        finally:
+            connection.close()
+
+    # ===== 寫入端 =====
+
+    def start(self):
+        """啟動背景寫入執行緒"""
+        if self._writer is not None and self._writer.is_alive():
+            return
+        self._stop.clear()
+        self._writer = threading.Thread(target=self._writer_loop, name="detection-store", daemon=True)
+        self._writer.start()
+        print(f"✅ 偵測資料儲存已啟動: {self.path}")
+
+    def close(self):
+        """停止寫入執行緒 (寫完佇列中剩餘資料)"""
+        if self._writer is None:
+            return
+        self._stop.set()
+        self._writer.join(timeout=10)
+        self._writer = None
+        print("⏹ 偵測資料儲存已停止")
+
+    def append(self, frame: DetectionFrame):
+        """
+        加入一幀 (FrameHub 監聽器,只做入列)
+
+        Args:
+            frame: 偵測幀
+        """
+        # 寫入執行緒未啟動或已結束時不入列 (否則佇列無人取用)
+        if self._writer is None or not self._writer.is_alive():
+            self.dropped_frames += 1
+            return
+
+        closest = float(frame.distances.min()) if frame.total_count else None
+        tracked = frame.track_ids >= 0
+        try:
+            self._queue.put_nowait((
+                frame.timestamp,
+                frame.total_count,
+                closest,
+                frame.track_ids[tracked].tolist(),
+                frame.distances[tracked].tolist()
+            ))
+        except queue.Full:
+            self.dropped_frames += 1
+
+    def _writer_loop(self):
+        """背景寫入迴圈"""
+        connection = self._connect()
+        batch: List[tuple] = []
+        last_flush = time.time()
+        last_retention = 0.0
+
+        try:
+            while True:
+                timeout = max(0.0, self.flush_interval - (time.time() - last_flush))
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    pass
+
+                stopping = self._stop.is_set()
+                if stopping:
+                    # 收完佇列剩餘資料
+                    while True:
+                        try:
+                            batch.append(self._queue.get_nowait())
+                        except queue.Empty:
+                            break
+
+                due = time.time() - last_flush >= self.flush_interval
+                if (batch and (len(batch) >= self.batch_size or due)) or stopping:
+                    try:
+                        self._flush(connection, batch, final=stopping)
+                    except sqlite3.Error as e:
+                        # 寫入失敗時捨棄此批,避免佇列無限累積
+                        print(f"❌ 偵測資料寫入錯誤: {e}")
+                        self.dropped_frames += len(batch)
+                    batch = []
+                    last_flush = time.time()
+
+                if time.time() - last_retention >= 60 or stopping:
+                    try:
+                        self._enforce_budget(connection)
+                    except sqlite3.Error as e:
+                        # 資料庫鎖定或磁碟已滿時下一輪再試,寫入執行緒不中斷
+                        print(f"❌ 偵測資料磁碟預算維護錯誤: {e}")
+                    last_retention = time.time()
+
+                if stopping:
+                    break
+        except Exception as e:
+            print(f"❌ 偵測資料寫入執行緒錯誤: {e}")
+        finally:
+            connection.close()
+
+    def _flush(self, connection: sqlite3.Connection, batch: List[tuple], final: bool = False):
+        """
+        寫入一批資料: 原始幀、彙總表增量、結束的追蹤摘要
+
+        Args:
+            connection: 資料庫連線
+            batch: [(ts, count, closest, track_ids, distances), ...]
+            final: 是否為關閉前最後一批 (所有進行中的追蹤一併寫入)
+        """
+        start = time.perf_counter()
+
+        # === 彙總增量 (依區間合併後才寫入,每區間只 UPSERT 一次) ===
+        rollups: Dict[str, Dict[int, list]] = {table: {} for table, _ in ROLLUPS}
+
+        def add_to_rollups(ts: float, count: int, closest: Optional[float], new_tracks: int):
+            for table, seconds in ROLLUPS:
+                bucket = int(ts // seconds) * seconds
+                agg = rollups[table].get(bucket)
+                if agg is None:
+                    agg = rollups[table][bucket] = [0, 0, 0, 0, None, 0.0, 0]
+                agg[0] += 1
+                agg[1] += count
+                agg[2] = max(agg[2], count)
+                if closest is not None:
+                    agg[3] += 1
+                    agg[4] = closest if agg[4] is None else min(agg[4], closest)
+                    agg[5] += closest
+                agg[6] += new_tracks
+
+        for ts, count, closest, track_ids, distances in batch:
+            new_tracks = 0
+            for track_id, distance in zip(track_ids, distances):
+                state = self._active_tracks.get(track_id)
+                if state is None or ts - state[1] > self.track_timeout:
+                    if state is not None:
+                        self._finished.append((track_id, *state))
+                    self._active_tracks[track_id] = [ts, ts, 1, distance, distance]
+                    new_tracks += 1
+                else:
+                    state[1] = ts
+                    state[2] += 1
+                    state[3] = min(state[3], distance)
+                    state[4] += distance
+            add_to_rollups(ts, count, closest, new_tracks)
+
+        # === 結束的追蹤 ===
+        now = batch[-1][0] if batch else time.time()
+        for track_id, state in list(self._active_tracks.items()):
+            if final or now - state[1] > self.track_timeout:
+                self._finished.append((track_id, *state))
+                del self._active_tracks[track_id]
+
+        with connection:
+            connection.executemany(
+                "INSERT INTO frames (ts, total_count, closest_distance) VALUES (?, ?, ?)",
+                [(ts, count, closest) for ts, count, closest, _, _ in batch]
+            )
+            for table, buckets in rollups.items():
+                connection.executemany(
+                    ROLLUP_UPSERT.format(table=table),
+                    [(bucket, *agg) for bucket, agg in buckets.items()]
+                )
+            if self._finished:
+                connection.executemany(
+                    "INSERT INTO tracks (track_id, first_seen, last_seen, samples, min_distance, avg_distance)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    [(tid, first, last, n, d_min, d_sum / n) for tid, first, last, n, d_min, d_sum in self._finished]
+                )
+                self._finished = []
+
+        self.frames_written += len(batch)
+        self.last_flush_ms = (time.perf_counter() - start) * 1000
+
+    def _disk_usage(self, connection: sqlite3.Connection) -> int:
+        """資料庫實際使用的位元組數 (不含可重用的空頁,含 -wal 檔)"""
+        page_size = connection.execute("PRAGMA page_size").fetchone()[0]
+        page_count = connection.execute("PRAGMA page_count").fetchone()[0]
+        free_pages = connection.execute("PRAGMA freelist_count").fetchone()[0]
+        try:
+            wal_size = os.path.getsize(f"{self.path}-wal")
+        except OSError:
+            wal_size = 0
+        return (page_count - free_pages) * page_size + wal_size
+
+    def _checkpoint(self, connection: sqlite3.Connection) -> bool:
+        """
+        將 WAL 寫回主檔並截斷
+
+        Returns:
+            是否完成 (有讀取端占用時為 False,WAL 未截斷)
+        """
+        busy = connection.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()[0]
+        return busy == 0
+
+    def _enforce_budget(self, connection: sqlite3.Connection):
+        """
+        維持磁碟預算: 依序刪除最舊的原始幀、追蹤摘要、分鐘彙總 (小時彙總最後保留)
+        """
+        targets = (
+            ("frames", "ts"),
+            ("tracks", "first_seen"),
+            ("rollup_1m", "bucket"),
+            ("rollup_1h", "bucket")
+        )
+
+        # 先截斷 WAL,刪除期間的 WAL 成長也在每批刪除後寫回,
+        # 無法截斷時停止刪除 (WAL 大小不會因刪除而減少,繼續刪會清光資料),下一輪再試
+        if not self._checkpoint(connection):
+            return
+
+        for table, column in targets:
+            while self._disk_usage(connection) > self.max_disk_bytes:
+                total = connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                if total == 0:
+                    break
+                # 每次刪除最舊的 10%
+                limit = max(1, total // 10)
+                with connection:
+                    connection.execute(
+                        f"DELETE FROM {table} WHERE rowid IN "
+                        f"(SELECT rowid FROM {table} ORDER BY {column} LIMIT ?)",
+                        (limit,)
+                    )
+                if not self._checkpoint(connection):
+                    return
+
+        # incremental_vacuum 需以 executescript 執行到底,才會釋放所有空頁
+        connection.executescript("PRAGMA incremental_vacuum;")
+        self._checkpoint(connection)
+
+    # ===== 查詢端 (可由任何執行緒 / 行程呼叫) =====
+
+    def query_frames(self, start: float, end: float, limit: int = 10000) -> Dict[str, list]:
+        """
+        查詢原始幀
+
+        Returns:
+            {"timestamp", "total_count", "closest_distance"}
+        """
+        connection = self._connect()
+        try:
+            rows = connection.execute(
+                "SELECT ts, total_count, closest_distance FROM frames"
+                " WHERE ts BETWEEN ? AND ? ORDER BY ts LIMIT ?",
+                (start, end, limit)
+            ).fetchall()
+        finally:
+            connection.close()
+
+        return {
+            "timestamp": [r[0] for r in rows],
+            "total_count": [r[1] for r in rows],
+            "closest_distance": [round(r[2], 1) if r[2] is not None else None for r in rows]
+        }
+
+    def query_rollups(self, resolution: str, start: float, end: float) -> Dict[str, list]:
+        """
+        查詢彙總資料
+
+        Args:
+            resolution: "1m" 或 "1h"
+            start: 起始時間戳記
+            end: 結束時間戳記
+
+        Returns:
+            {"timestamp", "frames", "count_avg", "count_max", "closest_min", "closest_avg", "new_tracks"}
+        """
+        table, seconds = _rollup_table(resolution)
+        connection = self._connect()
+        try:
+            rows = connection.execute(
+                f"SELECT bucket, frames, count_sum, count_max, occupied_frames,"
+                f" closest_min, closest_sum, new_tracks FROM {table}"
+                f" WHERE bucket BETWEEN ? AND ? ORDER BY bucket",
+                (int(start // seconds) * seconds, end)
+            ).fetchall()
+        finally:
+            connection.close()
+
+        return {
+            "timestamp": [r[0] for r in rows],
+            "frames": [r[1] for r in rows],
+            "count_avg": [round(r[2] / r[1], 2) if r[1] else 0 for r in rows],
+            "count_max": [r[3] for r in rows],
+            "closest_min": [round(r[5], 1) if r[5] is not None else None for r in rows],
+            "closest_avg": [round(r[6] / r[4], 1) if r[4] else None for r in rows],
+            "new_tracks": [r[7] for r in rows]
+        }
+
+    def summarize(self, resolution: str, start: float, end: float) -> Dict[str, Any]:
+        """
+        彙整區間統計 (只讀取彙總表)
+
+        Returns:
+            {"frames", "visitors", "count_avg", "count_max", "closest_min", "occupied_ratio"}
+        """
+        table, seconds = _rollup_table(resolution)
+        connection = self._connect()
+        try:
+            row = connection.execute(
+                f"SELECT SUM(frames), SUM(count_sum), MAX(count_max), SUM(occupied_frames),"
+                f" MIN(closest_min), SUM(new_tracks) FROM {table} WHERE bucket BETWEEN ? AND ?",
+                (int(start // seconds) * seconds, end)
+            ).fetchone()
+        finally:
+            connection.close()
+
+        frames, count_sum, count_max, occupied, closest_min, visitors = row
+        frames = frames or 0
+        return {
+            "frames": frames,
+            "visitors": visitors or 0,
+            "count_avg": round(count_sum / frames, 2) if frames else 0,
+            "count_max": count_max or 0,
+            "closest_min": round(closest_min, 1) if closest_min is not None else None,
+            "occupied_ratio": round(occupied / frames, 3) if frames else 0
+        }
+
+    def query_tracks(self, start: float, end: float, limit: int = 1000) -> List[Dict[str, Any]]:
+        """
+        查詢區間內開始的追蹤摘要
+
+        Returns:
+            [{"track_id", "first_seen", "last_seen", "dwell", "samples", "min_distance", "avg_distance"}, ...]
+        """
+        connection = self._connect()
+        try:
+            rows = connection.execute(
+                "SELECT track_id, first_seen, last_seen, samples, min_distance, avg_distance"
+                " FROM tracks WHERE first_seen BETWEEN ? AND ? ORDER BY first_seen LIMIT ?",
+                (start, end, limit)
+            ).fetchall()
+        finally:
+            connection.close()
+
+        return [
+            {
+                "track_id": r[0],
+                "first_seen": r[1],
+                "last_seen": r[2],
+                "dwell": round(r[2] - r[1], 2),
+                "samples": r[3],
+                "min_distance": round(r[4], 1),
+                "avg_distance": round(r[5], 1)
+            }
+            for r in rows
+        ]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """取得儲存統計"""
+        return {
+            "path": str(self.path),
+            "writer_running": self._writer is not None and self._writer.is_alive(),
+            "queued": self._queue.qsize(),
+            "max_queue": self._queue.maxsize,
+            "frames_written": self.frames_written,
+            "dropped_frames": self.dropped_frames,
+            "last_flush_ms": round(self.last_flush_ms, 2),
+            "active_tracks": len(self._active_tracks)
+        }
+
+
+def _rollup_table(resolution: str) -> Tuple[str, int]:
+    """彙總解析度對應的資料表與區間秒數"""
+    for table, seconds in ROLLUPS:
+        if table.endswith(resolution):
+            return table, seconds
+    raise ValueError(f"不支援的彙總解析度: {resolution}")
+
+
+def choose_resolution(start: float, end: float) -> str:
+    """
+    依查詢長度選擇資料來源: 15 分鐘內讀原始幀,2 天內讀分鐘彙總,更長讀小時彙總
+
+    Returns:
+        "raw"、"1m" 或 "1h"
+    """
+    span = end - start
+    if span <= 15 * 60:
+        return "raw"
+    if span <= 2 * 86400:
+        return "1m"
+    return "1h"
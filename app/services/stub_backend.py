@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+模擬推論後端 - 不需模型權重,輸出腳本或隨機產生的人員追蹤
+提供與 ultralytics YOLO.track() 相同形式的結果 (boxes.xyxy/conf/id、orig_shape),
+偵測器其餘流程 (距離計算、區域、廣播) 完全不變,可在建置機上做負載測試
+"""
+
+import time
+import numpy as np
+from typing import Dict, Any, List, Optional, Sequence
+
+from .results import ArrayBoxes, ArrayResults
+
+
+# 模擬模式
+RANDOM = "random"        # 隨機走動的人員,數量在 people 範圍內變動
+SCRIPTED = "scripted"    # 依 script 關鍵幀內插位置與距離
+
+# 站姿框的高寬比 (大於 standing_ratio,距離計算不套用姿態係數)
+BOX_ASPECT = 2.8
+
+
+class StubBackend:
+    """
+    模擬推論後端 (取代 YOLO 模型,介面與 YOLO.track() / predict() 相同)
+
+    random 模式: 每人有水平位置與距離,以隨機速度移動,離開畫面或距離範圍後消失,
+    人數在 people 範圍內隨機變動並補上新的追蹤 ID
+    scripted 模式: script 為 [{"track_id": 1, "keyframes": [[秒, 水平位置 0-1, 距離 cm], ...]}, ...],
+    依經過時間線性內插,超過最後關鍵幀後循環
+    """
+
+    def __init__(
+        self,
+        distance_config: Dict[str, Any],
+        mode: str = RANDOM,
+        people: Sequence[int] = (0, 4),
+        distance_range: Sequence[float] = (80, 600),
+        latency_ms: float = 20,
+        latency_jitter_ms: float = 5,
+        script: Optional[List[Dict[str, Any]]] = None,
+        seed: Optional[int] = None
+    ):
+        """
+        初始化模擬後端
+
+        Args:
+            distance_config: 距離參數 (依焦距與身高將距離換算為框高度)
+            mode: random / scripted
+            people: random 模式的人數範圍 [最少, 最多]
+            distance_range: random 模式的距離範圍 [最近, 最遠] (cm)
+            latency_ms: 模擬推論耗時 (毫秒)
+            latency_jitter_ms: 推論耗時的標準差 (毫秒)
+            script: scripted 模式的追蹤腳本
+            seed: 亂數種子 (相同種子產生相同的追蹤序列)
+        """
+        if mode not in (RANDOM, SCRIPTED):
+            raise ValueError(f"未知的模擬模式: {mode}")
+        if mode == SCRIPTED and not script:
+            raise ValueError("scripted 模式需要 script")
+        if not 0 <= people[0] <= people[1]:
+            raise ValueError(f"people 需為 [最少, 最多] 且不為負數: {list(people)}")
+        if not 0 < distance_range[0] < distance_range[1]:
+            raise ValueError(f"distance_range 需為 [最近, 最遠] 且大於 0: {list(distance_range)}")
+
+        self.mode = mode
+        self.min_people, self.max_people = int(people[0]), int(people[1])
+        self.near, self.far = float(distance_range[0]), float(distance_range[1])
+        self.latency = latency_ms / 1000
+        self.jitter = latency_jitter_ms / 1000
+        self.rng = np.random.default_rng(seed)
+
+        # 距離 -> 框高度: height = real_person_height × focal_length / distance
+        self.height_scale = distance_config["real_person_height"] * distance_config["focal_length"]
+
+        self.script = [
+            (int(track["track_id"]), np.asarray(track["keyframes"], dtype=np.float64))
+            for track in (script or [])
+        ]
+        self.script_period = max((keys[-1, 0] for _, keys in self.script), default=0.0)
+
+        # random 模式狀態 (每人一列: 水平位置 0-1、距離、水平速度、距離速度)
+        self.track_ids = np.empty(0, dtype=np.int64)
+        self.states = np.empty((0, 4), dtype=np.float64)
+        self.next_id = 1
+        self.target_people = int(self.rng.integers(self.min_people, self.max_people + 1))
+        self.started: Optional[float] = None
+        self.last_time: Optional[float] = None
+        self.calls = 0
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], distance_config: Dict[str, Any]) -> "StubBackend":
+        """
+        依配置建立模擬後端
+
+        Args:
+            config: sensor_config.json 的 model.stub 區塊
+            distance_config: distance 區塊
+        """
+        return cls(
+            distance_config,
+            mode=config.get("mode", RANDOM),
+            people=config.get("people", [0, 4]),
+            distance_range=config.get("distance_range", [80, 600]),
+            latency_ms=config.get("latency_ms", 20),
+            latency_jitter_ms=config.get("latency_jitter_ms", 5),
+            script=config.get("script"),
+            seed=config.get("seed")
+        )
+
+    def track(self, source: np.ndarray, conf: float = 0.5, **kwargs) -> List[ArrayResults]:
+        """
+        模擬一次追蹤推論 (其餘參數與 YOLO.track() 相同但不使用)
+
+        Args:
+            source: 輸入影像 (只使用尺寸)
+            conf: 信心度門檻 (模擬的信心度不低於此值)
+
+        Returns:
+            [Results]
+        """
+        return self._infer(source, conf, with_ids=True)
+
+    def predict(self, source: np.ndarray, conf: float = 0.5, **kwargs) -> List[ArrayResults]:
+        """
+        模擬一次不含追蹤的推論 (與 YOLO.predict() 相同,boxes.id 為 None,供內建追蹤器使用)
+
+        Args:
+            source: 輸入影像 (只使用尺寸)
+            conf: 信心度門檻
+
+        Returns:
+            [Results]
+        """
+        return self._infer(source, conf, with_ids=False)
+
+    def _infer(self, source: np.ndarray, conf: float, with_ids: bool) -> List[ArrayResults]:
+        """推進模擬狀態並產生一幀結果"""
+        start = time.perf_counter()
+        now = time.monotonic()
+        if self.started is None:
+            self.started = now
+            self.last_time = now
+        dt, self.last_time = now - self.last_time, now
+        self.calls += 1
+
+        if self.mode == SCRIPTED:
+            track_ids, positions, distances = self._scripted(now - self.started)
+        else:
+            track_ids, positions, distances = self._random(dt)
+
+        height, width = source.shape[:2]
+        xyxy = self._boxes(positions, distances, width, height)
+        visible = (xyxy[:, 2] > xyxy[:, 0]) & (xyxy[:, 3] > xyxy[:, 1])
+        xyxy, track_ids = xyxy[visible], track_ids[visible]
+        confidences = self.rng.uniform(max(conf, 0.5), 0.95, len(xyxy)).astype(np.float32)
+
+        # 模擬推論耗時 (扣除已花費的計算時間)
+        delay = self.latency + (self.rng.normal(0, self.jitter) if self.jitter > 0 else 0)
+        remaining = delay - (time.perf_counter() - start)
+        if remaining > 0:
+            time.sleep(remaining)
+
+        ids = track_ids.astype(np.float32) if with_ids else None
+        return [ArrayResults(ArrayBoxes(xyxy, confidences, ids), (height, width))]
+
+    def _random(self, dt: float):
+        """隨機模式: 移動、移除離場人員、補上新人員"""
+        if len(self.states):
+            self.states[:, 0] += self.states[:, 2] * dt
+            self.states[:, 1] += self.states[:, 3] * dt
+            inside = (
+                (self.states[:, 0] > -0.05) & (self.states[:, 0] < 1.05)
+                & (self.states[:, 1] >= self.near) & (self.states[:, 1] <= self.far)
+            )
+            self.track_ids = self.track_ids[inside]
+            self.states = self.states[inside]
+
+        # 偶爾改變目標人數
+        if self.rng.random() < min(1.0, dt * 0.2):
+            self.target_people = int(self.rng.integers(self.min_people, self.max_people + 1))
+
+        missing = self.target_people - len(self.states)
+        if missing > 0:
+            spawned = np.column_stack([
+                self.rng.uniform(0.1, 0.9, missing),
+                self.rng.uniform(self.near, self.far, missing),
+                self.rng.uniform(-0.08, 0.08, missing),    # 每秒移動畫面寬度的比例
+                self.rng.uniform(-60, 60, missing)         # 接近/遠離速度 (cm/s)
+            ])
+            self.states = np.vstack([self.states, spawned])
+            self.track_ids = np.concatenate([self.track_ids, np.arange(self.next_id, self.next_id + missing)])
+            self.next_id += missing
+
+        return self.track_ids, self.states[:, 0], self.states[:, 1]
+
+    def _scripted(self, elapsed: float):
+        """腳本模式: 依經過時間內插每個追蹤的位置與距離 (不在關鍵幀時間範圍內的追蹤不出現)"""
+        t = elapsed % self.script_period if self.script_period > 0 else 0.0
+        track_ids, positions, distances = [], [], []
+        for track_id, keys in self.script:
+            if not keys[0, 0] <= t <= keys[-1, 0]:
+                continue
+            track_ids.append(track_id)
+            positions.append(np.interp(t, keys[:, 0], keys[:, 1]))
+            distances.append(np.interp(t, keys[:, 0], keys[:, 2]))
+        return (
+            np.asarray(track_ids, dtype=np.int64),
+            np.asarray(positions, dtype=np.float64),
+            np.asarray(distances, dtype=np.float64)
+        )
+
+    def _boxes(self, positions: np.ndarray, distances: np.ndarray, width: int, height: int) -> np.ndarray:
+        """
+        由水平位置與距離產生站姿邊界框 (框置於畫面垂直中央)
+
+        只裁切水平方向 (走出畫面左右邊緣);垂直方向不裁切,
+        近距離時框會超出畫面上下緣,框高度與高寬比維持不變,算出的距離與模擬的距離一致
+        (真實模型的框會被畫面裁切,近距離的誤差需以實機量測)
+        """
+        box_heights = self.height_scale / np.maximum(distances, 1.0)
+        box_widths = box_heights / BOX_ASPECT
+        centers = positions * width
+        xyxy = np.column_stack([
+            centers - box_widths / 2,
+            height / 2 - box_heights / 2,
+            centers + box_widths / 2,
+            height / 2 + box_heights / 2
+        ])
+        np.clip(xyxy[:, 0::2], 0, width, out=xyxy[:, 0::2])
+        return xyxy.astype(np.float32)
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+串流訂閱 - 欄位投影與偵測過濾條件
+"""
+
+import numpy as np
+from dataclasses import dataclass
+from typing import Dict, Any, Optional, FrozenSet
+
+
+# 可訂閱的 payload 欄位
+PAYLOAD_FIELDS = frozenset({
+    "detections", "total_count", "closest_distance",
+    "fps", "actual_fps", "timestamp", "seq", "zones"
+})
+
+# /ws/live 預設欄位 (前端展覽作品用)
+LIVE_FIELDS = frozenset({"closest_distance", "total_count", "timestamp"})
+
+
+@dataclass(frozen=True)
+class Subscription:
+    """
+    訂閱內容 (不可變,可作為字典鍵值)
+    相同訂閱內容的連線共用同一份每幀 payload
+
+    過濾條件會同時影響 detections、total_count 與 closest_distance,
+    例如 max_distance=150 時 total_count 為 150cm 內的人數
+    """
+    fields: FrozenSet[str] = PAYLOAD_FIELDS
+    min_distance: Optional[float] = None
+    max_distance: Optional[float] = None
+    min_confidence: Optional[float] = None
+    track_ids: Optional[FrozenSet[int]] = None
+
+    @classmethod
+    def live(cls) -> "Subscription":
+        """簡化版訂閱 (只含距離與人數)"""
+        return cls(fields=LIVE_FIELDS)
+
+    @classmethod
+    def from_message(cls, message: Dict[str, Any]) -> "Subscription":
+        """
+        從客戶端訊息建立訂閱
+
+        訊息格式:
+        {
+            "type": "subscribe",
+            "fields": ["closest_distance", ...],   (可選,預設全部)
+            "distance_range": [min, max],           (可選,任一端可為 null)
+            "min_confidence": float,                (可選)
+            "track_ids": [int, ...]                 (可選)
+        }
+
+        Args:
+            message: 客戶端訊息字典
+
+        Returns:
+            Subscription 實例
+
+        Raises:
+            ValueError: 訊息格式錯誤
+        """
+        fields = message.get("fields")
+        if fields is None:
+            fields = PAYLOAD_FIELDS
+        else:
+            if not isinstance(fields, list):
+                raise ValueError("fields 必須為陣列")
+            unknown = set(fields) - PAYLOAD_FIELDS
+            if unknown:
+                raise ValueError(f"未知欄位: {', '.join(sorted(unknown))}")
+            fields = frozenset(fields)
+
+        min_distance = max_distance = None
+        distance_range = message.get("distance_range")
+        if distance_range is not None:
+            if not isinstance(distance_range, list) or len(distance_range) != 2:
+                raise ValueError("distance_range 必須為 [min, max]")
+            min_distance = _optional_float(distance_range[0], "distance_range")
+            max_distance = _optional_float(distance_range[1], "distance_range")
+
+        min_confidence = _optional_float(message.get("min_confidence"), "min_confidence")
+
+        track_ids = message.get("track_ids")
+        if track_ids is not None:
+            if not isinstance(track_ids, list):
+                raise ValueError("track_ids 必須為陣列")
+            try:
+                track_ids = frozenset(int(t) for t in track_ids)
+            except (TypeError, ValueError):
+                raise ValueError("track_ids 必須為整數陣列")
+
+        return cls(
+            fields=fields,
+            min_distance=min_distance,
+            max_distance=max_distance,
+            min_confidence=min_confidence,
+            track_ids=track_ids
+        )
+
+    @property
+    def has_filter(self) -> bool:
+        """是否設定任何過濾條件"""
+        return (
+            self.min_distance is not None
+            or self.max_distance is not None
+            or self.min_confidence is not None
+            or self.track_ids is not None
+        )
+
+    def select(self, frame) -> Optional[np.ndarray]:
+        """
+        依過濾條件選取偵測框 (向量化)
+
+        Args:
+            frame: DetectionFrame 實例
+
+        Returns:
+            符合條件的索引陣列,無過濾條件時返回 None
+        """
+        if not self.has_filter:
+            return None
+
+        mask = np.ones(len(frame.distances), dtype=bool)
+        if self.min_distance is not None:
+            mask &= frame.distances >= self.min_distance
+        if self.max_distance is not None:
+            mask &= frame.distances <= self.max_distance
+        if self.min_confidence is not None:
+            mask &= frame.confidences >= self.min_confidence
+        if self.track_ids is not None:
+            mask &= np.isin(frame.track_ids, list(self.track_ids))
+        return np.flatnonzero(mask)
+
+    def build_payload(self, frame) -> Dict[str, Any]:
+        """
+        組裝投影後的 payload (只計算已訂閱的欄位)
+
+        Args:
+            frame: DetectionFrame 實例
+
+        Returns:
+            payload 字典
+        """
+        fields = self.fields
+        indices = self.select(frame)
+        payload: Dict[str, Any] = {}
+
+        if "detections" in fields:
+            payload["detections"] = frame.build_detections(indices)
+
+        if "total_count" in fields:
+            payload["total_count"] = frame.total_count if indices is None else len(indices)
+
+        if "closest_distance" in fields:
+            if indices is None:
+                payload["closest_distance"] = frame.closest_distance
+            elif len(indices) > 0:
+                payload["closest_distance"] = round(float(frame.distances[indices].min()), 1)
+            else:
+                payload["closest_distance"] = 0.0
+
+        if "zones" in fields and frame.zone_names:
+            payload["zones"] = frame.build_zones(indices)
+
+        if "fps" in fields:
+            payload["fps"] = frame.fps
+        if "actual_fps" in fields:
+            payload["actual_fps"] = frame.actual_fps
+        if "timestamp" in fields:
+            payload["timestamp"] = frame.timestamp
+        if "seq" in fields:
+            payload["seq"] = frame.seq
+
+        # 跳幀內插的預測幀一律標記 (不受欄位投影影響)
+        if frame.interpolated:
+            payload["interpolated"] = True
+
+        return payload
+
+    def to_dict(self) -> Dict[str, Any]:
+        """轉為可序列化字典 (用於訂閱確認訊息)"""
+        return {
+            "fields": sorted(self.fields),
+            "distance_range": [self.min_distance, self.max_distance],
+            "min_confidence": self.min_confidence,
+            "track_ids": sorted(self.track_ids) if self.track_ids is not None else None
+        }
+
+
+# 預設完整訂閱 (/ws/detection 與 REST 快照)
+FULL_SUBSCRIPTION = Subscription()
+
+
+def _optional_float(value: Any, name: str) -> Optional[float]:
+    """將可選數值轉為 float"""
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} 必須為數值")
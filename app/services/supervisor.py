@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+偵測管線監督 - 實作 sensor_config.json 的 runtime 區塊
+(擷取停滯偵測、指數退避重連、錯誤預算用盡時重啟管線、定時回收,並記錄復原時間)
+"""
+
+import time
+from collections import deque
+from typing import Dict, Any, Optional
+
+
+# 錯誤處理動作
+RETRY = "retry"          # 稍候重試 (一般例外)
+RECONNECT = "reconnect"  # 重新開啟影像來源
+RESTART = "restart"      # 重啟整條管線 (模型、追蹤器、攝影機)
+STOP = "stop"            # 停止偵測 (auto_reconnect 關閉且錯誤預算用盡)
+
+
+class ExponentialBackoff:
+    """指數退避延遲 (每次加倍直到上限,成功後重置)"""
+
+    def __init__(self, initial: float, maximum: float):
+        """
+        Args:
+            initial: 第一次延遲 (秒)
+            maximum: 延遲上限 (秒)
+        """
+        self.initial = initial
+        self.maximum = maximum
+        self._next = initial
+
+    def next(self) -> float:
+        """取得本次延遲並加倍下一次"""
+        delay = self._next
+        self._next = min(self._next * 2, self.maximum)
+        return delay
+
+    def reset(self):
+        """重置為初始延遲"""
+        self._next = self.initial
+
+
+class PipelineSupervisor:
+    """
+    偵測管線監督器
+    偵測迴圈回報每次成功產生的幀與每次錯誤,由監督器決定處理動作:
+    - 讀取失敗或停滯: auto_reconnect 開啟時以指數退避重新開啟來源
+    - 其他例外: 短暫退避後重試
+    - 連續錯誤達 max_consecutive_errors: 重啟整條管線 (auto_reconnect 關閉時停止)
+    從第一次錯誤到下一幀成功產生的時間記為一次復原時間
+    """
+
+    def __init__(
+        self,
+        auto_reconnect: bool = True,
+        max_consecutive_errors: int = 50,
+        max_runtime_hours: float = 8,
+        health_check_interval: float = 300,
+        stall_timeout: float = 5.0,
+        reconnect_max_delay: float = 30.0,
+        history_size: int = 20
+    ):
+        """
+        初始化監督器
+
+        Args:
+            auto_reconnect: 讀取失敗時是否自動重新開啟來源
+            max_consecutive_errors: 錯誤預算,連續錯誤達此數時重啟管線
+            max_runtime_hours: 管線定時回收間隔 (小時),0 表示不回收
+            health_check_interval: 健康檢查間隔 (秒),期間沒有任何新幀時重啟管線
+            stall_timeout: 單次讀取影像的期限 (秒),逾時視為擷取停滯
+            reconnect_max_delay: 重連退避延遲上限 (秒)
+            history_size: 保留的近期事件數
+        """
+        self.auto_reconnect = auto_reconnect
+        self.max_consecutive_errors = max_consecutive_errors
+        self.max_runtime_hours = max_runtime_hours
+        self.health_check_interval = health_check_interval
+        self.stall_timeout = stall_timeout
+
+        self.reconnect_backoff = ExponentialBackoff(0.5, reconnect_max_delay)
+        self.retry_backoff = ExponentialBackoff(0.1, 2.0)
+
+        # 狀態
+        self.pipeline_started = time.time()
+        self.last_frame_at: Optional[float] = None
+        self.consecutive_errors = 0
+        self.incident_started: Optional[float] = None
+        self.incident_kind: Optional[str] = None
+        self.failed = False
+
+        # 統計
+        self.total_errors = 0
+        self.stalls = 0
+        self.reconnects = 0
+        self.restarts = 0
+        self.recycles = 0
+        self.last_error: Optional[str] = None
+        self.recovery_times = deque(maxlen=history_size)
+        self.incidents = deque(maxlen=history_size)
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "PipelineSupervisor":
+        """
+        依配置建立監督器
+
+        Args:
+            config: sensor_config.json 的 runtime 區塊
+        """
+        supervisor = cls()
+        supervisor.update_config(config)
+        return supervisor
+
+    def update_config(self, config: Dict[str, Any]):
+        """
+        套用新的 runtime 設定 (熱重載用,保留統計與目前事件)
+
+        Args:
+            config: sensor_config.json 的 runtime 區塊
+        """
+        self.auto_reconnect = bool(config.get("auto_reconnect", True))
+        self.max_consecutive_errors = int(config.get("max_consecutive_errors", 50))
+        self.max_runtime_hours = float(config.get("max_runtime_hours", 8))
+        self.health_check_interval = float(config.get("health_check_interval", 300))
+        self.stall_timeout = float(config.get("stall_timeout", 5.0))
+        self.reconnect_backoff.maximum = float(config.get("reconnect_max_delay", 30.0))
+
+    # === 偵測迴圈回報 ===
+
+    def frame_ok(self, now: float):
+        """
+        回報成功產生一幀 (清除連續錯誤,結束進行中的事件並記錄復原時間)
+
+        Args:
+            now: 目前時間
+        """
+        self.last_frame_at = now
+        if self.consecutive_errors == 0 and self.incident_started is None:
+            return
+
+        self.consecutive_errors = 0
+        self.reconnect_backoff.reset()
+        self.retry_backoff.reset()
+        self.failed = False
+
+        if self.incident_started is not None:
+            duration = now - self.incident_started
+            self.recovery_times.append(duration)
+            self.incidents.append({
+                "kind": self.incident_kind,
+                "started": self.incident_started,
+                "recovery_s": round(duration, 3),
+                "error": self.last_error
+            })
+            print(f"✅ 偵測已恢復 ({self.incident_kind},歷時 {duration:.1f} 秒)")
+            self.incident_started = None
+            self.incident_kind = None
+
+    def record_error(self, kind: str, message: str, now: Optional[float] = None) -> str:
+        """
+        回報一次錯誤並決定處理動作
+
+        Args:
+            kind: 錯誤類型 ("read" 讀取失敗、"stall" 讀取逾時、"error" 其他例外)
+            message: 錯誤訊息
+            now: 目前時間 (預設為現在)
+
+        Returns:
+            處理動作 (RETRY / RECONNECT / RESTART / STOP)
+        """
+        now = time.time() if now is None else now
+        self.consecutive_errors += 1
+        self.total_errors += 1
+        self.last_error = f"{kind}: {message}"
+        if kind == "stall":
+            self.stalls += 1
+        if self.incident_started is None:
+            self.incident_started = now
+            self.incident_kind = kind
+
+        if self.consecutive_errors >= self.max_consecutive_errors:
+            if not self.auto_reconnect:
+                self.failed = True
+                return STOP
+            self.consecutive_errors = 0
+            return RESTART
+
+        if kind in ("read", "stall") and self.auto_reconnect:
+            return RECONNECT
+        return RETRY
+
+    def next_delay(self, action: str) -> float:
+        """
+        取得處理動作前的等待時間
+
+        Args:
+            action: record_error 回傳的動作
+
+        Returns:
+            延遲秒數 (重連以較長的指數退避,重試以較短的退避)
+        """
+        if action == RECONNECT:
+            return self.reconnect_backoff.next()
+        if action == RETRY:
+            return self.retry_backoff.next()
+        return 0.0
+
+    def record_reconnect(self):
+        """記錄一次重新開啟來源"""
+        self.reconnects += 1
+
+    def record_restart(self, reason: str, now: Optional[float] = None):
+        """
+        記錄一次管線重啟 (定時回收不視為事件,其餘重啟延續進行中的事件)
+
+        Args:
+            reason: 重啟原因 ("errors" 錯誤預算用盡、"health" 健康檢查、"recycle" 定時回收)
+            now: 目前時間 (預設為現在)
+        """
+        now = time.time() if now is None else now
+        self.pipeline_started = now
+        if reason == "recycle":
+            self.recycles += 1
+            return
+        self.restarts += 1
+        if self.incident_started is None:
+            self.incident_started = now
+            self.incident_kind = reason
+
+    # === 定期檢查 ===
+
+    def recycle_due(self, now: float) -> bool:
+        """管線是否已達定時回收時間"""
+        if self.max_runtime_hours <= 0:
+            return False
+        return now - self.pipeline_started >= self.max_runtime_hours * 3600
+
+    def is_stalled(self, now: float) -> bool:
+        """健康檢查: 管線啟動後超過 health_check_interval 沒有產生任何幀"""
+        last = self.last_frame_at if self.last_frame_at is not None else self.pipeline_started
+        return now - max(last, self.pipeline_started) > self.health_check_interval
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        取得監督統計
+
+        Returns:
+            狀態、錯誤與復原次數、復原時間 (秒)
+        """
+        if self.failed:
+            state = "failed"
+        elif self.incident_started is not None:
+            state = "recovering"
+        else:
+            state = "ok"
+
+        recoveries = list(self.recovery_times)
+        return {
+            "state": state,
+            "consecutive_errors": self.consecutive_errors,
+            "total_errors": self.total_errors,
+            "stalls": self.stalls,
+            "reconnects": self.reconnects,
+            "restarts": self.restarts,
+            "recycles": self.recycles,
+            "last_error": self.last_error,
+            "pipeline_uptime": round(time.time() - self.pipeline_started, 1),
+            "last_recovery_s": round(recoveries[-1], 3) if recoveries else None,
+            "mean_recovery_s": round(sum(recoveries) / len(recoveries), 3) if recoveries else None,
+            "max_recovery_s": round(max(recoveries), 3) if recoveries else None,
+            "recent_incidents": list(self.incidents)
+        }
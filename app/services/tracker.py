@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+內建 IoU 追蹤器 - ByteTrack 式的兩階段關聯,直接使用偵測輸出 (YOLO.predict) 的邊界框陣列
+不需要外觀特徵與 ultralytics 的追蹤器,每幀只做一次 IoU 矩陣與指派
+"""
+
+import numpy as np
+from typing import Dict, Any, List, Tuple
+
+from .results import ArrayBoxes, ArrayResults
+
+
+# model.tracker 設為此值時使用內建追蹤器 (其餘值為 ultralytics 追蹤器設定檔)
+BUILTIN_TRACKER = "builtin"
+
+# 指派方式
+HUNGARIAN = "hungarian"   # 全域最佳指派 (scipy.optimize.linear_sum_assignment,未安裝時改用 greedy)
+GREEDY = "greedy"         # 依 IoU 由高到低依序配對
+
+# 速度的指數平滑係數 (新量測的權重)
+VELOCITY_SMOOTHING = 0.5
+
+
+def iou_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    計算兩組邊界框的 IoU 矩陣
+
+    Args:
+        a: 邊界框 (N, 4) [x1, y1, x2, y2]
+        b: 邊界框 (M, 4) [x1, y1, x2, y2]
+
+    Returns:
+        IoU 矩陣 (N, M)
+    """
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((len(a), len(b)), dtype=np.float64)
+    top_left = np.maximum(a[:, np.newaxis, :2], b[np.newaxis, :, :2])
+    bottom_right = np.minimum(a[:, np.newaxis, 2:], b[np.newaxis, :, 2:])
+    inter = np.prod(np.clip(bottom_right - top_left, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:] - b[:, :2], axis=1)
+    union = area_a[:, np.newaxis] + area_b[np.newaxis, :] - inter
+    return inter / np.maximum(union, 1e-9)
+
+
+def assign(iou: np.ndarray, threshold: float, method: str = HUNGARIAN) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    依 IoU 矩陣指派配對 (IoU 低於門檻的配對捨棄)
+
+    Args:
+        iou: IoU 矩陣 (N, M)
+        threshold: 最低 IoU
+        method: hungarian / greedy
+
+    Returns:
+        (列索引, 欄索引),一一對應的配對
+    """
+    empty = np.zeros(0, dtype=np.int64)
+    if iou.size == 0 or iou.max() < threshold:
+        return empty, empty
+
+    if method == HUNGARIAN:
+        try:
+            from scipy.optimize import linear_sum_assignment
+        except ImportError:
+            method = GREEDY
+        else:
+            rows, cols = linear_sum_assignment(-iou)
+            keep = iou[rows, cols] >= threshold
+            return rows[keep].astype(np.int64), cols[keep].astype(np.int64)
+
+    # greedy: 候選配對依 IoU 由高到低,列與欄都尚未使用時採用
+    candidates = np.argwhere(iou >= threshold)
+    order = np.argsort(-iou[candidates[:, 0], candidates[:, 1]], kind="stable")
+    used_rows, used_cols = set(), set()
+    rows, cols = [], []
+    for row, col in candidates[order]:
+        if row in used_rows or col in used_cols:
+            continue
+        used_rows.add(row)
+        used_cols.add(col)
+        rows.append(row)
+        cols.append(col)
+    return np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64)
+
+
+class IoUTracker:
+    """
+    IoU 追蹤器 (ByteTrack 式兩階段關聯)
+
+    1. 以等速度模型預測每個追蹤的邊界框 (速度為每幀位移,跳過的幀數越多預測越遠)
+    2. 高信心度偵測 (>= model.conf) 與所有追蹤依 IoU 配對
+    3. 剩餘追蹤再與低信心度偵測 (low_conf 至 model.conf 之間) 配對,遮擋時的弱偵測仍可延續 ID
+    4. 未配對的高信心度偵測建立新追蹤;連續 max_age 幀未配對的追蹤移除
+
+    低信心度偵測只用於延續既有追蹤,未配對時不輸出 (與 ultralytics 追蹤器的輸出一致)
+    所有追蹤的狀態存成陣列,每幀的預測、IoU 與更新都是一次陣列運算
+    """
+
+    def __init__(self, match_iou: float = 0.3, low_conf: float = 0.1, max_age: int = 30, assignment: str = HUNGARIAN):
+        """
+        初始化追蹤器
+
+        Args:
+            match_iou: 配對所需的最低 IoU
+            low_conf: 第二階段關聯使用的最低信心度
+            max_age: 追蹤連續未配對多少幀後移除
+            assignment: 指派方式 (hungarian / greedy)
+        """
+        self.match_iou = float(match_iou)
+        self.low_conf = float(low_conf)
+        self.max_age = int(max_age)
+        self.assignment = assignment
+
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.boxes = np.zeros((0, 4), dtype=np.float64)      # 最後一次配對的邊界框
+        self.velocity = np.zeros((0, 4), dtype=np.float64)   # 每幀位移
+        self.misses = np.zeros(0, dtype=np.int64)            # 連續未配對幀數
+        self.next_id = 1
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "IoUTracker":
+        """
+        依配置建立追蹤器
+
+        Args:
+            config: sensor_config.json 的 model.builtin_tracker 區塊
+        """
+        tracker = cls()
+        tracker.update_config(config)
+        return tracker
+
+    def update_config(self, config: Dict[str, Any]):
+        """更新參數 (保留追蹤狀態)"""
+        self.match_iou = float(config.get("match_iou", 0.3))
+        self.low_conf = float(config.get("low_conf", 0.1))
+        self.max_age = int(config.get("max_age", 30))
+        self.assignment = config.get("assignment", HUNGARIAN)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def reset(self):
+        """清除所有追蹤 (ID 繼續遞增,不與先前的 ID 重複)"""
+        self.ids = self.ids[:0]
+        self.boxes = self.boxes[:0]
+        self.velocity = self.velocity[:0]
+        self.misses = self.misses[:0]
+
+    def update(self, xyxy: np.ndarray, confidences: np.ndarray, high_conf: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        以一幀偵測更新追蹤
+
+        Args:
+            xyxy: 偵測邊界框 (N, 4)
+            confidences: 信心度 (N,)
+            high_conf: 高信心度門檻 (建立新追蹤所需,通常為 model.conf)
+
+        Returns:
+            (輸出的偵測索引 (K,) 依原順序, 對應的追蹤 ID (K,))
+        """
+        boxes = np.asarray(xyxy, dtype=np.float64).reshape(-1, 4)
+        conf = np.asarray(confidences, dtype=np.float64)
+        track_ids = np.full(len(boxes), -1, dtype=np.int64)
+
+        # === 預測 (等速度,距離上次配對經過 misses + 1 幀) ===
+        predicted = self.boxes + self.velocity * (self.misses + 1)[:, np.newaxis]
+
+        high = np.flatnonzero(conf >= high_conf)
+        low = np.flatnonzero((conf >= self.low_conf) & (conf < high_conf))
+
+        # === 第一階段: 高信心度偵測 ===
+        rows, cols = assign(iou_matrix(predicted, boxes[high]), self.match_iou, self.assignment)
+        matched_tracks = [rows]
+        matched_dets = [high[cols]]
+
+        # === 第二階段: 剩餘追蹤與低信心度偵測 ===
+        remaining = np.setdiff1d(np.arange(len(self.ids)), rows, assume_unique=True)
+        if len(remaining) and len(low):
+            rows2, cols2 = assign(iou_matrix(predicted[remaining], boxes[low]), self.match_iou, self.assignment)
+            matched_tracks.append(remaining[rows2])
+            matched_dets.append(low[cols2])
+
+        tracks = np.concatenate(matched_tracks)
+        dets = np.concatenate(matched_dets)
+
+        # === 更新配對的追蹤 ===
+        if len(tracks):
+            steps = (self.misses[tracks] + 1)[:, np.newaxis]
+            measured = (boxes[dets] - self.boxes[tracks]) / steps
+            self.velocity[tracks] = VELOCITY_SMOOTHING * measured + (1 - VELOCITY_SMOOTHING) * self.velocity[tracks]
+            self.boxes[tracks] = boxes[dets]
+            track_ids[dets] = self.ids[tracks]
+
+        # === 未配對的追蹤老化,超過 max_age 移除 ===
+        unmatched = np.ones(len(self.ids), dtype=bool)
+        unmatched[tracks] = False
+        self.misses[unmatched] += 1
+        self.misses[tracks] = 0
+        alive = self.misses <= self.max_age
+        if not alive.all():
+            self.ids = self.ids[alive]
+            self.boxes = self.boxes[alive]
+            self.velocity = self.velocity[alive]
+            self.misses = self.misses[alive]
+
+        # === 未配對的高信心度偵測建立新追蹤 ===
+        new = high[track_ids[high] < 0]
+        if len(new):
+            new_ids = np.arange(self.next_id, self.next_id + len(new), dtype=np.int64)
+            self.next_id += len(new)
+            self.ids = np.concatenate([self.ids, new_ids])
+            self.boxes = np.vstack([self.boxes, boxes[new]])
+            self.velocity = np.vstack([self.velocity, np.zeros((len(new), 4))])
+            self.misses = np.concatenate([self.misses, np.zeros(len(new), dtype=np.int64)])
+            track_ids[new] = new_ids
+
+        keep = np.flatnonzero(track_ids >= 0)
+        return keep, track_ids[keep]
+
+    def track(self, results, high_conf: float) -> List[ArrayResults]:
+        """
+        為 YOLO.predict() 的結果加上追蹤 ID (輸出與 YOLO.track() 相同形式)
+
+        Args:
+            results: YOLO.predict() 的 Results 列表
+            high_conf: 高信心度門檻 (model.conf)
+
+        Returns:
+            [Results],只含有追蹤 ID 的偵測
+        """
+        boxes = results[0].boxes
+        if boxes is None or len(boxes) == 0:
+            xyxy = np.zeros((0, 4), dtype=np.float32)
+            confidences = np.zeros(0, dtype=np.float32)
+        else:
+            xyxy = boxes.xyxy.cpu().numpy().astype(np.float32)
+            confidences = boxes.conf.cpu().numpy().astype(np.float32)
+
+        keep, track_ids = self.update(xyxy, confidences, high_conf)
+        tracked = ArrayBoxes(xyxy[keep], confidences[keep], track_ids.astype(np.float32))
+        return [ArrayResults(tracked, results[0].orig_shape)]
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+地面區域 - 將多邊形預先編譯為標籤點陣,以陣列索引一次判斷所有人所在的區域
+"""
+
+import numpy as np
+from typing import Dict, Any, List, Optional, Tuple
+
+
+# 點陣以 uint32 位元遮罩表示,每個區域佔一個位元 (區域可重疊)
+MAX_ZONES = 32
+
+
+class ZoneMap:
+    """
+    區域標籤點陣
+    多邊形以參考解析度 (預設為攝影機解析度) 的像素座標定義,
+    第一次遇到某個影像尺寸時以 cv2.fillPoly 編譯成同尺寸的位元遮罩點陣;
+    之後每幀只需以所有人的腳底座標做一次陣列索引
+    """
+
+    def __init__(self, zones: List[Dict[str, Any]], reference_size: Tuple[int, int]):
+        """
+        初始化區域點陣
+
+        Args:
+            zones: 區域列表 [{"name": str, "polygon": [[x, y], ...]}, ...]
+            reference_size: 多邊形座標的參考解析度 (寬, 高)
+
+        Raises:
+            ValueError: 區域格式錯誤、名稱重複或數量超過上限
+        """
+        if len(zones) > MAX_ZONES:
+            raise ValueError(f"區域數量不可超過 {MAX_ZONES}")
+
+        self.names: Tuple[str, ...] = tuple(str(z.get("name", "")) for z in zones)
+        if any(not name for name in self.names) or len(set(self.names)) != len(self.names):
+            raise ValueError("區域必須有不重複的 name")
+
+        self.polygons: List[np.ndarray] = []
+        for zone in zones:
+            polygon = np.asarray(zone.get("polygon", []), dtype=np.float64)
+            if polygon.ndim != 2 or polygon.shape[0] < 3 or polygon.shape[1] != 2:
+                raise ValueError(f"區域 {zone.get('name')} 的 polygon 需至少 3 個 [x, y] 頂點")
+            self.polygons.append(polygon)
+
+        self.reference_size = (int(reference_size[0]), int(reference_size[1]))
+        self._raster: Optional[np.ndarray] = None
+        self._raster_shape: Optional[Tuple[int, int]] = None
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], camera_config: Dict[str, Any]) -> "ZoneMap":
+        """
+        依配置建立區域點陣
+
+        Args:
+            config: sensor_config.json 的 zones 區塊
+            camera_config: sensor_config.json 的 camera 區塊 (預設參考解析度)
+        """
+        reference_size = config.get("reference_size") or (
+            camera_config.get("width", 640), camera_config.get("height", 480)
+        )
+        return cls(config.get("areas", []), reference_size)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def compile(self, height: int, width: int) -> np.ndarray:
+        """
+        將多邊形編譯為指定尺寸的位元遮罩點陣
+
+        Args:
+            height: 影像高度
+            width: 影像寬度
+
+        Returns:
+            uint32 點陣 (height, width),第 i 個位元表示屬於第 i 個區域
+        """
+        scale = np.array([
+            width / self.reference_size[0],
+            height / self.reference_size[1]
+        ])
+        import cv2  # 延遲載入,只在有設定區域時才需要
+
+        raster = np.zeros((height, width), dtype=np.uint32)
+        layer = np.zeros((height, width), dtype=np.uint8)
+
+        for bit, polygon in enumerate(self.polygons):
+            layer.fill(0)
+            points = np.round(polygon * scale).astype(np.int32)
+            cv2.fillPoly(layer, [points], 1)
+            raster |= layer.astype(np.uint32) << np.uint32(bit)
+
+        self._raster = raster
+        self._raster_shape = (height, width)
+        return raster
+
+    def lookup(self, boxes: np.ndarray, shape: Tuple[int, int]) -> np.ndarray:
+        """
+        以腳底座標 (邊界框底邊中點) 查詢每個人所在的區域
+
+        Args:
+            boxes: 邊界框陣列 (N, 4) [x1, y1, x2, y2]
+            shape: 影像尺寸 (高, 寬)
+
+        Returns:
+            uint32 位元遮罩陣列 (N,)
+        """
+        height, width = int(shape[0]), int(shape[1])
+        if self._raster_shape != (height, width):
+            self.compile(height, width)
+
+        if len(boxes) == 0:
+            return np.zeros(0, dtype=np.uint32)
+
+        xs = np.clip(((boxes[:, 0] + boxes[:, 2]) * 0.5).astype(np.int64), 0, width - 1)
+        ys = np.clip(boxes[:, 3].astype(np.int64), 0, height - 1)
+        return self._raster[ys, xs]
+
+
+def summarize_zones(names: Tuple[str, ...], masks: np.ndarray, distances: np.ndarray) -> Dict[str, Dict[str, Any]]:
+    """
+    計算各區域人數與最近距離 (向量化)
+
+    Args:
+        names: 區域名稱 (依位元順序)
+        masks: uint32 位元遮罩陣列 (N,)
+        distances: 距離陣列 (N,)
+
+    Returns:
+        {區域名稱: {"count": int, "closest_distance": float}},無人時最近距離為 0
+    """
+    if not names:
+        return {}
+
+    bits = np.arange(len(names), dtype=np.uint32)
+    member = ((masks[:, None] >> bits) & 1).astype(bool)
+    counts = member.sum(axis=0)
+    closest = np.where(member, distances[:, None], np.inf).min(axis=0, initial=np.inf)
+
+    return {
+        name: {
+            "count": int(counts[i]),
+            "closest_distance": round(float(closest[i]), 1) if counts[i] else 0.0
+        }
+        for i, name in enumerate(names)
+    }
+
+
+def zone_names_of(names: Tuple[str, ...], mask: int) -> List[str]:
+    """
+    將單一位元遮罩轉為區域名稱列表
+
+    Args:
+        names: 區域名稱 (依位元順序)
+        mask: 位元遮罩
+
+    Returns:
+        區域名稱列表
+    """
+    return [name for i, name in enumerate(names) if mask >> i & 1]
@@ -6,8 +6,10 @@
 
 import json
 import os
+import shutil
+import tempfile
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 
 # 配置檔案路徑
@@ -19,7 +21,7 @@ NETWORK_CONFIG_PATH = BASE_DIR / "configs" / "network_config.json"
 def load_sensor_config() -> Dict[str, Any]:
     """
     載入感測器配置 (sensor_config.json)
-    此檔案由 GUI 工具調整,FastAPI 只讀取不修改
+    此檔案由 GUI 工具調整,FastAPI 只讀取不修改 (偵測器以 SensorConfig 驗證後使用)
     """
     try:
         with open(SENSOR_CONFIG_PATH, 'r', encoding='utf-8') as f:
@@ -31,6 +33,35 @@ def load_sensor_config() -> Dict[str, Any]:
         raise ValueError(f"配置檔案格式錯誤: {e}")
 
 
+def update_sensor_config(section: str, values: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    更新感測器配置的單一區塊 (校準結果寫回用),其餘內容保持不變
+    先寫入暫存檔再取代,避免 GUI 或偵測器讀到寫到一半的檔案
+
+    Args:
+        section: 區塊名稱 (例如 "distance")
+        values: 要更新的欄位
+
+    Returns:
+        更新後的完整配置
+    """
+    config = load_sensor_config()
+    config.setdefault(section, {}).update(values)
+
+    fd, tmp_path = tempfile.mkstemp(dir=SENSOR_CONFIG_PATH.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(config, f, indent=2, ensure_ascii=False)
+        # mkstemp 建立的檔案只有擁有者可讀寫,沿用原檔權限 (常駐程式、GUI 可能以其他帳號讀取)
+        shutil.copymode(SENSOR_CONFIG_PATH, tmp_path)
+        os.replace(tmp_path, SENSOR_CONFIG_PATH)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return config
+
+
 def load_network_config() -> Dict[str, Any]:
     """
     載入網路配置 (network_config.json)
@@ -56,6 +87,27 @@ def load_network_config() -> Dict[str, Any]:
         raise ValueError(f"網路配置檔案格式錯誤: {e}")
 
 
+def get_daemon_config() -> Dict[str, Any]:
+    """
+    取得偵測常駐程式設定 (network_config.json 的 daemon 區塊,缺少時使用預設值)
+    
+    環境變數 DETECTOR_DAEMON=1 可強制 API 以訂閱端模式運行
+    """
+    defaults = {
+        "enabled": False,
+        "socket_path": str(Path(tempfile.gettempdir()) / "calcdistance-detector.sock"),
+        "host": "127.0.0.1",
+        "port": 8765,
+        "idle_linger": 10
+    }
+    config = {**defaults, **load_network_config().get("daemon", {})}
+    
+    env_flag = os.environ.get("DETECTOR_DAEMON")
+    if env_flag is not None:
+        config["enabled"] = env_flag.lower() in ("1", "true", "yes")
+    return config
+
+
 def save_network_config(config: Dict[str, Any]) -> bool:
     """
     儲存網路配置
@@ -72,10 +124,15 @@ def save_network_config(config: Dict[str, Any]) -> bool:
         return False
 
 
-def get_model_path() -> Path:
-    """取得 YOLO 模型路徑"""
-    sensor_config = load_sensor_config()
-    model_filename = sensor_config["model"]["model_path"]
+def get_model_path(model_filename: Optional[str] = None) -> Path:
+    """
+    取得 YOLO 模型路徑
+    
+    Args:
+        model_filename: 模型檔名 (偵測器傳入已載入的配置;未指定時才讀取 sensor_config.json)
+    """
+    if model_filename is None:
+        model_filename = load_sensor_config()["model"]["model_path"]
     
     # 優先在專案根目錄尋找
     model_path = BASE_DIR / model_filename
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+配置檔監看 - 定期檢查檔案修改時間,變更時呼叫回呼 (不需額外套件)
+"""
+
+import asyncio
+import os
+from pathlib import Path
+from typing import Awaitable, Callable, Optional, Tuple
+
+
+class ConfigWatcher:
+    """
+    配置檔監看器
+    以 stat 輪詢修改時間與大小;偵測到變更後等待檔案穩定 (連續兩次相同) 才觸發,
+    避免讀到 GUI 工具寫到一半的內容
+    """
+
+    def __init__(self, path: Path, on_change: Callable[[], Awaitable], interval: float = 1.0):
+        """
+        初始化監看器
+
+        Args:
+            path: 監看的檔案
+            on_change: 檔案變更時呼叫的非同步函式
+            interval: 檢查間隔 (秒)
+        """
+        self.path = Path(path)
+        self.on_change = on_change
+        self.interval = interval
+        self._signature = self._stat()
+        self._task: Optional[asyncio.Task] = None
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        """檔案簽章 (修改時間, 大小),檔案不存在時為 None"""
+        try:
+            stat = os.stat(self.path)
+            return (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return None
+
+    def start(self):
+        """開始監看"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            print(f"👀 監看配置檔: {self.path.name}")
+
+    async def stop(self):
+        """停止監看"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        """監看迴圈"""
+        pending = None
+        while True:
+            await asyncio.sleep(self.interval)
+            signature = self._stat()
+            if signature is None or signature == self._signature:
+                pending = None
+                continue
+
+            # 等到連續兩次檢查簽章相同 (寫入完成) 才觸發
+            if signature != pending:
+                pending = signature
+                continue
+
+            self._signature = signature
+            pending = None
+            try:
+                await self.on_change()
+            except Exception as e:
+                print(f"⚠ 配置變更未套用 ({self.path.name}): {e}")
@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+CPU 資源配置 - 設定 torch/OpenMP/OpenCV 的執行緒數,擷取與推論各用一個專用執行緒,
+並將擷取、推論與 API (事件迴圈與預設執行緒池) 綁定到指定核心,
+避免 4 核心的展示機上各自的執行緒池互相搶核心造成延遲抖動
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable, List, Optional, Sequence
+
+
+# 階段名稱
+CAPTURE = "capture"       # 讀取影像
+INFERENCE = "inference"   # 模型載入、預熱與推論
+API = "api"               # 事件迴圈 (uvicorn、WebSocket) 與 run_in_executor(None, ...) 的預設執行緒池
+
+# 有專用執行緒的階段
+STAGES = (CAPTURE, INFERENCE)
+
+# OpenMP 與 BLAS 函式庫讀取的執行緒數環境變數 (需在匯入 torch 前設定)
+OMP_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")
+
+# 每階段保留最近幾次呼叫的耗時 (計算 p50/p95)
+RECENT_CALLS = 300
+
+
+def get_affinity() -> Optional[List[int]]:
+    """呼叫端執行緒目前可使用的核心 (只支援 Linux,其餘平台回傳 None)"""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return None
+
+
+def pin_current_thread(cores: Sequence[int]) -> bool:
+    """
+    將呼叫端執行緒綁定到指定核心 (之後由此執行緒建立的執行緒繼承相同設定)
+
+    Args:
+        cores: 核心編號
+
+    Returns:
+        是否已綁定 (平台不支援時為 False)
+
+    Raises:
+        OSError: 核心編號無效
+    """
+    if hasattr(os, "sched_setaffinity"):
+        # Linux 的 pid 0 代表呼叫端執行緒 (不是整個程序)
+        os.sched_setaffinity(0, set(cores))
+        return True
+    if sys.platform == "win32":
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        kernel32.SetThreadAffinityMask.argtypes = [ctypes.c_void_p, ctypes.c_size_t]
+        kernel32.SetThreadAffinityMask.restype = ctypes.c_size_t
+        mask = sum(1 << core for core in set(cores))
+        if kernel32.SetThreadAffinityMask(kernel32.GetCurrentThread(), mask) == 0:
+            raise OSError(f"SetThreadAffinityMask 失敗 (核心 {sorted(cores)})")
+        return True
+    return False
+
+
+def affinity_supported() -> bool:
+    """目前平台是否支援綁定核心"""
+    return hasattr(os, "sched_setaffinity") or sys.platform == "win32"
+
+
+def thread_cpu_seconds(thread_id: int) -> Optional[float]:
+    """指定 Python 執行緒的累計 CPU 時間 (需要 pthread_getcpuclockid,Windows 回傳 None)"""
+    if not hasattr(time, "pthread_getcpuclockid"):
+        return None
+    try:
+        return time.clock_gettime(time.pthread_getcpuclockid(thread_id))
+    except OSError:
+        return None
+
+
+class CpuResources:
+    """
+    執行緒數、專用執行緒池與核心綁定
+
+    - OpenMP/BLAS 執行緒數以環境變數設定,需在匯入 torch 前呼叫 apply_environment()
+    - torch 與 OpenCV 的執行緒數在模組載入後由 apply_library_threads() 套用 (只套用一次)
+    - 擷取與推論各有一個單一執行緒的執行緒池,建立時綁定核心;
+      torch 的平行執行緒由推論執行緒建立,會繼承推論核心
+    - 未指定核心的階段使用程序啟動時的全部核心 (不繼承事件迴圈的綁定)
+
+    每階段的 CPU 時間以執行緒 CPU 時間 (time.thread_time) 量測,只含呼叫端執行緒;
+    torch 平行執行緒等未歸屬的時間列在 other (程序總 CPU 時間減去各階段)
+    """
+
+    def __init__(
+        self,
+        torch_threads: Optional[int] = None,
+        torch_interop_threads: Optional[int] = None,
+        omp_threads: Optional[int] = None,
+        opencv_threads: Optional[int] = None,
+        capture_cores: Sequence[int] = (),
+        inference_cores: Sequence[int] = (),
+        api_cores: Sequence[int] = (),
+        api_executor_workers: Optional[int] = None
+    ):
+        """
+        初始化 CPU 資源配置
+
+        Args:
+            torch_threads: torch 運算內平行執行緒數 (None 為函式庫預設)
+            torch_interop_threads: torch 運算間平行執行緒數 (None 為函式庫預設)
+            omp_threads: OpenMP/MKL/OpenBLAS 執行緒數 (None 為不設定環境變數)
+            opencv_threads: OpenCV 執行緒數 (None 為函式庫預設,0 為停用平行化)
+            capture_cores: 擷取執行緒綁定的核心 (空為不綁定)
+            inference_cores: 推論執行緒綁定的核心
+            api_cores: 事件迴圈與預設執行緒池綁定的核心
+            api_executor_workers: 預設執行緒池的執行緒數 (None 為 Python 預設)
+        """
+        self.torch_threads = torch_threads
+        self.torch_interop_threads = torch_interop_threads
+        self.omp_threads = omp_threads
+        self.opencv_threads = opencv_threads
+        self.cores: Dict[str, List[int]] = {
+            CAPTURE: sorted(set(capture_cores)),
+            INFERENCE: sorted(set(inference_cores)),
+            API: sorted(set(api_cores))
+        }
+        self.api_executor_workers = api_executor_workers
+
+        # 程序啟動時可用的核心 (未指定核心的階段還原為此設定)
+        self.initial_affinity = get_affinity()
+
+        self._executors: Dict[str, ThreadPoolExecutor] = {}
+        self._lock = threading.Lock()
+        self._api_thread: Optional[int] = None
+        self._library_applied = set()
+
+        # 各階段實際的核心 (由該執行緒啟動時記錄) 與統計
+        self.affinity: Dict[str, Optional[List[int]]] = {}
+        self.stage_totals = {stage: {"calls": 0, "cpu_seconds": 0.0, "wall_seconds": 0.0} for stage in STAGES}
+        self.recent = {stage: deque(maxlen=RECENT_CALLS) for stage in STAGES}
+        self.abandoned = {stage: 0 for stage in STAGES}
+        self.errors: List[str] = []
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "CpuResources":
+        """
+        依配置建立
+
+        Args:
+            config: sensor_config.json 的 cpu 區塊
+        """
+        return cls(
+            torch_threads=config.get("torch_threads"),
+            torch_interop_threads=config.get("torch_interop_threads"),
+            omp_threads=config.get("omp_threads"),
+            opencv_threads=config.get("opencv_threads"),
+            capture_cores=config.get("capture_cores", []),
+            inference_cores=config.get("inference_cores", []),
+            api_cores=config.get("api_cores", []),
+            api_executor_workers=config.get("api_executor_workers")
+        )
+
+    # === 執行緒數 ===
+
+    def apply_environment(self):
+        """設定 OpenMP/BLAS 執行緒數環境變數 (需在匯入 torch 前呼叫,之後的變更不會生效)"""
+        if self.omp_threads is None:
+            return
+        for name in OMP_ENV_VARS:
+            os.environ[name] = str(self.omp_threads)
+
+    def apply_library_threads(self):
+        """
+        套用 torch 與 OpenCV 的執行緒數 (只處理已匯入的模組,每個模組只套用一次)
+        模型載入與攝影機開啟後呼叫;torch 的運算間執行緒數只能在第一次平行運算前設定
+        """
+        torch = sys.modules.get("torch")
+        if torch is not None and "torch" not in self._library_applied:
+            self._library_applied.add("torch")
+            try:
+                if self.torch_threads is not None:
+                    torch.set_num_threads(self.torch_threads)
+                if self.torch_interop_threads is not None:
+                    torch.set_num_interop_threads(self.torch_interop_threads)
+            except RuntimeError as e:
+                self._record_error(f"torch 執行緒數設定失敗: {e}")
+
+        cv2 = sys.modules.get("cv2")
+        if cv2 is not None and "cv2" not in self._library_applied:
+            self._library_applied.add("cv2")
+            if self.opencv_threads is not None:
+                cv2.setNumThreads(self.opencv_threads)
+
+    # === 核心綁定與執行緒池 ===
+
+    def _pin(self, stage: str):
+        """將呼叫端執行緒綁定到階段的核心 (未指定時還原為程序啟動時的核心) 並記錄實際結果"""
+        cores = self.cores[stage] or self.initial_affinity
+        if cores:
+            try:
+                pin_current_thread(cores)
+            except OSError as e:
+                self._record_error(f"{stage} 核心綁定失敗 ({cores}): {e}")
+        self.affinity[stage] = get_affinity() if hasattr(os, "sched_getaffinity") else (self.cores[stage] or None)
+
+    def configure_event_loop(self, loop: asyncio.AbstractEventLoop):
+        """
+        綁定事件迴圈執行緒 (API) 的核心並設定預設執行緒池 (於事件迴圈中、匯入 torch 前呼叫)
+
+        Args:
+            loop: 事件迴圈
+        """
+        self._api_thread = threading.get_ident()
+        if self.cores[API]:
+            self._pin(API)
+        else:
+            self.affinity[API] = get_affinity()
+        if self.cores[API] or self.api_executor_workers is not None:
+            loop.set_default_executor(ThreadPoolExecutor(
+                max_workers=self.api_executor_workers,
+                thread_name_prefix="cpu-api",
+                initializer=self._pin,
+                initargs=(API,)
+            ))
+
+        pinned = ", ".join(f"{stage} {cores}" for stage, cores in self.cores.items() if cores)
+        if pinned:
+            print(f"🧵 CPU 核心綁定: {pinned}")
+
+    def executor(self, stage: str) -> ThreadPoolExecutor:
+        """
+        取得階段的專用執行緒池 (單一執行緒,第一次使用時建立並綁定核心)
+
+        Args:
+            stage: capture / inference
+        """
+        with self._lock:
+            executor = self._executors.get(stage)
+            if executor is None:
+                executor = ThreadPoolExecutor(
+                    max_workers=1,
+                    thread_name_prefix=f"cpu-{stage}",
+                    initializer=self._pin,
+                    initargs=(stage,)
+                )
+                self._executors[stage] = executor
+            return executor
+
+    async def run(self, stage: str, func: Callable, *args) -> Any:
+        """
+        在階段的專用執行緒執行同步函式並累計 CPU 時間
+
+        Args:
+            stage: capture / inference
+            func: 同步函式
+            *args: 函式參數
+
+        Returns:
+            函式回傳值
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor(stage), self._timed, stage, func, *args)
+
+    def _timed(self, stage: str, func: Callable, *args) -> Any:
+        """執行並記錄執行緒 CPU 時間與經過時間 (在階段執行緒內執行)"""
+        cpu_start = time.thread_time()
+        wall_start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            cpu = time.thread_time() - cpu_start
+            wall = time.perf_counter() - wall_start
+            totals = self.stage_totals[stage]
+            totals["calls"] += 1
+            totals["cpu_seconds"] += cpu
+            totals["wall_seconds"] += wall
+            self.recent[stage].append((cpu, wall))
+
+    def abandon(self, stage: str):
+        """
+        捨棄階段目前的執行緒池,下次使用時重新建立
+        讀取停滯時舊的 read() 仍占用唯一的執行緒,不捨棄的話重連後的讀取會排在它後面
+
+        Args:
+            stage: capture / inference
+        """
+        with self._lock:
+            executor = self._executors.pop(stage, None)
+        if executor is not None:
+            executor.shutdown(wait=False)
+            self.abandoned[stage] += 1
+
+    def shutdown(self):
+        """關閉所有專用執行緒池 (不等待執行中的工作)"""
+        with self._lock:
+            executors, self._executors = list(self._executors.values()), {}
+        for executor in executors:
+            executor.shutdown(wait=False)
+
+    def _record_error(self, message: str):
+        """記錄並輸出設定失敗 (保留最近 10 筆)"""
+        print(f"⚠ {message}")
+        self.errors = (self.errors + [message])[-10:]
+
+    # === 統計 ===
+
+    def _effective_threads(self) -> Dict[str, Any]:
+        """函式庫實際使用的執行緒數 (模組尚未匯入時為 None)"""
+        torch = sys.modules.get("torch")
+        cv2 = sys.modules.get("cv2")
+        return {
+            "torch_threads": torch.get_num_threads() if torch is not None else None,
+            "torch_interop_threads": torch.get_num_interop_threads() if torch is not None else None,
+            "opencv_threads": cv2.getNumThreads() if cv2 is not None else None,
+            "omp_env": {name: os.environ.get(name) for name in OMP_ENV_VARS},
+            "cpu_count": os.cpu_count()
+        }
+
+    def _stage_stats(self, stage: str) -> Dict[str, Any]:
+        """單一階段的累計與最近呼叫耗時 (ms)"""
+        totals = self.stage_totals[stage]
+        stats = {
+            "calls": totals["calls"],
+            "cpu_seconds": round(totals["cpu_seconds"], 3),
+            "wall_seconds": round(totals["wall_seconds"], 3),
+            "abandoned_threads": self.abandoned[stage]
+        }
+        recent = list(self.recent[stage])
+        if recent:
+            cpu_ms = sorted(cpu * 1000 for cpu, _ in recent)
+            wall_ms = sorted(wall * 1000 for _, wall in recent)
+            stats.update({
+                "cpu_ms_p50": round(cpu_ms[len(cpu_ms) // 2], 2),
+                "cpu_ms_p95": round(cpu_ms[min(len(cpu_ms) - 1, int(len(cpu_ms) * 0.95))], 2),
+                "wall_ms_p50": round(wall_ms[len(wall_ms) // 2], 2),
+                "wall_ms_p95": round(wall_ms[min(len(wall_ms) - 1, int(len(wall_ms) * 0.95))], 2)
+            })
+        return stats
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        取得設定值、實際生效值與各階段 CPU 時間
+
+        Returns:
+            {"settings", "effective", "affinity", "stages", "errors"}
+        """
+        stages = {stage: self._stage_stats(stage) for stage in STAGES}
+        api_cpu = thread_cpu_seconds(self._api_thread) if self._api_thread is not None else None
+        stages[API] = {"cpu_seconds": round(api_cpu, 3) if api_cpu is not None else None}
+
+        # 未歸屬的 CPU 時間: torch 平行執行緒、預設執行緒池、背景寫入等
+        attributed = sum(totals["cpu_seconds"] for totals in self.stage_totals.values()) + (api_cpu or 0.0)
+        stages["other"] = {"cpu_seconds": round(max(time.process_time() - attributed, 0.0), 3)}
+
+        return {
+            "settings": {
+                "torch_threads": self.torch_threads,
+                "torch_interop_threads": self.torch_interop_threads,
+                "omp_threads": self.omp_threads,
+                "opencv_threads": self.opencv_threads,
+                "api_executor_workers": self.api_executor_workers,
+                "cores": dict(self.cores)
+            },
+            "effective": self._effective_threads(),
+            "affinity": {
+                "supported": affinity_supported(),
+                "process": self.initial_affinity,
+                **{stage: self.affinity.get(stage) for stage in (CAPTURE, INFERENCE, API)}
+            },
+            "stages": stages,
+            "errors": list(self.errors)
+        }
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+程序資源統計 (CPU 時間、記憶體、執行緒數),供負載測試比較不同版本的伺服器成本
+"""
+
+import os
+import threading
+import time
+from typing import Dict, Any, Optional
+
+
+def _read_rss_mb() -> Optional[float]:
+    """目前常駐記憶體 (MB),只支援提供 /proc 的系統 (Linux),其餘平台回傳 None"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+def get_process_stats() -> Dict[str, Any]:
+    """
+    取得目前程序的資源使用量
+    cpu_seconds 為累計 CPU 時間 (所有執行緒),兩次取樣的差除以經過時間即為 CPU 使用率
+
+    Returns:
+        {"pid", "cpu_seconds", "rss_mb", "threads"}
+    """
+    rss_mb = _read_rss_mb()
+    return {
+        "pid": os.getpid(),
+        "cpu_seconds": round(time.process_time(), 3),
+        "rss_mb": round(rss_mb, 1) if rss_mb is not None else None,
+        "threads": threading.active_count()
+    }
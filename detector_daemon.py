@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+YOLO11 偵測常駐程式
+獨立負責攝影機擷取與模型推論,透過本機 socket 發佈偵測幀;
+API 以訂閱端模式 (network_config.json 的 daemon.enabled) 運行時可開多個 worker
+"""
+
+import os
+import asyncio
+
+from app.services.detector import YOLODetectorService
+from app.services.daemon import DetectorDaemon
+from app.services.history import DetectionHistory
+from app.services.analytics import OccupancyAnalytics
+from app.services.alerts import AlertEngine, WebhookSender
+from app.services.storage import DetectionStore
+from app.services.recording import EventRecorder
+from app.models.sensor_config import SensorConfig
+from app.utils.config_loader import get_daemon_config, load_network_config, load_sensor_config, BASE_DIR, SENSOR_CONFIG_PATH
+from app.utils.config_watcher import ConfigWatcher
+from app.utils.cpu_resources import CpuResources
+
+
+# 解決 OpenMP 函式庫衝突問題
+os.environ['KMP_DUPLICATE_LIB_OK'] = 'TRUE'
+
+
+async def run():
+    """啟動常駐程式直到中斷"""
+    print("🚀 正在啟動 YOLO11 偵測常駐程式...")
+
+    # CPU 資源 (執行緒數環境變數需在背景預熱匯入 torch 前設定;事件迴圈綁定 API 核心)
+    sensor_config = SensorConfig.from_dict(load_sensor_config()).to_dict()
+    resources = CpuResources.from_config(sensor_config["cpu"])
+    resources.apply_environment()
+    resources.configure_event_loop(asyncio.get_running_loop())
+
+    detector = YOLODetectorService(resources)
+    daemon = DetectorDaemon(detector, get_daemon_config())
+    detector.start_warmup()  # 背景載入並預熱模型,第一個訂閱端不必等待
+
+    # 近期歷史與人流分析只在常駐程式維護一份,API worker 以 query 指令查詢
+    detection_history = DetectionHistory.from_config(sensor_config["history"])
+    daemon.manager.hub.add_listener(detection_history.append)
+    daemon.add_query("history", detection_history.series)
+    occupancy_analytics = OccupancyAnalytics.from_config(sensor_config["analytics"])
+    daemon.manager.hub.add_listener(occupancy_analytics.update)
+    daemon.add_query("analytics", occupancy_analytics.get_summary)
+    daemon.add_query("analytics_tracks", occupancy_analytics.get_tracks)
+    daemon.add_stats_provider("analytics", occupancy_analytics.get_summary)
+
+    # 近距離警報只在常駐程式評估,Webhook 只送一次;事件經訂閱連線轉送給 API worker 的 /ws/alerts
+    webhook = None
+    alert_config = sensor_config["alerts"]
+    alert_engine = AlertEngine.from_config(alert_config)
+    alert_engine.add_callback(daemon.publish_alert)
+    if alert_config.get("webhook_url"):
+        webhook = WebhookSender(alert_config["webhook_url"])
+        alert_engine.add_callback(webhook.send)
+        daemon.add_stats_provider("alert_webhook", webhook.get_stats)
+    daemon.manager.hub.add_listener(alert_engine.update)
+    daemon.add_query("alerts", alert_engine.get_state)
+    daemon.add_stats_provider("alerts", alert_engine.get_stats)
+
+    # 長期時序儲存由常駐程式單一寫入 (API worker 只讀取)
+    store = None
+    storage_config = sensor_config["storage"]
+    if storage_config.get("enabled", False):
+        store = DetectionStore.from_config(storage_config, BASE_DIR)
+        store.start()
+        daemon.manager.hub.add_listener(store.append)
+
+    # 事件錄影 (影像只在常駐程式端,由常駐程式錄影)
+    recorder = None
+    always_on_task = None
+    recording_config = sensor_config["recording"]
+    if recording_config.get("enabled", False):
+        recorder = EventRecorder.from_config(recording_config, BASE_DIR)
+        recorder.start()
+        detector.image_consumers += 1
+        daemon.manager.hub.add_listener(recorder.update)
+        if recording_config.get("always_on", False):
+            # 偵測器無法啟動時以指數退避重試
+            always_on_task = daemon.manager.hold()
+
+    # 監看 sensor_config.json,變更時熱套用
+    watcher = None
+    server_config = load_network_config().get("server", {})
+    if server_config.get("watch_config", True):
+        watcher = ConfigWatcher(SENSOR_CONFIG_PATH, detector.reload_config, server_config.get("watch_interval", 1.0))
+        watcher.start()
+
+    try:
+        await daemon.serve_forever()
+    finally:
+        print("🛑 正在關閉偵測常駐程式...")
+        if watcher:
+            await watcher.stop()
+        if always_on_task:
+            always_on_task.cancel()
+        await daemon.close()
+        if webhook:
+            webhook.close()
+        if recorder:
+            recorder.close()
+        if store:
+            store.close()
+        resources.shutdown()
+        print("👋 偵測常駐程式已關閉")
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
@@ -5,14 +5,34 @@ YOLO11 距離偵測 FastAPI 主應用
 """
 
 import os
+import time
+import asyncio
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse
 from contextlib import asynccontextmanager
 
+# 應用模組匯入耗時 (ultralytics/torch/cv2 延遲到背景預熱時才載入)
+_import_start = time.perf_counter()
+
 from app.services.detector import YOLODetectorService
+from app.services.remote_detector import RemoteDetectorService
 from app.services.connection_manager import ConnectionManager
-from app.api import websocket, frontend
+from app.services.history import DetectionHistory
+from app.services.storage import DetectionStore
+from app.services.analytics import OccupancyAnalytics
+from app.services.alerts import AlertEngine, AlertChannel, WebhookSender
+from app.services.calibration import CalibrationRecorder
+from app.services.preview import PreviewRenderer
+from app.services.recording import EventRecorder
+from app.api import websocket, frontend, history, statistics, analytics, alerts, calibration, preview, recordings
+from app.models.sensor_config import SensorConfig
+from app.utils.config_loader import get_daemon_config, load_network_config, load_sensor_config, BASE_DIR, SENSOR_CONFIG_PATH
+from app.utils.config_watcher import ConfigWatcher
+from app.utils.process_stats import get_process_stats
+from app.utils.cpu_resources import CpuResources
+
+APP_IMPORT_MS = round((time.perf_counter() - _import_start) * 1000, 1)
 
 
 # 解決 OpenMP 函式庫衝突問題
@@ -22,6 +42,13 @@ os.environ['KMP_DUPLICATE_LIB_OK'] = 'TRUE'
 # 全域服務實例
 detector_service: YOLODetectorService = None
 connection_manager: ConnectionManager = None
+detection_store: DetectionStore = None
+alert_channel: AlertChannel = None
+alert_webhook: WebhookSender = None
+event_recorder: EventRecorder = None
+config_watcher: ConfigWatcher = None
+cpu_resources: CpuResources = None
+always_on_task: asyncio.Task = None
 
 
 @asynccontextmanager
@@ -30,20 +57,132 @@ async def lifespan(app: FastAPI):
     應用生命週期管理
     啟動時初始化服務,關閉時清理資源
     """
-    global detector_service, connection_manager
+    global detector_service, connection_manager, detection_store, alert_channel, alert_webhook, config_watcher, event_recorder, cpu_resources, always_on_task
     
     # === 啟動時 ===
     print("🚀 正在啟動 YOLO11 距離偵測服務...")
+    # 先驗證整份配置 (格式錯誤時啟動即失敗,不會在建立各服務時才發現)
+    sensor_config = SensorConfig.from_dict(load_sensor_config()).to_dict()
     
-    # 初始化服務
-    detector_service = YOLODetectorService()
+    # CPU 資源 (執行緒數環境變數需在背景預熱匯入 torch 前設定;事件迴圈綁定 API 核心)
+    cpu_resources = CpuResources.from_config(sensor_config.get("cpu", {}))
+    cpu_resources.apply_environment()
+    cpu_resources.configure_event_loop(asyncio.get_running_loop())
+    
+    # 初始化服務 (daemon 模式下只訂閱常駐程式,不開啟攝影機與模型)
+    daemon_config = get_daemon_config()
+    if daemon_config["enabled"]:
+        detector_service = RemoteDetectorService(daemon_config)
+        print("📡 訂閱端模式: 偵測幀來自 detector_daemon.py")
+    else:
+        detector_service = YOLODetectorService(cpu_resources)
+        # 背景載入並預熱模型,伺服器不等待即開始監聽 (就緒狀態見 /ready)
+        detector_service.start_warmup()
     connection_manager = ConnectionManager(detector_service)
+    remote_detector = detector_service if daemon_config["enabled"] else None
+    
+    # 近期歷史環形緩衝 (每幀由 FrameHub 寫入) 與即時人流分析 (在場人數、停留時間、距離區間);
+    # daemon 模式由常駐程式維護單一份,各 worker 向其查詢 (worker 只在有消費者時才收到幀)
+    detection_history = None
+    occupancy_analytics = None
+    if not daemon_config["enabled"]:
+        detection_history = DetectionHistory.from_config(sensor_config.get("history", {}))
+        connection_manager.hub.add_listener(detection_history.append)
+        occupancy_analytics = OccupancyAnalytics.from_config(sensor_config.get("analytics", {}))
+        connection_manager.hub.add_listener(occupancy_analytics.update)
+    
+    # 近距離警報 (事件推送至 /ws/alerts 與選用的 Webhook);
+    # daemon 模式由常駐程式評估並送出 Webhook,事件經訂閱連線轉送,避免每個 worker 各送一次
+    alert_config = sensor_config.get("alerts", {})
+    alert_engine = None
+    alert_channel = AlertChannel()
+    if daemon_config["enabled"]:
+        detector_service.add_alert_callback(alert_channel.publish)
+    else:
+        alert_engine = AlertEngine.from_config(alert_config)
+        alert_engine.add_callback(alert_channel.publish)
+        if alert_config.get("webhook_url"):
+            alert_webhook = WebhookSender(alert_config["webhook_url"])
+            alert_engine.add_callback(alert_webhook.send)
+        connection_manager.hub.add_listener(alert_engine.update)
+    
+    # 批次校準樣本錄製
+    calibration_recorder = CalibrationRecorder()
+    connection_manager.hub.add_listener(calibration_recorder.update)
+    
+    # 標註預覽 (只在有觀看者時於背景執行緒繪製與編碼)
+    preview_renderer = PreviewRenderer.from_config(detector_service, sensor_config.get("preview", {}))
+    if preview_renderer.supported:
+        connection_manager.hub.add_listener(preview_renderer.update)
+    
+    # 事件錄影 (daemon 模式由常駐程式錄影,API 只列出片段)
+    recording_config = sensor_config.get("recording", {})
+    recordings_dir = EventRecorder.resolve_directory(recording_config, BASE_DIR)
+    if recording_config.get("enabled", False) and not daemon_config["enabled"]:
+        event_recorder = EventRecorder.from_config(recording_config, BASE_DIR)
+        event_recorder.start()
+        detector_service.image_consumers += 1
+        connection_manager.hub.add_listener(event_recorder.update)
+    
+    # 長期時序儲存 (daemon 模式由常駐程式寫入,API 只讀取)
+    storage_config = sensor_config.get("storage", {})
+    if storage_config.get("enabled", False):
+        detection_store = DetectionStore.from_config(storage_config, BASE_DIR)
+        if not daemon_config["enabled"]:
+            detection_store.start()
+            connection_manager.hub.add_listener(detection_store.append)
     
     # 初始化 API 端點的服務依賴
     websocket.init_websocket_services(detector_service, connection_manager)
-    frontend.init_frontend_services(detector_service)
+    frontend.init_frontend_services(detector_service, connection_manager)
+    history.init_history_services(detection_history, remote_detector)
+    statistics.init_statistics_services(detection_store)
+    analytics.init_analytics_services(occupancy_analytics, remote_detector)
+    alerts.init_alert_services(alert_engine, alert_channel, connection_manager, remote_detector)
+    calibration.init_calibration_services(calibration_recorder, detector_service, connection_manager)
+    preview.init_preview_services(preview_renderer, connection_manager)
+    recordings.init_recording_services(event_recorder, recordings_dir)
+    
+    # 附加統計併入 /api/detection/stats (daemon 模式的 analytics、alerts 由常駐程式併入推送的統計)
+    if occupancy_analytics:
+        frontend.register_stats_provider("analytics", occupancy_analytics.get_summary)
+    if detection_store:
+        frontend.register_stats_provider("storage", detection_store.get_stats)
+    if alert_engine:
+        frontend.register_stats_provider("alerts", alert_engine.get_stats)
+    if alert_webhook:
+        frontend.register_stats_provider("alert_webhook", alert_webhook.get_stats)
+    if preview_renderer.supported:
+        frontend.register_stats_provider("preview", preview_renderer.get_stats)
+    if event_recorder:
+        frontend.register_stats_provider("recording", event_recorder.get_stats)
+    frontend.register_stats_provider("process", get_process_stats)
+    if daemon_config["enabled"]:
+        # 偵測器的 cpu 統計來自常駐程式,API worker 本身的事件迴圈另列
+        frontend.register_stats_provider("api_cpu", cpu_resources.get_stats)
+    frontend.register_stats_provider("connections", lambda: {
+        "websocket": connection_manager.get_connection_count(),
+        "consumers": connection_manager.consumer_count(),
+        "dropped": connection_manager.dropped_messages,
+        "stalled_disconnects": connection_manager.stalled_disconnects
+    })
     
-    print("✅ 服務啟動完成!")
+    # 監看 sensor_config.json,變更時熱套用 (daemon 模式由常駐程式監看)
+    server_config = load_network_config().get("server", {})
+    if not daemon_config["enabled"] and server_config.get("watch_config", True):
+        config_watcher = ConfigWatcher(
+            SENSOR_CONFIG_PATH,
+            detector_service.reload_config,
+            server_config.get("watch_interval", 1.0)
+        )
+        config_watcher.start()
+    
+    # 錄影需持續偵測時,保持一個消費者讓偵測器不因無人連線而停止
+    # (背景啟動,不等待模型預熱;偵測器無法啟動時以指數退避重試)
+    if event_recorder and recording_config.get("always_on", False):
+        always_on_task = connection_manager.hold()
+    
+    print(f"✅ 服務啟動完成! (模組匯入 {APP_IMPORT_MS:.0f} ms)")
     print("📍 後台管理介面: http://localhost:8000/admin")
     print("📍 API 文件: http://localhost:8000/docs")
     
@@ -52,12 +191,33 @@ async def lifespan(app: FastAPI):
     # === 關閉時 ===
     print("🛑 正在關閉服務...")
     
+    if config_watcher:
+        await config_watcher.stop()
+    
+    if always_on_task:
+        always_on_task.cancel()
+    
     if detector_service and detector_service.is_running:
         await detector_service.stop_detection()
     
     if connection_manager:
         await connection_manager.disconnect_all()
     
+    if alert_channel:
+        await alert_channel.close()
+    
+    if alert_webhook:
+        alert_webhook.close()
+    
+    if event_recorder:
+        event_recorder.close()
+    
+    if detection_store:
+        detection_store.close()
+    
+    if cpu_resources:
+        cpu_resources.shutdown()
+    
     print("👋 服務已關閉")
 
 
@@ -73,6 +233,13 @@ app = FastAPI(
 # === 註冊路由 ===
 app.include_router(websocket.router)
 app.include_router(frontend.router)
+app.include_router(history.router)
+app.include_router(statistics.router)
+app.include_router(analytics.router)
+app.include_router(alerts.router)
+app.include_router(calibration.router)
+app.include_router(preview.router)
+app.include_router(recordings.router)
 
 
 # === 靜態檔案服務 (後台管理介面) ===
@@ -94,6 +261,12 @@ async def root():
             "docs": "/docs",
             "websocket_detection": "/ws/detection",
             "websocket_live": "/ws/live",
+            "websocket_alerts": "/ws/alerts",
+            "health": "/health",
+            "ready": "/ready",
+            "sse": "/api/distance/stream",
+            "long_poll": "/api/distance/wait",
+            "preview": "/api/preview.mjpg",
             "api": "/api"
         }
     }
@@ -109,14 +282,35 @@ async def health():
     }
 
 
+# === 就緒檢查 ===
+@app.get("/ready")
+async def ready():
+    """
+    就緒檢查端點 (模型已載入並預熱)
+    /health 只表示伺服器存活;/ready 在模型可立即推論前回傳 503,供負載平衡器或啟動腳本等待
+    """
+    readiness = await detector_service.get_readiness() if detector_service else {
+        "ready": False, "state": "starting", "error": None, "timings": {}
+    }
+    readiness["timings"] = {"app_import_ms": APP_IMPORT_MS, **readiness.get("timings", {})}
+    return JSONResponse(readiness, status_code=200 if readiness["ready"] else 503)
+
+
 if __name__ == "__main__":
     import uvicorn
     
-    # 開發環境啟動
+    # 多 worker 需搭配 detector_daemon.py (否則每個 worker 都會開啟攝影機)
+    server_config = load_network_config().get("server", {})
+    workers = server_config.get("workers", 1)
+    if workers > 1 and not get_daemon_config()["enabled"]:
+        print("⚠ 多 worker 需啟用 daemon 模式,改以單一 worker 啟動")
+        workers = 1
+    
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
         port=8000,
-        reload=True,
+        workers=workers,
+        reload=server_config.get("reload", False) and workers == 1,
         log_level="info"
     )
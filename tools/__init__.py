@@ -0,0 +1,4 @@
+# -*- coding: utf-8 -*-
+"""
+命令列工具 (以 python -m tools.<名稱> 執行)
+"""
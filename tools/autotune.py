@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+現場參數調校 - 以參考錄影重播偵測管線,掃描 imgsz / vid_stride / conf 與推論後端 / 裝置 (及追蹤器) 的組合,
+量測處理速度、延遲,以及與高品質參考執行的偵測與距離一致性,列出 Pareto 前緣並可寫回 sensor_config.json
+
+每個組合使用新載入的模型與偵測服務的推論及結果處理 (YOLODetectorService._run_yolo_inference /
+_process_results),距離參數與追蹤器設定取自 sensor_config.json:
+- 處理速度: 每處理幀耗時 (推論 + 距離計算) 的 p50/p95,fps 為每秒可處理幀數,
+  camera_fps 為乘上 vid_stride 後可跟上的攝影機幀率
+- 一致性: 參考執行 (--reference-imgsz、--reference-conf、vid_stride 1) 視為正確答案,
+  每個攝影機幀比對客戶端當下看到的結果 (跳過的幀為上一處理幀,啟用 interpolate_skipped 時為預測幀),
+  以 IoU >= 0.5 配對計算 precision / recall / F1 與距離相對誤差中位數
+
+推薦點: Pareto 前緣中 camera_fps 不低於 --target-fps (預設為影片幀率)、F1 不低於 --min-f1 的組合,
+取 F1 最高者 (相同時取 fps 較高者);--write 將其 imgsz、vid_stride、conf、backend、device (與 tracker) 寫入 sensor_config.json
+
+--backends / --devices 預設為目前設定;參考執行一律使用目前設定的後端與裝置,
+stub 後端不使用裝置,與多個 --devices 組合時只執行一次
+
+用法:
+    python -m tools.autotune reference.mp4 [--imgsz 320 416 640] [--stride 1 2 3] [--conf 0.3 0.4 0.5]
+        [--backends ultralytics stub] [--devices cpu 0] [--trackers botsort.yaml builtin] [--max-frames 300] [--target-fps 30] [--min-f1 0.9]
+        [--output tune.json] [--json] [--write]
+"""
+
+import argparse
+import itertools
+import json
+import platform
+import time
+from typing import Dict, Any, List, Optional, Tuple, Union
+
+import numpy as np
+
+from app.models.sensor_config import SensorConfig
+from app.services.detector import YOLODetectorService
+from app.services.tracker import iou_matrix, assign
+from app.utils.config_loader import load_sensor_config, update_sensor_config
+from tools.tracker_compare import iter_frames, latency_stats
+
+
+MATCH_IOU = 0.5   # 與參考偵測配對的最低 IoU
+
+# 每個攝影機幀客戶端看到的結果: (邊界框 (N, 4), 距離 (N,)),尚無結果時為 None
+Output = Optional[Tuple[np.ndarray, np.ndarray]]
+
+
+def video_fps(path: str, fallback: float = 30.0) -> float:
+    """影片幀率 (沒有資訊時使用 fallback)"""
+    import cv2
+
+    cap = cv2.VideoCapture(path)
+    try:
+        return cap.get(cv2.CAP_PROP_FPS) or fallback
+    finally:
+        cap.release()
+
+
+def parse_device(value: str) -> Union[int, str]:
+    """--devices 參數: 純數字視為 CUDA 裝置編號,其餘 (cpu、mps、"0,1") 保留字串"""
+    return int(value) if value.isdigit() else value
+
+
+def build_grid(backends: List[str], devices: List[Union[int, str]], imgsz: List[int], strides: List[int],
+               confs: List[float], trackers: List[str]) -> List[Tuple]:
+    """
+    組合掃描格點 (backend, device, imgsz, vid_stride, conf, tracker)
+
+    stub 後端不使用裝置,只與第一個裝置組合,避免重複執行相同的設定
+    """
+    grid = []
+    for backend in backends:
+        backend_devices = devices[:1] if backend == "stub" else devices
+        grid.extend(itertools.product([backend], backend_devices, imgsz, strides, confs, trackers))
+    return grid
+
+
+def build_service(raw: Dict[str, Any], overrides: Dict[str, Any]) -> YOLODetectorService:
+    """依 sensor_config.json 與覆寫的 model 參數建立偵測服務並載入、預熱模型"""
+    settings = SensorConfig.from_dict({**raw, "model": {**raw.get("model", {}), **overrides}})
+    service = YOLODetectorService()
+    service.settings = settings
+    service.config = settings.to_dict()
+    service.distance_calculator.update_config(service.config["distance"])
+    service.load_model()
+    service.warm_up_model()
+    return service
+
+
+def replay(clip: str, raw: Dict[str, Any], overrides: Dict[str, Any], fps: float, max_frames: int,
+           warmup: int) -> Tuple[List[Output], Dict[str, Any]]:
+    """
+    以指定參數重播影片
+
+    Args:
+        clip: 影片路徑
+        raw: sensor_config.json 內容
+        overrides: 覆寫的 model 參數
+        fps: 影片幀率 (換算擷取時間戳記)
+        max_frames: 最多讀取的影片幀數 (0 為不限)
+        warmup: 不計入耗時統計的前幾個處理幀
+
+    Returns:
+        (每個攝影機幀客戶端看到的結果, 耗時統計)
+    """
+    service = build_service(raw, overrides)
+    stride = service.config["model"]["vid_stride"]
+    interpolate = service.config["model"]["interpolate_skipped"]
+
+    outputs: List[Output] = []
+    latencies: List[float] = []
+    latest: Output = None
+    for number, frame in iter_frames(clip, 1, max_frames):
+        if number % stride == 0:
+            started = time.perf_counter()
+            results = service._run_yolo_inference(frame)
+            frame_data = service._process_results(results, number / fps)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if interpolate:
+                service.interpolator.update(frame_data, number)
+            latest = (frame_data.boxes, frame_data.distances)
+        elif interpolate:
+            predicted = service.interpolator.predict(number, stride)
+            if predicted is not None:
+                latest = (predicted.boxes, predicted.distances)
+        outputs.append(latest)
+
+    timing = latency_stats(latencies[warmup:])
+    mean_ms = timing["mean"]
+    timing["processed"] = len(latencies)
+    timing["fps"] = round(1000 / mean_ms, 1) if mean_ms else None
+    timing["camera_fps"] = round(1000 / mean_ms * stride, 1) if mean_ms else None
+    return outputs, timing
+
+
+def agreement(reference: List[Output], outputs: List[Output]) -> Dict[str, Any]:
+    """
+    與參考執行逐幀比對 (IoU >= 0.5 配對)
+
+    Returns:
+        {"precision", "recall", "f1", "distance_error", "distance_error_p90"} (距離誤差為相對誤差)
+    """
+    tp = fp = fn = 0
+    errors: List[np.ndarray] = []
+    for ref, out in zip(reference, outputs):
+        ref_boxes, ref_distances = ref if ref is not None else (np.zeros((0, 4)), np.zeros(0))
+        if out is None:
+            fn += len(ref_boxes)
+            continue
+        boxes, distances = out
+        rows, cols = assign(iou_matrix(ref_boxes.astype(np.float64), boxes.astype(np.float64)), MATCH_IOU)
+        tp += len(rows)
+        fn += len(ref_boxes) - len(rows)
+        fp += len(boxes) - len(cols)
+        valid = ref_distances[rows] > 0
+        errors.append(np.abs(distances[cols][valid] - ref_distances[rows][valid]) / ref_distances[rows][valid])
+
+    precision = tp / (tp + fp) if tp + fp else 1.0
+    recall = tp / (tp + fn) if tp + fn else 1.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    error = np.concatenate(errors) if errors else np.zeros(0)
+    return {
+        "precision": round(precision, 3),
+        "recall": round(recall, 3),
+        "f1": round(f1, 3),
+        "distance_error": round(float(np.median(error)), 4) if len(error) else None,
+        "distance_error_p90": round(float(np.percentile(error, 90)), 4) if len(error) else None
+    }
+
+
+def pareto_front(rows: List[Dict[str, Any]]) -> List[int]:
+    """
+    Pareto 前緣 (fps、F1 越高越好,p95 延遲、距離誤差越低越好)
+
+    Returns:
+        不被任何其他組合支配的列索引
+    """
+    def objectives(row: Dict[str, Any]) -> np.ndarray:
+        error = row["distance_error"] if row["distance_error"] is not None else np.inf
+        return np.array([row["fps"] or 0.0, row["f1"], -(row["p95"] or np.inf), -error])
+
+    points = [objectives(row) for row in rows]
+    front = []
+    for i, p in enumerate(points):
+        dominated = any(np.all(q >= p) and np.any(q > p) for j, q in enumerate(points) if j != i)
+        if not dominated:
+            front.append(i)
+    return front
+
+
+def recommend(rows: List[Dict[str, Any]], front: List[int], target_fps: float, min_f1: float) -> Optional[int]:
+    """在 Pareto 前緣中挑選可跟上攝影機且 F1 達標的組合 (F1 最高,相同時 fps 較高)"""
+    candidates = [
+        i for i in front
+        if (rows[i]["camera_fps"] or 0) >= target_fps and rows[i]["f1"] >= min_f1
+    ]
+    if not candidates:
+        return None
+    return max(candidates, key=lambda i: (rows[i]["f1"], rows[i]["fps"] or 0))
+
+
+def print_table(rows: List[Dict[str, Any]], front: List[int], chosen: Optional[int]):
+    """以表格輸出所有組合 (★ 為 Pareto 前緣,▶ 為推薦點)"""
+    print(f"\n   {'':2} {'backend':<11} {'device':<6} {'imgsz':>5} {'stride':>6} {'conf':>5} {'tracker':<14} {'fps':>7} {'cam fps':>8} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'prec':>6} {'recall':>6} {'f1':>6} {'dist err':>9}")
+    for i, row in sorted(enumerate(rows), key=lambda item: -(item[1]["fps"] or 0)):
+        mark = "▶" if i == chosen else ("★" if i in front else "")
+        error = row["distance_error"]
+        print(f"   {mark:2} {row['backend']:<11} {str(row['device']):<6} {row['imgsz']:>5} {row['vid_stride']:>6} {row['conf']:>5} {row['tracker']:<14} "
+              f"{row['fps'] or '-':>7} {row['camera_fps'] or '-':>8} {row['p50'] or '-':>8} {row['p95'] or '-':>8} "
+              f"{row['precision']:>6} {row['recall']:>6} {row['f1']:>6} "
+              f"{(f'{error:.1%}' if error is not None else '-'):>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="以參考錄影掃描偵測參數,找出此裝置的操作點")
+    parser.add_argument("clip", help="參考錄影")
+    parser.add_argument("--imgsz", type=int, nargs="+", default=[320, 416, 640], help="要掃描的 model.imgsz")
+    parser.add_argument("--stride", type=int, nargs="+", default=[1, 2, 3], help="要掃描的 model.vid_stride")
+    parser.add_argument("--conf", type=float, nargs="+", default=[0.3, 0.4, 0.5], help="要掃描的 model.conf")
+    parser.add_argument("--backends", nargs="+", choices=["ultralytics", "stub"],
+                        help="要掃描的 model.backend (預設為目前設定)")
+    parser.add_argument("--devices", type=parse_device, nargs="+",
+                        help="要掃描的 model.device,例如 cpu 0 (預設為目前設定)")
+    parser.add_argument("--trackers", nargs="+", help="要掃描的 model.tracker (預設為目前設定)")
+    parser.add_argument("--reference-imgsz", type=int, default=960, help="參考執行的 imgsz")
+    parser.add_argument("--reference-conf", type=float, default=0.25, help="參考執行的 conf")
+    parser.add_argument("--max-frames", type=int, default=300, help="最多讀取的影片幀數 (0 為不限)")
+    parser.add_argument("--warmup", type=int, default=3, help="不計入耗時統計的前幾個處理幀")
+    parser.add_argument("--target-fps", type=float, help="需跟上的攝影機幀率 (預設為影片幀率)")
+    parser.add_argument("--min-f1", type=float, default=0.9, help="推薦點的最低 F1")
+    parser.add_argument("--output", help="結果 JSON 輸出路徑")
+    parser.add_argument("--json", action="store_true", help="以 JSON 輸出完整結果")
+    parser.add_argument("--write", action="store_true", help="將推薦點寫入 sensor_config.json")
+    args = parser.parse_args()
+
+    raw = load_sensor_config()
+    fps = video_fps(args.clip)
+    target_fps = args.target_fps if args.target_fps is not None else fps
+    model = raw.get("model", {})
+    backends = args.backends or [model.get("backend", "ultralytics")]
+    devices = args.devices or [model.get("device", "cpu")]
+    trackers = args.trackers or [model.get("tracker", "botsort.yaml")]
+
+    grid = build_grid(backends, devices, args.imgsz, args.stride, args.conf, trackers)
+    print(f"🎞 {args.clip} ({fps:g} FPS),參考執行 {model.get('backend', 'ultralytics')} / "
+          f"{model.get('device', 'cpu')} / imgsz {args.reference_imgsz} / conf {args.reference_conf},"
+          f"掃描 {len(grid)} 組")
+
+    reference, reference_timing = replay(args.clip, raw, {
+        "imgsz": args.reference_imgsz, "vid_stride": 1, "conf": args.reference_conf,
+        "interpolate_skipped": False
+    }, fps, args.max_frames, args.warmup)
+    print(f"   參考執行: {len(reference)} 幀,每幀 p50 {reference_timing['p50']} ms")
+
+    rows = []
+    for n, (backend, device, imgsz, stride, conf, tracker) in enumerate(grid, 1):
+        outputs, timing = replay(args.clip, raw, {
+            "backend": backend, "device": device,
+            "imgsz": imgsz, "vid_stride": stride, "conf": conf, "tracker": tracker
+        }, fps, args.max_frames, args.warmup)
+        row = {
+            "backend": backend, "device": device, "imgsz": imgsz, "vid_stride": stride, "conf": conf, "tracker": tracker,
+            "fps": timing["fps"], "camera_fps": timing["camera_fps"],
+            "p50": timing["p50"], "p95": timing["p95"],
+            **agreement(reference, outputs)
+        }
+        rows.append(row)
+        if not args.json:
+            print(f"   [{n}/{len(grid)}] {backend} {device} imgsz {imgsz} stride {stride} conf {conf} {tracker}: "
+                  f"{row['fps']} fps, F1 {row['f1']}")
+
+    front = pareto_front(rows)
+    chosen = recommend(rows, front, target_fps, args.min_f1)
+    report = {
+        "clip": args.clip,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "device": model.get("device", "cpu"),
+        "machine": platform.machine(),
+        "video_fps": fps,
+        "target_fps": target_fps,
+        "min_f1": args.min_f1,
+        "reference": {"backend": model.get("backend", "ultralytics"), "device": model.get("device", "cpu"),
+                      "imgsz": args.reference_imgsz, "conf": args.reference_conf, **reference_timing},
+        "results": rows,
+        "pareto": front,
+        "recommended": rows[chosen] if chosen is not None else None
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    else:
+        print_table(rows, front, chosen)
+        if chosen is None:
+            print(f"\n⚠ 沒有組合同時達到 camera_fps >= {target_fps:g} 與 F1 >= {args.min_f1}")
+        else:
+            best = rows[chosen]
+            print(f"\n▶ 推薦: {best['backend']} / {best['device']}, imgsz {best['imgsz']}, vid_stride {best['vid_stride']}, conf {best['conf']}, "
+                  f"tracker {best['tracker']} ({best['fps']} fps, F1 {best['f1']})")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        if not args.json:
+            print(f"💾 結果已儲存: {args.output}")
+
+    if args.write:
+        if chosen is None:
+            parser.exit(1, "❌ 沒有符合條件的推薦點,未寫入 sensor_config.json\n")
+        best = rows[chosen]
+        update_sensor_config("model", {
+            key: best[key] for key in ("backend", "device", "imgsz", "vid_stride", "conf", "tracker")
+        })
+        print("✅ 已寫入 sensor_config.json (執行中的服務請呼叫 POST /api/detector/refresh)")
+
+
+if __name__ == "__main__":
+    main()
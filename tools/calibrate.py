@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+離線批次校準 - 讀取樣本 CSV,擬合焦距與姿態係數,可選擇寫回 sensor_config.json
+
+用法:
+    python -m tools.calibrate samples.csv [more.csv ...] [--write] [--fixed-ratio]
+"""
+
+import argparse
+import json
+import numpy as np
+
+from app.services.calibration import load_samples, solve_calibration
+from app.utils.config_loader import load_sensor_config, update_sensor_config
+
+
+def main():
+    parser = argparse.ArgumentParser(description="從錄製樣本擬合焦距與姿態係數")
+    parser.add_argument("samples", nargs="+", help="樣本 CSV (box_height, box_width, distance)")
+    parser.add_argument("--write", action="store_true", help="將結果寫回 sensor_config.json")
+    parser.add_argument("--fixed-ratio", action="store_true", help="不擬合 standing_ratio")
+    parser.add_argument("--outlier-k", type=float, default=3.0, help="離群值門檻 (MAD 倍數)")
+    parser.add_argument("--min-samples", type=int, default=20, help="擬合單一姿態係數所需的最少樣本數")
+    parser.add_argument("--json", action="store_true", help="以 JSON 輸出完整結果")
+    args = parser.parse_args()
+
+    arrays = [load_samples(path) for path in args.samples]
+    heights, widths, distances = (np.concatenate(parts) for parts in zip(*arrays))
+
+    result = solve_calibration(
+        heights, widths, distances, load_sensor_config()["distance"],
+        fit_ratio=not args.fixed_ratio,
+        outlier_k=args.outlier_k,
+        min_samples=args.min_samples
+    )
+
+    if args.json:
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+    else:
+        print(f"📊 樣本 {result['samples']} 筆,內群 {result['inliers']} 筆 ({result['elapsed_ms']} ms)")
+        print(f"   姿態分佈: {result['postures']}")
+        for key, value in result["config"].items():
+            print(f"   {key}: {result['previous'][key]} → {value}")
+        before, after = result["residuals_before"], result["residuals"]
+        print(f"   平均誤差: {before['mae']} → {after['mae']} cm,"
+              f"P95: {before['p95']} → {after['p95']} cm,"
+              f"相對誤差: {before['mean_relative']:.1%} → {after['mean_relative']:.1%}")
+        for row in result["by_distance"]:
+            print(f"   {row['distance']:>7.0f} cm: 中位預測 {row['predicted_median']:>7.1f},"
+                  f"中位誤差 {row['error_median']:>5.1f} ({row['samples']} 筆)")
+
+    if args.write:
+        update_sensor_config("distance", result["config"])
+        print("✅ 已寫入 sensor_config.json (執行中的服務請呼叫 POST /api/detector/refresh)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,428 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+熱路徑微基準 - 量測每幀都會執行的程式碼,在版本更新前發現效能退化
+
+案例:
+- calculate_distance: 每幀對每個人呼叫 DistanceCalculator.calculate_distance (姿態判斷 + 兩段平滑)
+- smooth_distance / smooth_display: 每幀對每個人呼叫移動平均 / EMA
+- process_results: 以模擬的 ultralytics 結果 (boxes.xyxy/conf/id) 執行
+  YOLODetectorService._process_results (average 與 kalman 平滑模式)
+- render_full / render_live: 由 DetectionFrame 組裝並序列化完整訂閱與 /ws/live 訂閱的 payload
+- broadcast: ConnectionManager.broadcast 送給記憶體中的假連線 (一半完整訂閱、一半 live 訂閱)
+
+人數 (--people) 與追蹤 ID 池 (--ids) 組合成案例 (ID 池小於人數的組合略過),
+每幀的追蹤 ID 依序輪替整個 ID 池,平滑化狀態會成長到 ID 池大小 (模擬長時間運行累積的追蹤)
+每次操作單獨計時 (計時期間停用 GC,輸入資料在計時外準備),報告各案例的百分位數 (µs)
+所有案例依序執行 --repeats 輪,每個案例取 p50 最低的一輪 (排除背景負載造成的偶發變慢),
+各輪 p50 中位數與最低值的相對差距記為 noise
+
+用法:
+    python -m tools.hotpath_benchmark [--people 1 10 50 200] [--ids 1 100 1000] [--clients 1 100 1000]
+        [--samples 500] [--repeats 3] [--only process render] [--label v1.2] [--output bench.json]
+        [--compare baseline.json] [--threshold 0.2] [--min-delta-us 1.0] [--json]
+
+搭配 --compare 時,任一案例的 p50 比前一份報告慢超過 --threshold 加上兩份報告中較大的 noise,
+且差距超過 --min-delta-us 時視為退化,以結束碼 1 結束
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import math
+import platform
+import sys
+import time
+from typing import Dict, Any, List, Callable, Tuple
+
+import numpy as np
+
+from app.services.calculator import DistanceCalculator
+from app.services.connection_manager import ConnectionManager
+from app.services.detector import YOLODetectorService
+from app.services.frame import DetectionFrame
+from app.services.results import ArrayBoxes, ArrayResults
+from app.services.subscription import Subscription, FULL_SUBSCRIPTION
+
+
+PERCENTILES = (50, 90, 99)
+FRAME_POOL = 64      # 預先產生的邊界框組數 (每幀輪流使用)
+BOX_ASPECT = 2.8     # 站姿框高寬比
+
+
+class FakeWebSocket:
+    """記憶體中的假連線 (只計算收到的訊息數與位元組數)"""
+
+    def __init__(self):
+        self.messages = 0
+        self.bytes = 0
+
+    async def send_text(self, text: str):
+        self.messages += 1
+        self.bytes += len(text)
+
+
+class Scene:
+    """
+    模擬場景: 產生固定人數的邊界框,追蹤 ID 依序輪替 ID 池
+    同一組參數每次產生相同的資料 (固定亂數種子)
+    """
+
+    def __init__(self, people: int, ids: int, width: int, height: int, seed: int = 0):
+        self.people = people
+        self.ids = ids
+        self.shape = (height, width)
+        rng = np.random.default_rng(seed)
+
+        # 框高 80-400 像素,約一成為蹲坐姿 (高寬比較小)
+        heights = rng.uniform(80, 400, (FRAME_POOL, people))
+        aspects = np.where(rng.random((FRAME_POOL, people)) < 0.1, rng.uniform(1.0, 2.4, (FRAME_POOL, people)), BOX_ASPECT)
+        widths = heights / aspects
+        x1 = rng.uniform(0, 1, (FRAME_POOL, people)) * np.maximum(width - widths, 1)
+        y1 = rng.uniform(0, 1, (FRAME_POOL, people)) * np.maximum(height - heights, 1)
+        self.xyxy = np.stack([x1, y1, x1 + widths, y1 + heights], axis=-1).astype(np.float32)
+        self.conf = rng.uniform(0.5, 0.95, (FRAME_POOL, people)).astype(np.float32)
+
+    def track_ids(self, index: int) -> np.ndarray:
+        """第 index 幀的追蹤 ID (1 起算,依序輪替 ID 池)"""
+        return (index * self.people + np.arange(self.people)) % self.ids + 1
+
+    def result(self, index: int) -> List[ArrayResults]:
+        """第 index 幀的模擬 ultralytics 結果"""
+        i = index % FRAME_POOL
+        boxes = ArrayBoxes(self.xyxy[i], self.conf[i], self.track_ids(index).astype(np.float32))
+        return [ArrayResults(boxes, self.shape)]
+
+    def frame(self, index: int) -> DetectionFrame:
+        """第 index 幀的偵測幀 (距離由框高粗估,只用於 payload 與廣播案例)"""
+        i = index % FRAME_POOL
+        xyxy = self.xyxy[i]
+        return DetectionFrame(
+            boxes=xyxy,
+            confidences=self.conf[i],
+            track_ids=self.track_ids(index),
+            distances=50000.0 / (xyxy[:, 3] - xyxy[:, 1]).astype(np.float64),
+            seq=index,
+            timestamp=time.time(),
+            fps=30,
+            actual_fps=30
+        )
+
+    def warmup_frames(self, minimum: int) -> int:
+        """暖機幀數 (至少輪替一次整個 ID 池,讓平滑化狀態達到 ID 池大小)"""
+        return max(minimum, math.ceil(self.ids / self.people))
+
+
+# === 計時 ===
+
+def summarize(samples_ns: np.ndarray, items: int) -> Dict[str, Any]:
+    """計算計時統計 (µs);per_item_us 為 p50 除以每次操作處理的項目數 (人數或連線數)"""
+    us = samples_ns / 1000.0
+    stats = {
+        "samples": int(len(us)),
+        "mean": round(float(us.mean()), 2),
+        "stdev": round(float(us.std()), 2),
+        "min": round(float(us.min()), 2),
+        **{f"p{p}": round(float(np.percentile(us, p)), 2) for p in PERCENTILES},
+        "max": round(float(us.max()), 2)
+    }
+    stats["per_item_us"] = round(stats["p50"] / max(items, 1), 3)
+    return stats
+
+
+def measure(prepare: Callable[[int], tuple], op: Callable, samples: int, warmup: int, max_seconds: float) -> np.ndarray:
+    """
+    逐次計時同步操作
+
+    Args:
+        prepare: 依操作序號產生 op 參數 (不計時)
+        op: 受測操作
+        samples: 取樣次數上限
+        warmup: 暖機次數 (不計時)
+        max_seconds: 單一案例的計時上限 (秒,至少取樣 10 次)
+
+    Returns:
+        每次操作耗時 (ns)
+    """
+    for i in range(warmup):
+        op(*prepare(i))
+
+    times = np.empty(samples, dtype=np.float64)
+    deadline = time.perf_counter() + max_seconds
+    gc.collect()
+    gc.disable()
+    try:
+        count = 0
+        for count in range(1, samples + 1):
+            args = prepare(warmup + count)
+            started = time.perf_counter_ns()
+            op(*args)
+            times[count - 1] = time.perf_counter_ns() - started
+            if count >= 10 and time.perf_counter() > deadline:
+                break
+    finally:
+        gc.enable()
+    return times[:count]
+
+
+async def measure_async(prepare: Callable[[int], tuple], op: Callable, samples: int, warmup: int, max_seconds: float) -> np.ndarray:
+    """逐次計時非同步操作 (參數同 measure)"""
+    for i in range(warmup):
+        await op(*prepare(i))
+
+    times = np.empty(samples, dtype=np.float64)
+    deadline = time.perf_counter() + max_seconds
+    gc.collect()
+    gc.disable()
+    try:
+        count = 0
+        for count in range(1, samples + 1):
+            args = prepare(warmup + count)
+            started = time.perf_counter_ns()
+            await op(*args)
+            times[count - 1] = time.perf_counter_ns() - started
+            if count >= 10 and time.perf_counter() > deadline:
+                break
+    finally:
+        gc.enable()
+    return times[:count]
+
+
+# === 案例 ===
+
+def bench_calculator(name: str, config: dict, scene: Scene, opts: argparse.Namespace) -> Dict[str, Any]:
+    """DistanceCalculator 的逐人呼叫 (calculate_distance / _smooth_distance / _smooth_display)"""
+    calculator = DistanceCalculator({**config, "smoothing_mode": "average"})
+
+    def prepare(index: int) -> tuple:
+        xyxy = scene.xyxy[index % FRAME_POOL]
+        heights = (xyxy[:, 3] - xyxy[:, 1]).tolist()
+        widths = (xyxy[:, 2] - xyxy[:, 0]).tolist()
+        return heights, widths, scene.track_ids(index).tolist()
+
+    if name == "calculate_distance":
+        def op(heights, widths, ids):
+            for h, w, track_id in zip(heights, widths, ids):
+                calculator.calculate_distance(h, w, track_id)
+    else:
+        smooth = calculator._smooth_distance if name == "smooth_distance" else calculator._smooth_display
+
+        def op(heights, widths, ids):
+            for h, track_id in zip(heights, ids):
+                smooth(track_id, 50000.0 / h)
+
+    times = measure(prepare, op, opts.samples, scene.warmup_frames(opts.warmup), opts.max_seconds)
+    stats = summarize(times, scene.people)
+    stats["tracked"] = len(calculator.display_distances) if name != "smooth_distance" else len(calculator.distance_history)
+    return stats
+
+
+def bench_process_results(mode: str, service: YOLODetectorService, config: dict, scene: Scene,
+                          opts: argparse.Namespace) -> Dict[str, Any]:
+    """YOLODetectorService._process_results (距離計算、區域查詢、建立 DetectionFrame)"""
+    service.distance_calculator = DistanceCalculator({**config, "smoothing_mode": mode})
+
+    def prepare(index: int) -> tuple:
+        return scene.result(index), index / 30.0
+
+    times = measure(prepare, service._process_results, opts.samples, scene.warmup_frames(opts.warmup), opts.max_seconds)
+    return summarize(times, scene.people)
+
+
+def bench_render(subscription: Subscription, scene: Scene, opts: argparse.Namespace) -> Dict[str, Any]:
+    """payload 組裝與 JSON 序列化 (每次使用新的幀,不命中幀上的序列化快取)"""
+
+    def prepare(index: int) -> tuple:
+        return scene.frame(index), subscription
+
+    times = measure(prepare, DetectionFrame.render, opts.samples, opts.warmup, opts.max_seconds)
+    return summarize(times, scene.people)
+
+
+def bench_broadcast(clients: int, scene: Scene, opts: argparse.Namespace) -> Dict[str, Any]:
+    """ConnectionManager.broadcast 送給記憶體中的假連線 (不含網路,量測分組、序列化與逐一送出的成本)"""
+    manager = ConnectionManager(detector_service=None)
+    sockets = [FakeWebSocket() for _ in range(clients)]
+    live = Subscription.live()
+    for i, websocket in enumerate(sockets):
+        manager.active_connections.append(websocket)
+        manager.subscriptions[websocket] = FULL_SUBSCRIPTION if i % 2 == 0 else live
+
+    def prepare(index: int) -> tuple:
+        return (scene.frame(index),)
+
+    times = asyncio.run(measure_async(prepare, manager.broadcast, opts.samples, opts.warmup, opts.max_seconds))
+    stats = summarize(times, clients)
+    stats["bytes_per_frame"] = round(sum(s.bytes for s in sockets) / max(sockets[0].messages, 1))
+    return stats
+
+
+def scene_grid(people: List[int], ids: List[int]) -> List[Tuple[int, int]]:
+    """人數 × ID 池組合 (略過 ID 池小於人數的組合,同一幀不會有重複 ID)"""
+    return [(p, i) for i in ids for p in people if i >= p]
+
+
+def run_cases(opts: argparse.Namespace) -> List[Dict[str, Any]]:
+    """依參數執行所有案例"""
+    service = YOLODetectorService()
+    config = service.config["distance"]
+    width, height = service.config["camera"]["width"], service.config["camera"]["height"]
+    cases: List[Tuple[str, Dict[str, int], Callable[[], Dict[str, Any]]]] = []
+
+    for people, ids in scene_grid(opts.people, opts.ids):
+        scene = Scene(people, ids, width, height, opts.seed)
+        params = {"people": people, "ids": ids}
+        for name in ("calculate_distance", "smooth_distance", "smooth_display"):
+            cases.append((name, params, lambda name=name, scene=scene: bench_calculator(name, config, scene, opts)))
+        for mode in ("average", "kalman"):
+            cases.append((f"process_results_{mode}", params,
+                          lambda mode=mode, scene=scene: bench_process_results(mode, service, config, scene, opts)))
+
+    # payload 與廣播只與人數 (及連線數) 有關
+    render_ids = max(max(opts.ids), max(opts.people))
+    for people in opts.people:
+        scene = Scene(people, render_ids, width, height, opts.seed)
+        cases.append(("render_full", {"people": people},
+                      lambda scene=scene: bench_render(FULL_SUBSCRIPTION, scene, opts)))
+        cases.append(("render_live", {"people": people},
+                      lambda scene=scene: bench_render(Subscription.live(), scene, opts)))
+        for clients in opts.clients:
+            cases.append(("broadcast", {"people": people, "clients": clients},
+                          lambda clients=clients, scene=scene: bench_broadcast(clients, scene, opts)))
+
+    if opts.only:
+        cases = [case for case in cases if any(key in case[0] for key in opts.only)]
+
+    # 各輪依序執行所有案例 (背景負載分散到不同案例),每個案例保留 p50 最低的一輪
+    rounds: List[List[Dict[str, Any]]] = [[] for _ in cases]
+    for round_index in range(opts.repeats):
+        if not opts.json and opts.repeats > 1:
+            print(f"   -- 第 {round_index + 1}/{opts.repeats} 輪")
+        for runs, (_, _, run) in zip(rounds, cases):
+            runs.append(run())
+
+    results = []
+    for (name, params, _), runs in zip(cases, rounds):
+        best = min(runs, key=lambda stats: stats["p50"])
+        p50s = [stats["p50"] for stats in runs]
+        # 以中位數與最佳一輪的差距估計雜訊 (不受單一輪偶發變慢影響)
+        median = sorted(p50s)[len(p50s) // 2]
+        noise = (median - best["p50"]) / best["p50"] if best["p50"] > 0 else 0.0
+        result = {"case": name, "params": params, **best, "p50_rounds": p50s, "noise": round(noise, 3)}
+        results.append(result)
+        if not opts.json:
+            print(f"   {case_key(result):<52} p50 {result['p50']:>10.2f} µs   p99 {result['p99']:>10.2f} µs"
+                  f"   noise {noise:>6.1%}")
+    return results
+
+
+# === 報告 ===
+
+def case_key(result: Dict[str, Any]) -> str:
+    """案例識別字串 (例如 process_results_kalman[people=50,ids=1000])"""
+    params = ",".join(f"{k}={v}" for k, v in result["params"].items())
+    return f"{result['case']}[{params}]"
+
+
+def compare_reports(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float,
+                    min_delta_us: float = 1.0) -> List[str]:
+    """
+    輸出與前一份報告的 p50 差異
+
+    Args:
+        baseline: 前一份報告
+        current: 本次報告
+        threshold: 退化比例門檻
+        min_delta_us: 退化的最小絕對差距 (µs),低於此值視為計時雜訊
+
+    Returns:
+        p50 變慢超過 threshold + noise 且差距超過 min_delta_us 的案例
+    """
+    print(f"\n🔍 比較 {baseline['label']} → {current['label']} "
+          f"(p50, 退化門檻 +{threshold:.0%} + noise 且 > {min_delta_us:g} µs)")
+    before = {case_key(r): r for r in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        key = case_key(result)
+        if key not in before:
+            print(f"   {key:<52} {'(新案例)':>28}")
+            continue
+        old, new = before[key]["p50"], result["p50"]
+        change = (new - old) / old if old > 0 else 0.0
+        # 舊報告沒有 noise 欄位時視為 0
+        noise = max(before[key].get("noise", 0.0), result.get("noise", 0.0))
+        flag = ""
+        if change > threshold + noise and new - old > min_delta_us:
+            regressions.append(key)
+            flag = " ⚠"
+        print(f"   {key:<52} {old:>10.2f} → {new:>10.2f} µs ({change:+.1%}){flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="熱路徑微基準 (距離計算、結果處理、payload、廣播)")
+    parser.add_argument("--people", type=int, nargs="+", default=[1, 10, 50, 200], help="每幀人數")
+    parser.add_argument("--ids", type=int, nargs="+", default=[1, 100, 1000], help="追蹤 ID 池大小")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 100, 1000], help="廣播案例的連線數")
+    parser.add_argument("--samples", type=int, default=500, help="每個案例的取樣次數上限")
+    parser.add_argument("--warmup", type=int, default=20, help="每個案例的暖機次數")
+    parser.add_argument("--max-seconds", type=float, default=2.0, help="每個案例的計時上限 (秒)")
+    parser.add_argument("--repeats", type=int, default=3, help="執行輪數 (每個案例取 p50 最低的一輪)")
+    parser.add_argument("--only", nargs="+", help="只執行名稱包含這些字串的案例")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--label", default="run", help="報告標籤 (例如版本號)")
+    parser.add_argument("--output", help="報告 JSON 輸出路徑")
+    parser.add_argument("--compare", help="要比較的前一份報告 JSON")
+    parser.add_argument("--threshold", type=float, default=0.2, help="p50 變慢超過此比例 (加上 noise) 視為退化")
+    parser.add_argument("--min-delta-us", type=float, default=1.0, help="p50 變慢少於此值 (µs) 不視為退化")
+    parser.add_argument("--json", action="store_true", help="以 JSON 輸出報告")
+    opts = parser.parse_args()
+
+    if min(opts.people) < 1 or min(opts.ids) < 1 or min(opts.clients) < 1:
+        parser.error("人數、ID 池與連線數必須大於 0")
+    if opts.repeats < 1:
+        parser.error("--repeats 必須大於 0")
+
+    if not opts.json:
+        print(f"⏱ 熱路徑微基準 ({opts.label})")
+    report = {
+        "label": opts.label,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "machine": platform.machine()
+        },
+        "config": {
+            "people": opts.people,
+            "ids": opts.ids,
+            "clients": opts.clients,
+            "samples": opts.samples,
+            "warmup": opts.warmup,
+            "max_seconds": opts.max_seconds,
+            "repeats": opts.repeats,
+            "seed": opts.seed
+        },
+        "unit": "us",
+        "results": run_cases(opts)
+    }
+
+    if opts.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    if opts.output:
+        with open(opts.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        if not opts.json:
+            print(f"\n💾 報告已儲存: {opts.output}")
+    if opts.compare:
+        with open(opts.compare, "r", encoding="utf-8") as f:
+            regressions = compare_reports(json.load(f), report, opts.threshold, opts.min_delta_us)
+        if regressions:
+            print(f"\n⚠ {len(regressions)} 個案例退化")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+距離平滑化比較 - 移動平均 + EMA (average) 與卡爾曼濾波 (kalman) 的延遲、雜訊與運算時間
+
+以模擬軌跡 (靜止 → 接近 → 靜止 → 遠離) 產生含雜訊的框高,
+在不同 vid_stride 與掉幀率下比較兩種模式
+
+用法:
+    python -m tools.smoothing_benchmark [--strides 1 3 6] [--drop 0.1] [--json]
+"""
+
+import argparse
+import json
+import time
+import numpy as np
+
+from app.services.calculator import DistanceCalculator
+from app.utils.config_loader import load_sensor_config
+
+
+CAMERA_FPS = 30.0
+BOX_ASPECT = 3.0  # 站立姿態的框高/框寬
+
+
+def true_distance(t: np.ndarray) -> np.ndarray:
+    """模擬軌跡: 500cm 靜止 3 秒 → 以 100cm/s 接近到 200cm → 靜止 4 秒 → 以 150cm/s 遠離"""
+    return np.interp(t, [0, 3, 6, 10, 12], [500, 500, 200, 200, 500])
+
+
+def true_speed(t: np.ndarray) -> np.ndarray:
+    """模擬軌跡的接近速度 (cm/s,正值為接近)"""
+    return np.select([(t >= 3) & (t < 6), (t >= 10) & (t < 12)], [100.0, -150.0], 0.0)
+
+
+def simulate(stride: int, drop: float, rng: np.random.Generator) -> np.ndarray:
+    """產生處理幀的擷取時間 (依 vid_stride 取幀、隨機掉幀並加上時間抖動)"""
+    capture = np.arange(0, 12, 1.0 / CAMERA_FPS)[::stride]
+    capture = capture[rng.random(len(capture)) >= drop]
+    capture = capture + rng.normal(0, 0.003, len(capture))
+    return capture
+
+
+def run_mode(mode: str, config: dict, times: np.ndarray, heights: np.ndarray):
+    """以指定平滑模式處理單一追蹤的所有幀"""
+    calculator = DistanceCalculator({**config, "smoothing_mode": mode})
+    ids = np.array([1])
+    estimates = np.empty(len(times))
+    speeds = np.full(len(times), np.nan)
+    for i, (t, h) in enumerate(zip(times, heights)):
+        d, s = calculator.calculate_distances(np.array([h]), np.array([h / BOX_ASPECT]), ids, t)
+        estimates[i] = d[0]
+        if s is not None:
+            speeds[i] = s[0]
+    return estimates, speeds
+
+
+def measure_lag(times: np.ndarray, estimates: np.ndarray) -> float:
+    """估計延遲: 找出使估計值與延遲後真值誤差最小的時間位移 (ms)"""
+    shifts = np.arange(0, 1.0, 0.005)
+    errors = [np.sqrt(np.mean((estimates - true_distance(times - s)) ** 2)) for s in shifts]
+    return float(shifts[int(np.argmin(errors))] * 1000)
+
+
+def evaluate(mode: str, config: dict, stride: int, drop: float, noise: float, seed: int):
+    """計算單一模式的延遲與雜訊指標"""
+    rng = np.random.default_rng(seed)
+    times = simulate(stride, drop, rng)
+    person_height = config["real_person_height"]
+    heights = person_height * config["focal_length"] / true_distance(times) * np.exp(rng.normal(0, noise, len(times)))
+
+    estimates, speeds = run_mode(mode, config, times, heights)
+    truth = true_distance(times)
+    settled = ((times > 1.5) & (times < 3)) | ((times > 7.5) & (times < 10))
+
+    result = {
+        "mode": mode,
+        "stride": stride,
+        "frames": int(len(times)),
+        "rmse": round(float(np.sqrt(np.mean((estimates - truth) ** 2))), 2),
+        "static_noise": round(float(np.std(estimates[settled] - truth[settled])), 2),
+        "lag_ms": round(measure_lag(times, estimates), 0)
+    }
+    if not np.isnan(speeds).all():
+        moving = times > 0.5
+        result["speed_rmse"] = round(float(np.sqrt(np.mean((speeds[moving] - true_speed(times[moving])) ** 2))), 1)
+    return result
+
+
+def time_per_frame(mode: str, config: dict, tracks: int, frames: int = 300) -> float:
+    """量測每幀處理時間 (µs)"""
+    calculator = DistanceCalculator({**config, "smoothing_mode": mode})
+    rng = np.random.default_rng(0)
+    ids = np.arange(tracks)
+    heights = rng.uniform(100, 400, (frames, tracks))
+    started = time.perf_counter()
+    for i in range(frames):
+        calculator.calculate_distances(heights[i], heights[i] / BOX_ASPECT, ids, i / 10.0)
+    return (time.perf_counter() - started) / frames * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="比較距離平滑化模式的延遲與雜訊")
+    parser.add_argument("--strides", type=int, nargs="+", default=[1, 3, 6], help="要比較的 vid_stride")
+    parser.add_argument("--drop", type=float, default=0.1, help="隨機掉幀比例")
+    parser.add_argument("--noise", type=float, default=0.04, help="框高相對雜訊 (標準差)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="以 JSON 輸出")
+    args = parser.parse_args()
+
+    config = load_sensor_config()["distance"]
+    accuracy = [
+        evaluate(mode, config, stride, args.drop, args.noise, args.seed)
+        for stride in args.strides
+        for mode in ("average", "kalman")
+    ]
+    timing = [
+        {"mode": mode, "tracks": tracks, "us_per_frame": round(time_per_frame(mode, config, tracks), 1)}
+        for tracks in (1, 50, 200)
+        for mode in ("average", "kalman")
+    ]
+
+    if args.json:
+        print(json.dumps({"accuracy": accuracy, "timing": timing}, indent=2))
+        return
+
+    print(f"{'mode':<8} {'stride':>6} {'frames':>6} {'rmse':>7} {'noise':>7} {'lag_ms':>7} {'speed_rmse':>10}")
+    for r in accuracy:
+        print(f"{r['mode']:<8} {r['stride']:>6} {r['frames']:>6} {r['rmse']:>7} {r['static_noise']:>7} "
+              f"{r['lag_ms']:>7.0f} {r.get('speed_rmse', '-'):>10}")
+    print()
+    print(f"{'mode':<8} {'tracks':>6} {'µs/frame':>10}")
+    for r in timing:
+        print(f"{r['mode']:<8} {r['tracks']:>6} {r['us_per_frame']:>10}")
+
+
+if __name__ == "__main__":
+    main()
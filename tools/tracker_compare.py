@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+追蹤器比較 - 在錄製的影片上比較 ultralytics 追蹤器 (BoT-SORT 等) 與內建 IoU 追蹤器的 ID 穩定度與每幀耗時
+
+每個追蹤器使用新載入的模型,依 vid_stride 取幀逐幀執行:
+- ultralytics 追蹤器: model.track(tracker=...)
+- builtin: model.predict() + IoUTracker (與偵測服務 model.tracker = "builtin" 相同)
+另以不追蹤的 model.predict() 量測純偵測耗時,追蹤成本 = 每幀耗時中位數 - 偵測耗時中位數
+
+ID 穩定度:
+- 有標註 (--gt,MOT 格式 "frame,id,x,y,w,h,...",frame 由 1 起算) 時計算 ID switch:
+  每幀以 IoU >= 0.5 配對標註與追蹤,同一位標註人物配到的追蹤 ID 改變即計一次
+- 無標註時以片段接續估計 (fragment_switches): 新 ID 出現時,若其邊界框與 --max-gap 幀內消失的
+  其他 ID 最後位置重疊 (IoU >= 0.3),視為同一人換了 ID
+另報告 ID 數、平均追蹤長度 (處理幀) 與短追蹤 (少於 5 幀) 數
+
+模型參數 (model_path、conf、iou、imgsz、device、builtin_tracker) 取自 sensor_config.json
+
+用法:
+    python -m tools.tracker_compare clip.mp4 [more.mp4 ...] [--gt clip.txt ...]
+        [--trackers botsort.yaml bytetrack.yaml builtin] [--stride 3] [--max-frames 900] [--json]
+"""
+
+import argparse
+import json
+import time
+from collections import defaultdict
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.tracker import IoUTracker, BUILTIN_TRACKER, iou_matrix, assign
+from app.utils.config_loader import load_sensor_config, get_model_path
+
+
+PREDICT = "predict"        # 不追蹤的偵測基準
+GT_MATCH_IOU = 0.5         # 標註與追蹤配對的最低 IoU
+FRAGMENT_IOU = 0.3         # 片段接續判定的最低 IoU
+SHORT_TRACK_FRAMES = 5     # 短追蹤門檻 (處理幀)
+
+# 每幀紀錄: (影片幀號 1 起算, 追蹤 ID (K,), 邊界框 (K, 4))
+Record = Tuple[int, np.ndarray, np.ndarray]
+
+
+def load_mot(path: str) -> Dict[int, Tuple[np.ndarray, np.ndarray]]:
+    """
+    讀取 MOT 格式標註
+
+    Returns:
+        {幀號: (人物 ID (N,), 邊界框 (N, 4) xyxy)}
+    """
+    rows = np.loadtxt(path, delimiter=",", ndmin=2)
+    frames = {}
+    for number in np.unique(rows[:, 0]).astype(int):
+        part = rows[rows[:, 0] == number]
+        xyxy = np.column_stack([part[:, 2], part[:, 3], part[:, 2] + part[:, 4], part[:, 3] + part[:, 5]])
+        frames[int(number)] = (part[:, 1].astype(np.int64), xyxy)
+    return frames
+
+
+def iter_frames(path: str, stride: int, max_frames: int):
+    """依 stride 讀取影片幀,產生 (幀號 1 起算, 影像)"""
+    import cv2
+
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise RuntimeError(f"無法開啟影片: {path}")
+    number = 0
+    try:
+        while max_frames <= 0 or number < max_frames:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            number += 1
+            if number % stride == 0:
+                yield number, frame
+    finally:
+        cap.release()
+
+
+def run_tracker(name: str, clip: str, model_config: Dict[str, Any], stride: int, max_frames: int,
+                warmup: int) -> Tuple[List[Record], Dict[str, Any]]:
+    """
+    以指定追蹤器處理整支影片
+
+    Args:
+        name: ultralytics 追蹤器設定檔、builtin 或 predict (不追蹤)
+        clip: 影片路徑
+        model_config: sensor_config.json 的 model 區塊
+        stride: 取幀間隔
+        max_frames: 最多讀取的影片幀數 (0 為不限)
+        warmup: 不計入耗時統計的前幾幀
+
+    Returns:
+        (每幀紀錄, 耗時統計)
+    """
+    from ultralytics import YOLO
+
+    model = YOLO(str(get_model_path(model_config["model_path"])))
+    tracker = IoUTracker.from_config(model_config["builtin_tracker"]) if name == BUILTIN_TRACKER else None
+    options = dict(
+        classes=[0], iou=model_config["iou"], imgsz=model_config["imgsz"],
+        device=model_config["device"], show=False, verbose=False
+    )
+
+    records: List[Record] = []
+    frame_ms, tracker_ms = [], []
+    for number, frame in iter_frames(clip, stride, max_frames):
+        started = time.perf_counter()
+        if tracker is not None:
+            detected = model.predict(source=frame, conf=min(model_config["conf"], tracker.low_conf), **options)
+            tracked_at = time.perf_counter()
+            results = tracker.track(detected, model_config["conf"])
+            tracker_ms.append((time.perf_counter() - tracked_at) * 1000)
+        elif name == PREDICT:
+            results = model.predict(source=frame, conf=model_config["conf"], **options)
+        else:
+            results = model.track(source=frame, conf=model_config["conf"], tracker=name, persist=True, **options)
+        frame_ms.append((time.perf_counter() - started) * 1000)
+
+        boxes = results[0].boxes
+        if boxes is None or len(boxes) == 0 or boxes.id is None:
+            records.append((number, np.zeros(0, dtype=np.int64), np.zeros((0, 4))))
+        else:
+            records.append((number, boxes.id.cpu().numpy().astype(np.int64), boxes.xyxy.cpu().numpy().astype(np.float64)))
+
+    timing = {"frames": len(records), "frame_ms": latency_stats(frame_ms[warmup:])}
+    if tracker_ms:
+        timing["tracker_ms"] = latency_stats(tracker_ms[warmup:])
+    return records, timing
+
+
+def latency_stats(values: List[float]) -> Dict[str, Optional[float]]:
+    """耗時統計 (ms)"""
+    if not values:
+        return {"p50": None, "p95": None, "mean": None}
+    array = np.asarray(values)
+    return {
+        "p50": round(float(np.percentile(array, 50)), 2),
+        "p95": round(float(np.percentile(array, 95)), 2),
+        "mean": round(float(array.mean()), 2)
+    }
+
+
+def identity_stats(records: List[Record], max_gap: int) -> Dict[str, Any]:
+    """
+    不需標註的 ID 穩定度指標
+
+    Args:
+        records: 每幀紀錄
+        max_gap: 片段接續判定的最大間隔 (處理幀)
+    """
+    lengths: Dict[int, int] = defaultdict(int)
+    last_seen: Dict[int, Tuple[int, np.ndarray]] = {}
+    fragment_switches = 0
+
+    for index, (_, ids, boxes) in enumerate(records):
+        present = set(ids.tolist())
+        for track_id, box in zip(ids.tolist(), boxes):
+            if track_id not in lengths:
+                ended = [
+                    last_box for other, (seen_at, last_box) in last_seen.items()
+                    if other not in present and index - seen_at <= max_gap
+                ]
+                if ended and iou_matrix(box[np.newaxis], np.asarray(ended)).max() >= FRAGMENT_IOU:
+                    fragment_switches += 1
+            lengths[track_id] += 1
+            last_seen[track_id] = (index, box)
+
+    track_lengths = np.asarray(list(lengths.values()) or [0])
+    return {
+        "ids": len(lengths),
+        "mean_track_length": round(float(track_lengths.mean()), 1),
+        "short_tracks": int((track_lengths[track_lengths > 0] < SHORT_TRACK_FRAMES).sum()),
+        "fragment_switches": fragment_switches
+    }
+
+
+def gt_stats(records: List[Record], gt: Dict[int, Tuple[np.ndarray, np.ndarray]]) -> Dict[str, Any]:
+    """
+    依標註計算 ID switch 與涵蓋率 (只計入處理過的幀)
+
+    Args:
+        records: 每幀紀錄
+        gt: load_mot() 的標註
+    """
+    assigned: Dict[int, int] = {}
+    switches = matched = total = 0
+    for number, ids, boxes in records:
+        if number not in gt:
+            continue
+        gt_ids, gt_boxes = gt[number]
+        total += len(gt_ids)
+        rows, cols = assign(iou_matrix(gt_boxes, boxes), GT_MATCH_IOU)
+        matched += len(rows)
+        for row, col in zip(rows, cols):
+            person, track_id = int(gt_ids[row]), int(ids[col])
+            if person in assigned and assigned[person] != track_id:
+                switches += 1
+            assigned[person] = track_id
+    return {
+        "id_switches": switches,
+        "gt_boxes": total,
+        "coverage": round(matched / total, 3) if total else None
+    }
+
+
+def compare_clip(clip: str, trackers: List[str], model_config: Dict[str, Any], args: argparse.Namespace,
+                 gt: Optional[Dict[int, Tuple[np.ndarray, np.ndarray]]]) -> Dict[str, Any]:
+    """在單支影片上執行偵測基準與所有追蹤器"""
+    _, baseline = run_tracker(PREDICT, clip, model_config, args.stride, args.max_frames, args.warmup)
+    predict_p50 = baseline["frame_ms"]["p50"]
+    rows = []
+    for name in trackers:
+        records, timing = run_tracker(name, clip, model_config, args.stride, args.max_frames, args.warmup)
+        frame_p50 = timing["frame_ms"]["p50"]
+        row = {
+            "tracker": name,
+            **timing,
+            "tracking_overhead_ms": round(frame_p50 - predict_p50, 2) if None not in (frame_p50, predict_p50) else None,
+            **identity_stats(records, args.max_gap)
+        }
+        if gt is not None:
+            row.update(gt_stats(records, gt))
+        rows.append(row)
+    return {"clip": clip, "predict_ms": baseline["frame_ms"], "trackers": rows}
+
+
+def _cell(value) -> str:
+    """表格欄位 (沒有數值時顯示 -)"""
+    return "-" if value is None else str(value)
+
+
+def print_clip(result: Dict[str, Any]):
+    """以表格輸出單支影片的比較結果"""
+    print(f"\n🎞 {result['clip']}  (純偵測 p50 {_cell(result['predict_ms']['p50'])} ms)")
+    print(f"   {'tracker':<16} {'frames':>6} {'p50 ms':>8} {'p95 ms':>8} {'overhead':>9} "
+          f"{'ids':>5} {'mean len':>9} {'short':>6} {'frag sw':>8} {'id sw':>6} {'cover':>6}")
+    for row in result["trackers"]:
+        coverage = row.get("coverage")
+        print(f"   {row['tracker']:<16} {row['frames']:>6} {_cell(row['frame_ms']['p50']):>8} "
+              f"{_cell(row['frame_ms']['p95']):>8} {_cell(row['tracking_overhead_ms']):>9} {row['ids']:>5} "
+              f"{row['mean_track_length']:>9} {row['short_tracks']:>6} {row['fragment_switches']:>8} "
+              f"{_cell(row.get('id_switches')):>6} {(f'{coverage:.0%}' if coverage is not None else '-'):>6}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="比較 ultralytics 追蹤器與內建 IoU 追蹤器")
+    parser.add_argument("clips", nargs="+", help="錄製的影片")
+    parser.add_argument("--gt", nargs="+", help="與影片一一對應的 MOT 格式標註 (可選)")
+    parser.add_argument("--trackers", nargs="+", default=["botsort.yaml", BUILTIN_TRACKER],
+                        help="要比較的追蹤器 (ultralytics 設定檔或 builtin)")
+    parser.add_argument("--stride", type=int, help="取幀間隔 (預設為 model.vid_stride)")
+    parser.add_argument("--max-frames", type=int, default=0, help="每支影片最多讀取的幀數 (0 為不限)")
+    parser.add_argument("--warmup", type=int, default=5, help="不計入耗時統計的前幾幀")
+    parser.add_argument("--max-gap", type=int, default=30, help="片段接續判定的最大間隔 (處理幀)")
+    parser.add_argument("--json", action="store_true", help="以 JSON 輸出完整結果")
+    args = parser.parse_args()
+
+    if args.gt and len(args.gt) != len(args.clips):
+        parser.error("--gt 的數量必須與影片相同")
+
+    model_config = load_sensor_config()["model"]
+    model_config.setdefault("builtin_tracker", {})
+    if args.stride is None:
+        args.stride = model_config.get("vid_stride", 1)
+
+    results = []
+    for i, clip in enumerate(args.clips):
+        gt = load_mot(args.gt[i]) if args.gt else None
+        result = compare_clip(clip, args.trackers, model_config, args, gt)
+        results.append(result)
+        if not args.json:
+            print_clip(result)
+
+    if args.json:
+        print(json.dumps({"stride": args.stride, "clips": results}, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,427 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+WebSocket 扇出負載測試 - 對運行中的服務開啟大量 /ws/detection 與 /ws/live 客戶端
+
+客戶端分為三種讀取行為:
+- fast: 收到即處理
+- slow: 每則訊息後暫停 --slow-delay 秒 (模擬處理緩慢的前端)
+- stalled: 連線後完全不讀取 (模擬當機或網路卡住的前端,TCP 緩衝填滿後造成背壓)
+
+量測視窗內統計每組客戶端的遞送延遲百分位數 (接收時間 - payload timestamp)、
+遞送比例與遺失 (以伺服器視窗內產生的幀數為準),並每秒取樣伺服器的 CPU、RSS 與 FPS
+(/api/detection/stats 的 process、frame_seq 欄位)。報告為 JSON,可用 --compare 與前一版比較
+
+延遲以伺服器時鐘的 timestamp 計算,客戶端與伺服器應在同一台主機 (或時鐘已同步)
+沒有攝影機的機器可將服務設為 camera.type = "synthetic"、model.backend = "stub" 後測試
+
+用法:
+    python -m tools.ws_loadtest --url http://127.0.0.1:8000 --detection 200 --live 800
+        [--slow-ratio 0.1] [--stalled-ratio 0.02] [--duration 30] [--processes 4]
+        [--label v1.2] [--output report.json] [--compare baseline.json]
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import time
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+
+# 客戶端讀取行為
+FAST = "fast"
+SLOW = "slow"
+STALLED = "stalled"
+
+# 端點
+ENDPOINTS = {"detection": "/ws/detection", "live": "/ws/live"}
+
+# 同時進行的握手數上限 (避免瞬間大量連線被伺服器拒絕)
+MAX_CONCURRENT_HANDSHAKES = 100
+
+# 報告中比較的延遲百分位數
+PERCENTILES = (50, 90, 99)
+
+
+def build_clients(counts: Dict[str, int], slow_ratio: float, stalled_ratio: float) -> List[Tuple[str, str]]:
+    """
+    依比例分配每個客戶端的端點與讀取行為
+
+    Returns:
+        [(端點名稱, 行為), ...]
+    """
+    clients = []
+    for endpoint, count in counts.items():
+        stalled = int(round(count * stalled_ratio))
+        slow = int(round(count * slow_ratio))
+        fast = max(0, count - stalled - slow)
+        clients += [(endpoint, FAST)] * fast + [(endpoint, SLOW)] * slow + [(endpoint, STALLED)] * stalled
+    return clients
+
+
+# === 客戶端 (在工作程序中執行) ===
+
+class GroupStats:
+    """單一 (端點, 行為) 組合的統計"""
+
+    def __init__(self):
+        self.clients = 0
+        self.connected = 0
+        self.errors = 0
+        self.error_samples: List[str] = []
+        self.messages = 0
+        self.seq_gaps = 0
+        self.latencies: List[float] = []
+
+    def record_error(self, message: str):
+        """記錄連線錯誤 (只保留前幾則訊息)"""
+        self.errors += 1
+        if len(self.error_samples) < 5:
+            self.error_samples.append(message)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """轉為可傳回主程序的字典"""
+        return {
+            "clients": self.clients,
+            "connected": self.connected,
+            "errors": self.errors,
+            "error_samples": self.error_samples,
+            "messages": self.messages,
+            "seq_gaps": self.seq_gaps,
+            "latencies": np.asarray(self.latencies, dtype=np.float32)
+        }
+
+
+async def run_client(
+    ws_base: str, endpoint: str, behaviour: str, window: Tuple[float, float],
+    slow_delay: float, stats: GroupStats, handshake: asyncio.Semaphore
+):
+    """
+    單一客戶端: 連線後依行為讀取訊息,只統計量測視窗內收到的訊息
+
+    Args:
+        ws_base: WebSocket 基底位址 (ws://host:port)
+        endpoint: 端點名稱 (detection / live)
+        behaviour: 讀取行為 (fast / slow / stalled)
+        window: 量測視窗 (開始, 結束),time.time() 時間
+        slow_delay: slow 行為每則訊息後的暫停秒數
+        stats: 所屬組合的統計
+        handshake: 握手並行數限制
+    """
+    import websockets
+
+    window_start, window_end = window
+    stats.clients += 1
+    try:
+        async with handshake:
+            websocket = await websockets.connect(
+                ws_base + ENDPOINTS[endpoint],
+                max_size=None,
+                ping_interval=None,
+                open_timeout=30,
+                # stalled 客戶端不讀取,緩衝一則訊息後即停止接收,讓 TCP 背壓傳回伺服器
+                max_queue=1 if behaviour == STALLED else 32
+            )
+    except Exception as e:
+        stats.record_error(f"connect: {e}")
+        return
+
+    stats.connected += 1
+    try:
+        if behaviour == STALLED:
+            await asyncio.sleep(max(0.0, window_end - time.time()))
+            return
+
+        last_seq = None
+        while True:
+            remaining = window_end - time.time()
+            if remaining <= 0:
+                break
+            try:
+                message = await asyncio.wait_for(websocket.recv(), remaining)
+            except asyncio.TimeoutError:
+                break
+
+            received = time.time()
+            if received >= window_start:
+                payload = json.loads(message)
+                stats.messages += 1
+                timestamp = payload.get("timestamp")
+                if timestamp:
+                    stats.latencies.append((received - timestamp) * 1000)
+                seq = payload.get("seq")
+                if seq is not None:
+                    if last_seq is not None and seq > last_seq + 1:
+                        stats.seq_gaps += seq - last_seq - 1
+                    last_seq = seq
+
+            if behaviour == SLOW:
+                await asyncio.sleep(slow_delay)
+    except Exception as e:
+        stats.record_error(f"recv: {e}")
+    finally:
+        try:
+            await asyncio.wait_for(websocket.close(), 2)
+        except Exception:
+            pass
+
+
+async def run_clients(ws_base: str, clients: List[Tuple[str, str]], ramp_end: float,
+                      window: Tuple[float, float], slow_delay: float) -> Dict[str, Dict[str, Any]]:
+    """在單一事件迴圈中於 ramp_end 前平均開啟所有客戶端"""
+    handshake = asyncio.Semaphore(MAX_CONCURRENT_HANDSHAKES)
+    groups: Dict[str, GroupStats] = {}
+    tasks = []
+    ramp = max(0.0, ramp_end - time.time())
+    for i, (endpoint, behaviour) in enumerate(clients):
+        stats = groups.setdefault(f"{endpoint}/{behaviour}", GroupStats())
+        tasks.append(asyncio.create_task(
+            run_client(ws_base, endpoint, behaviour, window, slow_delay, stats, handshake)
+        ))
+        if ramp > 0 and len(clients) > 1:
+            await asyncio.sleep(ramp / len(clients))
+    await asyncio.gather(*tasks)
+    return {key: stats.to_dict() for key, stats in groups.items()}
+
+
+def worker_main(ws_base: str, clients: List[Tuple[str, str]], ramp_end: float,
+                window: Tuple[float, float], slow_delay: float) -> Dict[str, Dict[str, Any]]:
+    """工作程序進入點"""
+    return asyncio.run(run_clients(ws_base, clients, ramp_end, window, slow_delay))
+
+
+# === 伺服器取樣 ===
+
+def fetch_stats(url: str) -> Optional[Dict[str, Any]]:
+    """取得 /api/detection/stats (失敗時回傳 None)"""
+    try:
+        with urllib.request.urlopen(url + "/api/detection/stats", timeout=5) as response:
+            return json.loads(response.read().decode("utf-8")).get("data")
+    except Exception:
+        return None
+
+
+async def sample_server(url: str, window: Tuple[float, float], interval: float = 1.0) -> List[Dict[str, Any]]:
+    """從開始到量測視窗結束,每 interval 秒取樣一次伺服器統計"""
+    loop = asyncio.get_running_loop()
+    samples = []
+    while True:
+        stats = await loop.run_in_executor(None, fetch_stats, url)
+        now = time.time()
+        if stats is not None:
+            process = stats.get("process", {})
+            samples.append({
+                "time": now,
+                "frame_seq": stats.get("frame_seq"),
+                "fps": stats.get("fps"),
+                "actual_fps": stats.get("actual_fps"),
+                "cpu_seconds": process.get("cpu_seconds"),
+                "rss_mb": process.get("rss_mb"),
+                "threads": process.get("threads"),
+                "connections": stats.get("connections", {}).get("websocket")
+            })
+        if now >= window[1]:
+            return samples
+        await asyncio.sleep(interval)
+
+
+def summarize_server(samples: List[Dict[str, Any]], window: Tuple[float, float]) -> Dict[str, Any]:
+    """彙整量測視窗內的伺服器取樣"""
+    inside = [s for s in samples if window[0] <= s["time"] <= window[1] + 1.5]
+    if len(inside) < 2:
+        return {"error": "量測視窗內的伺服器取樣不足 (無法取得 /api/detection/stats)"}
+
+    first, last = inside[0], inside[-1]
+    elapsed = last["time"] - first["time"]
+    summary: Dict[str, Any] = {
+        "samples": len(inside),
+        "frames": (last["frame_seq"] - first["frame_seq"]) if first["frame_seq"] is not None else None,
+        "elapsed_s": round(elapsed, 2),
+        "fps_mean": round(float(np.mean([s["fps"] or 0 for s in inside])), 1),
+        "fps_min": min(s["fps"] or 0 for s in inside),
+        "connections_max": max(s["connections"] or 0 for s in inside)
+    }
+
+    cpu = [s for s in inside if s["cpu_seconds"] is not None]
+    if len(cpu) >= 2:
+        percents = [
+            (b["cpu_seconds"] - a["cpu_seconds"]) / (b["time"] - a["time"]) * 100
+            for a, b in zip(cpu, cpu[1:]) if b["time"] > a["time"]
+        ]
+        summary["cpu_percent_mean"] = round((cpu[-1]["cpu_seconds"] - cpu[0]["cpu_seconds"]) / elapsed * 100, 1)
+        summary["cpu_percent_max"] = round(max(percents), 1) if percents else None
+
+    rss = [s["rss_mb"] for s in inside if s["rss_mb"] is not None]
+    if rss:
+        summary["rss_mb_start"] = rss[0]
+        summary["rss_mb_end"] = rss[-1]
+        summary["rss_mb_max"] = max(rss)
+    return summary
+
+
+# === 報告 ===
+
+def summarize_group(group: Dict[str, Any], expected_frames: Optional[int]) -> Dict[str, Any]:
+    """彙整單一組合: 延遲百分位數、遞送比例與遺失"""
+    latencies = group["latencies"]
+    summary: Dict[str, Any] = {
+        "clients": group["clients"],
+        "connected": group["connected"],
+        "errors": group["errors"],
+        "messages": group["messages"],
+        "messages_per_client": round(group["messages"] / group["connected"], 1) if group["connected"] else 0,
+        "seq_gaps": group["seq_gaps"]
+    }
+    if expected_frames and group["connected"]:
+        delivered = group["messages"] / (group["connected"] * expected_frames)
+        summary["delivered_ratio"] = round(delivered, 4)
+        summary["loss"] = round(max(0.0, 1 - delivered), 4)
+    if len(latencies):
+        summary["latency_ms"] = {
+            **{f"p{p}": round(float(np.percentile(latencies, p)), 2) for p in PERCENTILES},
+            "mean": round(float(latencies.mean()), 2),
+            "max": round(float(latencies.max()), 2)
+        }
+    if group["error_samples"]:
+        summary["error_samples"] = group["error_samples"]
+    return summary
+
+
+def merge_groups(results: List[Dict[str, Dict[str, Any]]]) -> Dict[str, Dict[str, Any]]:
+    """合併各工作程序的組合統計"""
+    merged: Dict[str, Dict[str, Any]] = {}
+    for result in results:
+        for key, group in result.items():
+            if key not in merged:
+                merged[key] = {**group, "error_samples": list(group["error_samples"])}
+                continue
+            target = merged[key]
+            for field in ("clients", "connected", "errors", "messages", "seq_gaps"):
+                target[field] += group[field]
+            target["error_samples"] = (target["error_samples"] + group["error_samples"])[:5]
+            target["latencies"] = np.concatenate([target["latencies"], group["latencies"]])
+    return merged
+
+
+def print_report(report: Dict[str, Any]):
+    """以表格輸出報告"""
+    server = report["server"]
+    print(f"\n📊 {report['label']}  ({report['config']['clients']} 客戶端, 視窗 {report['config']['duration']:g} 秒)")
+    if "error" in server:
+        print(f"   伺服器: {server['error']}")
+    else:
+        print(f"   伺服器: {server['frames']} 幀, FPS 平均 {server['fps_mean']} / 最低 {server['fps_min']}, "
+              f"CPU 平均 {server.get('cpu_percent_mean', '-')}% / 最高 {server.get('cpu_percent_max', '-')}%, "
+              f"RSS {server.get('rss_mb_start', '-')} → {server.get('rss_mb_end', '-')} MB")
+    print(f"   {'group':<20} {'conn':>6} {'err':>5} {'msg/cl':>8} {'loss':>7} "
+          + " ".join(f"{'p' + str(p):>9}" for p in PERCENTILES) + f" {'max':>9}")
+    for key, group in sorted(report["groups"].items()):
+        latency = group.get("latency_ms", {})
+        loss = group.get("loss")
+        print(f"   {key:<20} {group['connected']:>6} {group['errors']:>5} {group['messages_per_client']:>8} "
+              f"{(f'{loss:.1%}' if loss is not None else '-'):>7} "
+              + " ".join(f"{latency.get(f'p{p}', '-'):>9}" for p in PERCENTILES)
+              + f" {latency.get('max', '-'):>9}")
+
+
+def compare_reports(baseline: Dict[str, Any], current: Dict[str, Any]):
+    """輸出與前一版報告的差異 (延遲百分位數、遺失、CPU、RSS)"""
+    print(f"\n🔍 比較 {baseline['label']} → {current['label']}")
+
+    def delta(before, after, unit=""):
+        if before is None or after is None:
+            return "-"
+        return f"{before}{unit} → {after}{unit} ({after - before:+.2f})"
+
+    for key in ("fps_mean", "cpu_percent_mean", "rss_mb_max"):
+        print(f"   server.{key:<20} {delta(baseline['server'].get(key), current['server'].get(key))}")
+    for key in sorted(set(baseline["groups"]) | set(current["groups"])):
+        before = baseline["groups"].get(key, {})
+        after = current["groups"].get(key, {})
+        for p in PERCENTILES:
+            print(f"   {key + f'.p{p}':<27} {delta(before.get('latency_ms', {}).get(f'p{p}'), after.get('latency_ms', {}).get(f'p{p}'), ' ms')}")
+        print(f"   {key + '.loss':<27} {delta(before.get('loss'), after.get('loss'))}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="WebSocket 扇出負載測試")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="服務位址")
+    parser.add_argument("--detection", type=int, default=100, help="/ws/detection 客戶端數")
+    parser.add_argument("--live", type=int, default=100, help="/ws/live 客戶端數")
+    parser.add_argument("--slow-ratio", type=float, default=0.1, help="slow 客戶端比例")
+    parser.add_argument("--stalled-ratio", type=float, default=0.02, help="stalled 客戶端比例")
+    parser.add_argument("--slow-delay", type=float, default=0.25, help="slow 客戶端每則訊息後暫停秒數")
+    parser.add_argument("--ramp", type=float, default=5.0, help="開啟所有客戶端的時間 (秒)")
+    parser.add_argument("--warmup", type=float, default=3.0, help="開啟完成後到開始量測的時間 (秒)")
+    parser.add_argument("--duration", type=float, default=30.0, help="量測視窗長度 (秒)")
+    parser.add_argument("--processes", type=int, default=1, help="客戶端工作程序數 (客戶端數千時避免產生端成為瓶頸)")
+    parser.add_argument("--label", default="run", help="報告標籤 (例如版本號)")
+    parser.add_argument("--output", help="報告 JSON 輸出路徑")
+    parser.add_argument("--compare", help="要比較的前一份報告 JSON")
+    args = parser.parse_args()
+
+    url = args.url.rstrip("/")
+    ws_base = "ws" + url[len("http"):]
+    clients = build_clients({"detection": args.detection, "live": args.live}, args.slow_ratio, args.stalled_ratio)
+    if not clients:
+        parser.error("至少需要一個客戶端")
+
+    if fetch_stats(url) is None:
+        parser.error(f"無法取得 {url}/api/detection/stats,請確認服務已啟動")
+
+    processes = max(1, min(args.processes, len(clients)))
+    started = time.time()
+    ramp_end = started + args.ramp
+    window = (ramp_end + args.warmup, ramp_end + args.warmup + args.duration)
+    print(f"🚀 開啟 {len(clients)} 個客戶端 ({processes} 個程序),{args.ramp:g} 秒內完成,"
+          f"量測 {args.duration:g} 秒")
+
+    async def run() -> Tuple[List[Dict[str, Dict[str, Any]]], List[Dict[str, Any]]]:
+        loop = asyncio.get_running_loop()
+        sampler = asyncio.create_task(sample_server(url, window))
+        with ProcessPoolExecutor(processes, mp_context=multiprocessing.get_context("spawn")) as pool:
+            results = await asyncio.gather(*(
+                loop.run_in_executor(pool, worker_main, ws_base, clients[i::processes], ramp_end, window, args.slow_delay)
+                for i in range(processes)
+            ))
+        return results, await sampler
+
+    results, samples = asyncio.run(run())
+
+    server = summarize_server(samples, window)
+    groups = merge_groups(results)
+    report = {
+        "label": args.label,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {
+            "url": url,
+            "clients": len(clients),
+            "detection": args.detection,
+            "live": args.live,
+            "slow_ratio": args.slow_ratio,
+            "stalled_ratio": args.stalled_ratio,
+            "slow_delay": args.slow_delay,
+            "duration": args.duration,
+            "processes": processes
+        },
+        "server": server,
+        "groups": {key: summarize_group(group, server.get("frames")) for key, group in groups.items()}
+    }
+
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\n💾 報告已儲存: {args.output}")
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare_reports(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -17,13 +17,18 @@ import cv2
 import numpy as np
 import time
 import json
+import argparse
+import urllib.request
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 from PIL import Image, ImageTk
 import threading
-from ultralytics import YOLO
 from collections import deque
 
+# 畫面尺寸 (畫布大小) 與狀態文字更新間隔 (秒)
+DISPLAY_SIZE = (800, 600)
+STATUS_INTERVAL = 0.25
+
 
 class ConfigManager:
     """配置檔管理器"""
@@ -87,7 +92,8 @@ class ConfigManager:
             },
             "performance": {
                 "use_fps_limit": False,
-                "target_fps": 30
+                "target_fps": 30,
+                "display_fps": 60
             },
             "runtime": {
                 "max_runtime_hours": 8,
@@ -178,14 +184,107 @@ class DistanceCalculator:
         return avg_focal, std_dev
 
 
+class ServerClient:
+    """
+    偵測服務客戶端 (連線模式使用)
+    偵測結果來自 /ws/detection,標註影像來自 /api/preview.mjpg,
+    校準結果以 /api/calibration/distance 寫回服務,整台攝影機只有服務端一個推論引擎
+    """
+    
+    def __init__(self, base_url, timeout=10):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.stream = None      # 目前的 MJPEG 回應 (停止時關閉以中斷讀取)
+        self.websocket = None   # 目前的 WebSocket 連線
+    
+    @property
+    def ws_url(self):
+        """WebSocket 位址 (http -> ws, https -> wss)"""
+        return "ws" + self.base_url[len("http"):] + "/ws/detection"
+    
+    def request(self, method, path, data=None):
+        """
+        呼叫 JSON API
+        
+        Returns:
+            回應的 data 欄位
+        """
+        body = json.dumps(data).encode("utf-8") if data is not None else None
+        request = urllib.request.Request(
+            self.base_url + path, data=body, method=method,
+            headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.loads(response.read().decode("utf-8")).get("data")
+    
+    def iter_detections(self):
+        """逐筆接收偵測結果 (JSON 字典)"""
+        from websockets.sync.client import connect
+        
+        with connect(self.ws_url, open_timeout=self.timeout) as websocket:
+            self.websocket = websocket
+            for message in websocket:
+                if message != "pong":
+                    yield json.loads(message)
+    
+    def iter_frames(self):
+        """
+        逐張接收標註影像
+        
+        Yields:
+            (BGR 影像, 原始影像尺寸 (寬, 高) 或 None)
+        """
+        with urllib.request.urlopen(self.base_url + "/api/preview.mjpg", timeout=self.timeout) as response:
+            self.stream = response
+            while True:
+                line = response.readline()
+                if not line:
+                    return
+                if not line.startswith(b"--"):
+                    continue
+                
+                # 讀取分段標頭
+                headers = {}
+                while True:
+                    line = response.readline().strip()
+                    if not line:
+                        break
+                    key, _, value = line.decode("latin-1").partition(":")
+                    headers[key.strip().lower()] = value.strip()
+                
+                jpeg = response.read(int(headers["content-length"]))
+                frame = cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), cv2.IMREAD_COLOR)
+                if frame is None:
+                    continue
+                
+                width, _, height = headers.get("x-source-size", "").partition("x")
+                source_size = (int(width), int(height)) if width.isdigit() and int(width) > 0 else None
+                yield frame, source_size
+    
+    def close(self):
+        """關閉串流連線 (中斷背景執行緒的讀取)"""
+        for connection in (self.stream, self.websocket):
+            if connection is not None:
+                try:
+                    connection.close()
+                except Exception:
+                    pass
+        self.stream = None
+        self.websocket = None
+
+
 class YOLO11DistanceDetectorGUI:
     """YOLO11n 距離偵測器 - GUI版本"""
     
-    def __init__(self, root, config_path="config.json"):
+    def __init__(self, root, config_path="config.json", server_url=None):
         self.root = root
         self.root.title("YOLO11n 距離偵測系統 v3.1")
         self.root.geometry("1400x900")
         
+        # 連線模式: 不開攝影機也不載入模型,改用偵測服務的串流
+        self.server = ServerClient(server_url) if server_url else None
+        if self.server:
+            self.root.title(f"YOLO11n 距離偵測系統 v3.1 - 連線 {self.server.base_url}")
+        
         # 載入配置
         self.config = ConfigManager.load_config(config_path)
         self.config_path = config_path
@@ -200,8 +299,28 @@ class YOLO11DistanceDetectorGUI:
         self.detection_thread = None
         self.current_frame = None
         self.current_results = None  # 儲存當前偵測結果
+        self.remote_detections = []  # 連線模式的當前偵測結果 (bbox 為原始影像座標)
+        self.remote_source_size = None
         self.calibration_measurements = []
         
+        # 畫面繪製: 偵測執行緒只交出最新結果,背景繪製執行緒標註並轉換到重複使用的緩衝,
+        # Tk 執行緒依螢幕更新頻率貼上最新完成的畫面 (來不及顯示的畫面直接丟棄)
+        self.render_condition = threading.Condition()
+        self.pending_render = None       # 等待繪製的最新偵測結果
+        self.render_thread = None
+        self.annotated_lock = threading.Lock()
+        self.annotated_buffer = None     # 原始解析度標註緩衝 (擷取畫面使用)
+        self.resized_buffer = np.empty((DISPLAY_SIZE[1], DISPLAY_SIZE[0], 3), dtype=np.uint8)
+        self.rgb_buffer = np.empty_like(self.resized_buffer)
+        self.display_lock = threading.Lock()
+        self.display_images = [Image.new("RGB", DISPLAY_SIZE), Image.new("RGB", DISPLAY_SIZE)]  # 前/後緩衝
+        self.front_index = 0
+        self.display_seq = 0             # 已完成繪製的畫面序號
+        self.painted_seq = 0             # 已貼上畫布的畫面序號
+        self.frames_dropped = 0          # 繪製前被取代的結果數 (偵測執行緒計數)
+        self.paints_dropped = 0          # 繪製後來不及貼上的畫面數 (Tk 執行緒計數)
+        self.last_status_update = 0
+        
         # 統計資訊
         self.fps = 0
         self.actual_fps = 0
@@ -212,9 +331,13 @@ class YOLO11DistanceDetectorGUI:
         
         # 建立 UI
         self.setup_ui()
+        self.repaint()
         
-        # 載入模型
-        self.load_model()
+        # 載入模型 (連線模式由服務端推論)
+        if self.server:
+            self.update_status(f"🔗 連線模式: {self.server.base_url}")
+        else:
+            self.load_model()
     
     def setup_ui(self):
         """建立使用者介面"""
@@ -228,10 +351,14 @@ class YOLO11DistanceDetectorGUI:
         title_label.pack(pady=5)
         
         # 畫布
-        self.canvas = tk.Canvas(left_frame, width=800, height=600, bg="black")
+        self.canvas = tk.Canvas(left_frame, width=DISPLAY_SIZE[0], height=DISPLAY_SIZE[1], bg="black")
         self.canvas.pack(pady=5)
         self.canvas.bind("<Button-1>", self.on_canvas_click)  # 點擊取樣
         
+        # 畫布影像只建立一次,之後以 paste 更新內容
+        self.photo = ImageTk.PhotoImage("RGB", DISPLAY_SIZE)
+        self.canvas.create_image(0, 0, anchor=tk.NW, image=self.photo)
+        
         # 狀態列
         status_frame = ttk.LabelFrame(left_frame, text="即時狀態", padding="10")
         status_frame.pack(fill=tk.X, pady=5)
@@ -584,39 +711,52 @@ class YOLO11DistanceDetectorGUI:
         ttk.Button(stats_frame, text="📊 匯出統計報告", 
                   command=self.export_stats).pack(pady=5)
     
+    def get_sample_boxes(self):
+        """
+        取得可供點擊取樣的偵測框
+        
+        Returns:
+            (偵測框列表 [x1, y1, x2, y2], 原始影像尺寸 (寬, 高)),沒有資料時為 None
+        """
+        if self.server:
+            if self.remote_source_size is None:
+                return None
+            boxes = [detection["bbox"] for detection in self.remote_detections if detection.get("bbox")]
+            return boxes, self.remote_source_size
+        
+        if self.current_results is None or self.current_frame is None:
+            return None
+        frame_height, frame_width = self.current_frame.shape[:2]
+        boxes = []
+        if self.current_results[0].boxes is not None:
+            boxes = [box.xyxy[0].cpu().numpy() for box in self.current_results[0].boxes]
+        return boxes, (frame_width, frame_height)
+    
     def on_canvas_click(self, event):
         """點擊畫布取樣偵測框高度"""
-        if not self.detector_running or self.current_results is None:
+        sample = self.get_sample_boxes() if self.detector_running else None
+        if sample is None:
             return
+        boxes, (frame_width, frame_height) = sample
         
         # 轉換座標 (畫布座標 -> 實際影像座標)
-        canvas_x, canvas_y = event.x, event.y
+        scale_x = frame_width / DISPLAY_SIZE[0]
+        scale_y = frame_height / DISPLAY_SIZE[1]
+        img_x = event.x * scale_x
+        img_y = event.y * scale_y
+        
+        # 尋找點擊位置的偵測框
+        for x1, y1, x2, y2 in boxes:
+            # 檢查點擊是否在框內
+            if x1 <= img_x <= x2 and y1 <= img_y <= y2:
+                box_height = y2 - y1
+                self.calib_height_var.set(round(box_height, 1))
+                messagebox.showinfo("已取樣", 
+                    f"已自動帶入偵測框高度: {box_height:.1f} 像素\n"
+                    f"請輸入實際距離後點擊「執行快速校準」")
+                return
         
-        # 計算縮放比例
-        if self.current_frame is not None:
-            frame_height, frame_width = self.current_frame.shape[:2]
-            scale_x = frame_width / 800
-            scale_y = frame_height / 600
-            
-            img_x = canvas_x * scale_x
-            img_y = canvas_y * scale_y
-            
-            # 尋找點擊位置的偵測框
-            if self.current_results[0].boxes is not None:
-                for box in self.current_results[0].boxes:
-                    xyxy = box.xyxy[0].cpu().numpy()
-                    x1, y1, x2, y2 = xyxy
-                    
-                    # 檢查點擊是否在框內
-                    if x1 <= img_x <= x2 and y1 <= img_y <= y2:
-                        box_height = y2 - y1
-                        self.calib_height_var.set(round(box_height, 1))
-                        messagebox.showinfo("已取樣", 
-                            f"已自動帶入偵測框高度: {box_height:.1f} 像素\n"
-                            f"請輸入實際距離後點擊「執行快速校準」")
-                        return
-            
-            messagebox.showwarning("提示", "請點擊偵測框內的位置")
+        messagebox.showwarning("提示", "請點擊偵測框內的位置")
     
     def toggle_fps_limit(self):
         """切換 FPS 限制"""
@@ -627,6 +767,8 @@ class YOLO11DistanceDetectorGUI:
     def load_model(self):
         """載入 YOLO 模型"""
         try:
+            from ultralytics import YOLO  # 連線模式不需要,延後載入
+            
             model_path = self.config["model"]["model_path"]
             self.update_status(f"正在載入模型: {model_path}")
             self.model = YOLO(model_path)
@@ -640,6 +782,10 @@ class YOLO11DistanceDetectorGUI:
         if self.detector_running:
             return
         
+        if self.server:
+            self.start_remote()
+            return
+        
         if self.model is None:
             messagebox.showwarning("警告", "模型尚未載入")
             return
@@ -661,12 +807,15 @@ class YOLO11DistanceDetectorGUI:
             self.detector_running = True
             self.start_time = time.time()
             self.total_detections = 0
+            self.frames_dropped = 0
+            self.paints_dropped = 0
             self.frame_times.clear()
             
             # 重置距離計算器
             self.distance_calculator = DistanceCalculator(self.config)
             
-            # 啟動偵測執行緒
+            # 啟動繪製執行緒 (常駐) 與偵測執行緒
+            self.ensure_render_thread()
             self.detection_thread = threading.Thread(target=self.detection_loop, daemon=True)
             self.detection_thread.start()
             
@@ -680,6 +829,94 @@ class YOLO11DistanceDetectorGUI:
             messagebox.showerror("錯誤", f"啟動失敗:\n{str(e)}")
             self.detector_running = False
     
+    def ensure_render_thread(self):
+        """啟動常駐的繪製執行緒"""
+        if self.render_thread is None:
+            self.render_thread = threading.Thread(target=self.render_loop, daemon=True)
+            self.render_thread.start()
+    
+    def start_remote(self):
+        """連線模式: 同步服務端距離參數,啟動偵測結果與影像接收執行緒"""
+        try:
+            distance_config = self.server.request("GET", "/api/calibration/distance")
+        except Exception as e:
+            messagebox.showerror("錯誤", f"無法連線偵測服務:\n{str(e)}")
+            return
+        
+        # 校準以服務端目前的參數為基準
+        self.config["distance"].update(distance_config)
+        self.distance_calculator = DistanceCalculator(self.config)
+        self.focal_length_label.config(text=f"{self.config['distance']['focal_length']:.2f} 像素")
+        
+        self.detector_running = True
+        self.start_time = time.time()
+        self.frames_dropped = 0
+        self.paints_dropped = 0
+        self.remote_detections = []
+        
+        self.ensure_render_thread()
+        threading.Thread(target=self.remote_detection_loop, daemon=True).start()
+        self.detection_thread = threading.Thread(target=self.remote_frame_loop, daemon=True)
+        self.detection_thread.start()
+        
+        self.start_btn.config(state=tk.DISABLED)
+        self.stop_btn.config(state=tk.NORMAL)
+        self.update_status("✓ 已連線偵測服務")
+    
+    def remote_detection_loop(self):
+        """連線模式: 接收偵測結果 (斷線時自動重連)"""
+        while self.detector_running:
+            try:
+                for payload in self.server.iter_detections():
+                    if not self.detector_running:
+                        break
+                    self.remote_detections = payload.get("detections", [])
+                    self.fps = payload.get("fps", 0)
+                    self.actual_fps = payload.get("actual_fps", 0)
+                    self.total_detections = payload.get("total_count", 0)
+                    self.closest_distance = payload.get("closest_distance", 0)
+            except Exception as e:
+                if self.detector_running:
+                    print(f"偵測串流中斷: {e}")
+            if self.detector_running:
+                time.sleep(1.0)
+    
+    def remote_frame_loop(self):
+        """連線模式: 接收服務端已標註的影像並交給繪製執行緒 (斷線時自動重連)"""
+        while self.detector_running:
+            try:
+                for frame, source_size in self.server.iter_frames():
+                    if not self.detector_running:
+                        break
+                    self.current_frame = frame
+                    self.remote_source_size = source_size
+                    
+                    # 服務端已畫上偵測框與資訊,只需縮放顯示
+                    with self.render_condition:
+                        if self.pending_render is not None:
+                            self.frames_dropped += 1
+                        self.pending_render = (frame, [], None)
+                        self.render_condition.notify()
+            except Exception as e:
+                if self.detector_running:
+                    print(f"影像串流中斷: {e}")
+            if self.detector_running:
+                time.sleep(1.0)
+    
+    def push_distance_config(self):
+        """
+        連線模式: 將距離參數寫回服務端 sensor_config.json (服務熱套用)
+        
+        Returns:
+            是否成功
+        """
+        try:
+            self.server.request("PUT", "/api/calibration/distance", self.config["distance"])
+            return True
+        except Exception as e:
+            print(f"❌ 寫回服務端失敗: {e}")
+            return False
+    
     def stop_detection(self):
         """停止偵測"""
         self.detector_running = False
@@ -687,6 +924,11 @@ class YOLO11DistanceDetectorGUI:
         if self.cap:
             self.cap.release()
             self.cap = None
+        if self.server:
+            self.server.close()
+        
+        with self.render_condition:
+            self.pending_render = None
         
         # 更新按鈕狀態
         self.start_btn.config(state=tk.NORMAL)
@@ -736,10 +978,8 @@ class YOLO11DistanceDetectorGUI:
                 
                 self.current_results = results  # 儲存結果供點擊取樣使用
                 
-                # 處理結果
-                annotated_frame = results[0].plot(conf=True, labels=True, boxes=True)
-                
-                # 計算距離
+                # 計算距離 (標註交給繪製執行緒)
+                detections = []
                 if results[0].boxes is not None:
                     distances = []
                     for box in results[0].boxes:
@@ -754,13 +994,7 @@ class YOLO11DistanceDetectorGUI:
                         distance = self.distance_calculator.calculate_distance(
                             box_height, box_width, track_id)
                         distances.append(distance)
-                        
-                        # 顯示距離
-                        x1, y1 = int(xyxy[0]), int(xyxy[1])
-                        color = self.get_distance_color(distance)
-                        cv2.putText(annotated_frame, f"{distance:.1f}cm", 
-                                   (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 
-                                   0.6, color, 2)
+                        detections.append((xyxy, track_id, float(box.conf[0]), distance))
                     
                     self.total_detections = len(results[0].boxes)
                     self.closest_distance = min(distances) if distances else 0
@@ -783,27 +1017,16 @@ class YOLO11DistanceDetectorGUI:
                     self.actual_fps = int(1.0 / avg_frame_time) if avg_frame_time > 0 else 0
                 last_frame_time = time.time()
                 
-                # 在影像上顯示資訊
-                elapsed = time.time() - self.start_time
-                hours = int(elapsed // 3600)
-                minutes = int((elapsed % 3600) // 60)
-                seconds = int(elapsed % 60)
-                
-                cv2.putText(annotated_frame, f"FPS: {self.fps}/{self.actual_fps}", 
-                           (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-                cv2.putText(annotated_frame, f"人數: {self.total_detections}", 
-                           (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-                if self.closest_distance > 0:
-                    cv2.putText(annotated_frame, f"最近: {self.closest_distance:.1f}cm", 
-                               (10, 90), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
-                cv2.putText(annotated_frame, f"運行: {hours:02d}:{minutes:02d}:{seconds:02d}", 
-                           (10, 120), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
-                
-                self.current_frame = annotated_frame
+                self.current_frame = frame
                 
-                # 更新顯示
-                self.root.after(0, self.update_display, annotated_frame)
-                self.root.after(0, self.update_status_display)
+                # 交給繪製執行緒 (尚未繪製的舊結果直接被取代)
+                overlay = (self.fps, self.actual_fps, self.total_detections,
+                           self.closest_distance, time.time() - self.start_time)
+                with self.render_condition:
+                    if self.pending_render is not None:
+                        self.frames_dropped += 1
+                    self.pending_render = (frame, detections, overlay)
+                    self.render_condition.notify()
                 
                 # FPS 限制
                 if use_fps_limit:
@@ -825,20 +1048,95 @@ class YOLO11DistanceDetectorGUI:
         else:
             return (0, 0, 255)  # 紅色
     
-    def update_display(self, frame):
-        """更新顯示畫面"""
-        try:
-            # 調整大小以符合畫布
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            frame_resized = cv2.resize(frame_rgb, (800, 600))
+    def render_loop(self):
+        """繪製執行緒: 取最新偵測結果,標註、縮放並轉為 RGB 寫入後緩衝"""
+        while True:
+            with self.render_condition:
+                while self.pending_render is None:
+                    self.render_condition.wait()
+                frame, detections, overlay = self.pending_render
+                self.pending_render = None
             
-            img = Image.fromarray(frame_resized)
-            imgtk = ImageTk.PhotoImage(image=img)
+            try:
+                self.render_frame(frame, detections, overlay)
+            except Exception as e:
+                print(f"繪製錯誤: {e}")
+    
+    def render_frame(self, frame, detections, overlay):
+        """
+        繪製一幀到重複使用的緩衝,完成後與前緩衝交換
+        
+        Args:
+            frame: 原始影像 (BGR)
+            detections: [(xyxy, track_id, conf, distance), ...]
+            overlay: (fps, actual_fps, 人數, 最近距離, 運行秒數),None 表示影像已標註
+        """
+        with self.annotated_lock:
+            if self.annotated_buffer is None or self.annotated_buffer.shape != frame.shape:
+                self.annotated_buffer = np.empty_like(frame)
+            annotated = self.annotated_buffer
+            np.copyto(annotated, frame)
             
-            self.canvas.create_image(0, 0, anchor=tk.NW, image=imgtk)
-            self.canvas.imgtk = imgtk
+            # 偵測框、追蹤ID、信心度與距離
+            for xyxy, track_id, conf, distance in detections:
+                x1, y1, x2, y2 = (int(v) for v in xyxy)
+                color = self.get_distance_color(distance)
+                cv2.rectangle(annotated, (x1, y1), (x2, y2), color, 2)
+                label = f"{distance:.1f}cm {conf:.2f}"
+                if track_id is not None:
+                    label = f"#{track_id} {label}"
+                cv2.putText(annotated, label, (x1, max(y1 - 10, 15)),
+                           cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+            
+            # 在影像上顯示資訊
+            if overlay is not None:
+                fps, actual_fps, total, closest, elapsed = overlay
+                hours = int(elapsed // 3600)
+                minutes = int((elapsed % 3600) // 60)
+                seconds = int(elapsed % 60)
+                
+                cv2.putText(annotated, f"FPS: {fps}/{actual_fps}", 
+                           (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+                cv2.putText(annotated, f"人數: {total}", 
+                           (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+                if closest > 0:
+                    cv2.putText(annotated, f"最近: {closest:.1f}cm", 
+                               (10, 90), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
+                cv2.putText(annotated, f"運行: {hours:02d}:{minutes:02d}:{seconds:02d}", 
+                           (10, 120), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+            
+            # 調整大小以符合畫布
+            cv2.resize(annotated, DISPLAY_SIZE, dst=self.resized_buffer)
+        
+        cv2.cvtColor(self.resized_buffer, cv2.COLOR_BGR2RGB, dst=self.rgb_buffer)
+        
+        # 寫入後緩衝後交換 (Tk 貼上期間持有 display_lock,不會讀到寫到一半的畫面)
+        back = 1 - self.front_index
+        self.display_images[back].frombytes(self.rgb_buffer)
+        with self.display_lock:
+            self.front_index = back
+            self.display_seq += 1
+    
+    def repaint(self):
+        """依螢幕更新頻率貼上最新完成的畫面 (沒有新畫面時不重繪)"""
+        updated = False
+        try:
+            with self.display_lock:
+                if self.display_seq != self.painted_seq:
+                    self.paints_dropped += self.display_seq - self.painted_seq - 1
+                    self.photo.paste(self.display_images[self.front_index])
+                    self.painted_seq = self.display_seq
+                    updated = True
+            
+            now = time.time()
+            if updated and now - self.last_status_update >= STATUS_INTERVAL:
+                self.last_status_update = now
+                self.update_status_display()
         except Exception as e:
             print(f"更新顯示錯誤: {e}")
+        
+        display_fps = self.config.get("performance", {}).get("display_fps", 60)
+        self.root.after(max(1, int(1000 / display_fps)), self.repaint)
     
     def update_status_display(self):
         """更新狀態顯示"""
@@ -849,7 +1147,7 @@ class YOLO11DistanceDetectorGUI:
         status = f"""
 ╔═════════════════════════════════════════════════════════════════════╗
 ║  FPS: {self.fps:3d}/{self.actual_fps:3d}  |  偵測人數: {self.total_detections:2d}  |  最近距離: {self.closest_distance:6.1f} cm
-║  運行時間: {hours:02d}:{minutes:02d}  |  焦距: {self.config['distance']['focal_length']:.1f} px
+║  運行時間: {hours:02d}:{minutes:02d}  |  焦距: {self.config['distance']['focal_length']:.1f} px  |  丟棄畫面: {self.frames_dropped + self.paints_dropped}
 ╚═════════════════════════════════════════════════════════════════════╝
         """
         
@@ -865,10 +1163,13 @@ class YOLO11DistanceDetectorGUI:
     
     def capture_frame(self):
         """擷取當前畫面"""
-        if self.current_frame is not None:
+        with self.annotated_lock:
+            snapshot = self.annotated_buffer.copy() if self.annotated_buffer is not None else None
+        
+        if snapshot is not None:
             timestamp = time.strftime("%Y%m%d_%H%M%S")
             filename = f"capture_{timestamp}.jpg"
-            cv2.imwrite(filename, self.current_frame)
+            cv2.imwrite(filename, snapshot)
             messagebox.showinfo("成功", f"畫面已儲存:\n{filename}")
         else:
             messagebox.showwarning("警告", "沒有可擷取的畫面")
@@ -980,9 +1281,15 @@ class YOLO11DistanceDetectorGUI:
             messagebox.showerror("錯誤", f"儲存失敗:\n{str(e)}")
     
     def save_focal_length(self):
-        """儲存焦距設定"""
+        """儲存焦距設定 (連線模式寫回服務端)"""
         try:
-            if ConfigManager.save_config(self.config, self.config_path):
+            if self.server:
+                if self.push_distance_config():
+                    messagebox.showinfo("成功", 
+                        f"焦距 {self.config['distance']['focal_length']:.2f} 已寫入偵測服務")
+                else:
+                    messagebox.showerror("錯誤", "寫入偵測服務失敗")
+            elif ConfigManager.save_config(self.config, self.config_path):
                 messagebox.showinfo("成功", 
                     f"焦距 {self.config['distance']['focal_length']:.2f} 已儲存至 config.json")
             else:
@@ -996,9 +1303,15 @@ class YOLO11DistanceDetectorGUI:
             # 先套用設定
             self.apply_settings_internal()
             
+            # 連線模式: 距離參數寫回服務端,其餘設定仍存於本機
+            if self.server and not self.push_distance_config():
+                messagebox.showerror("錯誤", "距離參數寫入偵測服務失敗")
+                return
+            
             # 儲存到 config.json
             if ConfigManager.save_config(self.config, self.config_path):
-                messagebox.showinfo("成功", "所有設定已儲存至 config.json")
+                messagebox.showinfo("成功", "所有設定已儲存至 config.json"
+                                    + (" (距離參數已寫入偵測服務)" if self.server else ""))
             else:
                 messagebox.showerror("錯誤", "儲存失敗")
         except Exception as e:
@@ -1153,8 +1466,13 @@ YOLO11n 距離偵測系統 - 統計報告
 
 def main():
     """主程式"""
+    parser = argparse.ArgumentParser(description="YOLO11n 距離偵測 GUI")
+    parser.add_argument("--config", default="config.json", help="配置檔路徑")
+    parser.add_argument("--server", help="連線模式: 偵測服務位址 (例如 http://127.0.0.1:8000),不開攝影機也不載入模型")
+    args = parser.parse_args()
+    
     root = tk.Tk()
-    app = YOLO11DistanceDetectorGUI(root, config_path="config.json")
+    app = YOLO11DistanceDetectorGUI(root, config_path=args.config, server_url=args.server)
     root.protocol("WM_DELETE_WINDOW", app.on_closing)
     root.mainloop()
 